@@ -0,0 +1,395 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+"""Deduplicated layout of binary packages in a build cache.
+
+Instead of a tarball, the prefix of a spec is stored as a manifest listing its directories,
+symlinks, hardlinks and files, and the contents of the files are stored as compressed blobs
+named by the sha256 of their uncompressed contents. Blobs are shared by all the specs in the
+build cache, so pushing a spec only uploads the files that are not already there, and
+installing a spec only downloads the files that are not already in the local blob store:
+
+.. code-block::
+
+   build_cache/
+       linux-ubuntu22.04-x86_64_v3-gcc-12.3.0-zlib-1.3.1-<hash>.spec.json
+       linux-ubuntu22.04-x86_64_v3/gcc-12.3.0/zlib-1.3.1/
+           linux-ubuntu22.04-x86_64_v3-gcc-12.3.0-zlib-1.3.1-<hash>.manifest.json
+       blobs/sha256/ab/ab12...ef.gz
+
+The sha256 of the manifest is recorded in the specfile, so a signed specfile also covers all
+the blobs of the spec.
+"""
+import concurrent.futures
+import hashlib
+import io
+import os
+import pathlib
+import re
+import shutil
+import tarfile
+import tempfile
+from contextlib import closing
+from typing import Any, Dict, Iterable, List, Union
+
+import llnl.util.tty as tty
+from llnl.util.filesystem import mkdirp
+
+import spack.error
+import spack.util.archive
+import spack.util.spack_json as sjson
+import spack.util.url as url_util
+import spack.util.web as web_util
+
+#: Version of the format of the manifests
+MANIFEST_VERSION = 1
+
+#: Directory of the blobs, relative to the build cache directory of a mirror
+BLOBS_RELATIVE_PATH = "blobs"
+
+#: Extension of the blobs of each compression format
+BLOB_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+#: Maximum number of blobs uploaded or downloaded at the same time
+MAX_CONCURRENT_TRANSFERS = 16
+
+DIGEST_REGEX = re.compile(r"^[0-9a-f]{64}$")
+
+#: Contents of a file: either its path, or its data
+Source = Union[str, bytes]
+
+
+class BlobError(spack.error.SpackError):
+    """Raised when a blob or a manifest is invalid"""
+
+
+def blob_url(cache_prefix: str, digest: str, compression: str) -> str:
+    """URL of a blob in a build cache.
+
+    Args:
+        cache_prefix: URL of the build cache directory of a mirror
+        digest: sha256 of the uncompressed contents of the blob
+        compression: compression format of the blob
+    """
+    return url_util.join(
+        cache_prefix,
+        BLOBS_RELATIVE_PATH,
+        "sha256",
+        digest[:2],
+        f"{digest}{BLOB_EXTENSIONS[compression]}",
+    )
+
+
+class ManifestRecorder:
+    """Records the entries of a prefix in a manifest, and the sha256 of the contents of its files.
+
+    It has the same ``addfile`` method as a ``tarfile.TarFile``, so that it can be passed to
+    ``spack.util.archive.reproducible_tarfile_from_prefix``, with entry names relative to the
+    prefix.
+    """
+
+    def __init__(self, compression: str = "gzip") -> None:
+        self.compression = compression
+        self.entries: List[Dict[str, Any]] = []
+        #: Contents of the files, by sha256
+        self.sources: Dict[str, Source] = {}
+
+    def addfile(self, tarinfo: tarfile.TarInfo, fileobj=None) -> None:
+        # The prefix itself is created by the installer
+        if tarinfo.name in ("", "."):
+            return
+
+        if tarinfo.isdir():
+            self.entries.append({"type": "dir", "path": tarinfo.name})
+        elif tarinfo.issym():
+            self.entries.append(
+                {"type": "symlink", "path": tarinfo.name, "target": tarinfo.linkname}
+            )
+        elif tarinfo.islnk():
+            self.entries.append(
+                {"type": "hardlink", "path": tarinfo.name, "target": tarinfo.linkname}
+            )
+        else:
+            hasher = hashlib.sha256()
+            for chunk in iter(lambda: fileobj.read(1 << 20), b""):
+                hasher.update(chunk)
+            digest = hasher.hexdigest()
+            name = getattr(fileobj, "name", None)
+            self.sources[digest] = name if isinstance(name, str) else fileobj.getvalue()
+            self.entries.append(
+                {
+                    "type": "file",
+                    "path": tarinfo.name,
+                    "mode": tarinfo.mode,
+                    "size": tarinfo.size,
+                    "digest": digest,
+                }
+            )
+
+    def add_bytes(self, name: str, data: bytes, mode: int = 0o644) -> None:
+        """Add a file that does not exist in the prefix"""
+        tarinfo = tarfile.TarInfo(name)
+        tarinfo.mode = mode
+        tarinfo.size = len(data)
+        self.addfile(tarinfo, io.BytesIO(data))
+
+    def manifest(self) -> Dict[str, Any]:
+        return {
+            "version": MANIFEST_VERSION,
+            "compression": self.compression,
+            "entries": self.entries,
+        }
+
+
+def _push_blob(
+    digest: str, source: Source, cache_prefix: str, compression: str, tmpdir: str
+) -> bool:
+    url = blob_url(cache_prefix, digest, compression)
+    if web_util.url_exists(url):
+        return False
+
+    # Hash the contents again while compressing them, in case the file changed
+    local_path = os.path.join(tmpdir, f"{digest}{BLOB_EXTENSIONS[compression]}")
+    compressor = spack.util.archive.COMPRESSION_FORMATS[compression][0]
+    hasher = hashlib.sha256()
+    with open(local_path, "wb") as f, closing(compressor(f, 1)) as writer:
+        src = io.BytesIO(source) if isinstance(source, bytes) else open(source, "rb")
+        with src:
+            for chunk in iter(lambda: src.read(1 << 20), b""):
+                hasher.update(chunk)
+                writer.write(chunk)
+
+    if hasher.hexdigest() != digest:
+        os.unlink(local_path)
+        raise BlobError(f"{source} changed while it was pushed to the build cache")
+
+    web_util.push_to_url(local_path, url, keep_original=False)
+    return True
+
+
+def push_blobs(
+    sources: Dict[str, Source], cache_prefix: str, compression: str, tmpdir: str
+) -> int:
+    """Upload the blobs that are missing in a build cache, and return how many were uploaded.
+
+    Args:
+        sources: contents of the blobs, by sha256
+        cache_prefix: URL of the build cache directory of a mirror
+        compression: compression format of the blobs
+        tmpdir: directory where blobs are compressed before they are uploaded
+    """
+    with concurrent.futures.ThreadPoolExecutor(MAX_CONCURRENT_TRANSFERS) as executor:
+        futures = [
+            executor.submit(_push_blob, digest, source, cache_prefix, compression, tmpdir)
+            for digest, source in sources.items()
+        ]
+        return sum(future.result() for future in futures)
+
+
+def _copy_blob(
+    digest: str, src_cache_prefix: str, dest_cache_prefix: str, compression: str, tmpdir: str
+) -> bool:
+    dest_url = blob_url(dest_cache_prefix, digest, compression)
+    if web_util.url_exists(dest_url):
+        return False
+
+    local_path = os.path.join(tmpdir, f"{digest}{BLOB_EXTENSIONS[compression]}")
+    _, _, response = web_util.read_from_url(blob_url(src_cache_prefix, digest, compression))
+    with open(local_path, "wb") as f, closing(response):
+        shutil.copyfileobj(response, f)
+    web_util.push_to_url(local_path, dest_url, keep_original=False)
+    return True
+
+
+def copy_manifest(
+    rel_path: str, src_cache_prefix: str, dest_cache_prefix: str, tmpdir: str
+) -> bool:
+    """Copy a manifest from a build cache to another, after the blobs it lists that are missing
+    in the destination, so that the destination never has a manifest without its blobs.
+
+    Args:
+        rel_path: path of the manifest, relative to the build cache directories
+        src_cache_prefix: URL of the build cache directory of the source mirror
+        dest_cache_prefix: URL of the build cache directory of the destination mirror
+        tmpdir: directory where the manifest and the blobs are downloaded before they are
+            uploaded
+
+    Returns:
+        False if there is no such manifest in the source build cache
+    """
+    src_url = url_util.join(src_cache_prefix, rel_path)
+    if not web_util.url_exists(src_url):
+        return False
+
+    local_path = os.path.join(tmpdir, os.path.basename(rel_path))
+    _, _, response = web_util.read_from_url(src_url)
+    with open(local_path, "wb") as f, closing(response):
+        shutil.copyfileobj(response, f)
+    manifest = load_manifest(local_path)
+
+    digests = sorted({e["digest"] for e in manifest["entries"] if e["type"] == "file"})
+    with concurrent.futures.ThreadPoolExecutor(MAX_CONCURRENT_TRANSFERS) as executor:
+        futures = [
+            executor.submit(
+                _copy_blob,
+                digest,
+                src_cache_prefix,
+                dest_cache_prefix,
+                manifest["compression"],
+                tmpdir,
+            )
+            for digest in digests
+        ]
+        copied = sum(future.result() for future in futures)
+    tty.debug(f"Copied {copied} of the {len(digests)} blobs of {src_url}")
+
+    web_util.push_to_url(
+        local_path, url_util.join(dest_cache_prefix, rel_path), keep_original=False
+    )
+    return True
+
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    """Read a manifest, and check that its entries cannot escape the prefix they are extracted
+    to, that each path is listed once, and that hardlinks point to files listed before them."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = sjson.load(f)
+        if manifest["version"] != MANIFEST_VERSION:
+            raise BlobError(f"unsupported manifest version {manifest['version']}")
+        if manifest["compression"] not in BLOB_EXTENSIONS:
+            raise BlobError(f"unsupported compression {manifest['compression']}")
+        files = set()
+        paths = set()
+        for entry in manifest["entries"]:
+            entry_path = _check_relative_path(entry["path"])
+            if entry_path in paths:
+                raise BlobError(f"manifest entry {entry['path']} is listed more than once")
+            paths.add(entry_path)
+            if entry["type"] == "file":
+                if not DIGEST_REGEX.match(entry["digest"]):
+                    raise BlobError(f"invalid digest {entry['digest']}")
+                files.add(entry_path)
+            elif entry["type"] == "hardlink":
+                if _check_relative_path(entry["target"]) not in files:
+                    raise BlobError(
+                        f"manifest entry {entry['path']} is a hardlink to {entry['target']}, "
+                        "which is not a file listed before it"
+                    )
+    except (KeyError, TypeError, ValueError) as e:
+        raise BlobError(f"invalid manifest {path}: {e}") from e
+    return manifest
+
+
+def _check_relative_path(path: str) -> str:
+    """Return the normalized form of a relative path of a manifest entry"""
+    p = pathlib.PurePosixPath(path)
+    if p.is_absolute() or ".." in p.parts or not p.parts:
+        raise BlobError(f"manifest entry {path} is outside of the prefix")
+    return str(p)
+
+
+def _join_inside(root: str, path: str) -> str:
+    """Join a path to a root directory, making sure that no symlink in its parent directories
+    leads outside of the root"""
+    result = os.path.join(root, path)
+    parent = os.path.realpath(os.path.dirname(result))
+    if parent != root and not parent.startswith(root + os.sep):
+        raise BlobError(f"manifest entry {path} is outside of the prefix")
+    return result
+
+
+class BlobStore:
+    """Local store of the blobs downloaded from build caches, which are stored uncompressed.
+
+    Args:
+        root: directory of the store
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def missing(self, manifest: Dict[str, Any]) -> List[str]:
+        """Digests of the files of a manifest that are not in the store"""
+        digests = {e["digest"] for e in manifest["entries"] if e["type"] == "file"}
+        return sorted(d for d in digests if not os.path.exists(self.path(d)))
+
+    def fetch(self, digests: Iterable[str], cache_prefix: str, compression: str) -> None:
+        """Download blobs from a build cache, and check their sha256.
+
+        Args:
+            digests: sha256 of the blobs to download
+            cache_prefix: URL of the build cache directory of a mirror
+            compression: compression format of the blobs
+        """
+        with concurrent.futures.ThreadPoolExecutor(MAX_CONCURRENT_TRANSFERS) as executor:
+            futures = [
+                executor.submit(self._fetch_blob, digest, cache_prefix, compression)
+                for digest in digests
+            ]
+            for future in futures:
+                future.result()
+
+    def _fetch_blob(self, digest: str, cache_prefix: str, compression: str) -> None:
+        url = blob_url(cache_prefix, digest, compression)
+        _, _, response = web_util.read_from_url(url)
+
+        path = self.path(digest)
+        mkdirp(os.path.dirname(path))
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            hasher = hashlib.sha256()
+            with os.fdopen(fd, "wb") as f, closing(response):
+                reader = spack.util.archive.decompressing_reader(response, compression)
+                for chunk in iter(lambda: reader.read(1 << 20), b""):
+                    hasher.update(chunk)
+                    f.write(chunk)
+            if hasher.hexdigest() != digest:
+                raise BlobError(f"sha256 checksum failed for {url}")
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        tty.debug(f"Fetched {url}")
+
+    def extract(self, manifest: Dict[str, Any], prefix: str) -> None:
+        """Populate a prefix from a manifest, whose blobs must be in the store.
+
+        Files are never written through a symlink, and their permissions are masked by the
+        umask, like the ones of the files extracted from a tarball.
+
+        Args:
+            manifest: manifest read with ``load_manifest``
+            prefix: existing directory where the entries of the manifest are created
+        """
+        root = os.path.realpath(prefix)
+        umask = os.umask(0)
+        os.umask(umask)
+        for entry in manifest["entries"]:
+            path = _join_inside(root, entry["path"])
+            kind = entry["type"]
+            if kind == "dir":
+                os.makedirs(path, mode=0o755, exist_ok=True)
+            elif kind == "file":
+                # Files are copied, since they are relocated in place
+                self._copy_to(entry["digest"], path, entry["mode"] & 0o777 & ~umask)
+            elif kind == "symlink":
+                os.symlink(entry["target"], path)
+            elif kind == "hardlink":
+                os.link(_join_inside(root, entry["target"]), path)
+            else:
+                raise BlobError(f"unknown type {kind} of manifest entry {entry['path']}")
+
+    def _copy_to(self, digest: str, path: str, mode: int) -> None:
+        """Copy a blob to a new file, which replaces any symlink or file at that path"""
+        if os.path.lexists(path) and not os.path.isdir(path):
+            os.unlink(path)
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_NOFOLLOW", 0)
+        fd = os.open(path, flags, 0o600)
+        with os.fdopen(fd, "wb") as dst, open(self.path(digest), "rb") as src:
+            shutil.copyfileobj(src, dst)
+            os.chmod(dst.fileno() if os.chmod in os.supports_fd else path, mode)
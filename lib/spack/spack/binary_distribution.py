@@ -32,6 +32,7 @@
 from llnl.util.filesystem import BaseDirectoryVisitor, mkdirp, visit_directory_tree
 from llnl.util.symlink import readlink
 
+import spack.binary_blobs
 import spack.caches
 import spack.config as config
 import spack.database as spack_db
@@ -89,9 +90,35 @@
 BUILD_CACHE_RELATIVE_PATH = "build_cache"
 BUILD_CACHE_KEYS_RELATIVE_PATH = "_pgp"
 
-#: The build cache layout version that this version of Spack creates.
+#: The newest build cache layout version that this version of Spack creates.
 #: Version 2: includes parent directories of the package prefix in the tarball
-CURRENT_BUILD_CACHE_LAYOUT_VERSION = 2
+#: Version 3: the tarball is compressed with the format in ``binary_cache_checksum.compression``
+#: Version 4: the prefix is stored as a manifest of blobs, see :mod:`spack.binary_blobs`
+CURRENT_BUILD_CACHE_LAYOUT_VERSION = 4
+
+#: Layout version of tarballs compressed with gzip, which older versions of Spack can install
+GZIP_BUILD_CACHE_LAYOUT_VERSION = 2
+
+#: Layout version of tarballs compressed with another format than gzip
+COMPRESSED_BUILD_CACHE_LAYOUT_VERSION = 3
+
+#: Layout version of specs stored as a manifest of blobs
+MANIFEST_BUILD_CACHE_LAYOUT_VERSION = 4
+
+#: Directory of the sharded index, relative to the build cache
+INDEX_SHARDS_RELATIVE_PATH = "index"
+
+#: Name of the manifest listing the shards of the index, and their checksums
+INDEX_MANIFEST_NAME = "manifest.json"
+
+#: Version of the format of the manifest of a sharded index
+INDEX_MANIFEST_VERSION = 1
+
+#: Number of leading characters of the DAG hash of a spec selecting the shard of its record
+INDEX_SHARD_PREFIX_LENGTH = 1
+
+#: Matches the DAG hash in the name of a specfile
+SPECFILE_HASH_REGEX = re.compile(r"-([a-z2-7]{32})\.spec\.json(?:\.sig)?$")
 
 
 class BuildCacheDatabase(spack_db.Database):
@@ -504,14 +531,23 @@ def _fetch_and_cache_index(self, mirror_url, cache_entry={}):
         # TODO: get rid of this request, handle 404 better
         scheme = urllib.parse.urlparse(mirror_url).scheme
 
-        if scheme != "oci" and not web_util.url_exists(
-            url_util.join(mirror_url, BUILD_CACHE_RELATIVE_PATH, "index.json")
+        sharded = scheme != "oci" and web_util.url_exists(index_manifest_url(mirror_url))
+        if (
+            scheme != "oci"
+            and not sharded
+            and not web_util.url_exists(
+                url_util.join(mirror_url, BUILD_CACHE_RELATIVE_PATH, "index.json")
+            )
         ):
             return False
 
         if scheme == "oci":
             # TODO: Actually etag and OCI are not mutually exclusive...
             fetcher = OCIIndexFetcher(mirror_url, cache_entry.get("index_hash", None))
+        elif sharded:
+            fetcher = ShardedIndexFetcher(
+                mirror_url, cache_entry.get("index_hash", None), cache=self._index_file_cache
+            )
         elif cache_entry.get("etag"):
             fetcher = EtagIndexFetcher(mirror_url, cache_entry["etag"])
         else:
@@ -788,8 +824,189 @@ def sign_specfile(key: str, specfile_path: str) -> str:
     return signed_specfile_path
 
 
+def index_manifest_url(mirror_url: str) -> str:
+    """Return the url of the manifest of the sharded index of a mirror"""
+    return url_util.join(
+        mirror_url, BUILD_CACHE_RELATIVE_PATH, INDEX_SHARDS_RELATIVE_PATH, INDEX_MANIFEST_NAME
+    )
+
+
+def index_shard_of(dag_hash: str) -> str:
+    """Return the name of the shard of the index storing the record of a spec"""
+    return dag_hash[:INDEX_SHARD_PREFIX_LENGTH]
+
+
+def _index_json(installs: Dict[str, dict]) -> str:
+    """Serialize install records as a buildcache index, in a reproducible way"""
+    installs = {dag_hash: installs[dag_hash] for dag_hash in sorted(installs)}
+    return sjson.dump({"database": {"version": str(spack_db._DB_VERSION), "installs": installs}})
+
+
+def _read_url_text(url: str) -> str:
+    _, _, response = web_util.read_from_url(url)
+    return codecs.getreader("utf-8")(response).read()
+
+
+def _read_sharded_index(cache_prefix: str) -> Tuple[Optional[dict], Dict[str, dict]]:
+    """Read the manifest and all the install records of the sharded index of a build cache.
+
+    Returns None and no records if the build cache has no valid sharded index, and no records
+    if the sharded index is out of sync with index.json, for instance because index.json was
+    updated by a client that does not write shards.
+
+    Args:
+        cache_prefix: url of the build cache
+    """
+    shards_prefix = url_util.join(cache_prefix, INDEX_SHARDS_RELATIVE_PATH)
+    try:
+        manifest = json.loads(_read_url_text(url_util.join(shards_prefix, INDEX_MANIFEST_NAME)))
+        if manifest["version"] != INDEX_MANIFEST_VERSION:
+            raise ValueError(f"unsupported manifest version {manifest['version']}")
+        if not all("file" in entry for entry in manifest["shards"].values()):
+            raise ValueError("invalid list of shards")
+    except Exception as e:
+        tty.debug(f"Ignoring the sharded index of {cache_prefix}: {e}")
+        return None, {}
+
+    try:
+        index_hash = _read_url_text(url_util.join(cache_prefix, "index.json.hash")).strip()
+    except Exception:
+        index_hash = None
+    if manifest.get("index_hash") != index_hash:
+        tty.debug(f"Ignoring the records of the sharded index of {cache_prefix}: out of sync")
+        return manifest, {}
+
+    try:
+        installs = {}
+        for entry in manifest["shards"].values():
+            data = _read_url_text(url_util.join(shards_prefix, entry["file"]))
+            if compute_hash(data) != entry["hash"]:
+                raise ValueError(f"the checksum of {entry['file']} does not match")
+            installs.update(json.loads(data)["database"]["installs"])
+    except Exception as e:
+        tty.debug(f"Ignoring the sharded index of {cache_prefix}: {e}")
+        return None, {}
+    return manifest, installs
+
+
+def _merge_index_records(
+    indexed: Dict[str, dict], added: Dict[str, dict], in_buildcache: Set[str]
+) -> Dict[str, dict]:
+    """Merge the records of an existing index with the records of new specs.
+
+    Only the specs in the build cache and their dependencies are kept, and reference counts are
+    computed again from the dependencies of the records that are kept.
+
+    Args:
+        indexed: records of the existing index
+        added: records of the specs read from their specfiles
+        in_buildcache: DAG hashes of the specs in the build cache
+    """
+    installs = {**indexed, **added}
+
+    def dependencies(record):
+        return [d["hash"] for d in record["spec"].get("dependencies", []) if d["hash"] in installs]
+
+    kept: Set[str] = set()
+    stack = [dag_hash for dag_hash in in_buildcache if dag_hash in installs]
+    while stack:
+        dag_hash = stack.pop()
+        if dag_hash not in kept:
+            kept.add(dag_hash)
+            stack.extend(dependencies(installs[dag_hash]))
+
+    result = {}
+    for dag_hash in kept:
+        record = dict(installs[dag_hash])
+        record["ref_count"] = 0
+        record["in_buildcache"] = dag_hash in in_buildcache
+        result[dag_hash] = record
+
+    for record in result.values():
+        for dag_hash in dependencies(record):
+            result[dag_hash]["ref_count"] += 1
+
+    return result
+
+
+def _push_index_shards(
+    cache_prefix: str,
+    installs: Dict[str, dict],
+    manifest: Optional[dict],
+    index_hash: str,
+    temp_dir: str,
+) -> None:
+    """Push the shards of the index that changed, and then the manifest listing all of them.
+
+    Shards are content addressed, so the ones that did not change are not pushed again, and
+    clients never read a shard that does not match the manifest.
+
+    Args:
+        cache_prefix: url of the build cache
+        installs: all the records of the index
+        manifest: current manifest of the sharded index, if any
+        index_hash: checksum of the index.json with the same records, which clients compare
+            with index.json.hash to detect a sharded index that is out of sync
+        temp_dir: directory for the files to be pushed
+    """
+    shards_prefix = url_util.join(cache_prefix, INDEX_SHARDS_RELATIVE_PATH)
+    old_shards = manifest["shards"] if manifest else {}
+
+    by_shard: Dict[str, Dict[str, dict]] = collections.defaultdict(dict)
+    for dag_hash, record in installs.items():
+        by_shard[index_shard_of(dag_hash)][dag_hash] = record
+
+    new_shards = {}
+    for shard, records in sorted(by_shard.items()):
+        data = _index_json(records)
+        shard_hash = compute_hash(data)
+        new_shards[shard] = {"file": f"{shard}-{shard_hash}.json", "hash": shard_hash}
+        if old_shards.get(shard) == new_shards[shard]:
+            continue
+
+        tty.debug(f"Pushing shard {shard} of the index to {shards_prefix}")
+        shard_path = os.path.join(temp_dir, new_shards[shard]["file"])
+        with open(shard_path, "w") as f:
+            f.write(data)
+        web_util.push_to_url(
+            shard_path,
+            url_util.join(shards_prefix, new_shards[shard]["file"]),
+            keep_original=False,
+            extra_args={"ContentType": "application/json"},
+        )
+
+    manifest_path = os.path.join(temp_dir, INDEX_MANIFEST_NAME)
+    with open(manifest_path, "w") as f:
+        sjson.dump(
+            {"version": INDEX_MANIFEST_VERSION, "index_hash": index_hash, "shards": new_shards}, f
+        )
+    web_util.push_to_url(
+        manifest_path,
+        url_util.join(shards_prefix, INDEX_MANIFEST_NAME),
+        keep_original=False,
+        extra_args={"ContentType": "application/json", "CacheControl": "no-cache"},
+    )
+
+    # Remove the shards that are not referenced anymore
+    current = {entry["file"] for entry in new_shards.values()}
+    for entry in old_shards.values():
+        if entry["file"] in current:
+            continue
+        try:
+            web_util.remove_url(url_util.join(shards_prefix, entry["file"]))
+        except Exception as e:
+            tty.debug(f"Cannot remove the stale shard {entry['file']}: {e}")
+
+
 def _read_specs_and_push_index(
-    file_list, read_method, cache_prefix, db: BuildCacheDatabase, temp_dir, concurrency
+    file_list,
+    read_method,
+    cache_prefix,
+    db: BuildCacheDatabase,
+    temp_dir,
+    concurrency,
+    indexed: Optional[Dict[str, dict]] = None,
+    manifest: Optional[dict] = None,
 ):
     """Read all the specs listed in the provided list, using thread given thread parallelism,
         generate the index, and push it to the mirror.
@@ -802,8 +1019,18 @@ def _read_specs_and_push_index(
         db: A spack database used for adding specs and then writing the index.
         temp_dir (str): Location to write index.json and hash for pushing
         concurrency (int): Number of parallel processes to use when fetching
+        indexed: records of the current index. Specfiles of specs that are already in the
+            build cache according to these records are not read again.
+        manifest: manifest of the current sharded index, if any
     """
+    indexed = indexed or {}
+    in_buildcache: Set[str] = set()
     for file in file_list:
+        match = SPECFILE_HASH_REGEX.search(file)
+        if match and indexed.get(match.group(1), {}).get("in_buildcache"):
+            in_buildcache.add(match.group(1))
+            continue
+
         contents = read_method(file)
         # Need full spec.json name or this gets confused with index.json.
         if file.endswith(".json.sig"):
@@ -816,17 +1043,17 @@ def _read_specs_and_push_index(
 
         db.add(fetched_spec)
         db.mark(fetched_spec, "in_buildcache", True)
+        in_buildcache.add(fetched_spec.dag_hash())
+
+    installs = _merge_index_records(indexed, dict(db._record_dicts()), in_buildcache)
 
-    # Now generate the index, compute its hash, and push the two files to
-    # the mirror.
+    # Generate the monolithic index, for clients that don't read sharded
+    # indices, compute its hash, and push the two files to the mirror.
+    index_string = _index_json(installs)
+    index_hash = compute_hash(index_string)
     index_json_path = os.path.join(temp_dir, "index.json")
     with open(index_json_path, "w") as f:
-        db._write_to_file(f)
-
-    # Read the index back in and compute its hash
-    with open(index_json_path) as f:
-        index_string = f.read()
-        index_hash = compute_hash(index_string)
+        f.write(index_string)
 
     # Write the hash out to a local file
     index_hash_path = os.path.join(temp_dir, "index.json.hash")
@@ -849,6 +1076,10 @@ def _read_specs_and_push_index(
         extra_args={"ContentType": "text/plain", "CacheControl": "no-cache"},
     )
 
+    # Push the shards that changed, and their manifest, last: until the manifest records the
+    # new index hash, clients fall back to index.json
+    _push_index_shards(cache_prefix, installs, manifest, index_hash, temp_dir)
+
 
 def _specs_from_cache_aws_cli(cache_prefix):
     """Use aws cli to sync all the specs into a local temporary directory.
@@ -980,10 +1211,22 @@ def _url_generate_package_index(url: str, tmpdir: str, concurrency: int = 32):
 
     tty.debug(f"Retrieving spec descriptor files from {url} to build index")
 
+    # Specs that are already in the sharded index are not read again
+    manifest, indexed = _read_sharded_index(url)
+
     db = BuildCacheDatabase(tmpdir)
 
     try:
-        _read_specs_and_push_index(file_list, read_fn, url, db, db.database_directory, concurrency)
+        _read_specs_and_push_index(
+            file_list,
+            read_fn,
+            url,
+            db,
+            db.database_directory,
+            concurrency,
+            indexed=indexed,
+            manifest=manifest,
+        )
     except Exception as e:
         raise GenerateIndexError(f"Encountered problem pushing package index to {url}: {e}") from e
 
@@ -1033,13 +1276,6 @@ def tarfile_of_spec_prefix(tar: tarfile.TarFile, prefix: str) -> None:
         prefix: absolute install prefix of spec"""
     if not os.path.isabs(prefix) or not os.path.isdir(prefix):
         raise ValueError(f"prefix '{prefix}' must be an absolute path to a directory")
-    stat_key = lambda stat: (stat.st_dev, stat.st_ino)
-
-    try:  # skip buildinfo file if it exists
-        files_to_skip = [stat_key(os.lstat(buildinfo_file_name(prefix)))]
-        skip = lambda entry: stat_key(entry.stat(follow_symlinks=False)) in files_to_skip
-    except OSError:
-        skip = lambda entry: False
 
     spack.util.archive.reproducible_tarfile_from_prefix(
         tar,
@@ -1047,12 +1283,64 @@ def tarfile_of_spec_prefix(tar: tarfile.TarFile, prefix: str) -> None:
         # Spack <= 0.21 did not include parent directories, leading to issues when tarballs are
         # used in runtimes like AWS lambda.
         include_parent_directories=True,
-        skip=skip,
+        skip=_skip_buildinfo_file(prefix),
     )
 
 
-def _do_create_tarball(tarfile_path: str, binaries_dir: str, buildinfo: dict):
-    with spack.util.archive.gzip_compressed_tarfile(tarfile_path) as (
+def _skip_buildinfo_file(prefix: str):
+    """Return a function skipping the existing buildinfo file of a prefix, if any"""
+    stat_key = lambda stat: (stat.st_dev, stat.st_ino)
+    try:
+        files_to_skip = [stat_key(os.lstat(buildinfo_file_name(prefix)))]
+        return lambda entry: stat_key(entry.stat(follow_symlinks=False)) in files_to_skip
+    except OSError:
+        return lambda entry: False
+
+
+def _push_spec_prefix_as_blobs(
+    spec: Spec, files: "BuildcacheFiles", compression: str, tmpdir: str
+) -> str:
+    """Upload the files of the prefix of a spec that are missing in a build cache as blobs, and
+    push the manifest of the prefix. Returns the sha256 of the manifest."""
+    recorder = spack.binary_blobs.ManifestRecorder(compression)
+    spack.util.archive.reproducible_tarfile_from_prefix(
+        recorder,  # type: ignore[arg-type]
+        spec.prefix,
+        skip=_skip_buildinfo_file(spec.prefix),
+        path_to_name=lambda path: pathlib.Path(path).relative_to(spec.prefix).as_posix(),
+    )
+    buildinfo = syaml.dump(get_buildinfo_dict(spec), default_flow_style=True)
+    recorder.add_bytes(
+        os.path.relpath(buildinfo_file_name(spec.prefix), spec.prefix), buildinfo.encode("utf-8")
+    )
+
+    blobs_tmpdir = tempfile.mkdtemp(dir=tmpdir)
+    uploaded = spack.binary_blobs.push_blobs(
+        recorder.sources,
+        url_util.join(files.remote, build_cache_relative_path()),
+        compression,
+        blobs_tmpdir,
+    )
+    tty.debug(f"Uploaded {uploaded} of the {len(recorder.sources)} blobs of {_format_spec(spec)}")
+
+    manifest = files.local_manifest()
+    with open(manifest, "w", encoding="utf-8") as f:
+        json.dump(recorder.manifest(), f, separators=(",", ":"))
+    checksum = spack.util.crypto.checksum(hashlib.sha256, manifest)
+    web_util.push_to_url(
+        manifest,
+        files.remote_manifest(),
+        keep_original=False,
+        extra_args={"ContentType": "application/json"},
+    )
+    return checksum
+
+
+def _do_create_tarball(
+    tarfile_path: str, binaries_dir: str, buildinfo: dict, compression: str = "gzip"
+):
+    jobs = spack.config.determine_number_of_jobs(parallel=True)
+    with spack.util.archive.compressed_tarfile(tarfile_path, compression, jobs) as (
         tar,
         inner_checksum,
         outer_checksum,
@@ -1077,6 +1365,7 @@ class ExistsInBuildcache(NamedTuple):
     signed: bool
     unsigned: bool
     tarball: bool
+    manifest: bool = False
 
 
 class BuildcacheFiles:
@@ -1103,40 +1392,79 @@ def remote_tarball(self) -> str:
             self.remote, build_cache_relative_path(), tarball_path_name(self.spec, ".spack")
         )
 
+    def remote_manifest(self) -> str:
+        return url_util.join(
+            self.remote,
+            build_cache_relative_path(),
+            tarball_path_name(self.spec, ".manifest.json"),
+        )
+
     def local_specfile(self) -> str:
         return os.path.join(self.local, f"{self.spec.dag_hash()}.spec.json")
 
     def local_tarball(self) -> str:
         return os.path.join(self.local, f"{self.spec.dag_hash()}.tar.gz")
 
+    def local_manifest(self) -> str:
+        return os.path.join(self.local, f"{self.spec.dag_hash()}.manifest.json")
+
 
 def _exists_in_buildcache(spec: Spec, tmpdir: str, out_url: str) -> ExistsInBuildcache:
-    """returns a tuple of bools (signed, unsigned, tarball) indicating whether specfiles/tarballs
-    exist in the buildcache"""
+    """returns a tuple of bools (signed, unsigned, tarball, manifest) indicating whether
+    specfiles/tarballs/manifests exist in the buildcache"""
     files = BuildcacheFiles(spec, tmpdir, out_url)
     signed = web_util.url_exists(files.remote_specfile(signed=True))
     unsigned = web_util.url_exists(files.remote_specfile(signed=False))
     tarball = web_util.url_exists(files.remote_tarball())
-    return ExistsInBuildcache(signed, unsigned, tarball)
+    manifest = web_util.url_exists(files.remote_manifest())
+    return ExistsInBuildcache(signed, unsigned, tarball, manifest)
 
 
 def _url_upload_tarball_and_specfile(
-    spec: Spec, tmpdir: str, out_url: str, exists: ExistsInBuildcache, signing_key: Optional[str]
+    spec: Spec,
+    tmpdir: str,
+    out_url: str,
+    exists: ExistsInBuildcache,
+    signing_key: Optional[str],
+    compression: str = "gzip",
+    deduplicate: bool = False,
 ):
     files = BuildcacheFiles(spec, tmpdir, out_url)
-    tarball = files.local_tarball()
-    checksum, _ = _do_create_tarball(tarball, spec.prefix, get_buildinfo_dict(spec))
     spec_dict = spec.to_dict(hash=ht.dag_hash)
-    spec_dict["buildcache_layout_version"] = CURRENT_BUILD_CACHE_LAYOUT_VERSION
-    spec_dict["binary_cache_checksum"] = {"hash_algorithm": "sha256", "hash": checksum}
+    spec_dict["buildcache_layout_version"] = GZIP_BUILD_CACHE_LAYOUT_VERSION
 
-    if exists.tarball:
-        web_util.remove_url(files.remote_tarball())
     if exists.signed:
         web_util.remove_url(files.remote_specfile(signed=True))
     if exists.unsigned:
         web_util.remove_url(files.remote_specfile(signed=False))
-    web_util.push_to_url(tarball, files.remote_tarball(), keep_original=False)
+
+    if deduplicate:
+        # Blobs are never removed, since they may be shared with other specs
+        if exists.tarball:
+            web_util.remove_url(files.remote_tarball())
+        checksum = _push_spec_prefix_as_blobs(spec, files, compression, tmpdir)
+        # Older versions of Spack would look for a tarball that does not exist
+        spec_dict["buildcache_layout_version"] = MANIFEST_BUILD_CACHE_LAYOUT_VERSION
+        spec_dict["binary_cache_checksum"] = {
+            "hash_algorithm": "sha256",
+            "hash": checksum,
+            "format": "manifest",
+        }
+    else:
+        tarball = files.local_tarball()
+        checksum, _ = _do_create_tarball(
+            tarball, spec.prefix, get_buildinfo_dict(spec), compression
+        )
+        spec_dict["binary_cache_checksum"] = {"hash_algorithm": "sha256", "hash": checksum}
+        if compression != "gzip":
+            # Older versions of Spack would extract the tarball as if it was compressed with gzip
+            spec_dict["buildcache_layout_version"] = COMPRESSED_BUILD_CACHE_LAYOUT_VERSION
+            spec_dict["binary_cache_checksum"]["compression"] = compression
+        if exists.manifest:
+            web_util.remove_url(files.remote_manifest())
+        if exists.tarball:
+            web_util.remove_url(files.remote_tarball())
+        web_util.push_to_url(tarball, files.remote_tarball(), keep_original=False)
 
     specfile = files.local_specfile()
     with open(specfile, "w") as f:
@@ -1270,6 +1598,8 @@ def push(
             signing_key=self.signing_key,
             tmpdir=self.tmpdir,
             executor=self.executor,
+            compression=self.mirror.compression,
+            deduplicate=self.mirror.deduplicate,
         )
 
 
@@ -1340,6 +1670,8 @@ def _url_push(
     update_index: bool,
     tmpdir: str,
     executor: concurrent.futures.Executor,
+    compression: str = "gzip",
+    deduplicate: bool = False,
 ) -> Tuple[List[Spec], List[Tuple[Spec, BaseException]]]:
     """Pushes to the provided build cache, and returns a list of skipped specs that were already
     present (when force=False), and a list of errors. Does not raise on error."""
@@ -1359,8 +1691,10 @@ def _url_push(
         specs_to_upload = []
 
         for spec in specs:
-            signed, unsigned, tarball = exists[spec.dag_hash()]
-            if (signed or unsigned) and tarball:
+            spec_exists = exists[spec.dag_hash()]
+            if (spec_exists.signed or spec_exists.unsigned) and (
+                spec_exists.tarball or spec_exists.manifest
+            ):
                 skipped.append(spec)
             else:
                 specs_to_upload.append(spec)
@@ -1383,6 +1717,8 @@ def _url_push(
             out_url,
             exists[spec.dag_hash()],
             signing_key,
+            compression,
+            deduplicate,
         )
         for spec in specs_to_upload
     ]
@@ -1702,7 +2038,7 @@ def _oci_push(
 
     def extra_config(spec: Spec):
         spec_dict = spec.to_dict(hash=ht.dag_hash)
-        spec_dict["buildcache_layout_version"] = CURRENT_BUILD_CACHE_LAYOUT_VERSION
+        spec_dict["buildcache_layout_version"] = GZIP_BUILD_CACHE_LAYOUT_VERSION
         spec_dict["binary_cache_checksum"] = {
             "hash_algorithm": "sha256",
             "hash": checksums[spec.dag_hash()].compressed_digest.digest,
@@ -1861,12 +2197,74 @@ def try_fetch(url_to_fetch):
     return stage
 
 
+def try_open(url_to_open):
+    """Utility function to try and open a remote file for reading, without staging it.
+
+    Args:
+        url_to_open (str): Url pointing to remote resource to read
+
+    Returns:
+        A file-like response or ``None`` if the resource could not be opened.
+    """
+    try:
+        _, _, response = web_util.read_from_url(url_to_open)
+    except web_util.SpackWebError as e:
+        tty.debug(f"Cannot open {url_to_open}: {e}")
+        return None
+    return response
+
+
 def _delete_staged_downloads(download_result):
-    """Clean up stages used to download tarball and specfile"""
-    download_result["tarball_stage"].destroy()
+    """Clean up stages used to download tarball and specfile, or close the stream the tarball
+    is read from"""
+    if "tarball_stream" in download_result:
+        download_result["tarball_stream"].close()
+    elif "manifest_stage" in download_result:
+        download_result["manifest_stage"].destroy()
+    else:
+        download_result["tarball_stage"].destroy()
     download_result["specfile_stage"].destroy()
 
 
+def blob_store() -> spack.binary_blobs.BlobStore:
+    """Local store of the blobs downloaded from deduplicated build caches, which is used when
+    ``config:binary_blob_store`` is set"""
+    return spack.binary_blobs.BlobStore(os.path.join(misc_cache_location(), "buildcache_blobs"))
+
+
+def _fetch_manifest_and_blobs(manifest_url: str, checksum: str, cache_prefix: str):
+    """Fetch the manifest of a spec from a deduplicated build cache, and the blobs it lists that
+    are not in the local blob store. Unless ``config:binary_blob_store`` is set, the blobs are
+    stored in the stage of the manifest, and removed with it once the spec is installed.
+
+    Returns:
+        The stage of the manifest, the manifest, and the blob store with its files, or ``None``
+        if they could not be fetched.
+    """
+    manifest_stage = try_fetch(manifest_url)
+    if not manifest_stage:
+        return None
+
+    try:
+        path = manifest_stage.save_filename
+        if spack.util.crypto.checksum(hashlib.sha256, path) != checksum:
+            raise spack.binary_blobs.BlobError(f"sha256 checksum failed for {manifest_url}")
+        manifest = spack.binary_blobs.load_manifest(path)
+        if spack.config.get("config:binary_blob_store", False):
+            store = blob_store()
+        else:
+            store = spack.binary_blobs.BlobStore(os.path.join(manifest_stage.path, "blobs"))
+        missing = store.missing(manifest)
+        store.fetch(missing, cache_prefix, manifest["compression"])
+        tty.debug(f"Fetched {len(missing)} blobs for {manifest_url}")
+    except (spack.error.SpackError, OSError) as e:
+        tty.warn(f"Cannot fetch the files listed in {manifest_url}: {e}")
+        manifest_stage.destroy()
+        return None
+
+    return manifest_stage, manifest, store
+
+
 def _get_valid_spec_file(path: str, max_supported_layout: int) -> Tuple[Dict, int]:
     """Read and validate a spec file, returning the spec dict with its layout version, or raising
     InvalidMetadataFile if invalid."""
@@ -1903,7 +2301,9 @@ def _get_valid_spec_file(path: str, max_supported_layout: int) -> Tuple[Dict, in
     return spec_dict, layout_version
 
 
-def download_tarball(spec, unsigned: Optional[bool] = False, mirrors_for_spec=None):
+def download_tarball(
+    spec, unsigned: Optional[bool] = False, mirrors_for_spec=None, stream: bool = False
+):
     """
     Download binary tarball for given package into stage area, returning
     path to downloaded tarball if successful, None otherwise.
@@ -1915,6 +2315,10 @@ def download_tarball(spec, unsigned: Optional[bool] = False, mirrors_for_spec=No
             obtained by calling binary_distribution.get_mirrors_for_spec().
             These will be checked in order first before looking in other
             configured mirrors.
+        stream: if ``True``, the tarball is in a layout that can be extracted on the fly, and
+            the signature of the specfile was verified, do not stage the tarball, but return an
+            open response under the ``tarball_stream`` key instead, so that ``extract_tarball``
+            reads it while it is downloaded
 
     Returns:
         ``None`` if the tarball could not be downloaded (maybe also verified,
@@ -2054,7 +2458,7 @@ def fetch_url_to_mirror(url):
                     signature_verified = False
 
                     try:
-                        _get_valid_spec_file(
+                        spec_dict, layout_version = _get_valid_spec_file(
                             local_specfile_path, CURRENT_BUILD_CACHE_LAYOUT_VERSION
                         )
                     except InvalidMetadataFile as e:
@@ -2091,6 +2495,42 @@ def fetch_url_to_mirror(url):
                         #     verify signature, checksum doesn't match) we will fail at
                         #     that point instead of trying to download more tarballs from
                         #     the remaining mirrors, looking for one we can use.
+                        bchecksum = spec_dict.get("binary_cache_checksum", {})
+                        if bchecksum.get("format") == "manifest":
+                            manifest_url = url_util.join(
+                                fetch_url,
+                                BUILD_CACHE_RELATIVE_PATH,
+                                tarball_path_name(spec, ".manifest.json"),
+                            )
+                            fetched = _fetch_manifest_and_blobs(
+                                manifest_url,
+                                bchecksum["hash"],
+                                url_util.join(fetch_url, BUILD_CACHE_RELATIVE_PATH),
+                            )
+                            if fetched:
+                                manifest_stage, manifest, store = fetched
+                                return {
+                                    "manifest_stage": manifest_stage,
+                                    "manifest": manifest,
+                                    "blob_store": store,
+                                    "specfile_stage": local_specfile_stage,
+                                    "signature_verified": signature_verified,
+                                    "signature_required": not currently_unsigned,
+                                }
+                            local_specfile_stage.destroy()
+                            continue
+                        # Without a verified signature, the checksum is the only thing that
+                        # can be trusted, so the tarball is verified before it is extracted
+                        if stream and signature_verified and layout_version >= 1:
+                            response = try_open(spackfile_url)
+                            if response:
+                                return {
+                                    "tarball_stream": response,
+                                    "tarball_url": spackfile_url,
+                                    "specfile_stage": local_specfile_stage,
+                                    "signature_verified": signature_verified,
+                                    "signature_required": not currently_unsigned,
+                                }
                         tarball_stage = try_fetch(spackfile_url)
                         if tarball_stage:
                             return {
@@ -2392,10 +2832,41 @@ def extract_tarball(spec, download_result, force=False, timer=timer.NULL_TIMER):
         specfile_path, CURRENT_BUILD_CACHE_LAYOUT_VERSION
     )
     bchecksum = spec_dict["binary_cache_checksum"]
-
-    filename = download_result["tarball_stage"].save_filename
     signature_verified: bool = download_result["signature_verified"]
     signature_required: bool = download_result["signature_required"]
+
+    if "tarball_stream" in download_result or "manifest_stage" in download_result:
+        # Either the tarball is extracted while it is downloaded, and its checksum is verified
+        # once the last byte has been read, or the prefix is populated from the local blob store
+        # with the files of a manifest whose checksum was verified when it was downloaded
+        try:
+            if signature_required and not signature_verified:
+                raise UnsignedPackageException(
+                    "To install unsigned packages, use the --no-check-signature option, "
+                    "or configure the mirror with signed: false."
+                )
+            if "tarball_stream" in download_result:
+                _extract_tarball_stream(
+                    spec,
+                    download_result["tarball_stream"],
+                    download_result["tarball_url"],
+                    bchecksum,
+                )
+            else:
+                download_result["blob_store"].extract(download_result["manifest"], spec.prefix)
+        except Exception:
+            shutil.rmtree(spec.prefix, ignore_errors=True)
+            _delete_staged_downloads(download_result)
+            raise
+        _delete_staged_downloads(download_result)
+        timer.stop("extract")
+
+        timer.start("relocate")
+        _relocate_extracted_tarball(spec)
+        timer.stop("relocate")
+        return
+
+    filename = download_result["tarball_stage"].save_filename
     tmpdir = None
 
     if layout_version == 0:
@@ -2411,7 +2882,7 @@ def extract_tarball(spec, download_result, force=False, timer=timer.NULL_TIMER):
             _delete_staged_downloads(download_result)
             shutil.rmtree(tmpdir)
             raise e
-    elif 1 <= layout_version <= 2:
+    elif 1 <= layout_version <= 3:
         # Newer buildcache layout: the .spack file contains just
         # in the install tree, the signature, if it exists, is
         # wrapped around the spec.json at the root.  If sig verify
@@ -2436,6 +2907,16 @@ def extract_tarball(spec, download_result, force=False, timer=timer.NULL_TIMER):
             raise NoChecksumException(
                 tarfile_path, size, contents, "sha256", expected, local_checksum
             )
+
+        # tarfile only reads gzip compressed tarballs, other ones are decompressed first
+        compression = bchecksum.get("compression", "gzip")
+        if compression != "gzip":
+            try:
+                tarfile_path = _decompress_tarball(tarfile_path, compression)
+            except Exception:
+                shutil.rmtree(spec.prefix, ignore_errors=True)
+                _delete_staged_downloads(download_result)
+                raise
     try:
         with closing(tarfile.open(tarfile_path, "r")) as tar:
             # Remove install prefix from tarfil to extract directly into spec.prefix
@@ -2454,19 +2935,7 @@ def extract_tarball(spec, download_result, force=False, timer=timer.NULL_TIMER):
 
     timer.start("relocate")
     try:
-        relocate_package(spec)
-    except Exception as e:
-        shutil.rmtree(spec.prefix, ignore_errors=True)
-        raise e
-    else:
-        manifest_file = os.path.join(
-            spec.prefix,
-            spack.store.STORE.layout.metadata_dir,
-            spack.store.STORE.layout.manifest_file_name,
-        )
-        if not os.path.exists(manifest_file):
-            spec_id = spec.format("{name}/{hash:7}")
-            tty.warn("No manifest file in tarball for spec %s" % spec_id)
+        _relocate_extracted_tarball(spec)
     finally:
         if tmpdir:
             shutil.rmtree(tmpdir, ignore_errors=True)
@@ -2476,6 +2945,118 @@ def extract_tarball(spec, download_result, force=False, timer=timer.NULL_TIMER):
     timer.stop("relocate")
 
 
+def _decompress_tarball(path: str, compression: str) -> str:
+    """Decompress a tarball next to itself, and return the path of the uncompressed tarball"""
+    decompressed = f"{path}.tar"
+    with open(path, "rb") as f, spack.util.archive.decompressing_reader(
+        f, compression
+    ) as reader, open(decompressed, "wb") as out:
+        shutil.copyfileobj(reader, out)
+    return decompressed
+
+
+def _relocate_extracted_tarball(spec):
+    """Relocate the prefix of a spec extracted from a tarball, and remove it on failure"""
+    try:
+        relocate_package(spec)
+    except Exception as e:
+        shutil.rmtree(spec.prefix, ignore_errors=True)
+        raise e
+
+    manifest_file = os.path.join(
+        spec.prefix,
+        spack.store.STORE.layout.metadata_dir,
+        spack.store.STORE.layout.manifest_file_name,
+    )
+    if not os.path.exists(manifest_file):
+        spec_id = spec.format("{name}/{hash:7}")
+        tty.warn("No manifest file in tarball for spec %s" % spec_id)
+
+
+def _extract_tarball_stream(spec, stream, url: str, bchecksum: Dict[str, str]) -> None:
+    """Decompress and extract a tarball into the prefix of a spec while it is read from a stream,
+    and verify its checksum on the fly.
+
+    Members are extracted in a temporary directory next to the prefix, and are moved into the
+    prefix only once the whole tarball has been read and its checksum matches.
+
+    Args:
+        spec: concrete spec whose prefix is populated
+        stream: file-like object the compressed tarball is read from
+        url: location of the tarball, for error messages
+        bchecksum: ``binary_cache_checksum`` entry of the specfile
+    """
+    reader = spack.util.archive.ChecksumReader(
+        stream, getattr(hashlib, bchecksum["hash_algorithm"])
+    )
+    binary_distribution: List[str] = []
+
+    def _checked_members(tar: tarfile.TarFile):
+        # The tarball is extracted before its checksum is known, so no member may be written
+        # outside of the temporary directory: not through a path with "..", nor through a link
+        # extracted before it. Symlinks may point anywhere, since they are relocated later.
+        files: Set[pathlib.PurePosixPath] = set()
+        links: Set[pathlib.PurePosixPath] = set()
+        for member in tar:
+            path = pathlib.PurePosixPath(member.name)
+            if path.is_absolute() or ".." in path.parts or not path.parts:
+                raise ValueError(f"Tarball contains file {member.name} outside of the archive")
+            if not (member.isreg() or member.isdir() or member.issym() or member.islnk()):
+                raise ValueError(f"Tarball contains unsupported file {member.name}")
+            if path in links or any(parent in links for parent in path.parents):
+                raise ValueError(f"Tarball contains file {member.name} through a link")
+            if member.islnk() and pathlib.PurePosixPath(member.linkname) not in files:
+                raise ValueError(
+                    f"Tarball contains hard link {member.name} to {member.linkname}, which is "
+                    "not a file of the archive"
+                )
+            if member.issym() or member.islnk():
+                links.add(path)
+            elif member.isreg():
+                files.add(path)
+            if member.isfile() and member.name.endswith(".spack/binary_distribution"):
+                binary_distribution.append(member.name)
+            yield member
+
+    compression = bchecksum.get("compression", "gzip")
+    if compression == "gzip":
+        tar_stream = tarfile.open(fileobj=reader, mode="r|*")
+    else:
+        decompressed = spack.util.archive.decompressing_reader(reader, compression)
+        tar_stream = tarfile.open(fileobj=decompressed, mode="r|")
+
+    tmpdir = tempfile.mkdtemp(dir=os.path.dirname(spec.prefix), prefix=".extract-")
+    try:
+        with closing(tar_stream) as tar:
+            tar.extractall(path=tmpdir, members=_checked_members(tar))
+        reader.drain()
+
+        local_checksum = reader.hexdigest()
+        if local_checksum != bchecksum["hash"]:
+            raise NoChecksumException(
+                url,
+                reader.length,
+                "",
+                bchecksum["hash_algorithm"],
+                bchecksum["hash"],
+                local_checksum,
+            )
+
+        if not binary_distribution:
+            raise ValueError("Tarball is not a Spack package, missing binary_distribution file")
+
+        # Find the lowest `binary_distribution` file, as in _ensure_common_prefix
+        pkg_path = pathlib.PurePosixPath(min(binary_distribution, key=len)).parent.parent
+        if pkg_path == pathlib.PurePosixPath():
+            raise ValueError("Invalid tarball, missing package prefix dir")
+
+        pkg_root = os.path.join(tmpdir, str(pkg_path))
+        for entry in os.listdir(pkg_root):
+            os.rename(os.path.join(pkg_root, entry), os.path.join(spec.prefix, entry))
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
 def _ensure_common_prefix(tar: tarfile.TarFile) -> str:
     # Find the lowest `binary_distribution` file (hard-coded forward slash is on purpose).
     binary_distribution = min(
@@ -2551,7 +3132,8 @@ def install_root_node(spec, unsigned=False, force=False, sha256=None):
     if sha256:
         checker = spack.util.crypto.Checker(sha256)
         msg = 'cannot verify checksum for "{0}" [expected={1}]'
-        tarball_path = download_result["tarball_stage"].save_filename
+        stage = download_result.get("tarball_stage") or download_result["manifest_stage"]
+        tarball_path = stage.save_filename
         msg = msg.format(tarball_path, sha256)
         if not checker.check(tarball_path):
             size, contents = fsys.filesummary(tarball_path)
@@ -3051,6 +3633,97 @@ def conditional_fetch(self) -> FetchIndexResult:
         )
 
 
+class ShardedIndexFetcher:
+    """Fetcher for a sharded index, using the checksum of its manifest as cache invalidation
+    strategy.
+
+    Only the shards that are not in the local cache are downloaded. Shards are content addressed,
+    so they are stored by checksum, and the fetched index is the union of all the shards. When
+    the index hash recorded in the manifest differs from index.json.hash, the shards are out of
+    sync, and index.json is fetched instead.
+    """
+
+    def __init__(
+        self, url, local_hash, cache: file_cache.FileCache, urlopen=web_util.urlopen
+    ) -> None:
+        self.url = url
+        self.local_hash = local_hash
+        self.cache = cache
+        self.urlopen = urlopen
+        self.headers = {"User-Agent": web_util.SPACK_USER_AGENT}
+        # Directory of the shards of this mirror in the local cache
+        self.shards_dir = f"index_shards/{compute_hash(url)[:10]}"
+
+    def _read(self, url: str) -> str:
+        try:
+            response = self.urlopen(urllib.request.Request(url, headers=self.headers))
+            return codecs.getreader("utf-8")(response).read()
+        except (TimeoutError, urllib.error.URLError) as e:
+            raise FetchIndexError(f"Could not fetch {url}", e) from e
+        except ValueError as e:
+            raise FetchIndexError(f"Remote file {url} is invalid", e) from e
+
+    def _shard(self, entry: dict) -> Dict[str, dict]:
+        """Return the records in a shard, read from the local cache if possible"""
+        key = f"{self.shards_dir}/{entry['hash']}.json"
+        if self.cache.init_entry(key):
+            with self.cache.read_transaction(key) as f:
+                data = f.read()
+            if compute_hash(data) == entry["hash"]:
+                return json.loads(data)["database"]["installs"]
+
+        url = url_util.join(self.url, BUILD_CACHE_RELATIVE_PATH, INDEX_SHARDS_RELATIVE_PATH)
+        url = url_util.join(url, entry["file"])
+        data = self._read(url)
+        if compute_hash(data) != entry["hash"]:
+            raise FetchIndexError(f"Remote shard {url} does not match its checksum")
+
+        with self.cache.write_transaction(key) as (_, new):
+            new.write(data)
+        return json.loads(data)["database"]["installs"]
+
+    def conditional_fetch(self) -> FetchIndexResult:
+        url_manifest = index_manifest_url(self.url)
+        manifest_text = self._read(url_manifest)
+        manifest_hash = compute_hash(manifest_text)
+
+        # Early exit if our cache is up to date.
+        if self.local_hash == manifest_hash:
+            return FetchIndexResult(etag=None, hash=None, data=None, fresh=True)
+
+        try:
+            manifest = json.loads(manifest_text)
+            if manifest["version"] != INDEX_MANIFEST_VERSION:
+                raise ValueError(f"unsupported version {manifest['version']}")
+            entries = [manifest["shards"][shard] for shard in sorted(manifest["shards"])]
+        except (ValueError, KeyError, TypeError) as e:
+            raise FetchIndexError(f"Remote index {url_manifest} is invalid", e) from e
+
+        # The shards are out of sync with index.json, for instance because the index was
+        # updated by a client that does not write shards, so index.json is the reference
+        index_fetcher = DefaultIndexFetcher(self.url, self.local_hash, urlopen=self.urlopen)
+        if manifest.get("index_hash") != index_fetcher.get_remote_hash():
+            tty.debug(f"The sharded index {url_manifest} is out of sync, reading index.json")
+            return index_fetcher.conditional_fetch()
+
+        installs: Dict[str, dict] = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
+            for records in executor.map(self._shard, entries):
+                installs.update(records)
+
+        # Drop the shards that are not referenced anymore
+        current = {f"{entry['hash']}.json" for entry in entries}
+        shards_dir = self.cache.cache_path(self.shards_dir)
+        if os.path.isdir(shards_dir):
+            for name in os.listdir(shards_dir):
+                if name.endswith(".json") and name not in current:
+                    self.cache.remove(f"{self.shards_dir}/{name}")
+
+        return FetchIndexResult(
+            etag=None, hash=manifest_hash, data=_index_json(installs), fresh=False
+        )
+
+
 class OCIIndexFetcher:
     def __init__(self, url: str, local_hash, urlopen=None) -> None:
         self.local_hash = local_hash
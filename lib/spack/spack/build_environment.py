@@ -1334,6 +1334,16 @@ def child_fun():
     For more information on `multiprocessing` child process creation
     mechanisms, see https://docs.python.org/3/library/multiprocessing.html#contexts-and-start-methods
     """
+    return create_build_process(pkg, function, kwargs).complete()
+
+
+def create_build_process(pkg, function, kwargs) -> "BuildProcess":
+    """Start a child process to do part of a spack build, without waiting for it to finish.
+
+    This is the non-blocking counterpart of :func:`start_build_process`: the result of the
+    child process is retrieved, or its error raised, by calling ``complete()`` on the object
+    returned.
+    """
     read_pipe, write_pipe = multiprocessing.Pipe(duplex=False)
     input_multiprocess_fd = None
     jobserver_fd1 = None
@@ -1383,40 +1393,79 @@ def child_fun():
         if input_multiprocess_fd is not None:
             input_multiprocess_fd.close()
 
-    def exitcode_msg(p):
-        typ = "exit" if p.exitcode >= 0 else "signal"
-        return f"{typ} {abs(p.exitcode)}"
+    return BuildProcess(pkg, p, read_pipe)
 
-    try:
-        child_result = read_pipe.recv()
-    except EOFError:
-        p.join()
-        raise InstallError(f"The process has stopped unexpectedly ({exitcode_msg(p)})")
 
-    p.join()
+class BuildProcess:
+    """A child process started by :func:`create_build_process`.
 
-    # If returns a StopPhase, raise it
-    if isinstance(child_result, spack.error.StopPhase):
-        # do not print
-        raise child_result
+    The child process sends a single result to the parent over ``read_pipe``, which becomes
+    readable once the child has finished (or died). This makes it possible to wait on several
+    build processes at once with :func:`multiprocessing.connection.wait`.
+    """
 
-    # let the caller know which package went wrong.
-    if isinstance(child_result, InstallError):
-        child_result.pkg = pkg
+    def __init__(self, pkg, process: multiprocessing.Process, read_pipe):
+        self.pkg = pkg
+        self.process = process
+        self.read_pipe = read_pipe
 
-    if isinstance(child_result, ChildError):
-        # If the child process raised an error, print its output here rather
-        # than waiting until the call to SpackError.die() in main(). This
-        # allows exception handling output to be logged from within Spack.
-        # see spack.main.SpackCommand.
-        child_result.print_context()
-        raise child_result
+    def poll(self, timeout: Optional[float] = 0) -> bool:
+        """Return True if the child process is done, waiting at most ``timeout`` seconds
+        (forever if None)."""
+        return self.read_pipe.poll(timeout)
 
-    # Fallback. Usually caught beforehand in EOFError above.
-    if p.exitcode != 0:
-        raise InstallError(f"The process failed unexpectedly ({exitcode_msg(p)})")
+    def _exitcode_msg(self) -> str:
+        typ = "exit" if self.process.exitcode >= 0 else "signal"
+        return f"{typ} {abs(self.process.exitcode)}"
+
+    def complete(self):
+        """Wait for the child process to finish, and return its result.
+
+        Raises:
+            StopPhase: if the build was asked to stop at a given phase
+            ChildError: if the child process raised an error
+            InstallError: if the child process stopped unexpectedly
+        """
+        p = self.process
+        try:
+            child_result = self.read_pipe.recv()
+        except EOFError:
+            p.join()
+            raise InstallError(f"The process has stopped unexpectedly ({self._exitcode_msg()})")
+        finally:
+            self.read_pipe.close()
+
+        p.join()
 
-    return child_result
+        # If returns a StopPhase, raise it
+        if isinstance(child_result, spack.error.StopPhase):
+            # do not print
+            raise child_result
+
+        # let the caller know which package went wrong.
+        if isinstance(child_result, InstallError):
+            child_result.pkg = self.pkg
+
+        if isinstance(child_result, ChildError):
+            # If the child process raised an error, print its output here rather
+            # than waiting until the call to SpackError.die() in main(). This
+            # allows exception handling output to be logged from within Spack.
+            # see spack.main.SpackCommand.
+            child_result.print_context()
+            raise child_result
+
+        # Fallback. Usually caught beforehand in EOFError above.
+        if p.exitcode != 0:
+            raise InstallError(f"The process failed unexpectedly ({self._exitcode_msg()})")
+
+        return child_result
+
+    def terminate(self) -> None:
+        """Terminate the child process, if it is still running, and wait for it to exit."""
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.read_pipe.close()
 
 
 CONTEXT_BASES = (spack.package_base.PackageBase, spack.build_systems._checks.BaseBuilder)
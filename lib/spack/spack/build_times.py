@@ -0,0 +1,141 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+"""Historical build times of packages, used to estimate how long a build from source takes.
+
+Build times are read from the timers that the installer writes in the metadata directory of
+each installed spec. They are stored next to the database of the install tree, so that all the
+processes and hosts sharing an install tree share its history, keyed by package name, version
+and variants:
+
+.. code-block:: json
+
+   {"zlib": {"1.3.1": {"+optimize+pic+shared": 12.3}}}
+
+When a spec was never built, its build time is estimated from the builds of the same version
+with other variants, and then from all the builds of the package.
+"""
+from typing import Dict, Optional
+
+import llnl.util.lock as lk
+import llnl.util.tty as tty
+
+import spack.spec
+import spack.store
+import spack.util.file_cache
+import spack.util.spack_json as sjson
+
+#: Key of the build times in the cache
+CACHE_KEY = "build_times.json"
+
+#: Weight of the last build in the running average of the build times
+SMOOTHING = 0.5
+
+BuildTimesData = Dict[str, Dict[str, Dict[str, float]]]
+
+
+def _mean(values) -> Optional[float]:
+    values = list(values)
+    return sum(values) / len(values) if values else None
+
+
+class BuildTimes:
+    """Database of the time it took to build packages from source, in seconds."""
+
+    def __init__(self, cache: Optional[spack.util.file_cache.FileCache] = None) -> None:
+        """
+        Args:
+            cache: cache storing the build times, by default the database directory of the
+                current store
+        """
+        self._cache = cache
+        self._data: Optional[BuildTimesData] = None
+
+    @property
+    def cache(self) -> spack.util.file_cache.FileCache:
+        """Cache storing the build times, which is created on first access."""
+        if self._cache is None:
+            self._cache = spack.util.file_cache.FileCache(spack.store.STORE.db.database_directory)
+        return self._cache
+
+    @property
+    def data(self) -> BuildTimesData:
+        """Build times read from the cache, which are loaded on first access."""
+        if self._data is None:
+            self._data = {}
+            try:
+                if self.cache.init_entry(CACHE_KEY):
+                    with self.cache.read_transaction(CACHE_KEY) as f:
+                        self._data = sjson.load(f)
+            except (OSError, ValueError, spack.util.file_cache.CacheError) as e:
+                tty.debug(f"Cannot read the build times: {e}")
+        return self._data
+
+    def record(self, spec: spack.spec.Spec, seconds: float) -> None:
+        """Record the time it took to build a spec from source.
+
+        Args:
+            spec: concrete spec that was built
+            seconds: duration of the build
+        """
+        try:
+            self.cache.init_entry(CACHE_KEY)
+            with self.cache.write_transaction(CACHE_KEY) as (old, new):
+                try:
+                    data = sjson.load(old) if old else {}
+                except ValueError:
+                    data = {}
+
+                times = data.setdefault(spec.name, {}).setdefault(str(spec.version), {})
+                variants = str(spec.variants)
+                previous = times.get(variants)
+                if previous is not None:
+                    seconds = SMOOTHING * seconds + (1 - SMOOTHING) * previous
+                times[variants] = seconds
+
+                sjson.dump(data, new)
+        except (OSError, lk.LockError, spack.util.file_cache.CacheError) as e:
+            tty.debug(f"Cannot record the build time of {spec.name}: {e}")
+            return
+        self._data = data
+
+    def record_from_timer(self, spec: spack.spec.Spec, path: str) -> None:
+        """Record the build time of a spec from the timer file written by the installer.
+
+        Installations from a binary cache are ignored.
+
+        Args:
+            spec: concrete spec that was installed
+            path: path of the timer file
+        """
+        try:
+            with open(path) as f:
+                timer = sjson.load(f)
+            if timer.get("cache", False):
+                return
+            seconds = float(timer["total"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            tty.debug(f"Cannot read the build time of {spec.name} from {path}: {e}")
+            return
+        self.record(spec, seconds)
+
+    def estimate(self, spec: spack.spec.Spec) -> Optional[float]:
+        """Estimate the time it takes to build a spec from source, or return None if the
+        package was never built."""
+        versions = self.data.get(spec.name)
+        if not versions:
+            return None
+
+        variants = versions.get(str(spec.version))
+        if variants:
+            exact = variants.get(str(spec.variants))
+            return exact if exact is not None else _mean(variants.values())
+
+        return _mean(t for variants in versions.values() for t in variants.values())
+
+    def default_estimate(self) -> float:
+        """Estimate for packages that were never built: the average of all the build times,
+        or one second when nothing was ever built."""
+        mean = _mean(t for v in self.data.values() for ts in v.values() for t in ts.values())
+        return 1.0 if mean is None else mean
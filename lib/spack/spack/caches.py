@@ -4,11 +4,11 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 """Caches used by Spack to store data"""
+import hashlib
 import os
 from typing import Union
 
 import llnl.util.lang
-from llnl.util.filesystem import mkdirp
 
 import spack.config
 import spack.fetch_strategy
@@ -40,6 +40,41 @@ def _misc_cache():
 )
 
 
+@llnl.util.lang.memoized
+def library_checksum() -> str:
+    """Checksum of the paths and stats of the files of the Spack library, except tests.
+
+    Caches of data computed by Spack's own code include it in their keys, so that their entries
+    are not reused by a different version of that code, including in development checkouts. Any
+    change to a file changes its size or modification time, so files are not read.
+    """
+    digest = hashlib.sha256()
+    tops = (
+        spack.paths.module_path,
+        spack.paths.external_path,
+        os.path.join(spack.paths.lib_path, "llnl"),
+    )
+    for top in tops:
+        for root, dirs, files in os.walk(top):
+            dirs[:] = sorted(
+                d
+                for d in dirs
+                if d != "__pycache__" and os.path.join(root, d) != spack.paths.test_path
+            )
+            for name in sorted(files):
+                if name.endswith(".pyc"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                stat_key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+                relative_path = os.path.relpath(path, spack.paths.lib_path)
+                digest.update(f"{relative_path}\0{stat_key}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
 def fetch_cache_location():
     """Filesystem cache of downloaded archives.
 
@@ -68,9 +103,7 @@ def store(self, fetcher, relative_dest):
 
         # Note this will archive package sources even if they would not
         # normally be cached (e.g. the current tip of an hg/git branch)
-        dst = os.path.join(self.root, relative_dest)
-        mkdirp(os.path.dirname(dst))
-        fetcher.archive(dst)
+        spack.fetch_strategy.archive_atomically(fetcher, os.path.join(self.root, relative_dest))
 
 
 #: Spack's local cache for downloaded source archives
@@ -15,6 +15,7 @@
 from llnl.string import plural
 from llnl.util.lang import elide_list, stable_partition
 
+import spack.binary_blobs
 import spack.binary_distribution as bindist
 import spack.cmd
 import spack.config
@@ -707,6 +708,18 @@ def sync_fn(args):
     tmpdir = tempfile.mkdtemp()
 
     try:
+        # Manifests of deduplicated build caches, and their blobs, are copied first, so that no
+        # specfile in the destination refers to a missing manifest
+        src_cache_prefix = url_util.join(src_mirror_url, build_cache_dir)
+        dest_cache_prefix = url_util.join(dest_mirror_url, build_cache_dir)
+        for s in env.all_specs():
+            spack.binary_blobs.copy_manifest(
+                bindist.tarball_path_name(s, ".manifest.json"),
+                src_cache_prefix,
+                dest_cache_prefix,
+                tmpdir,
+            )
+
         for rel_path in buildcache_rel_paths:
             src_url = url_util.join(src_mirror_url, rel_path)
             local_path = os.path.join(tmpdir, rel_path)
@@ -744,6 +757,22 @@ def manifest_copy(manifest_file_list, dest_mirror=None):
             tty.debug("copying {0} to {1}".format(copy_file["src"], dest))
             copy_buildcache_file(copy_file["src"], dest)
 
+            # Specs of deduplicated build caches have a manifest instead of a tarball
+            if copy_file["src"].endswith(".spack"):
+                src_prefix, rel_path = copy_file["src"].rsplit(build_cache_dir, 1)
+                dest_prefix = dest.rsplit(build_cache_dir, 1)[0]
+                rel_path = rel_path.lstrip("/")[: -len(".spack")] + ".manifest.json"
+                tmpdir = tempfile.mkdtemp()
+                try:
+                    spack.binary_blobs.copy_manifest(
+                        rel_path,
+                        src_prefix + build_cache_dir,
+                        dest_prefix + build_cache_dir,
+                        tmpdir,
+                    )
+                finally:
+                    shutil.rmtree(tmpdir)
+
 
 def update_index(mirror: spack.mirror.Mirror, update_keys=False):
     # Special case OCI images for now.
@@ -8,6 +8,7 @@
 import spack.cmd
 import spack.config
 import spack.environment as ev
+import spack.fetch_scheduler
 import spack.traverse
 from spack.cmd.common import arguments
 
@@ -63,12 +64,25 @@ def fetch(parser, args):
     else:
         to_be_fetched = specs
 
+    packages = []
     for spec in to_be_fetched:
         if args.missing and spec.installed:
             continue
 
         pkg = spec.package
 
+        # Ask about unsafe versions upfront, since the packages are fetched in threads
+        pkg.confirm_fetch()
         pkg.stage.keep = True
-        with pkg.stage:
-            pkg.do_fetch()
+        packages.append(pkg)
+
+    futures = spack.fetch_scheduler.FetchScheduler().run(
+        _fetch_package, packages, host=spack.fetch_scheduler.package_host
+    )
+    for future in futures:
+        future.result()
+
+
+def _fetch_package(pkg):
+    with pkg.stage:
+        pkg.do_fetch(confirm=False)
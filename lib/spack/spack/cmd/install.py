@@ -46,6 +46,7 @@ def install_kwargs_from_args(args):
     pkg_use_bc, dep_use_bc = args.use_buildcache
 
     return {
+        "concurrent_packages": args.concurrent_packages,
         "fail_fast": args.fail_fast,
         "keep_prefix": args.keep_prefix,
         "keep_stage": args.keep_stage,
@@ -85,6 +86,13 @@ def setup_parser(subparser):
         help="phase to stop after when installing (default None)",
     )
     arguments.add_common_arguments(subparser, ["jobs"])
+    subparser.add_argument(
+        "-p",
+        "--concurrent-packages",
+        type=int,
+        default=None,
+        help="maximum number of packages to build from source at the same time",
+    )
     subparser.add_argument(
         "--overwrite",
         action="store_true",
@@ -117,9 +117,14 @@ def match(p, f):
                 if f.match(p):
                     return True
 
-                pkg_cls = spack.repo.PATH.get_pkg_class(p)
-                if pkg_cls.__doc__:
-                    return f.match(pkg_cls.__doc__)
+                # Read the docstring without importing the package, if possible
+                metadata = spack.repo.PATH.package_metadata(p)
+                if metadata is not None:
+                    doc = metadata.docstring
+                else:
+                    doc = spack.repo.PATH.get_pkg_class(p).__doc__
+                if doc:
+                    return f.match(doc)
                 return False
 
         else:
@@ -117,6 +117,17 @@ def setup_parser(subparser):
         action="store_true",
         help=("set mirror to push automatically after installation"),
     )
+    add_parser.add_argument(
+        "--compression",
+        choices=("gzip", "zstd"),
+        help="compression of the tarballs pushed to this build cache (default: gzip)",
+    )
+    add_parser.add_argument(
+        "--deduplicate",
+        action="store_true",
+        help="push files to this build cache individually, so that identical files are shared by "
+        "all the specs, instead of pushing a tarball per spec",
+    )
     add_parser_signed = add_parser.add_mutually_exclusive_group(required=False)
     add_parser_signed.add_argument(
         "--unsigned",
@@ -199,6 +210,27 @@ def setup_parser(subparser):
         default=None,
         dest="autopush",
     )
+    set_parser.add_argument(
+        "--compression",
+        choices=("gzip", "zstd"),
+        help="compression of the tarballs pushed to this build cache",
+    )
+    set_parser_deduplicate = set_parser.add_mutually_exclusive_group(required=False)
+    set_parser_deduplicate.add_argument(
+        "--deduplicate",
+        help="push files to this build cache individually, so that identical files are shared by "
+        "all the specs",
+        action="store_true",
+        default=None,
+        dest="deduplicate",
+    )
+    set_parser_deduplicate.add_argument(
+        "--no-deduplicate",
+        help="push a tarball per spec to this build cache",
+        action="store_false",
+        default=None,
+        dest="deduplicate",
+    )
     set_parser_unsigned = set_parser.add_mutually_exclusive_group(required=False)
     set_parser_unsigned.add_argument(
         "--unsigned",
@@ -243,6 +275,8 @@ def mirror_add(args):
         or args.oci_username
         or args.oci_password
         or args.autopush
+        or args.compression
+        or args.deduplicate
         or args.signed is not None
     ):
         connection = {"url": args.url}
@@ -263,6 +297,10 @@ def mirror_add(args):
             connection["autopush"] = args.autopush
         if args.signed is not None:
             connection["signed"] = args.signed
+        if args.compression:
+            connection["compression"] = args.compression
+        if args.deduplicate:
+            connection["deduplicate"] = args.deduplicate
         mirror = spack.mirror.Mirror(connection, name=args.name)
     else:
         mirror = spack.mirror.Mirror(args.url, name=args.name)
@@ -299,6 +337,10 @@ def _configure_mirror(args):
         changes["signed"] = args.signed
     if getattr(args, "autopush", None) is not None:
         changes["autopush"] = args.autopush
+    if getattr(args, "compression", None):
+        changes["compression"] = args.compression
+    if getattr(args, "deduplicate", None) is not None:
+        changes["deduplicate"] = args.deduplicate
 
     # argparse cannot distinguish between --binary and --no-binary when same dest :(
     # notice that set-url does not have these args, so getattr
@@ -541,11 +583,11 @@ def create_mirror_for_all_specs(mirror_specs, path, skip_unstable_versions):
     mirror_cache, mirror_stats = spack.mirror.mirror_cache_and_stats(
         path, skip_unstable_versions=skip_unstable_versions
     )
-    for candidate in mirror_specs:
-        pkg_cls = spack.repo.PATH.get_pkg_class(candidate.name)
-        pkg_obj = pkg_cls(spack.spec.Spec(candidate))
-        mirror_stats.next_spec(pkg_obj.spec)
-        spack.mirror.create_mirror_from_package_object(pkg_obj, mirror_cache, mirror_stats)
+    pkg_objs = (
+        spack.repo.PATH.get_pkg_class(candidate.name)(spack.spec.Spec(candidate))
+        for candidate in mirror_specs
+    )
+    spack.mirror.create_mirror_from_package_objects(pkg_objs, mirror_cache, mirror_stats)
     process_mirror_stats(*mirror_stats.stats())
 
 
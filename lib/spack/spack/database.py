@@ -18,6 +18,7 @@
 provides a cache and a sanity checking mechanism for what is in the
 filesystem.
 """
+import bisect
 import contextlib
 import datetime
 import os
@@ -32,7 +33,11 @@
     Container,
     Dict,
     Generator,
+    Iterable,
+    Iterator,
     List,
+    Mapping,
+    MutableMapping,
     NamedTuple,
     Optional,
     Set,
@@ -55,9 +60,11 @@
 
 import spack.deptypes as dt
 import spack.hash_types as ht
+import spack.repo
 import spack.spec
 import spack.traverse as tr
 import spack.util.lock as lk
+import spack.util.record_table as record_table
 import spack.util.spack_json as sjson
 import spack.version as vn
 from spack.directory_layout import (
@@ -92,6 +99,13 @@
     (vn.Version("6"), vn.Version("7")),
 ]
 
+#: DB version of an ``index.json`` that may have a journal on top of it. The format is the same as
+#: version 7, but older versions of Spack, which don't replay the journal, must not read it.
+_JOURNAL_DB_VERSION = vn.Version("8")
+
+#: The journal is compacted into index.json when it grows larger than this fraction of the index
+_JOURNAL_COMPACTION_RATIO = 0.1
+
 #: Default timeout for spack database locks in seconds or None (no timeout).
 #: A balance needs to be struck between quick turnaround for parallel installs
 #: (to avoid excess delays) and waiting long enough when the system is busy
@@ -138,6 +152,7 @@ def reader(version: vn.StandardVersion) -> Type["spack.spec.SpecfileReaderBase"]
         vn.Version("5"): spack.spec.SpecfileV1,
         vn.Version("6"): spack.spec.SpecfileV3,
         vn.Version("7"): spack.spec.SpecfileV4,
+        vn.Version("8"): spack.spec.SpecfileV4,
     }
     return reader_cls[version]
 
@@ -147,6 +162,29 @@ def _now() -> float:
     return time.time()
 
 
+def _timestamp(date: Optional[datetime.datetime], default: float) -> float:
+    """Return the POSIX timestamp of a date, or a default if the date is None or out of the
+    range supported by the platform.
+    """
+    if date is None:
+        return default
+    try:
+        return date.timestamp()
+    except (ValueError, OverflowError, OSError):
+        return default
+
+
+def _parse_verifier(verifier: str) -> Tuple[str, int]:
+    """Split the content of the verifier file into the verifier of ``index.json``, and the
+    length of the journal that must be replayed on top of it.
+    """
+    base, _, journal_length = verifier.partition("+")
+    try:
+        return base, int(journal_length or 0)
+    except ValueError:
+        return verifier, 0
+
+
 def _autospec(function):
     """Decorator that automatically converts the argument of a single-arg
     function to a Spec."""
@@ -278,6 +316,198 @@ def from_dict(cls, spec, dictionary):
         return InstallRecord(spec, **d)
 
 
+class RecordIndex:
+    """Secondary indexes on the install records of a database.
+
+    They are used to narrow down the records that need to be checked with ``Spec.satisfies``
+    when running an abstract query. Indexes are conservative: every record matching a query is
+    among the candidates returned, but candidates still need to be checked against the query.
+
+    The index must be kept in sync by the database, by calling ``add`` and ``remove`` when a
+    record is inserted or deleted, and ``update`` when an indexed field of a record changes.
+    """
+
+    def __init__(self, data: Optional[Mapping[str, InstallRecord]] = None) -> None:
+        #: Maps package names to the versions installed, and each version to the dag hashes
+        self.by_name: Dict[str, Dict[vn.VersionList, Set[str]]] = {}
+        #: Dag hashes of explicitly installed specs
+        self.explicit: Set[str] = set()
+        #: Pairs of (installation time, dag hash), sorted by installation time
+        self.by_time: List[Tuple[float, str]] = []
+        self._time_of: Dict[str, float] = {}
+
+        if data:
+            self._insert_all(
+                (key, rec.spec.name, rec.spec.versions, rec.explicit, rec.installation_time)
+                for key, rec in data.items()
+            )
+
+    @staticmethod
+    def from_entries(entries: Iterable[Tuple[str, str, vn.VersionList, bool, float]]):
+        """Create an index from ``(dag hash, name, versions, explicit, installation time)``
+        tuples, without the need to construct install records.
+        """
+        index = RecordIndex()
+        index._insert_all(entries)
+        return index
+
+    def _insert_all(self, entries: Iterable[Tuple[str, str, vn.VersionList, bool, float]]):
+        for entry in entries:
+            self._insert(*entry)
+        self.by_time = sorted((t, key) for key, t in self._time_of.items())
+
+    def _insert(
+        self, key: str, name: str, versions: vn.VersionList, explicit: bool, time: float
+    ) -> None:
+        self.by_name.setdefault(name, {}).setdefault(versions, set()).add(key)
+        if explicit:
+            self.explicit.add(key)
+        self._time_of[key] = time
+
+    def add(self, key: str, rec: InstallRecord) -> None:
+        """Add a new record to the index"""
+        self._insert(key, rec.spec.name, rec.spec.versions, rec.explicit, rec.installation_time)
+        bisect.insort(self.by_time, (rec.installation_time, key))
+
+    def remove(self, key: str, rec: InstallRecord) -> None:
+        """Remove a record from the index"""
+        versions = self.by_name.get(rec.spec.name, {})
+        for installed_versions, keys in list(versions.items()):
+            if key in keys:
+                keys.discard(key)
+                if not keys:
+                    del versions[installed_versions]
+                break
+        if not versions:
+            self.by_name.pop(rec.spec.name, None)
+
+        self.explicit.discard(key)
+
+        time = self._time_of.pop(key, None)
+        if time is not None:
+            idx = bisect.bisect_left(self.by_time, (time, key))
+            if idx < len(self.by_time) and self.by_time[idx] == (time, key):
+                del self.by_time[idx]
+
+    def update(self, key: str, rec: InstallRecord) -> None:
+        """Re-index a record after some of its fields changed"""
+        self.remove(key, rec)
+        self.add(key, rec)
+
+    def by_names(
+        self, names: Iterable[str], versions: Optional[vn.VersionList] = None
+    ) -> Set[str]:
+        """Return the dag hashes of records with one of the names passed as input, and
+        (optionally) with versions satisfying the constraint passed as input.
+        """
+        check_versions = versions is not None and versions != vn.any_version
+        result: Set[str] = set()
+        for name in names:
+            for installed_versions, keys in self.by_name.get(name, {}).items():
+                if check_versions and not installed_versions.satisfies(versions):
+                    continue
+                result.update(keys)
+        return result
+
+    def installed_between(self, start: float, end: float) -> Set[str]:
+        """Return the dag hashes of records installed in the closed time interval passed as
+        input.
+        """
+        lo = bisect.bisect_left(self.by_time, (start, ""))
+        hi = bisect.bisect_right(self.by_time, (end, "~"))
+        return set(key for _, key in self.by_time[lo:hi])
+
+
+class LazyInstallRecords(MutableMapping[str, InstallRecord]):
+    """Install records of a database, read from a binary index.
+
+    Records are decoded, and their specs constructed, only when they are first accessed. Records
+    that are added or replaced are kept in memory, and shadow the ones in the binary index.
+    """
+
+    def __init__(self, db: "Database", table: record_table.RecordTable) -> None:
+        self._db = db
+        self._table = table
+        self._summary: Optional[Dict[str, list]] = None
+        self._records: Dict[str, InstallRecord] = {}
+        self._keys: Dict[str, None] = dict.fromkeys(table.keys())
+        self._reader = reader(_DB_VERSION)
+        self._decoder = spack.spec.SpecfileDecoder(self._reader)
+
+    def __getitem__(self, key: str) -> InstallRecord:
+        try:
+            return self._records[key]
+        except KeyError:
+            if key not in self._keys:
+                raise
+        return self._materialize(key)
+
+    def _materialize(self, key: str) -> InstallRecord:
+        try:
+            raw = sjson.load(self._table.get(key).decode("utf-8"))  # type: ignore[union-attr]
+            installs = {key: raw}
+            spec = self._db._read_spec_from_dict(self._decoder, key, installs)
+            record = InstallRecord.from_dict(spec, raw)
+            # Register the record before connecting dependencies, which are materialized
+            # recursively and need to find it.
+            self._records[key] = record
+            self._db._assign_dependencies(self._reader, key, installs, self)
+            spec._mark_root_concrete()
+        except Exception as e:
+            self._records.pop(key, None)
+            raise CorruptDatabaseError(
+                f"Invalid record in Spack database: hash: {key}, cause: "
+                f"{type(e).__name__}: {e}",
+                self._table.path,
+            ) from e
+        return record
+
+    def __setitem__(self, key: str, record: InstallRecord) -> None:
+        self._records[key] = record
+        self._keys[key] = None
+
+    def __delitem__(self, key: str) -> None:
+        del self._keys[key]
+        self._records.pop(key, None)
+
+    def __contains__(self, key) -> bool:
+        return key in self._keys
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def summary(self) -> Dict[str, list]:
+        """Summary of the records in the binary index, by DAG hash, which is read only when it is
+        first needed."""
+        if self._summary is None:
+            try:
+                entries = sjson.load(self._table.summary().decode("utf-8"))
+                if len(entries) != len(self._table):
+                    raise ValueError(f"{len(entries)} summaries for {len(self._table)} records")
+            except ValueError as e:
+                raise CorruptDatabaseError(
+                    f"Invalid summary in binary database index: {e}", self._table.path
+                ) from e
+            self._summary = dict(zip(self._table.keys(), entries))
+        return self._summary
+
+    def unmodified(self, key: str) -> Optional[Tuple[bytes, list]]:
+        """Return the serialized record and its summary, if the record was never accessed since
+        it was read from the binary index, otherwise None.
+        """
+        if key in self._records or key not in self.summary:
+            return None
+        return self._table.get(key), self.summary[key]  # type: ignore[return-value]
+
+    def close(self) -> None:
+        """Unmap the binary index. Records that were not accessed cannot be read anymore."""
+        self._table.close()
+
+
 class ForbiddenLockError(SpackError):
     """Raised when an upstream DB attempts to acquire a lock"""
 
@@ -616,6 +846,8 @@ def __init__(
         is_upstream: bool = False,
         lock_cfg: LockConfiguration = DEFAULT_LOCK_CFG,
         layout: Optional[DirectoryLayout] = None,
+        binary_index: bool = False,
+        journal: bool = False,
     ) -> None:
         """Database for Spack installations.
 
@@ -629,12 +861,24 @@ def __init__(
         If that does not exist, it will create a database when needed by scanning the entire
         store root for ``spec.json`` files according to Spack's directory layout.
 
+        An up-to-date ``index.bin`` file in the database directory, if present, is read instead
+        of ``index.json``. That file is a memory-mapped table of install records addressed by
+        DAG hash, so that only the records that are accessed need to be decoded.
+
+        Changes to install records may be appended to an ``index.journal`` file, instead of
+        rewriting ``index.json`` at the end of every write transaction. The journal is replayed
+        on top of ``index.json`` when reading, and compacted into it once it grows too large.
+
         Args:
             root: root directory where to create the database directory.
             upstream_dbs: upstream databases for this repository.
             is_upstream: whether this repository is an upstream.
             lock_cfg: configuration for the locks to be used by this repository.
                 Relevant only if the repository is not an upstream.
+            binary_index: if True, write ``index.bin`` next to ``index.json`` every time the
+                database is written.
+            journal: if True, write transactions append the records they changed to
+                ``index.journal``, instead of rewriting ``index.json``.
         """
         self.root = root
         self.database_directory = os.path.join(self.root, _DB_DIRNAME)
@@ -643,6 +887,8 @@ def __init__(
         # Set up layout of database files within the db dir
         self._index_path = os.path.join(self.database_directory, "index.json")
         self._verifier_path = os.path.join(self.database_directory, "index_verifier")
+        self._binary_index_path = os.path.join(self.database_directory, "index.bin")
+        self._journal_path = os.path.join(self.database_directory, "index.journal")
         self._lock_path = os.path.join(self.database_directory, "lock")
 
         # Create needed directories and files
@@ -650,7 +896,18 @@ def __init__(
             fs.mkdirp(self.database_directory)
 
         self.is_upstream = is_upstream
+        self.binary_index = binary_index
+        self.journal = journal
         self.last_seen_verifier = ""
+        # Verifier and version of the index.json in memory, and length of the journal replayed
+        # on top of it
+        self._base_verifier = ""
+        self._base_version: Optional[vn.StandardVersion] = None
+        self._journal_length = 0
+        # Records changed in the current write transaction, and whether index.json must be
+        # rewritten at the end of it
+        self._changed: Dict[str, None] = {}
+        self._compact_on_write = False
         # Failed write transactions (interrupted by exceptions) will alert
         # _write. When that happens, we set this flag to indicate that
         # future read/write transactions should re-read the DB. Normally it
@@ -674,12 +931,19 @@ def __init__(
                 desc="database",
                 enable=lock_cfg.enable,
             )
-        self._data: Dict[str, InstallRecord] = {}
+        self._data: MutableMapping[str, InstallRecord] = {}
+
+        # Records read from a binary index whose summary was not read yet. The secondary
+        # indexes and the installed prefixes are built from it when they are first needed.
+        self._pending_summary: Optional[LazyInstallRecords] = None
+
+        # Secondary indexes on the records above, to speed-up queries
+        self._index = RecordIndex()
 
         # For every installed spec we keep track of its install prefix, so that
         # we can answer the simple query whether a given path is already taken
         # before installing a different spec.
-        self._installed_prefixes: Set[str] = set()
+        self._installed_prefixes = set()
 
         self.upstream_dbs = list(upstream_dbs) if upstream_dbs else []
 
@@ -701,9 +965,7 @@ def _write_to_file(self, stream):
         This function does not do any locking or transactions.
         """
         # map from per-spec hash code to installation record.
-        installs = dict(
-            (k, v.to_dict(include_fields=self.record_fields)) for k, v in self._data.items()
-        )
+        installs = dict(self._record_dicts())
 
         # database includes installation list and version.
 
@@ -715,7 +977,7 @@ def _write_to_file(self, stream):
             "database": {
                 # TODO: move this to a top-level _meta section if we ever
                 # TODO: bump the DB version to 7
-                "version": str(_DB_VERSION),
+                "version": str(self._index_version),
                 # dictionary of installation records, keyed by DAG hash
                 "installs": installs,
             }
@@ -726,8 +988,291 @@ def _write_to_file(self, stream):
         except (TypeError, ValueError) as e:
             raise sjson.SpackJSONError("error writing JSON database:", str(e))
 
-    def _read_spec_from_dict(self, spec_reader, hash_key, installs, hash=ht.dag_hash):
-        """Recursively construct a spec from a hash in a YAML database.
+    def _record_dicts(self) -> Iterator[Tuple[str, dict]]:
+        """Iterate over pairs of DAG hash and serialized install record.
+
+        Records read from a binary index that were never accessed are serialized without
+        constructing their specs.
+        """
+        for key in self._data:
+            if isinstance(self._data, LazyInstallRecords):
+                unmodified = self._data.unmodified(key)
+                if unmodified is not None:
+                    yield key, sjson.load(unmodified[0].decode("utf-8"))
+                    continue
+            yield key, self._data[key].to_dict(include_fields=self.record_fields)
+
+    @property
+    def _index_version(self) -> vn.StandardVersion:
+        """Version of the index.json written by this database"""
+        return _JOURNAL_DB_VERSION if self.journal else _DB_VERSION
+
+    def _write_binary_index(self, verifier: str) -> None:
+        """Write the binary index of the database, tagged with the verifier of the
+        corresponding ``index.json``, so that readers can detect when it is stale.
+        """
+        records, summary = [], []
+        for key in sorted(self._data):
+            unmodified = None
+            if isinstance(self._data, LazyInstallRecords):
+                unmodified = self._data.unmodified(key)
+
+            if unmodified is not None:
+                records.append((key, unmodified[0]))
+                summary.append(unmodified[1])
+                continue
+
+            rec = self._data[key]
+            serialized = sjson.dump(rec.to_dict(include_fields=self.record_fields))
+            records.append((key, serialized.encode("utf-8")))  # type: ignore[union-attr]
+            prefix = rec.path if rec.installed and not rec.spec.external else None
+            summary.append(
+                [
+                    rec.spec.name,
+                    rec.spec.versions.to_dict(),
+                    rec.explicit,
+                    rec.installation_time,
+                    prefix,
+                ]
+            )
+
+        metadata = {"version": str(self._base_version), "verifier": verifier}
+        record_table.write(
+            self._binary_index_path,
+            records,
+            metadata=metadata,
+            summary=sjson.dump(summary).encode("utf-8"),  # type: ignore[union-attr]
+        )
+
+    def _read_from_binary_index(self, verifier: str) -> bool:
+        """Fill database from the binary index, if it is consistent with the verifier passed as
+        argument. Records are decoded lazily, when accessed.
+
+        Return True if the database was read, False if the binary index is missing or stale.
+        Does not do any locking.
+        """
+        if not verifier or not os.path.isfile(self._binary_index_path):
+            return False
+
+        try:
+            table = record_table.RecordTable(self._binary_index_path)
+        except (OSError, record_table.RecordTableError) as e:
+            tty.debug(f"Ignoring binary database index: {e}")
+            return False
+
+        metadata = table.metadata
+        if metadata.get("verifier") != verifier or metadata.get("version") not in (
+            str(_DB_VERSION),
+            str(_JOURNAL_DB_VERSION),
+        ):
+            table.close()
+            return False
+
+        self._close_binary_index()
+        self._data = self._pending_summary = LazyInstallRecords(self, table)
+        self._base_version = vn.Version(metadata["version"])
+        return True
+
+    def _close_binary_index(self) -> None:
+        """Unmap the binary index the current records were read from, if any, before they are
+        replaced."""
+        if isinstance(self._data, LazyInstallRecords):
+            self._data.close()
+        self._pending_summary = None
+
+    def _load_summary(self) -> None:
+        """Build the secondary indexes and the installed prefixes from the summary of the binary
+        index the records were read from, if that was not done yet."""
+        records, self._pending_summary = self._pending_summary, None
+        if records is None:
+            return
+
+        entries = []
+        installed_prefixes: Set[str] = set()
+        for key, entry in records.summary.items():
+            name, versions, explicit, installation_time, prefix = entry
+            entries.append(
+                (key, name, vn.VersionList.from_dict(versions), explicit, installation_time)
+            )
+            if prefix:
+                installed_prefixes.add(prefix)
+        self._record_index = RecordIndex.from_entries(entries)
+        self._prefixes = installed_prefixes
+
+    @property
+    def _index(self) -> RecordIndex:
+        self._load_summary()
+        return self._record_index
+
+    @_index.setter
+    def _index(self, value: RecordIndex) -> None:
+        self._load_summary()
+        self._record_index = value
+
+    @property
+    def _installed_prefixes(self) -> Set[str]:
+        self._load_summary()
+        return self._prefixes
+
+    @_installed_prefixes.setter
+    def _installed_prefixes(self, value: Set[str]) -> None:
+        self._load_summary()
+        self._prefixes = value
+
+    def _read_from_index(self, verifier: str) -> None:
+        """Fill database from the binary index if it is up-to-date, otherwise from
+        ``index.json``, then replay the journal on top of it. Does not do any locking.
+        """
+        base, journal_length = _parse_verifier(verifier)
+        if not self._read_from_binary_index(base):
+            self._read_from_file(self._index_path)
+        self._base_verifier, self._journal_length = base, 0
+        self._replay_journal(journal_length)
+
+    def _read_journal_increment(self, verifier: str) -> bool:
+        """Replay only the part of the journal that was appended since the last read, if the
+        database in memory is otherwise up-to-date.
+
+        Return True on success, False if the database needs to be read from scratch.
+        """
+        base, journal_length = _parse_verifier(verifier)
+        if (
+            not base
+            or base != self._base_verifier
+            or journal_length < self._journal_length
+            or self._state_is_inconsistent
+        ):
+            return False
+        self._replay_journal(journal_length)
+        return True
+
+    def _replay_journal(self, length: int) -> None:
+        """Apply the journal entries up to ``length`` bytes that were not applied yet.
+
+        Does not do any locking.
+        """
+        if length <= self._journal_length:
+            return
+
+        try:
+            with open(self._journal_path, "rb") as f:
+                f.seek(self._journal_length)
+                content = f.read(length - self._journal_length)
+        except OSError as e:
+            raise CorruptDatabaseError(f"cannot read database journal: {e}", self._journal_path)
+
+        lines = content.splitlines()
+        if self._journal_length == 0:
+            header = sjson.load(lines.pop(0).decode("utf-8")) if lines else {}
+            if header.get("base") != self._base_verifier:
+                raise CorruptDatabaseError(
+                    "database journal does not match index.json", self._journal_path
+                )
+
+        spec_reader = reader(_DB_VERSION)
+        decoder = spack.spec.SpecfileDecoder(spec_reader)
+        new_records: Dict[str, dict] = {}
+        for line in lines:
+            entry = sjson.load(line.decode("utf-8"))
+            key = entry["hash"]
+            old = self._data.get(key)
+
+            if old is not None:
+                self._index.remove(key, old)
+                if old.installed and not old.spec.external and old.path:
+                    self._installed_prefixes.discard(old.path)
+
+            if "record" not in entry:
+                # The record was removed
+                if old is not None:
+                    del self._data[key]
+                    old.spec.detach(deptype=_TRACKED_DEPENDENCIES)
+                new_records.pop(key, None)
+                continue
+
+            raw = entry["record"]
+            if old is not None:
+                # Specs are immutable for a given hash, only the other fields can change
+                record = InstallRecord.from_dict(old.spec, raw)
+            else:
+                spec = self._read_spec_from_dict(decoder, key, {key: raw})
+                record = InstallRecord.from_dict(spec, raw)
+                new_records[key] = raw
+
+            self._data[key] = record
+            self._index.add(key, record)
+            if record.installed and not record.spec.external and record.path:
+                self._installed_prefixes.add(record.path)
+
+        # Connect new specs to their dependencies only when all of them have been created
+        for key, raw in new_records.items():
+            self._assign_dependencies(spec_reader, key, {key: raw}, self._data)
+        for key in new_records:
+            self._data[key].spec._mark_root_concrete()
+
+        self._journal_length = length
+
+    def _record_changed(self, key: str) -> None:
+        """Record that an install record was added, removed or modified in the current write
+        transaction.
+        """
+        if self.journal:
+            self._changed[key] = None
+
+    def _write_journal(self, changed: Iterable[str]) -> bool:
+        """Append the records changed in the current write transaction to the journal.
+
+        Return True on success, False if the journal can't be used and index.json must be
+        rewritten instead.
+        """
+        if (
+            not _use_uuid
+            or self._compact_on_write
+            or self._base_version != _JOURNAL_DB_VERSION
+            or not self._base_verifier
+            or not os.path.isfile(self._index_path)
+            or self._journal_length > _JOURNAL_COMPACTION_RATIO * os.path.getsize(self._index_path)
+        ):
+            return False
+
+        entries = []
+        for key in changed:
+            entry: Dict[str, Any] = {"hash": key}
+            if key in self._data:
+                entry["record"] = self._data[key].to_dict(include_fields=self.record_fields)
+            entries.append(sjson.dump(entry).encode("utf-8"))  # type: ignore[union-attr]
+
+        if not entries:
+            return True
+
+        if self._journal_length == 0:
+            header = sjson.dump({"base": self._base_verifier}).encode("utf-8")  # type: ignore
+            entries.insert(0, header)
+
+        # Discard anything left over by an interrupted write, after the replayed entries
+        with open(self._journal_path, "ab") as f:
+            f.truncate(self._journal_length)
+            f.seek(self._journal_length)
+            f.write(b"".join(entry + b"\n" for entry in entries))
+            f.flush()
+            os.fsync(f.fileno())
+            journal_length = f.tell()
+
+        new_verifier = f"{self._base_verifier}+{journal_length}"
+        with open(self._verifier_path, "w") as f:
+            f.write(new_verifier)
+        self.last_seen_verifier = new_verifier
+        self._journal_length = journal_length
+        return True
+
+    def _read_spec_from_dict(
+        self,
+        decoder: "spack.spec.SpecfileDecoder",
+        hash_key: str,
+        installs: dict,
+        hash=ht.dag_hash,
+    ):
+        """Construct a spec without dependencies from a hash in a JSON database.
 
         Does not do any locking.
         """
@@ -744,7 +1289,7 @@ def _read_spec_from_dict(self, spec_reader, hash_key, installs, hash=ht.dag_hash
             spec_dict[hash.name] = hash_key
 
         # Build spec from dict first.
-        return spec_reader.from_node_dict(spec_dict)
+        return decoder.spec(spec_dict)
 
     def db_for_spec_hash(self, hash_key):
         with self.read_transaction():
@@ -756,7 +1301,7 @@ def db_for_spec_hash(self, hash_key):
                 return db
 
     def query_by_spec_hash(
-        self, hash_key: str, data: Optional[Dict[str, InstallRecord]] = None
+        self, hash_key: str, data: Optional[Mapping[str, InstallRecord]] = None
     ) -> Tuple[bool, Optional[InstallRecord]]:
         """Get a spec for hash, and whether it's installed upstream.
 
@@ -790,7 +1335,7 @@ def _assign_dependencies(
         spec_reader: Type["spack.spec.SpecfileReaderBase"],
         hash_key: str,
         installs: dict,
-        data: Dict[str, InstallRecord],
+        data: Mapping[str, InstallRecord],
     ):
         # Add dependencies from other records in the install DB to
         # form a full spec.
@@ -850,7 +1395,7 @@ def check(cond, msg):
 
         # TODO: better version checking semantics.
         version = vn.Version(db["version"])
-        if version > _DB_VERSION:
+        if version > _DB_VERSION and version != _JOURNAL_DB_VERSION:
             raise InvalidDatabaseVersionError(self, _DB_VERSION, version)
         elif version < _DB_VERSION and not any(
             old == version and new == _DB_VERSION for old, new in _SKIP_REINDEX
@@ -866,6 +1411,8 @@ def check(cond, msg):
             installs = db["installs"]
 
         spec_reader = reader(version)
+        # Records share most of their versions, variants, etc. which are decoded only once
+        decoder = spack.spec.SpecfileDecoder(spec_reader)
 
         def invalid_record(hash_key, error):
             return CorruptDatabaseError(
@@ -889,7 +1436,7 @@ def invalid_record(hash_key, error):
         for hash_key, rec in installs.items():
             try:
                 # This constructs a spec DAG from the list of all installs
-                spec = self._read_spec_from_dict(spec_reader, hash_key, installs)
+                spec = self._read_spec_from_dict(decoder, hash_key, installs)
 
                 # Insert the brand new spec in the database.  Each
                 # spec has its own copies of its dependency specs.
@@ -919,7 +1466,10 @@ def invalid_record(hash_key, error):
         for hash_key, rec in data.items():
             rec.spec._mark_root_concrete()
 
+        self._close_binary_index()
         self._data = data
+        self._base_version = version
+        self._index = RecordIndex(data)
         self._installed_prefixes = installed_prefixes
 
     def reindex(self):
@@ -935,13 +1485,16 @@ def reindex(self):
         def _read_suppress_error():
             try:
                 if os.path.isfile(self._index_path):
-                    self._read_from_file(self._index_path)
+                    self._read_from_index(self._read_verifier())
             except CorruptDatabaseError as e:
                 tty.warn(f"Reindexing corrupt database, error was: {e}")
+                self._close_binary_index()
                 self._data = {}
+                self._index = RecordIndex()
                 self._installed_prefixes = set()
 
         with lk.WriteTransaction(self.lock, acquire=_read_suppress_error, release=self._write):
+            self._compact_on_write = True
             old_installed_prefixes, self._installed_prefixes = self._installed_prefixes, set()
             old_data, self._data = self._data, {}
             try:
@@ -951,8 +1504,10 @@ def _read_suppress_error():
                 self._data = old_data
                 self._installed_prefixes = old_installed_prefixes
                 raise
+            finally:
+                self._index = RecordIndex(self._data)
 
-    def _reindex(self, old_data: Dict[str, InstallRecord]):
+    def _reindex(self, old_data: Mapping[str, InstallRecord]):
         # Specs on the file system are the source of truth for record.spec. The old database values
         # if available are the source of truth for the rest of the record.
         assert self.layout, "Database layout must be set to reindex"
@@ -1088,6 +1643,9 @@ def _write(self, type, value, traceback):
 
         This routine does no locking.
         """
+        changed, self._changed = self._changed, {}
+        compact, self._compact_on_write = self._compact_on_write, False
+
         # Do not write if exceptions were raised
         if type is not None:
             # A failure interrupted a transaction, so we should record that
@@ -1096,6 +1654,13 @@ def _write(self, type, value, traceback):
             self._state_is_inconsistent = True
             return
 
+        if self.journal and not compact:
+            try:
+                if self._write_journal(changed):
+                    return
+            except OSError as e:
+                tty.debug(f"Cannot append to the database journal: {e}")
+
         temp_file = self._index_path + (".%s.%s.temp" % (_getfqdn(), os.getpid()))
 
         # Write a temporary database file them move it into place
@@ -1109,6 +1674,18 @@ def _write(self, type, value, traceback):
                     new_verifier = str(uuid.uuid4())
                     f.write(new_verifier)
                     self.last_seen_verifier = new_verifier
+                self._base_verifier, self._journal_length = new_verifier, 0
+                self._base_version = self._index_version
+
+                # The journal has been compacted into index.json
+                if os.path.exists(self._journal_path):
+                    os.remove(self._journal_path)
+
+                if self.binary_index:
+                    try:
+                        self._write_binary_index(new_verifier)
+                    except OSError as e:
+                        tty.debug(f"Cannot write binary database index: {e}")
         except BaseException as e:
             tty.debug(e)
             # Clean up temp file if something goes wrong.
@@ -1116,22 +1693,28 @@ def _write(self, type, value, traceback):
                 os.remove(temp_file)
             raise
 
+    def _read_verifier(self) -> str:
+        """Return the content of the verifier file, or an empty string if not available."""
+        current_verifier = ""
+        if _use_uuid:
+            try:
+                with open(self._verifier_path, "r") as f:
+                    current_verifier = f.read()
+            except BaseException:
+                pass
+        return current_verifier
+
     def _read(self):
         """Re-read Database from the data in the set location. This does no locking."""
         if os.path.isfile(self._index_path):
-            current_verifier = ""
-            if _use_uuid:
-                try:
-                    with open(self._verifier_path, "r") as f:
-                        current_verifier = f.read()
-                except BaseException:
-                    pass
+            current_verifier = self._read_verifier()
             if (current_verifier != self.last_seen_verifier) or (current_verifier == ""):
                 self.last_seen_verifier = current_verifier
-                # Read from file if a database exists
-                self._read_from_file(self._index_path)
+                # Read from file if a database exists, unless only the journal changed
+                if not self._read_journal_increment(current_verifier):
+                    self._read_from_index(current_verifier)
             elif self._state_is_inconsistent:
-                self._read_from_file(self._index_path)
+                self._read_from_index(current_verifier)
                 self._state_is_inconsistent = False
             return
         elif self.is_upstream:
@@ -1230,6 +1813,7 @@ def _add(
                 new_spec._add_dependency(record.spec, depflag=dep.depflag, virtuals=dep.virtuals)
                 if not upstream:
                     record.ref_count += 1
+                    self._record_changed(dkey)
 
             # Mark concrete once everything is built, and preserve the original hashes of concrete
             # specs.
@@ -1237,12 +1821,17 @@ def _add(
             new_spec._hash = key
             new_spec._package_hash = spec_pkg_hash
 
+            self._data[key].explicit = explicit
+            self._index.add(key, self._data[key])
+
         else:
             # It is already in the database
             self._data[key].installed = installed
             self._data[key].installation_time = _now()
+            self._data[key].explicit = explicit
+            self._index.update(key, self._data[key])
 
-        self._data[key].explicit = explicit
+        self._record_changed(key)
 
     @_autospec
     def add(self, spec: "spack.spec.Spec", *, explicit: bool = False) -> None:
@@ -1283,9 +1872,11 @@ def _decrement_ref_count(self, spec: "spack.spec.Spec") -> None:
 
         rec = self._data[key]
         rec.ref_count -= 1
+        self._record_changed(key)
 
         if rec.ref_count == 0 and not rec.installed:
             del self._data[key]
+            self._index.remove(key, rec)
 
             for dep in spec.dependencies(deptype=_TRACKED_DEPENDENCIES):
                 self._decrement_ref_count(dep)
@@ -1298,11 +1889,13 @@ def _increment_ref_count(self, spec: "spack.spec.Spec") -> None:
 
         rec = self._data[key]
         rec.ref_count += 1
+        self._record_changed(key)
 
     def _remove(self, spec: "spack.spec.Spec") -> "spack.spec.Spec":
         """Non-locking version of remove(); does real work."""
         key = self._get_matching_spec_key(spec)
         rec = self._data[key]
+        self._record_changed(key)
 
         # This install prefix is now free for other specs to use, even if the
         # spec is only marked uninstalled.
@@ -1314,6 +1907,7 @@ def _remove(self, spec: "spack.spec.Spec") -> "spack.spec.Spec":
             return rec.spec
 
         del self._data[key]
+        self._index.remove(key, rec)
 
         # Remove any reference to this node from dependencies and
         # decrement the reference count
@@ -1379,6 +1973,7 @@ def _deprecate(self, spec: "spack.spec.Spec", deprecator: "spack.spec.Spec") ->
         spec_rec.deprecated_for = deprecator_key
         spec_rec.installed = False
         self._data[spec_key] = spec_rec
+        self._record_changed(spec_key)
 
     @_autospec
     def mark(self, spec: "spack.spec.Spec", key, value) -> None:
@@ -1387,8 +1982,11 @@ def mark(self, spec: "spack.spec.Spec", key, value) -> None:
             return self._mark(spec, key, value)
 
     def _mark(self, spec: "spack.spec.Spec", key, value) -> None:
-        record = self._data[self._get_matching_spec_key(spec)]
+        hash_key = self._get_matching_spec_key(spec)
+        record = self._data[hash_key]
         setattr(record, key, value)
+        self._index.update(hash_key, record)
+        self._record_changed(hash_key)
 
     @_autospec
     def deprecate(self, spec: "spack.spec.Spec", deprecator: "spack.spec.Spec") -> None:
@@ -1453,9 +2051,9 @@ def _get_by_hash_local(self, dag_hash, default=None, installed=any):
         # check if hash is a prefix of some installed (or previously
         # installed) spec.
         matches = [
-            record.spec
-            for h, record in self._data.items()
-            if h.startswith(dag_hash) and record.install_type_matches(installed)
+            self._data[h].spec
+            for h in self._data
+            if h.startswith(dag_hash) and self._data[h].install_type_matches(installed)
         ]
         if matches:
             return matches
@@ -1523,6 +2121,54 @@ def get_by_hash(self, dag_hash, default=None, installed=any):
 
         return default
 
+    def _query_candidates(
+        self,
+        query_spec,
+        explicit,
+        start_date: Optional[datetime.datetime],
+        end_date: Optional[datetime.datetime],
+    ) -> Iterable[InstallRecord]:
+        """Return the install records that might match a query, using secondary indexes.
+
+        The records returned still need to be checked against every filter of the query.
+        """
+        keys: Optional[Set[str]] = None
+
+        def narrow(subset: Set[str]) -> None:
+            nonlocal keys
+            keys = subset if keys is None else keys & subset
+
+        if query_spec is not any:
+            if query_spec.name:
+                narrow(self._index.by_names([query_spec.name], query_spec.versions))
+                # Only virtuals can match records with a different name. Checking if a
+                # spec is virtual is expensive, so do it only when the name is not found.
+                if not keys and query_spec.virtual:
+                    try:
+                        providers = spack.repo.PATH.providers_for(query_spec.name)
+                    except spack.repo.UnknownPackageError:
+                        providers = []
+                    # Versions of the query refer to the virtual, not to its providers
+                    keys = self._index.by_names(set(p.name for p in providers))
+            elif query_spec.versions != vn.any_version:
+                narrow(self._index.by_names(self._index.by_name, query_spec.versions))
+
+        if explicit is True:
+            narrow(self._index.explicit)
+
+        if start_date or end_date:
+            # Pad the interval, so that rounding in timestamp conversions can't exclude records
+            start = _timestamp(start_date, float("-inf")) - 1
+            end = _timestamp(end_date, float("inf")) + 1
+            narrow(self._index.installed_between(start, end))
+
+        if keys is None:
+            return self._data.values()
+        # Keep the order of the records in the database, which is the order of query results
+        if len(keys) < 2:
+            return [self._data[key] for key in keys]
+        return [self._data[key] for key in self._data if key in keys]
+
     def _query(
         self,
         query_spec=any,
@@ -1555,16 +2201,15 @@ def _query(
                 else:
                     return []
 
-        # Abstract specs require more work -- currently we test
-        # against everything.
+        # Abstract specs require more work: narrow down candidates using the
+        # secondary indexes, then check each of them against the query.
+        candidates = self._query_candidates(query_spec, explicit, start_date, end_date)
+
         results = []
         start_date = start_date or datetime.datetime.min
         end_date = end_date or datetime.datetime.max
 
-        # save specs whose name doesn't match for last, to avoid a virtual check
-        deferred = []
-
-        for key, rec in self._data.items():
+        for rec in candidates:
             if hashes is not None and rec.spec.dag_hash() not in hashes:
                 continue
 
@@ -1588,26 +2233,8 @@ def _query(
                 if not (start_date < inst_date < end_date):
                     continue
 
-            if query_spec is any:
+            if query_spec is any or rec.spec.satisfies(query_spec):
                 results.append(rec.spec)
-                continue
-
-            # check anon specs and exact name matches first
-            if not query_spec.name or rec.spec.name == query_spec.name:
-                if rec.spec.satisfies(query_spec):
-                    results.append(rec.spec)
-
-            # save potential virtual matches for later, but not if we already found a match
-            elif not results:
-                deferred.append(rec.spec)
-
-        # Checking for virtuals is expensive, so we save it for last and only if needed.
-        # If we get here, we didn't find anything in the DB that matched by name.
-        # If we did fine something, the query spec can't be virtual b/c we matched an actual
-        # package installation, so skip the virtual check entirely. If we *didn't* find anything,
-        # check all the deferred specs *if* the query is virtual.
-        if not results and query_spec is not any and deferred and query_spec.virtual:
-            results = [spec for spec in deferred if spec.satisfies(query_spec)]
 
         return results
 
@@ -1736,6 +2363,10 @@ def update_explicit(self, spec, explicit):
                 status = "explicit" if explicit else "implicit"
                 tty.debug(message.format(status, s=spec))
                 rec.explicit = explicit
+                key = rec.spec.dag_hash()
+                if self._data.get(key) is rec:
+                    self._index.update(key, rec)
+                    self._record_changed(key)
 
 
 class NoUpstreamVisitor:
@@ -594,6 +594,7 @@ def __init__(
         exclude=[],
         link=default_view_link,
         link_type="symlink",
+        atomic=False,
     ):
         self.base = base_path
         self.raw_root = root
@@ -603,6 +604,7 @@ def __init__(
         self.exclude = exclude
         self.link_type = fsv.canonicalize_link_type(link_type)
         self.link = link
+        self.atomic = atomic
 
     def select_fn(self, spec):
         return any(spec.satisfies(s) for s in self.select)
@@ -623,6 +625,7 @@ def __eq__(self, other):
                 self.exclude == other.exclude,
                 self.link == other.link,
                 self.link_type == other.link_type,
+                self.atomic == other.atomic,
             ]
         )
 
@@ -638,6 +641,8 @@ def to_dict(self):
             ret["link_type"] = self.link_type
         if self.link != default_view_link:
             ret["link"] = self.link
+        if self.atomic:
+            ret["atomic"] = self.atomic
         return ret
 
     @staticmethod
@@ -650,6 +655,7 @@ def from_dict(base_path, d):
             d.get("exclude", []),
             d.get("link", default_view_link),
             d.get("link_type", "symlink"),
+            d.get("atomic", False),
         )
 
     @property
@@ -755,14 +761,12 @@ def specs_for_view(self, concrete_roots: List[Spec]) -> List[Spec]:
     def regenerate(self, concrete_roots: List[Spec]) -> None:
         specs = self.specs_for_view(concrete_roots)
 
-        # To ensure there are no conflicts with packages being installed
-        # that cannot be resolved or have repos that have been removed
-        # we always regenerate the view from scratch.
-        # We will do this by hashing the view contents and putting the view
-        # in a directory by hash, and then having a symlink to the real
-        # view in the root. The real root for a view at /dirname/basename
-        # will be /dirname/._basename_<hash>.
-        # This allows for atomic swaps when we update the view
+        # We hash the view contents and put the view in a directory by hash, and then have a
+        # symlink to the real view in the root. The real root for a view at /dirname/basename
+        # will be /dirname/._basename/<hash>. Symlink and hardlink views are updated in place
+        # using the merge map stored in /dirname/._basename/<hash>.json, and then moved to the
+        # directory of the new hash. Otherwise, or when the stored merge map cannot be used, the
+        # view is regenerated from scratch in the new directory, which allows for atomic swaps.
 
         # cache the roots because the way we determine which is which does
         # not work while we are updating
@@ -779,6 +783,11 @@ def regenerate(self, concrete_roots: List[Spec]) -> None:
         if specs:
             tty.msg(f"Updating view at {self.root}")
 
+        # Unless the view has to be swapped atomically, try to update the old view in place, and
+        # move it to new_root.
+        if self._update_in_place(specs, old_root, new_root):
+            return
+
         view = self.view(new=new_root)
 
         root_dirname = os.path.dirname(self.root)
@@ -804,15 +813,13 @@ def regenerate(self, concrete_roots: List[Spec]) -> None:
         # Create a new view
         try:
             fs.mkdirp(new_root)
-            view.add_specs(*specs)
+            contents = view.update_specs(specs)
 
-            # create symlink from tmp_symlink_name to new_root
-            if os.path.exists(tmp_symlink_name):
-                os.unlink(tmp_symlink_name)
-            symlink(new_root, tmp_symlink_name)
+            # Store what was linked, so that the view can be updated in place later on
+            if self._updates_in_place:
+                contents.write(self._contents_path(new_root))
 
-            # mv symlink atomically over root symlink to old_root
-            fs.rename(tmp_symlink_name, self.root)
+            self._link_root(new_root)
         except Exception as e:
             # Clean up new view and temporary symlink on any failure.
             try:
@@ -820,6 +827,10 @@ def regenerate(self, concrete_roots: List[Spec]) -> None:
                 os.unlink(tmp_symlink_name)
             except OSError:
                 pass
+            try:
+                os.unlink(self._contents_path(new_root))
+            except OSError:
+                pass
 
             # Give an informative error message for the typical error case: two specs, same package
             # project to same prefix.
@@ -853,6 +864,74 @@ def regenerate(self, concrete_roots: List[Spec]) -> None:
                 msg = "Failed to remove old view at %s\n" % old_root
                 msg += str(e)
                 tty.warn(msg)
+            try:
+                os.unlink(self._contents_path(old_root))
+            except OSError:
+                pass
+
+    @property
+    def _updates_in_place(self) -> bool:
+        """Whether the view is updated in place rather than swapped atomically. Copied files may
+        depend on the root of the view, so copy views are always generated from scratch."""
+        return not self.atomic and self.link_type in ("symlink", "hardlink")
+
+    @staticmethod
+    def _contents_path(root: str) -> str:
+        """Path of the file with the contents of the view in the given directory."""
+        return f"{root}.json"
+
+    def _link_root(self, root: str) -> None:
+        """Atomically point the root of the view to the given directory."""
+        tmp_symlink_name = os.path.join(os.path.dirname(self.root), "._view_link")
+
+        # create symlink from tmp_symlink_name to root
+        if os.path.exists(tmp_symlink_name):
+            os.unlink(tmp_symlink_name)
+        symlink(root, tmp_symlink_name)
+
+        # mv symlink atomically over root symlink to old_root
+        fs.rename(tmp_symlink_name, self.root)
+
+    def _update_in_place(self, specs: List[Spec], old_root: Optional[str], new_root: str) -> bool:
+        """Update the view in old_root in place, by linking and removing only the files that
+        changed since it was generated, and move it to new_root. Returns False if the view has
+        to be generated from scratch instead."""
+        if not self._updates_in_place or not old_root:
+            return False
+
+        # Only update views that were generated by the environment, next to the new root
+        try:
+            if not os.path.samefile(os.path.dirname(new_root), os.path.dirname(old_root)):
+                return False
+        except OSError:
+            return False
+
+        previous = fsv.ViewContents.read(self._contents_path(old_root))
+        if previous is None or previous.root != old_root or previous.link_type != self.link_type:
+            return False
+
+        try:
+            contents = self._view(new_root).update_specs(specs, previous)
+            contents.write(self._contents_path(new_root))
+            self._link_root(new_root)
+        except Exception as e:
+            tty.debug(f"Regenerating the view at {self.root} from scratch: {e}")
+
+            # The old view was moved, and may be partially updated
+            if not os.path.exists(old_root):
+                shutil.rmtree(new_root, ignore_errors=True)
+                for root in (old_root, new_root):
+                    try:
+                        os.unlink(self._contents_path(root))
+                    except OSError:
+                        pass
+            return False
+
+        try:
+            os.unlink(self._contents_path(old_root))
+        except OSError:
+            pass
+        return True
 
     def _exclude_duplicate_runtimes(self, nodes):
         all_runtimes = spack.repo.PATH.packages_with_tags("runtime")
@@ -1603,6 +1682,7 @@ def _concretize_separately(self, tests=False):
         user spec after the other.
         """
         import spack.bootstrap
+        import spack.solver.asp
 
         # keep any concretized specs whose user specs are still in the manifest
         old_concretized_user_specs = self.concretized_user_specs
@@ -1645,6 +1725,11 @@ def _concretize_separately(self, tests=False):
         if len(args) == 0:
             return []
 
+        # Select the reusable specs once, in this process. The workers are forked from it, so
+        # they share the same solver instead of reading the store and the buildcaches again.
+        solver = spack.solver.asp.Solver()
+        solver.selector.candidates()
+
         # Solve the environment in parallel on Linux
         start = time.time()
         num_procs = min(len(args), spack.config.determine_number_of_jobs(parallel=True))
@@ -1655,16 +1740,21 @@ def _concretize_separately(self, tests=False):
             msg += f" pool with {num_procs} processes"
         tty.msg(msg)
 
+        # Workers are long-lived, and get roots in batches small enough to balance the load
+        chunksize = max(1, len(args) // (4 * num_procs))
+
         batch = []
-        for j, (i, concrete, duration) in enumerate(
+        for j, (i, specfile, duration) in enumerate(
             spack.util.parallel.imap_unordered(
                 _concretize_task,
                 args,
                 processes=num_procs,
                 debug=tty.is_debug(),
-                maxtaskperchild=1,
+                chunksize=chunksize,
+                state=solver,
             )
         ):
+            concrete = Spec.from_json(specfile)
             batch.append((i, concrete))
             percentage = (j + 1) / len(args) * 100
             tty.verbose(
@@ -2313,9 +2403,13 @@ def filter_specs(self, reader, json_specs_by_hash, order_concretized):
         # Track specs by their DAG hash, allows handling DAG hash collisions
         first_seen = {}
 
+        # The specs of a lockfile share most of their versions, variants, etc. which are
+        # decoded only once
+        decoder = spack.spec.SpecfileDecoder(reader)
+
         # First pass: Put each spec in the map ignoring dependencies
         for lockfile_key, node_dict in json_specs_by_hash.items():
-            spec = reader.from_node_dict(node_dict)
+            spec = decoder.spec(node_dict)
             if not spec._hash:
                 # in v1 lockfiles, the hash only occurs as a key
                 spec._hash = lockfile_key
@@ -2324,11 +2418,7 @@ def filter_specs(self, reader, json_specs_by_hash, order_concretized):
         # Second pass: For each spec, get its dependencies from the node dict
         # and add them to the spec
         for lockfile_key, node_dict in json_specs_by_hash.items():
-            name, data = reader.name_and_data(node_dict)
-            for _, dep_hash, deptypes, _, virtuals in reader.dependencies_from_node_dict(data):
-                specs_by_hash[lockfile_key]._add_dependency(
-                    specs_by_hash[dep_hash], depflag=dt.canonicalize(deptypes), virtuals=virtuals
-                )
+            decoder.add_dependencies(specs_by_hash[lockfile_key], node_dict, specs_by_hash)
 
         # Traverse the root specs one at a time in the order they appear.
         # The first time we see each DAG hash, that's the one we want to
@@ -2503,12 +2593,16 @@ def display_specs(specs):
     print(tree_string)
 
 
-def _concretize_task(packed_arguments) -> Tuple[int, Spec, float]:
+def _concretize_task(packed_arguments) -> Tuple[int, str, float]:
+    """Concretize a single root, and return its specfile as a JSON string, which is much
+    cheaper to send to the parent process than a pickled spec. The solver is shared by all
+    tasks through the worker state.
+    """
     index, spec_str, tests = packed_arguments
     with tty.SuppressOutput(msg_enabled=False):
         start = time.time()
-        spec = Spec(spec_str).concretized(tests=tests)
-        return index, spec, time.time() - start
+        spec = Spec(spec_str).concretized(tests=tests, solver=spack.util.parallel.worker_state())
+        return index, spec.to_json(hash=ht.process_hash), time.time() - start
 
 
 def make_repo_path(root):
@@ -0,0 +1,166 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Fetch the sources of many packages at the same time.
+
+Commands like ``spack fetch`` and ``spack mirror create`` download the sources of many packages,
+and most of the time of each download is spent waiting on the network. The
+:class:`FetchScheduler` runs the downloads in threads, limits how many of them go to the same host
+at once, and retries the ones that fail with exponential backoff. Everything else that is done
+per package, like verifying checksums or archiving sources in a mirror, happens in the same
+threads.
+"""
+import concurrent.futures
+import contextlib
+import threading
+import time
+import urllib.parse
+from typing import Callable, Dict, Iterable, List, Optional, TypeVar
+
+import llnl.util.tty as tty
+
+import spack.config
+import spack.error
+import spack.fetch_strategy
+
+#: Number of packages fetched at the same time when ``config:fetch_jobs`` is not set
+DEFAULT_FETCH_JOBS = 8
+
+#: Number of downloads from the same host at the same time when ``config:fetch_jobs_per_host``
+#: is not set
+DEFAULT_FETCH_JOBS_PER_HOST = 4
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a fetch may succeed when it is tried again. Checksum errors are permanent."""
+    return isinstance(error, spack.error.FetchError) and not isinstance(
+        error, spack.fetch_strategy.ChecksumError
+    )
+
+
+def package_host(pkg) -> Optional[str]:
+    """The host the sources of a package are downloaded from, or None if it is unknown.
+
+    Archives may also be fetched from mirrors, which are tried first. This host is only used to
+    spread the downloads of different packages over hosts.
+    """
+    try:
+        url = getattr(pkg.fetcher, "url", None)
+    except spack.error.SpackError:
+        return None
+    if not isinstance(url, str):
+        return None
+    return urllib.parse.urlparse(url).netloc or None
+
+
+class FetchScheduler:
+    """Calls a function that fetches something for each of many items, in threads.
+
+    At most ``jobs`` items are processed at the same time, and at most ``jobs_per_host`` of them
+    for the same host. Each call is attempted up to ``attempts`` times, waiting ``backoff``
+    seconds before the second attempt, and twice as long before each following one.
+    """
+
+    def __init__(
+        self,
+        jobs: Optional[int] = None,
+        jobs_per_host: Optional[int] = None,
+        attempts: int = 3,
+        backoff: float = 1.0,
+    ):
+        self.jobs = jobs or spack.config.get("config:fetch_jobs", DEFAULT_FETCH_JOBS)
+        self.jobs_per_host = jobs_per_host or spack.config.get(
+            "config:fetch_jobs_per_host", DEFAULT_FETCH_JOBS_PER_HOST
+        )
+        self.attempts = attempts
+        self.backoff = backoff
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, threading.BoundedSemaphore] = {}
+
+    @contextlib.contextmanager
+    def _host_slot(self, host: Optional[str]):
+        if not host:
+            yield
+            return
+        with self._lock:
+            semaphore = self._hosts.get(host)
+            if semaphore is None:
+                semaphore = self._hosts[host] = threading.BoundedSemaphore(self.jobs_per_host)
+        with semaphore:
+            yield
+
+    def _call(
+        self,
+        fn: Callable[[T], R],
+        item: T,
+        host: Optional[str],
+        retry: Callable[[Exception], bool],
+    ) -> R:
+        attempt = 1
+        while True:
+            try:
+                with self._host_slot(host):
+                    return fn(item)
+            except Exception as e:
+                if attempt >= self.attempts or not retry(e):
+                    raise
+                delay = self.backoff * 2 ** (attempt - 1)
+                tty.debug(
+                    f"Attempt {attempt} of {self.attempts} failed, retrying in {delay}s: {e}"
+                )
+                time.sleep(delay)
+                attempt += 1
+
+    def run(
+        self,
+        fn: Callable[[T], R],
+        items: Iterable[T],
+        *,
+        host: Callable[[T], Optional[str]] = lambda item: None,
+        retry: Callable[[Exception], bool] = is_transient,
+    ) -> List["concurrent.futures.Future[R]"]:
+        """Call ``fn`` for every item, and return the futures of the calls in the order of the
+        items, once all calls are done.
+
+        Items are taken from ``items``, and ``host`` is called on them, in the calling thread, as
+        threads become available. Failed calls are attempted again if ``retry`` is true for their
+        error.
+        """
+        futures: List[concurrent.futures.Future] = []
+
+        if self.jobs < 2:
+            for item in items:
+                future: concurrent.futures.Future = concurrent.futures.Future()
+                try:
+                    future.set_result(self._call(fn, item, host(item), retry))
+                except Exception as e:
+                    future.set_exception(e)
+                futures.append(future)
+            return futures
+
+        executor = concurrent.futures.ThreadPoolExecutor(self.jobs)
+        try:
+            running: set = set()
+            for item in items:
+                # Keep the next items queued, but don't take them all at once
+                if len(running) >= 2 * self.jobs:
+                    _, running = concurrent.futures.wait(
+                        running, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                future = executor.submit(self._call, fn, item, host(item), retry)
+                futures.append(future)
+                running.add(future)
+            concurrent.futures.wait(futures)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            executor.shutdown()
+
+        return futures
@@ -29,6 +29,7 @@
 import os.path
 import re
 import shutil
+import tempfile
 import urllib.error
 import urllib.parse
 import urllib.request
@@ -1720,6 +1721,26 @@ def from_list_url(pkg):
             tty.msg("Could not determine url from list_url.")
 
 
+def archive_atomically(fetcher: FetchStrategy, destination: str) -> None:
+    """Archive the data of a fetcher in a temporary directory next to the destination, and move
+    the archive into place, so that concurrent stores of the same archive, or failed ones, never
+    leave a truncated file behind.
+
+    Args:
+        fetcher: fetcher whose data is archived
+        destination: path of the archive
+    """
+    mkdirp(os.path.dirname(destination))
+    tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(destination), prefix=".tmp-")
+    try:
+        # The archive keeps its name, which determines the format of archives of repositories
+        tmp_archive = os.path.join(tmp_dir, os.path.basename(destination))
+        fetcher.archive(tmp_archive)
+        os.replace(tmp_archive, destination)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
 class FsCache:
     def __init__(self, root):
         self.root = os.path.abspath(root)
@@ -1733,9 +1754,7 @@ def store(self, fetcher, relative_dest):
         if isinstance(fetcher, CacheURLFetchStrategy):
             return
 
-        dst = os.path.join(self.root, relative_dest)
-        mkdirp(os.path.dirname(dst))
-        fetcher.archive(dst)
+        archive_atomically(fetcher, os.path.join(self.root, relative_dest))
 
     def fetcher(self, target_path: str, digest: Optional[str], **kwargs) -> CacheURLFetchStrategy:
         path = os.path.join(self.root, target_path)
@@ -3,6 +3,7 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import concurrent.futures
 import functools as ft
 import itertools
 import os
@@ -10,7 +11,7 @@
 import shutil
 import stat
 import sys
-from typing import Callable, Dict, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 from llnl.string import comma_or
 from llnl.util import tty
@@ -25,6 +26,7 @@
     ConflictingSpecsError,
     DestinationMergeVisitor,
     LinkTree,
+    MergeConflict,
     MergeConflictSummary,
     SingleMergeConflictError,
     SourceMergeVisitor,
@@ -49,6 +51,13 @@
 
 _projections_path = ".spack/projections.yaml"
 
+#: Maximum number of threads that walk prefixes, and create directories and links in views. These
+#: are metadata operations, which are latency bound on network filesystems.
+MAX_VIEW_THREADS = 16
+
+#: Number of directories or links that a thread creates at once
+ITEMS_PER_THREAD_TASK = 256
+
 
 LinkCallbackType = Callable[[str, str, "FilesystemView", Optional["spack.spec.Spec"]], None]
 
@@ -697,26 +706,100 @@ def add_specs(self, *specs: spack.spec.Spec) -> None:
         if len(specs) == 0:
             return
 
+        self.update_specs(list(specs))
+
+    def update_specs(
+        self, specs: List[spack.spec.Spec], previous: Optional["ViewContents"] = None
+    ) -> "ViewContents":
+        """Link a root-to-leaf topologically ordered list of specs into the view, and return the
+        contents of the view.
+
+        When the ``previous`` contents of the view are given, the view is updated in place instead:
+        only the prefixes of new specs are walked, and only the files that differ are removed and
+        linked. If the previous contents are rooted elsewhere, that directory is moved to the root
+        of this view after the specs are checked for conflicts, and before it is updated.
+        """
+        assert all((s.concrete for s in specs))
+
         # Drop externals
         specs = [s for s in specs if not s.external]
 
         self._sanity_check_view_projection(specs)
 
-        # Ignore spack meta data folder.
-        def skip_list(file):
-            return os.path.basename(file) == spack.store.STORE.layout.metadata_dir
+        with concurrent.futures.ThreadPoolExecutor(MAX_VIEW_THREADS) as executor:
+            return self._update_specs(specs, previous, executor)
 
-        visitor = SourceMergeVisitor(ignore=skip_list)
-
-        # Gather all the directories to be made and files to be linked
+    def _update_specs(
+        self,
+        specs: List[spack.spec.Spec],
+        previous: Optional["ViewContents"],
+        executor: concurrent.futures.Executor,
+    ) -> "ViewContents":
+        # Gather the directories and files of each prefix, reusing those recorded before
+        metadata_dir = spack.store.STORE.layout.metadata_dir
+        prefixes: Dict[str, dict] = {}
+        new_entries: List[dict] = []
         for spec in specs:
             src_prefix = spec.package.view_source()
-            visitor.set_projection(self.get_relative_projection_for_spec(spec))
-            visit_directory_tree(src_prefix, visitor)
+            projection = self.get_relative_projection_for_spec(spec)
+            metadata_projection = self.relative_metadata_dir_for_spec(spec)
+            entry = previous.prefixes.get(spec.dag_hash()) if previous else None
+            if entry is None or (
+                entry["prefix"],
+                entry["projection"],
+                entry["metadata_projection"],
+            ) != (src_prefix, projection, metadata_projection):
+                entry = {
+                    "prefix": src_prefix,
+                    "projection": projection,
+                    "metadata_projection": metadata_projection,
+                    "adds_own_files": _adds_own_files(spec),
+                }
+                new_entries.append(entry)
+            prefixes[spec.dag_hash()] = entry
+
+        # Walk the prefixes in threads, since listing directories is latency bound on network
+        # filesystems. The contents are merged in order afterwards, so the result is the same.
+        walk = ft.partial(_walk_prefix, metadata_dir=metadata_dir)
+        for entry, (contents, metadata) in zip(
+            new_entries, executor.map(walk, [e["prefix"] for e in new_entries])
+        ):
+            entry["contents"] = contents
+            entry["metadata"] = metadata
+
+        visitor = _merge_prefixes(
+            (e["prefix"], e["projection"], e["contents"]) for e in prefixes.values()
+        )
+        metadata_visitor = _merge_prefixes(
+            (os.path.join(e["prefix"], metadata_dir), e["metadata_projection"], e["metadata"])
+            for e in prefixes.values()
+        )
+
+        if previous is None:
+            # Check for conflicts in destination dir.
+            visit_directory_tree(self._root, DestinationMergeVisitor(visitor))
+
+        self._check_conflicts(visitor)
 
-        # Check for conflicts in destination dir.
-        visit_directory_tree(self._root, DestinationMergeVisitor(visitor))
+        if previous is None:
+            tty.debug(f"Creating {len(visitor.directories)} dirs and {len(visitor.files)} links")
 
+            # Make the directory structure
+            self._make_dirs(executor, visitor.directories)
+
+            self._add_files(executor, specs, visitor.files)
+
+            # Finally create the metadata dirs.
+            visit_directory_tree(self._root, DestinationMergeVisitor(metadata_visitor))
+            self._check_metadata_conflicts(metadata_visitor)
+            self._make_dirs(executor, metadata_visitor.directories)
+            self._link_metadata(executor, metadata_visitor.files)
+        else:
+            self._update(executor, specs, prefixes, visitor, metadata_visitor, previous)
+
+        return ViewContents(self._root, self.link_type, prefixes, visitor.files)
+
+    def _check_conflicts(self, visitor: SourceMergeVisitor) -> None:
         # Throw on fatal dir-file conflicts.
         if visitor.fatal_conflicts:
             raise MergeConflictSummary(visitor.fatal_conflicts)
@@ -728,32 +811,178 @@ def skip_list(file):
             else:
                 raise MergeConflictSummary(visitor.file_conflicts)
 
-        tty.debug(f"Creating {len(visitor.directories)} dirs and {len(visitor.files)} links")
+    def _check_metadata_conflicts(self, metadata_visitor: SourceMergeVisitor) -> None:
+        # Throw on dir-file conflicts -- unlikely, but who knows.
+        if metadata_visitor.fatal_conflicts:
+            raise MergeConflictSummary(metadata_visitor.fatal_conflicts)
+
+        # We are strict here for historical reasons
+        if metadata_visitor.file_conflicts:
+            raise MergeConflictSummary(metadata_visitor.file_conflicts)
+
+    def _update(
+        self,
+        executor: concurrent.futures.Executor,
+        specs: List[spack.spec.Spec],
+        prefixes: Dict[str, dict],
+        visitor: SourceMergeVisitor,
+        metadata_visitor: SourceMergeVisitor,
+        previous: "ViewContents",
+    ) -> None:
+        """Update the view holding the previous contents in place"""
+        metadata_dir = spack.store.STORE.layout.metadata_dir
+
+        # Packages that add their own files may have added files that were not recorded.
+        removed = [h for h, e in previous.prefixes.items() if h not in prefixes]
+        if any(previous.prefixes[h].get("adds_own_files") for h in removed):
+            raise ViewUpdateError(
+                f"cannot update the view in {self._root} in place, since a spec to be removed "
+                "adds its own files to the view"
+            )
 
-        # Make the directory structure
-        for dst in visitor.directories:
-            os.mkdir(os.path.join(self._root, dst))
+        # The metadata dirs are checked against the merged files and dirs of the new view, which
+        # is what visiting the destination would do after linking them.
+        metadata_dirs = set(metadata_visitor.directories)
+        for dst in list(metadata_visitor.directories):
+            if dst in visitor.files:
+                src_a_root, src_a_relpath = visitor.files[dst]
+                metadata_visitor.fatal_conflicts.append(
+                    MergeConflict(
+                        dst,
+                        os.path.join(src_a_root, src_a_relpath),
+                        os.path.join(*metadata_visitor.directories[dst]),
+                    )
+                )
+            elif dst in visitor.directories:
+                del metadata_visitor.directories[dst]
+        for dst, (src_b_root, src_b_relpath) in metadata_visitor.files.items():
+            src_a = visitor.files.get(dst) or visitor.directories.get(dst)
+            if src_a:
+                metadata_visitor.fatal_conflicts.append(
+                    MergeConflict(
+                        dst, os.path.join(*src_a), os.path.join(src_b_root, src_b_relpath)
+                    )
+                )
+        self._check_metadata_conflicts(metadata_visitor)
+
+        # Recover the dirs and metadata of the previous view. The previous view was generated
+        # without conflicts, so this does not need the merged files.
+        old_visitor = _merge_prefixes(
+            ((e["prefix"], e["projection"], e["contents"]) for e in previous.prefixes.values()),
+            files=False,
+        )
+        old_metadata_visitor = _merge_prefixes(
+            (os.path.join(e["prefix"], metadata_dir), e["metadata_projection"], e["metadata"])
+            for e in previous.prefixes.values()
+        )
+        old_dirs = set(old_visitor.directories).union(old_metadata_visitor.directories)
+        new_dirs = metadata_dirs.union(visitor.directories)
+
+        if previous.root != self._root:
+            os.rename(previous.root, self._root)
+
+        # Files of packages that add their own files are always added again, since they may
+        # depend on the root of the view.
+        refresh = {e["prefix"] for e in prefixes.values() if e.get("adds_own_files")}
+        files = {
+            dst: src
+            for dst, src in visitor.files.items()
+            if src[0] in refresh or previous.files.get(dst) != src
+        }
+        metadata_files = {
+            dst: src
+            for dst, src in metadata_visitor.files.items()
+            if old_metadata_visitor.files.get(dst) != src
+        }
+        old_files = [
+            dst
+            for dst, src in previous.files.items()
+            if src[0] in refresh or visitor.files.get(dst) != src
+        ]
+        old_files.extend(
+            dst
+            for dst, src in old_metadata_visitor.files.items()
+            if metadata_visitor.files.get(dst) != src
+        )
 
+        tty.debug(
+            f"Removing {len(old_files)} links and {len(old_dirs - new_dirs)} dirs, and adding "
+            f"{len(files) + len(metadata_files)} links and {len(new_dirs - old_dirs)} dirs"
+        )
+
+        _run_in_threads(executor, _remove_file, [os.path.join(self._root, d) for d in old_files])
+
+        # Remove the deepest directories first
+        for level in reversed(_by_depth(old_dirs - new_dirs)):
+            _run_in_threads(executor, os.rmdir, [os.path.join(self._root, d) for d in level])
+
+        self._make_dirs(
+            executor,
+            [
+                dst
+                for dst in itertools.chain(visitor.directories, metadata_visitor.directories)
+                if dst not in old_dirs
+            ],
+        )
+        self._add_files(executor, specs, files)
+        self._link_metadata(executor, metadata_files)
+
+    def _make_dirs(self, executor: concurrent.futures.Executor, dirs: Iterable[str]) -> None:
+        # Directories at the same depth are independent, so each level is created in threads
+        for level in _by_depth(dirs):
+            _run_in_threads(executor, os.mkdir, [os.path.join(self._root, d) for d in level])
+
+    def _add_files(
+        self,
+        executor: concurrent.futures.Executor,
+        specs: List[spack.spec.Spec],
+        files: Dict[str, Tuple[str, str]],
+    ) -> None:
         # Link the files using a "merge map": full src => full dst
-        merge_map_per_prefix = self._source_merge_visitor_to_merge_map(visitor)
+        merge_map_per_prefix = self._files_to_merge_map(files)
+
+        # Symlinks and hardlinks of packages that don't customize how their files are added to the
+        # view are created in threads. Packages that do customize it may look at the files in the
+        # view, so they add their files in order, after the links of the preceding specs.
+        in_threads = canonicalize_link_type(self.link_type) != "copy"
+        links: List[Tuple[str, str]] = []
         for spec in specs:
             merge_map = merge_map_per_prefix.get(spec.package.view_source(), None)
             if not merge_map:
                 # Not every spec may have files to contribute.
                 continue
+            if in_threads and not _adds_own_files(spec):
+                links.extend(merge_map.items())
+                continue
+            _run_in_threads(executor, self._link_pair, links)
+            links = []
             spec.package.add_files_to_view(self, merge_map, skip_if_exists=False)
+        _run_in_threads(executor, self._link_pair, links)
+
+    def _link_metadata(
+        self, executor: concurrent.futures.Executor, files: Dict[str, Tuple[str, str]]
+    ) -> None:
+        links = [
+            (os.path.join(src_root, src_relpath), os.path.join(self._root, dst_relpath))
+            for dst_relpath, (src_root, src_relpath) in files.items()
+        ]
+        if canonicalize_link_type(self.link_type) == "copy":
+            for src, dst in links:
+                self.link(src, dst)
+        else:
+            _run_in_threads(executor, self._link_pair, links)
 
-        # Finally create the metadata dirs.
-        self.link_metadata(specs)
+    def _link_pair(self, link: Tuple[str, str]) -> None:
+        self.link(*link)
 
-    def _source_merge_visitor_to_merge_map(self, visitor: SourceMergeVisitor):
+    def _files_to_merge_map(self, files: Dict[str, Tuple[str, str]]):
         # For compatibility with add_files_to_view, we have to create a
         # merge_map of the form join(src_root, src_rel) => join(dst_root, dst_rel),
         # but our visitor.files format is dst_rel => (src_root, src_rel).
         # We exploit that visitor.files is an ordered dict, and files per source
         # prefix are contiguous.
         source_root = lambda item: item[1][0]
-        per_source = itertools.groupby(visitor.files.items(), key=source_root)
+        per_source = itertools.groupby(files.items(), key=source_root)
         return {
             src_root: {
                 os.path.join(src_root, src_rel): os.path.join(self._root, dst_rel)
@@ -769,34 +998,6 @@ def relative_metadata_dir_for_spec(self, spec):
             spec.name,
         )
 
-    def link_metadata(self, specs):
-        metadata_visitor = SourceMergeVisitor()
-
-        for spec in specs:
-            src_prefix = os.path.join(
-                spec.package.view_source(), spack.store.STORE.layout.metadata_dir
-            )
-            proj = self.relative_metadata_dir_for_spec(spec)
-            metadata_visitor.set_projection(proj)
-            visit_directory_tree(src_prefix, metadata_visitor)
-
-        # Check for conflicts in destination dir.
-        visit_directory_tree(self._root, DestinationMergeVisitor(metadata_visitor))
-
-        # Throw on dir-file conflicts -- unlikely, but who knows.
-        if metadata_visitor.fatal_conflicts:
-            raise MergeConflictSummary(metadata_visitor.fatal_conflicts)
-
-        # We are strict here for historical reasons
-        if metadata_visitor.file_conflicts:
-            raise MergeConflictSummary(metadata_visitor.file_conflicts)
-
-        for dst in metadata_visitor.directories:
-            os.mkdir(os.path.join(self._root, dst))
-
-        for dst_relpath, (src_root, src_relpath) in metadata_visitor.files.items():
-            self.link(os.path.join(src_root, src_relpath), os.path.join(self._root, dst_relpath))
-
     def get_relative_projection_for_spec(self, spec):
         # Extensions are placed by their extendee, not by their own spec
         if spec.package.extendee_spec:
@@ -822,6 +1023,164 @@ def get_projection_for_spec(self, spec):
         return self._root
 
 
+class ViewContents:
+    """What the specs in a view contributed to it when it was generated: the directories and files
+    in each prefix, and the merged files that were linked into the view. These are stored next to
+    environment views, so that they can be updated in place with
+    :meth:`SimpleFilesystemView.update_specs`."""
+
+    #: Version of the format, to be bumped on incompatible changes
+    version = 1
+
+    def __init__(
+        self,
+        root: str,
+        link_type: str,
+        prefixes: Dict[str, dict],
+        files: Dict[str, Tuple[str, str]],
+    ):
+        self.root = root
+        self.link_type = link_type
+        #: Maps the DAG hashes of specs, in the order they are linked, to their prefix, their
+        #: projections, and the directories and files in their prefix
+        self.prefixes = prefixes
+        #: Maps files in the view to the (source root, relative source path) they link to
+        self.files = files
+
+    def to_dict(self):
+        return {
+            "version": self.version,
+            "root": self.root,
+            "link_type": self.link_type,
+            "prefixes": self.prefixes,
+            "files": self.files,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        if d.get("version") != cls.version:
+            raise ValueError(f"unsupported version of view contents: {d.get('version')}")
+        files = {dst: (src_root, src_rel) for dst, (src_root, src_rel) in d["files"].items()}
+        return cls(d["root"], d["link_type"], d["prefixes"], files)
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as f:
+            s_json.dump(self.to_dict(), f)
+
+    @classmethod
+    def read(cls, path: str) -> Optional["ViewContents"]:
+        """Read view contents from a file, or return None if they are missing or invalid."""
+        try:
+            with open(path, "r") as f:
+                return cls.from_dict(s_json.load(f))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            tty.debug(f"Cannot read view contents from {path}: {e}")
+            return None
+
+
+class _PrefixVisitor(SourceMergeVisitor):
+    """Registers the directories and files of a single prefix, and which files are symlinks."""
+
+    def __init__(self, ignore: Optional[Callable[[str], bool]] = None):
+        super().__init__(ignore)
+        self.symlinks: List[str] = []
+
+    def visit_symlinked_file(self, root: str, rel_path: str, depth: int) -> None:
+        if not self.ignore(rel_path):
+            self.symlinks.append(rel_path)
+        super().visit_symlinked_file(root, rel_path, depth)
+
+
+def _prefix_contents(prefix: str, ignore: Optional[Callable[[str], bool]] = None) -> dict:
+    visitor = _PrefixVisitor(ignore)
+    visit_directory_tree(prefix, visitor)
+    return {
+        "directories": list(visitor.directories),
+        "files": list(visitor.files),
+        "symlinks": visitor.symlinks,
+    }
+
+
+def _walk_prefix(prefix: str, metadata_dir: str) -> Tuple[dict, dict]:
+    """Contents of a prefix without its metadata dir, and contents of its metadata dir"""
+    contents = _prefix_contents(prefix, ignore=lambda f: os.path.basename(f) == metadata_dir)
+    return contents, _prefix_contents(os.path.join(prefix, metadata_dir))
+
+
+def _by_depth(paths: Iterable[str]) -> List[List[str]]:
+    """Group relative paths by their depth, from shallow to deep, keeping their order"""
+    levels: Dict[int, List[str]] = {}
+    for path in paths:
+        levels.setdefault(path.count(os.sep), []).append(path)
+    return [levels[depth] for depth in sorted(levels)]
+
+
+def _run_in_threads(
+    executor: concurrent.futures.Executor, fn: Callable[[Any], None], items: List[Any]
+) -> None:
+    """Apply a function to all items, in chunks that are distributed over threads. The first
+    error, in the order of the items, is raised."""
+    chunks = [
+        items[i : i + ITEMS_PER_THREAD_TASK] for i in range(0, len(items), ITEMS_PER_THREAD_TASK)
+    ]
+    if len(chunks) < 2:
+        for item in items:
+            fn(item)
+        return
+
+    def apply(chunk):
+        for item in chunk:
+            fn(item)
+
+    for _ in executor.map(apply, chunks):
+        pass
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _merge_prefixes(
+    prefixes: Iterable[Tuple[str, str, dict]], files: bool = True
+) -> SourceMergeVisitor:
+    """Merge the contents of prefixes, as recorded by ``_prefix_contents``, in order and with the
+    given projections. This has the same result as visiting the prefixes, without walking them
+    again. With ``files=False`` only the directories are merged."""
+    visitor = SourceMergeVisitor()
+    for prefix, projection, contents in prefixes:
+        visitor.set_projection(projection)
+
+        # As in a directory walk, skip what is inside directories that cannot be created
+        blocked: List[str] = []
+        for rel_path in contents["directories"]:
+            if blocked and any(rel_path.startswith(b + os.sep) for b in blocked):
+                continue
+            if not visitor.before_visit_dir(prefix, rel_path, 0):
+                blocked.append(rel_path)
+
+        if not files:
+            continue
+
+        symlinks = set(contents["symlinks"])
+        for rel_path in contents["files"]:
+            if blocked and any(rel_path.startswith(b + os.sep) for b in blocked):
+                continue
+            visitor.visit_file(prefix, rel_path, 0, symlink=rel_path in symlinks)
+    return visitor
+
+
+def _adds_own_files(spec: spack.spec.Spec) -> bool:
+    """Whether the package of a spec overrides how its files are added to a view, in which case
+    they may depend on the root of the view, or not be limited to the merge map."""
+    import spack.package_base  # break cycle
+
+    add_files_to_view = getattr(spec.package.add_files_to_view, "__func__", None)
+    return add_files_to_view is not spack.package_base.PackageBase.add_files_to_view
+
+
 #####################
 # utility functions #
 #####################
@@ -882,3 +1241,7 @@ def get_dependencies(specs):
 
 class ConflictingProjectionsError(SpackError):
     """Raised when a view has a projections file and is given one manually."""
+
+
+class ViewUpdateError(SpackError):
+    """Raised when a view cannot be updated in place, and has to be generated from scratch."""
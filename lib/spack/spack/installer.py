@@ -26,11 +26,13 @@
 installations of packages in a Spack instance.
 """
 
+import concurrent.futures
 import copy
 import glob
 import heapq
 import io
 import itertools
+import multiprocessing.connection
 import os
 import shutil
 import sys
@@ -48,6 +50,7 @@
 
 import spack.binary_distribution as binary_distribution
 import spack.build_environment
+import spack.build_times
 import spack.config
 import spack.database
 import spack.deptypes as dt
@@ -335,7 +338,10 @@ def _print_timer(pre: str, pkg_id: str, timer: timer.BaseTimer) -> None:
 
 
 def _install_from_cache(
-    pkg: "spack.package_base.PackageBase", explicit: bool, unsigned: Optional[bool] = False
+    pkg: "spack.package_base.PackageBase",
+    explicit: bool,
+    unsigned: Optional[bool] = False,
+    download: Optional[concurrent.futures.Future] = None,
 ) -> bool:
     """
     Install the package from binary cache
@@ -345,12 +351,13 @@ def _install_from_cache(
         explicit: ``True`` if installing the package was explicitly
             requested by the user, otherwise, ``False``
         unsigned: if ``True`` or ``False`` override the mirror signature verification defaults
+        download: download of the tarball started in the background, if any
 
     Return: ``True`` if the package was extract from binary cache, ``False`` otherwise
     """
     t = timer.Timer()
     installed_from_cache = _try_install_from_binary_cache(
-        pkg, explicit, unsigned=unsigned, timer=t
+        pkg, explicit, unsigned=unsigned, timer=t, download=download
     )
     if not installed_from_cache:
         return False
@@ -413,6 +420,7 @@ def _process_binary_cache_tarball(
     unsigned: Optional[bool],
     mirrors_for_spec: Optional[list] = None,
     timer: timer.BaseTimer = timer.NULL_TIMER,
+    download: Optional[concurrent.futures.Future] = None,
 ) -> bool:
     """
     Process the binary cache tarball.
@@ -424,15 +432,20 @@ def _process_binary_cache_tarball(
         mirrors_for_spec: Optional list of concrete specs and mirrors
         obtained by calling binary_distribution.get_mirrors_for_spec().
         timer: timer to keep track of binary install phases.
+        download: download of the tarball started in the background, if any. Otherwise the
+            tarball is extracted while it is downloaded.
 
     Return:
         bool: ``True`` if the package was extracted from binary cache,
             else ``False``
     """
     with timer.measure("fetch"):
-        download_result = binary_distribution.download_tarball(
-            pkg.spec, unsigned, mirrors_for_spec
-        )
+        if download is not None:
+            download_result = download.result()
+        else:
+            download_result = binary_distribution.download_tarball(
+                pkg.spec, unsigned, mirrors_for_spec, stream=True
+            )
 
         if download_result is None:
             return False
@@ -455,6 +468,7 @@ def _try_install_from_binary_cache(
     explicit: bool,
     unsigned: Optional[bool] = None,
     timer: timer.BaseTimer = timer.NULL_TIMER,
+    download: Optional[concurrent.futures.Future] = None,
 ) -> bool:
     """
     Try to extract the package from binary cache.
@@ -464,7 +478,13 @@ def _try_install_from_binary_cache(
         explicit: the package was explicitly requested by the user
         unsigned: if ``True`` or ``False`` override the mirror signature verification defaults
         timer: timer to keep track of binary install phases.
+        download: download of the tarball started in the background, if any
     """
+    if download is not None:
+        return _process_binary_cache_tarball(
+            pkg, explicit, unsigned, timer=timer, download=download
+        )
+
     # Early exit if no binary mirrors are configured.
     if not spack.mirror.MirrorCollection(binary=True):
         return False
@@ -927,6 +947,15 @@ def __init__(
             pkg_id for pkg_id in self.dependencies if pkg_id not in installed
         )
 
+        # Estimated time, in seconds, to build the package and the longest chain of its
+        # dependents still to be installed. It is set by the installer once all the build
+        # tasks are known.
+        self.critical_path = 0.0
+
+        # Number of times the task was requeued because another process was installing the
+        # package. Deferred tasks are popped after the other ready tasks.
+        self.deferrals = 0
+
         # Ensure key sequence-related properties are updated accordingly.
         self.attempts = 0
         self._update()
@@ -1026,9 +1055,10 @@ def cache_only(self) -> bool:
             return self.request.install_args.get("dependencies_cache_only", _cache_only)
 
     @property
-    def key(self) -> Tuple[int, int]:
-        """The key is the tuple (# uninstalled dependencies, sequence)."""
-        return (self.priority, self.sequence)
+    def key(self) -> Tuple[int, int, float, int]:
+        """The key is the tuple (# uninstalled dependencies, # deferrals, -critical path,
+        sequence)."""
+        return (self.priority, self.deferrals, -self.critical_path, self.sequence)
 
     def next_attempt(self, installed) -> "BuildTask":
         """Create a new, updated task for the next installation attempt."""
@@ -1057,6 +1087,7 @@ def __init__(
         packages: List["spack.package_base.PackageBase"],
         *,
         cache_only: bool = False,
+        concurrent_packages: Optional[int] = None,
         dependencies_cache_only: bool = False,
         dependencies_use_cache: bool = True,
         dirty: bool = False,
@@ -1083,6 +1114,8 @@ def __init__(
     ) -> None:
         """
         Arguments:
+            concurrent_packages: Maximum number of packages built from source at the same time.
+                Defaults to the ``config:concurrent_packages`` setting, or 1.
             explicit: Set of package hashes to be marked as installed explicitly in the db. If
                 True, the specs from ``packages`` are marked explicit, while their dependencies are
                 not.
@@ -1138,7 +1171,7 @@ def __init__(
         self.build_requests = [BuildRequest(pkg, install_args) for pkg in packages]
 
         # Priority queue of build tasks
-        self.build_pq: List[Tuple[Tuple[int, int], BuildTask]] = []
+        self.build_pq: List[Tuple[Tuple[int, int, float, int], BuildTask]] = []
 
         # Mapping of unique package ids to build task
         self.build_tasks: Dict[str, BuildTask] = {}
@@ -1162,6 +1195,29 @@ def __init__(
         # fast then that option applies to all build requests.
         self.fail_fast = False
 
+        # Maximum number of packages built from source at the same time
+        self.concurrent_packages: int = concurrent_packages or spack.config.get(
+            "config:concurrent_packages", 1
+        )
+
+        # Tasks whose build processes are running, keyed on the package's unique id
+        self.running_builds: Dict[str, Tuple[BuildTask, spack.build_environment.BuildProcess]] = {}
+
+        # Historical build times, used to estimate the critical paths
+        self.build_times = spack.build_times.BuildTimes()
+
+        # Estimated time to build each package and the longest chain of its queued
+        # dependents, keyed on the package's unique id
+        self.critical_paths: Dict[str, float] = {}
+
+        # Maximum number of binaries downloaded in the background, while another package is
+        # installed from a binary cache
+        self.binary_prefetch: int = spack.config.get("config:binary_prefetch", 4)
+
+        # Downloads of binaries started in the background, keyed on the package's unique id
+        self.prefetched: Dict[str, concurrent.futures.Future] = {}
+        self._prefetch_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
     def __repr__(self) -> str:
         """Returns a formal representation of the package installer."""
         rep = f"{self.__class__.__name__}("
@@ -1538,16 +1594,69 @@ def _add_tasks(self, request: BuildRequest, all_deps):
         fail_fast = bool(request.install_args.get("fail_fast"))
         self.fail_fast = self.fail_fast or fail_fast
 
-    def _install_task(self, task: BuildTask, install_status: InstallStatus) -> None:
+    def _install_task(
+        self,
+        task: BuildTask,
+        install_status: InstallStatus,
+        process: Optional[spack.build_environment.BuildProcess] = None,
+        wait: bool = True,
+    ) -> Optional[spack.build_environment.BuildProcess]:
         """
         Perform the installation of the requested spec and/or dependency
         represented by the build task.
 
         Args:
             task: the installation build task for a package
-            install_status: the installation status for the package"""
+            install_status: the installation status for the package
+            process: the build process returned by a previous call with ``wait=False``, which
+                is still to be completed
+            wait: if False, return as soon as the build process has been started
+
+        Returns:
+            The build process, if it has been started and not waited for, otherwise None"""
 
         explicit = task.explicit
+        pkg = task.pkg
+
+        if process is None:
+            process = self._start_build(task, install_status)
+            if process is None or not wait:
+                return process
+
+        try:
+            # Preserve verbosity settings across installs.
+            spack.package_base.PackageBase._verbose = process.complete()
+            # Note: PARENT of the build process adds the new package to
+            # the database, so that we don't need to re-read from file.
+            spack.store.STORE.db.add(pkg.spec, explicit=explicit)
+
+            # Keep track of the build time to schedule future builds
+            if not task.request.install_args.get("fake"):
+                self.build_times.record_from_timer(pkg.spec, pkg.times_log_path)
+
+        except spack.error.StopPhase as e:
+            # A StopPhase exception means that the installer was asked to stop early from clients,
+            # and is not an error at this point
+            pid = f"{self.pid}: " if tty.show_pid() else ""
+            tty.debug(f"{pid}{str(e)}")
+            tty.debug(f"Package stage directory: {pkg.stage.source_path}")
+
+        return None
+
+    def _start_build(
+        self, task: BuildTask, install_status: InstallStatus
+    ) -> Optional[spack.build_environment.BuildProcess]:
+        """
+        Install the package of the build task from a binary cache, if possible, or otherwise
+        start the child process building it from source.
+
+        Args:
+            task: the installation build task for a package
+            install_status: the installation status for the package
+
+        Returns:
+            The process building the package, or None if there is nothing left to do"""
+        explicit = task.explicit
         install_args = task.request.install_args
         cache_only = task.cache_only
         use_cache = task.use_cache
@@ -1563,9 +1672,11 @@ def _install_task(self, task: BuildTask, install_status: InstallStatus) -> None:
 
         # Use the binary cache if requested
         if use_cache:
-            if _install_from_cache(pkg, explicit, unsigned):
+            download = self.prefetched.pop(pkg_id, None)
+            self._prefetch_binaries(exclude=pkg_id)
+            if _install_from_cache(pkg, explicit, unsigned, download=download):
                 self._update_installed(task)
-                return
+                return None
             elif cache_only:
                 raise spack.error.InstallError(
                     "No binary found when cache-only was specified", pkg=pkg
@@ -1578,30 +1689,27 @@ def _install_task(self, task: BuildTask, install_status: InstallStatus) -> None:
         # hook that allows tests to inspect the Package before installation
         # see unit_test_check() docs.
         if not pkg.unit_test_check():
-            return
+            return None
 
-        try:
-            self._setup_install_dir(pkg)
+        self._setup_install_dir(pkg)
 
-            # Create stage object now and let it be serialized for the child process. That
-            # way monkeypatch in tests works correctly.
-            pkg.stage
+        # Create stage object now and let it be serialized for the child process. That
+        # way monkeypatch in tests works correctly.
+        pkg.stage
 
-            # Create a child process to do the actual installation.
-            # Preserve verbosity settings across installs.
-            spack.package_base.PackageBase._verbose = spack.build_environment.start_build_process(
-                pkg, build_process, install_args
-            )
-            # Note: PARENT of the build process adds the new package to
-            # the database, so that we don't need to re-read from file.
-            spack.store.STORE.db.add(pkg.spec, explicit=explicit)
+        # Do not fork while other threads download binaries
+        self._drain_prefetches()
 
-        except spack.error.StopPhase as e:
-            # A StopPhase exception means that the installer was asked to stop early from clients,
-            # and is not an error at this point
-            pid = f"{self.pid}: " if tty.show_pid() else ""
-            tty.debug(f"{pid}{str(e)}")
-            tty.debug(f"Package stage directory: {pkg.stage.source_path}")
+        # Create a child process to do the actual installation.
+        if self.concurrent_packages == 1:
+            return spack.build_environment.create_build_process(pkg, build_process, install_args)
+
+        # Builds running at the same time share the jobs that a single build would get,
+        # unless the number of jobs was set explicitly on the command line.
+        jobs = spack.config.determine_number_of_jobs(parallel=True)
+        jobs = max(1, jobs // self.concurrent_packages)
+        with spack.config.override("config:build_jobs", jobs):
+            return spack.build_environment.create_build_process(pkg, build_process, install_args)
 
     def _next_is_pri0(self) -> bool:
         """
@@ -1629,6 +1737,140 @@ def _pop_task(self) -> Optional[BuildTask]:
                 return task
         return None
 
+    def _ready_tasks(self) -> Iterator[Tuple[Tuple[int, int, float, int], BuildTask]]:
+        """Iterate over the queue entries of the build tasks with no uninstalled dependencies."""
+        return (
+            entry
+            for entry in self.build_pq
+            if entry[1].status != STATUS_REMOVED and entry[1].priority == 0
+        )
+
+    def _prefetch_binaries(self, exclude: str) -> None:
+        """
+        Start downloading the binaries of the next ready tasks using the binary cache, so that
+        they are available once the package being installed has been extracted and relocated.
+
+        Args:
+            exclude: identifier of the package being installed
+        """
+        budget = self.binary_prefetch - len(self.prefetched)
+        if budget < 1 or not spack.mirror.MirrorCollection(binary=True):
+            return
+
+        candidates = (
+            task
+            for _, task in sorted(self._ready_tasks(), key=lambda entry: entry[0])
+            if task.use_cache
+            and task.pkg_id != exclude
+            and task.pkg_id not in self.prefetched
+            and task.pkg_id not in self.installed
+        )
+        for task in candidates:
+            if budget < 1:
+                break
+            spec = task.pkg.spec
+            record = spack.store.STORE.db.query_local_by_spec_hash(spec.dag_hash())
+            if record is not None and record.installed:
+                continue
+
+            if self._prefetch_executor is None:
+                self._prefetch_executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.binary_prefetch
+                )
+            tty.debug(f"Downloading the binary of {task.pkg_id} in the background")
+            matches = binary_distribution.get_mirrors_for_spec(spec, index_only=True)
+            self.prefetched[task.pkg_id] = self._prefetch_executor.submit(
+                binary_distribution.download_tarball,
+                spec,
+                task.request.install_args.get("unsigned"),
+                matches,
+            )
+            budget -= 1
+
+    def _drain_prefetches(self) -> None:
+        """Cancel the downloads of binaries that did not start, and wait for the others, so that
+        no prefetch thread is left running. Cancelled downloads are started again later."""
+        if self._prefetch_executor is None:
+            return
+
+        for pkg_id, future in list(self.prefetched.items()):
+            if future.cancel():
+                del self.prefetched[pkg_id]
+
+        self._prefetch_executor.shutdown(wait=True)
+        self._prefetch_executor = None
+
+    def _cancel_prefetches(self) -> None:
+        """Cancel the downloads of binaries that were not used, and remove what they staged."""
+        prefetched, self.prefetched = self.prefetched, {}
+        for future in prefetched.values():
+            if future.cancel():
+                continue
+            try:
+                download_result = future.result()
+            except Exception:
+                continue
+            if download_result is not None:
+                binary_distribution._delete_staged_downloads(download_result)
+
+        if self._prefetch_executor is not None:
+            self._prefetch_executor.shutdown()
+            self._prefetch_executor = None
+
+    def _critical_path(self, pkg_id: str, default: float) -> float:
+        """
+        Return the estimated time to build the package and the longest chain of its queued
+        dependents, which is memoized in ``critical_paths``.
+
+        Args:
+            pkg_id: identifier of the package
+            default: estimated build time of packages that were never built
+        """
+        if pkg_id not in self.critical_paths:
+            task = self.build_tasks.get(pkg_id)
+            if task is None:
+                return 0.0
+            estimate = self.build_times.estimate(task.pkg.spec)
+            self.critical_paths[pkg_id] = (default if estimate is None else estimate) + max(
+                (
+                    self._critical_path(dep_id, default)
+                    for dep_id in task.dependents
+                    if dep_id in self.build_tasks
+                ),
+                default=0.0,
+            )
+        return self.critical_paths[pkg_id]
+
+    def _wait_for_build(
+        self, timeout: Optional[float] = None
+    ) -> Optional[Tuple[BuildTask, spack.build_environment.BuildProcess]]:
+        """
+        Wait for one of the running build processes to be done.
+
+        Args:
+            timeout: maximum time to wait in seconds, or None to wait until a build is done
+
+        Return:
+            The task whose build process is done together with the process, or None if no
+            build was done before the timeout
+        """
+        pipes = [process.read_pipe for _, process in self.running_builds.values()]
+        done = multiprocessing.connection.wait(pipes, timeout)
+        for pkg_id, (task, process) in self.running_builds.items():
+            if process.read_pipe in done:
+                del self.running_builds[pkg_id]
+                return task, process
+        return None
+
+    def _terminate_builds(self) -> None:
+        """Terminate the build processes that are still running."""
+        for task, process in self.running_builds.values():
+            tty.debug(f"Terminating the build of {task.pkg_id}")
+            process.terminate()
+            if not task.request.install_args.get("keep_prefix"):
+                task.pkg.remove_prefix()
+        self.running_builds.clear()
+
     def _push_task(self, task: BuildTask) -> None:
         """
         Push (or queue) the specified build task for the package.
@@ -1658,9 +1900,10 @@ def _push_task(self, task: BuildTask) -> None:
         tty.debug(msg.format(desc, task.pkg_id, task.status))
 
         # Now add the new task to the queue with a new sequence number to
-        # ensure it is the last entry popped with the same priority.  This
-        # is necessary in case we are re-queueing a task whose priority
-        # was decremented due to the installation of one of its dependencies.
+        # ensure it is the last entry popped among those with the same priority,
+        # deferrals and critical path.  This is necessary in case we are
+        # re-queueing a task whose priority was decremented due to the
+        # installation of one of its dependencies.
         self.build_tasks[task.pkg_id] = task
         heapq.heappush(self.build_pq, (task.key, task))
 
@@ -1716,8 +1959,10 @@ def _requeue_task(self, task: BuildTask, install_status: InstallStatus) -> None:
                 "in progress by another process"
             )
 
+        # Other ready tasks go first, so that the same task is not popped again right away
         new_task = task.next_attempt(self.installed)
         new_task.status = STATUS_INSTALLING
+        new_task.deferrals += 1
         self._push_task(new_task)
 
     def _setup_install_dir(self, pkg: "spack.package_base.PackageBase") -> None:
@@ -1847,6 +2092,16 @@ def _init_queue(self) -> None:
                 for dependent_id in dependents.difference(task.dependents):
                     task.add_dependent(dependent_id)
 
+        # Order the tasks by critical path once all the dependents are known, so that long
+        # chains of builds are started first
+        default = self.build_times.default_estimate()
+        for pkg_id, task in self.build_tasks.items():
+            task.critical_path = self._critical_path(pkg_id, default)
+        self.build_pq = [
+            (task.key, task) for _, task in self.build_pq if task.status != STATUS_REMOVED
+        ]
+        heapq.heapify(self.build_pq)
+
     def _install_action(self, task: BuildTask) -> int:
         """
         Determine whether the installation should be overwritten (if it already
@@ -1883,220 +2138,271 @@ def _install_action(self, task: BuildTask) -> int:
         # back on failure
         return InstallAction.OVERWRITE
 
-    def install(self) -> None:
-        """Install the requested package(s) and or associated dependencies."""
+    def _run_install_task(
+        self,
+        task: BuildTask,
+        install_status: InstallStatus,
+        failed_build_requests: List[Tuple["spack.package_base.PackageBase", str, str]],
+        process: Optional[spack.build_environment.BuildProcess] = None,
+    ) -> None:
+        """
+        Install the package of a build task, which must be write locked, or complete its
+        build if it was started in the background, and update the installer accordingly.
 
-        self._init_queue()
-        fail_fast_err = "Terminating after first install failure"
-        single_requested_spec = len(self.build_requests) == 1
-        failed_build_requests = []
+        Args:
+            task: the installation build task for a package
+            install_status: the installation status for the package
+            failed_build_requests: list of ``(pkg, pkg_id, error message)`` for the failed
+                build requests, which is appended to
+            process: the running build process of the package, if any
+        """
+        pkg, pkg_id = task.pkg, task.pkg_id
+        keep_prefix = task.request.install_args.get("keep_prefix")
+        action = InstallAction.INSTALL
+        try:
+            if process is None:
+                action = self._install_action(task)
 
-        install_status = InstallStatus(len(self.build_pq))
+            if action == InstallAction.INSTALL:
+                if self.concurrent_packages == 1:
+                    self._install_task(task, install_status)
+                else:
+                    process = self._install_task(task, install_status, process, wait=False)
+                    if process is not None:
+                        # Keep the write lock and the prefix until the build is done
+                        self.running_builds[pkg_id] = (task, process)
+                        keep_prefix = True
+                        return
+            elif action == InstallAction.OVERWRITE:
+                # spack.store.STORE.db is not really a Database object, but a small
+                # wrapper -- silence mypy
+                OverwriteInstall(self, spack.store.STORE.db, task, install_status).install()  # type: ignore[arg-type] # noqa: E501
 
-        # Only enable the terminal status line when we're in a tty without debug info
-        # enabled, so that the output does not get cluttered.
-        term_status = TermStatusLine(
-            enabled=sys.stdout.isatty() and tty.msg_enabled() and not tty.is_debug()
-        )
+            self._update_installed(task)
 
-        while self.build_pq:
-            task = self._pop_task()
-            if task is None:
-                continue
+            # If we installed then we should keep the prefix
+            stop_before_phase = getattr(pkg, "stop_before_phase", None)
+            last_phase = getattr(pkg, "last_phase", None)
+            keep_prefix = keep_prefix or (stop_before_phase is None and last_phase is None)
 
-            install_args = task.request.install_args
-            keep_prefix = install_args.get("keep_prefix")
-
-            pkg, pkg_id, spec = task.pkg, task.pkg_id, task.pkg.spec
-            install_status.next_pkg(pkg)
-            install_status.set_term_title(f"Processing {pkg.name}")
-            tty.debug(f"Processing {pkg_id}: task={task}")
-            # Ensure that the current spec has NO uninstalled dependencies,
-            # which is assumed to be reflected directly in its priority.
-            #
-            # If the spec has uninstalled dependencies, then there must be
-            # a bug in the code (e.g., priority queue or uninstalled
-            # dependencies handling).  So terminate under the assumption that
-            # all subsequent tasks will have non-zero priorities or may be
-            # dependencies of this task.
-            if task.priority != 0:
-                term_status.clear()
+        except KeyboardInterrupt as exc:
+            # The build has been terminated with a Ctrl-C so terminate
+            # regardless of the number of remaining specs.
+            tty.error(
+                f"Failed to install {pkg.name} due to " f"{exc.__class__.__name__}: {str(exc)}"
+            )
+            raise
+
+        except binary_distribution.NoChecksumException as exc:
+            if task.cache_only:
+                raise
+
+            # Checking hash on downloaded binary failed.
+            tty.error(
+                f"Failed to install {pkg.name} from binary cache due "
+                f"to {str(exc)}: Requeueing to install from source."
+            )
+            # this overrides a full method, which is ugly.
+            task.use_cache = False  # type: ignore[misc]
+            self._requeue_task(task, install_status)
+            return
+
+        except (Exception, SystemExit) as exc:
+            self._update_failed(task, True, exc)
+
+            # Best effort installs suppress the exception and mark the
+            # package as a failure.
+            if not isinstance(exc, spack.error.SpackError) or not exc.printed:  # type: ignore[union-attr] # noqa: E501
+                exc.printed = True  # type: ignore[union-attr]
+                # SpackErrors can be printed by the build process or at
+                # lower levels -- skip printing if already printed.
+                # TODO: sort out this and SpackError.print_context()
                 tty.error(
-                    f"Detected uninstalled dependencies for {pkg_id}: " f"{task.uninstalled_deps}"
+                    f"Failed to install {pkg.name} due to " f"{exc.__class__.__name__}: {str(exc)}"
                 )
-                left = [dep_id for dep_id in task.uninstalled_deps if dep_id not in self.installed]
-                if not left:
-                    tty.warn(f"{pkg_id} does NOT actually have any uninstalled deps left")
-                dep_str = "dependencies" if task.priority > 1 else "dependency"
-
+            # Terminate if requested to do so on the first failure.
+            if self.fail_fast:
                 raise spack.error.InstallError(
-                    f"Cannot proceed with {pkg_id}: {task.priority} uninstalled "
-                    f"{dep_str}: {','.join(task.uninstalled_deps)}",
-                    pkg=pkg,
+                    f"Terminating after first install failure: {str(exc)}", pkg=pkg
                 )
 
-            # Skip the installation if the spec is not being installed locally
-            # (i.e., if external or upstream) BUT flag it as installed since
-            # some package likely depends on it.
-            if _handle_external_and_upstream(pkg, task.explicit):
-                term_status.clear()
-                self._flag_installed(pkg, task.dependents)
-                continue
-
-            # Flag a failed spec.  Do not need an (install) prefix lock since
-            # assume using a separate (failed) prefix lock file.
-            if pkg_id in self.failed or spack.store.STORE.failure_tracker.has_failed(spec):
-                term_status.clear()
-                tty.warn(f"{pkg_id} failed to install")
-                self._update_failed(task)
+            # Terminate when a single build request has failed, or summarize errors later.
+            if task.is_build_request:
+                if len(self.build_requests) == 1:
+                    raise
+                failed_build_requests.append((pkg, pkg_id, str(exc)))
 
-                if self.fail_fast:
-                    raise spack.error.InstallError(fail_fast_err, pkg=pkg)
+        finally:
+            # Remove the install prefix if anything went wrong during
+            # install.
+            if not keep_prefix and not action == InstallAction.OVERWRITE:
+                pkg.remove_prefix()
 
-                continue
+        # Perform basic task cleanup for the installed spec to
+        # include downgrading the write to a read lock
+        self._cleanup_task(pkg)
 
-            # Attempt to get a write lock.  If we can't get the lock then
-            # another process is likely (un)installing the spec or has
-            # determined the spec has already been installed (though the
-            # other process may be hung).
-            install_status.set_term_title(f"Acquiring lock for {pkg.name}")
-            term_status.add(pkg_id)
-            ltype, lock = self._ensure_locked("write", pkg)
-            if lock is None:
-                # Attempt to get a read lock instead.  If this fails then
-                # another process has a write lock so must be (un)installing
-                # the spec (or that process is hung).
-                ltype, lock = self._ensure_locked("read", pkg)
-            # Requeue the spec if we cannot get at least a read lock so we
-            # can check the status presumably established by another process
-            # -- failed, installed, or uninstalled -- on the next pass.
-            if lock is None:
-                self._requeue_task(task, install_status)
-                continue
+    def install(self) -> None:
+        """Install the requested package(s) and or associated dependencies."""
 
-            term_status.clear()
+        self._init_queue()
+        fail_fast_err = "Terminating after first install failure"
+        failed_build_requests: List[Tuple["spack.package_base.PackageBase", str, str]] = []
 
-            # Take a timestamp with the overwrite argument to allow checking
-            # whether another process has already overridden the package.
-            if task.request.overwrite and task.explicit:
-                task.request.overwrite_time = time.time()
+        install_status = InstallStatus(len(self.build_pq))
 
-            # Determine state of installation artifacts and adjust accordingly.
-            install_status.set_term_title(f"Preparing {pkg.name}")
-            self._prepare_for_install(task)
+        # Only enable the terminal status line when we're in a tty without debug info
+        # enabled, so that the output does not get cluttered.
+        term_status = TermStatusLine(
+            enabled=sys.stdout.isatty() and tty.msg_enabled() and not tty.is_debug()
+        )
 
-            # Flag an already installed package
-            if pkg_id in self.installed:
-                # Downgrade to a read lock to preclude other processes from
-                # uninstalling the package until we're done installing its
-                # dependents.
-                ltype, lock = self._ensure_locked("read", pkg)
-                if lock is not None:
-                    self._update_installed(task)
-                    path = spack.util.path.debug_padded_filter(pkg.prefix)
-                    _print_installed_pkg(path)
+        try:
+            while self.build_pq or self.running_builds:
+                if self.running_builds:
+                    # Only block on the running builds when no other build can be started
+                    blocked = len(self.running_builds) >= self.concurrent_packages or not any(
+                        self._ready_tasks()
+                    )
+                    finished = self._wait_for_build(None if blocked else 0)
+                    if finished is not None:
+                        task, process = finished
+                        install_status.set_term_title(f"Installing {task.pkg.name}")
+                        self._run_install_task(
+                            task, install_status, failed_build_requests, process
+                        )
+                        continue
+
+                task = self._pop_task()
+                if task is None:
+                    continue
+
+                pkg, pkg_id, spec = task.pkg, task.pkg_id, task.pkg.spec
+                install_status.next_pkg(pkg)
+                install_status.set_term_title(f"Processing {pkg.name}")
+                tty.debug(f"Processing {pkg_id}: task={task}")
+                # Ensure that the current spec has NO uninstalled dependencies,
+                # which is assumed to be reflected directly in its priority.
+                #
+                # If the spec has uninstalled dependencies, then there must be
+                # a bug in the code (e.g., priority queue or uninstalled
+                # dependencies handling).  So terminate under the assumption that
+                # all subsequent tasks will have non-zero priorities or may be
+                # dependencies of this task.
+                if task.priority != 0:
+                    term_status.clear()
+                    tty.error(
+                        f"Detected uninstalled dependencies for {pkg_id}: "
+                        f"{task.uninstalled_deps}"
+                    )
+                    left = [
+                        dep_id for dep_id in task.uninstalled_deps if dep_id not in self.installed
+                    ]
+                    if not left:
+                        tty.warn(f"{pkg_id} does NOT actually have any uninstalled deps left")
+                    dep_str = "dependencies" if task.priority > 1 else "dependency"
+
+                    raise spack.error.InstallError(
+                        f"Cannot proceed with {pkg_id}: {task.priority} uninstalled "
+                        f"{dep_str}: {','.join(task.uninstalled_deps)}",
+                        pkg=pkg,
+                    )
 
-                else:
-                    # At this point we've failed to get a write or a read
-                    # lock, which means another process has taken a write
-                    # lock between our releasing the write and acquiring the
-                    # read.
-                    #
-                    # Requeue the task so we can re-check the status
-                    # established by the other process -- failed, installed,
-                    # or uninstalled -- on the next pass.
-                    self.installed.remove(pkg_id)
+                # Skip the installation if the spec is not being installed locally
+                # (i.e., if external or upstream) BUT flag it as installed since
+                # some package likely depends on it.
+                if _handle_external_and_upstream(pkg, task.explicit):
+                    term_status.clear()
+                    self._flag_installed(pkg, task.dependents)
+                    continue
+
+                # Flag a failed spec.  Do not need an (install) prefix lock since
+                # assume using a separate (failed) prefix lock file.
+                if pkg_id in self.failed or spack.store.STORE.failure_tracker.has_failed(spec):
+                    term_status.clear()
+                    tty.warn(f"{pkg_id} failed to install")
+                    self._update_failed(task)
+
+                    if self.fail_fast:
+                        raise spack.error.InstallError(fail_fast_err, pkg=pkg)
+
+                    continue
+
+                # Attempt to get a write lock.  If we can't get the lock then
+                # another process is likely (un)installing the spec or has
+                # determined the spec has already been installed (though the
+                # other process may be hung).
+                install_status.set_term_title(f"Acquiring lock for {pkg.name}")
+                term_status.add(pkg_id)
+                ltype, lock = self._ensure_locked("write", pkg)
+                if lock is None:
+                    # Attempt to get a read lock instead.  If this fails then
+                    # another process has a write lock so must be (un)installing
+                    # the spec (or that process is hung).
+                    ltype, lock = self._ensure_locked("read", pkg)
+                # Requeue the spec if we cannot get at least a read lock so we
+                # can check the status presumably established by another process
+                # -- failed, installed, or uninstalled -- on the next pass.
+                if lock is None:
                     self._requeue_task(task, install_status)
-                continue
+                    continue
 
-            # Having a read lock on an uninstalled pkg may mean another
-            # process completed an uninstall of the software between the
-            # time we failed to acquire the write lock and the time we
-            # took the read lock.
-            #
-            # Requeue the task so we can check the status presumably
-            # established by the other process -- failed, installed, or
-            # uninstalled -- on the next pass.
-            if ltype == "read":
-                lock.release_read()
-                self._requeue_task(task, install_status)
-                continue
-
-            # Proceed with the installation since we have an exclusive write
-            # lock on the package.
-            install_status.set_term_title(f"Installing {pkg.name}")
-            try:
-                action = self._install_action(task)
-
-                if action == InstallAction.INSTALL:
-                    self._install_task(task, install_status)
-                elif action == InstallAction.OVERWRITE:
-                    # spack.store.STORE.db is not really a Database object, but a small
-                    # wrapper -- silence mypy
-                    OverwriteInstall(self, spack.store.STORE.db, task, install_status).install()  # type: ignore[arg-type] # noqa: E501
-
-                self._update_installed(task)
-
-                # If we installed then we should keep the prefix
-                stop_before_phase = getattr(pkg, "stop_before_phase", None)
-                last_phase = getattr(pkg, "last_phase", None)
-                keep_prefix = keep_prefix or (stop_before_phase is None and last_phase is None)
-
-            except KeyboardInterrupt as exc:
-                # The build has been terminated with a Ctrl-C so terminate
-                # regardless of the number of remaining specs.
-                tty.error(
-                    f"Failed to install {pkg.name} due to " f"{exc.__class__.__name__}: {str(exc)}"
-                )
-                raise
-
-            except binary_distribution.NoChecksumException as exc:
-                if task.cache_only:
-                    raise
-
-                # Checking hash on downloaded binary failed.
-                tty.error(
-                    f"Failed to install {pkg.name} from binary cache due "
-                    f"to {str(exc)}: Requeueing to install from source."
-                )
-                # this overrides a full method, which is ugly.
-                task.use_cache = False  # type: ignore[misc]
-                self._requeue_task(task, install_status)
-                continue
+                term_status.clear()
 
-            except (Exception, SystemExit) as exc:
-                self._update_failed(task, True, exc)
+                # Take a timestamp with the overwrite argument to allow checking
+                # whether another process has already overridden the package.
+                if task.request.overwrite and task.explicit:
+                    task.request.overwrite_time = time.time()
+
+                # Determine state of installation artifacts and adjust accordingly.
+                install_status.set_term_title(f"Preparing {pkg.name}")
+                self._prepare_for_install(task)
+
+                # Flag an already installed package
+                if pkg_id in self.installed:
+                    # Downgrade to a read lock to preclude other processes from
+                    # uninstalling the package until we're done installing its
+                    # dependents.
+                    ltype, lock = self._ensure_locked("read", pkg)
+                    if lock is not None:
+                        self._update_installed(task)
+                        path = spack.util.path.debug_padded_filter(pkg.prefix)
+                        _print_installed_pkg(path)
 
-                # Best effort installs suppress the exception and mark the
-                # package as a failure.
-                if not isinstance(exc, spack.error.SpackError) or not exc.printed:  # type: ignore[union-attr] # noqa: E501
-                    exc.printed = True  # type: ignore[union-attr]
-                    # SpackErrors can be printed by the build process or at
-                    # lower levels -- skip printing if already printed.
-                    # TODO: sort out this and SpackError.print_context()
-                    tty.error(
-                        f"Failed to install {pkg.name} due to "
-                        f"{exc.__class__.__name__}: {str(exc)}"
-                    )
-                # Terminate if requested to do so on the first failure.
-                if self.fail_fast:
-                    raise spack.error.InstallError(f"{fail_fast_err}: {str(exc)}", pkg=pkg)
-
-                # Terminate when a single build request has failed, or summarize errors later.
-                if task.is_build_request:
-                    if single_requested_spec:
-                        raise
-                    failed_build_requests.append((pkg, pkg_id, str(exc)))
-
-            finally:
-                # Remove the install prefix if anything went wrong during
-                # install.
-                if not keep_prefix and not action == InstallAction.OVERWRITE:
-                    pkg.remove_prefix()
-
-            # Perform basic task cleanup for the installed spec to
-            # include downgrading the write to a read lock
-            self._cleanup_task(pkg)
+                    else:
+                        # At this point we've failed to get a write or a read
+                        # lock, which means another process has taken a write
+                        # lock between our releasing the write and acquiring the
+                        # read.
+                        #
+                        # Requeue the task so we can re-check the status
+                        # established by the other process -- failed, installed,
+                        # or uninstalled -- on the next pass.
+                        self.installed.remove(pkg_id)
+                        self._requeue_task(task, install_status)
+                    continue
+
+                # Having a read lock on an uninstalled pkg may mean another
+                # process completed an uninstall of the software between the
+                # time we failed to acquire the write lock and the time we
+                # took the read lock.
+                #
+                # Requeue the task so we can check the status presumably
+                # established by the other process -- failed, installed, or
+                # uninstalled -- on the next pass.
+                if ltype == "read":
+                    lock.release_read()
+                    self._requeue_task(task, install_status)
+                    continue
+
+                # Proceed with the installation since we have an exclusive write
+                # lock on the package.
+                install_status.set_term_title(f"Installing {pkg.name}")
+                self._run_install_task(task, install_status, failed_build_requests)
+        finally:
+            # Do not leave builds running behind if anything went wrong
+            self._terminate_builds()
+            self._cancel_prefetches()
 
         # Cleanup, which includes releasing all of the read locks
         self._cleanup_all_tasks()
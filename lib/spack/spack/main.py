@@ -726,6 +726,7 @@ def _profile_wrapper(command, parser, args, unknown_args):
         stats = pstats.Stats(pr, stream=sys.stderr)
         stats.sort_stats(*sortby)
         stats.print_stats(nlines)
+        print(f"Spec.satisfies cache: {spack.spec.SATISFIES_CACHE}", file=sys.stderr)
 
 
 @llnl.util.lang.memoized
@@ -28,6 +28,7 @@
 import spack.caches
 import spack.config
 import spack.error
+import spack.fetch_scheduler
 import spack.fetch_strategy
 import spack.mirror
 import spack.oci.image
@@ -145,6 +146,21 @@ def autopush(self) -> bool:
             return False
         return self._data.get("autopush", False)
 
+    @property
+    def compression(self) -> str:
+        """Compression format of the tarballs pushed to the binary cache"""
+        if isinstance(self._data, str):
+            return "gzip"
+        return self._data.get("compression", "gzip")
+
+    @property
+    def deduplicate(self) -> bool:
+        """Whether binaries are pushed to the binary cache as deduplicated files, instead of
+        tarballs"""
+        if isinstance(self._data, str):
+            return False
+        return self._data.get("deduplicate", False)
+
     @property
     def fetch_url(self):
         """Get the valid, canonicalized fetch URL"""
@@ -158,7 +174,7 @@ def push_url(self):
     def _update_connection_dict(self, current_data: dict, new_data: dict, top_level: bool):
         keys = ["url", "access_pair", "access_token", "profile", "endpoint_url"]
         if top_level:
-            keys += ["binary", "source", "signed", "autopush"]
+            keys += ["binary", "source", "signed", "autopush", "compression", "deduplicate"]
         changed = False
         for key in keys:
             if key in new_data and current_data.get(key) != new_data[key]:
@@ -617,9 +633,9 @@ def create(path, specs, skip_unstable_versions=False):
     specs = [s if isinstance(s, spack.spec.Spec) else spack.spec.Spec(s) for s in specs]
 
     mirror_cache, mirror_stats = mirror_cache_and_stats(path, skip_unstable_versions)
-    for spec in specs:
-        mirror_stats.next_spec(spec)
-        create_mirror_from_package_object(spec.package, mirror_cache, mirror_stats)
+    create_mirror_from_package_objects(
+        (spec.package for spec in specs), mirror_cache, mirror_stats
+    )
 
     return mirror_stats.stats()
 
@@ -714,6 +730,14 @@ def added(self, resource):
     def error(self):
         self.errors.add(self.current_spec)
 
+    def update(self, other: "MirrorStats") -> None:
+        """Add the statistics of another mirror stats object, e.g. of a single spec"""
+        self._tally_current_spec()
+        other._tally_current_spec()
+        self.present.update(other.present)
+        self.new.update(other.new)
+        self.errors.update(other.errors)
+
 
 def create_mirror_from_package_object(pkg_obj, mirror_cache, mirror_stats):
     """Add a single package object to a mirror.
@@ -730,29 +754,67 @@ def create_mirror_from_package_object(pkg_obj, mirror_cache, mirror_stats):
         True if the spec was added successfully, False otherwise
     """
     tty.msg("Adding package {} to mirror".format(pkg_obj.spec.format("{name}{@version}")))
-    num_retries = 3
-    while num_retries > 0:
-        try:
-            # Includes patches and resources
-            with pkg_obj.stage as pkg_stage:
-                pkg_stage.cache_mirror(mirror_cache, mirror_stats)
-            exception = None
-            break
-        except Exception as e:
-            exc_tuple = sys.exc_info()
-            exception = e
-        num_retries -= 1
-    if exception:
-        if spack.config.get("config:debug"):
-            traceback.print_exception(file=sys.stderr, *exc_tuple)
-        else:
-            tty.warn(
-                "Error while fetching %s" % pkg_obj.spec.cformat("{name}{@version}"),
-                getattr(exception, "message", exception),
-            )
-        mirror_stats.error()
-        return False
-    return True
+    scheduler = spack.fetch_scheduler.FetchScheduler(jobs=1, backoff=0)
+    (future,) = scheduler.run(
+        lambda pkg: _cache_package(pkg, mirror_cache, mirror_stats),
+        [pkg_obj],
+        retry=lambda e: True,
+    )
+    return _report_mirror_error(pkg_obj, future, mirror_stats)
+
+
+def create_mirror_from_package_objects(pkg_objs, mirror_cache, mirror_stats):
+    """Add package objects to a mirror, fetching several of them at the same time with a
+    :class:`~spack.fetch_scheduler.FetchScheduler`.
+
+    Args:
+        pkg_objs (Iterable[spack.package_base.PackageBase]): package objects to be added
+        mirror_cache (spack.caches.MirrorCache): mirror where to add the specs
+        mirror_stats (spack.mirror.MirrorStats): statistics on the current mirror
+    """
+    pkg_objs = list(pkg_objs)
+
+    # Set up the stage and the statistics of each package in the main thread
+    stats_per_pkg = {}
+    for pkg_obj in pkg_objs:
+        tty.msg("Adding package {} to mirror".format(pkg_obj.spec.format("{name}{@version}")))
+        pkg_obj.stage
+        stats_per_pkg[id(pkg_obj)] = stats = MirrorStats()
+        stats.next_spec(pkg_obj.spec)
+
+    def add(pkg_obj):
+        _cache_package(pkg_obj, mirror_cache, stats_per_pkg[id(pkg_obj)])
+
+    futures = spack.fetch_scheduler.FetchScheduler().run(
+        add, pkg_objs, host=spack.fetch_scheduler.package_host, retry=lambda e: True
+    )
+    for pkg_obj, future in zip(pkg_objs, futures):
+        stats = stats_per_pkg.pop(id(pkg_obj))
+        _report_mirror_error(pkg_obj, future, stats)
+        mirror_stats.update(stats)
+
+
+def _cache_package(pkg_obj, mirror_cache, mirror_stats):
+    # Includes patches and resources
+    with pkg_obj.stage as pkg_stage:
+        pkg_stage.cache_mirror(mirror_cache, mirror_stats)
+
+
+def _report_mirror_error(pkg_obj, future, mirror_stats):
+    exception = future.exception()
+    if exception is None:
+        return True
+    if spack.config.get("config:debug"):
+        traceback.print_exception(
+            type(exception), exception, exception.__traceback__, file=sys.stderr
+        )
+    else:
+        tty.warn(
+            "Error while fetching %s" % pkg_obj.spec.cformat("{name}{@version}"),
+            getattr(exception, "message", exception),
+        )
+    mirror_stats.error()
+    return False
 
 
 def require_mirror_name(mirror_name):
@@ -1540,15 +1540,41 @@ def download_instr(self):
         )
         return f"{required}Refer to {self.homepage} for download instructions."
 
-    def do_fetch(self, mirror_only=False):
+    def do_fetch(self, mirror_only=False, *, confirm=True):
         """
         Creates a stage directory and downloads the tarball for this package.
         Working directory will be set to the stage directory.
+
+        Args:
+            mirror_only (bool): only fetch from a mirror
+            confirm (bool): whether to call :meth:`confirm_fetch` first. Callers fetching
+                packages in threads call it beforehand, from the main thread.
         """
         if not self.has_code or self.spec.external:
             tty.debug("No fetch required for {0}".format(self.name))
             return
 
+        if confirm:
+            self.confirm_fetch()
+
+        self.stage.create()
+        err_msg = None if not self.manual_download else self.download_instr
+        start_time = time.time()
+        self.stage.fetch(mirror_only, err_msg=err_msg)
+        self._fetch_time = time.time() - start_time
+
+        if spack.config.get("config:checksum") and self.version in self.versions:
+            self.stage.check()
+
+        self.stage.cache_local()
+
+    def confirm_fetch(self):
+        """Check that the version of this package can be fetched safely. When it has no checksum
+        or is deprecated, ask the user whether to fetch it anyway if running interactively, and
+        raise a FetchError otherwise."""
+        if not self.has_code or self.spec.external:
+            return
+
         checksum = spack.config.get("config:checksum")
         if (
             checksum
@@ -1601,17 +1627,6 @@ def do_fetch(self, mirror_only=False):
                     "Will not fetch {0}".format(self.spec.format("{name}{@version}")), dp_msg
                 )
 
-        self.stage.create()
-        err_msg = None if not self.manual_download else self.download_instr
-        start_time = time.time()
-        self.stage.fetch(mirror_only, err_msg=err_msg)
-        self._fetch_time = time.time() - start_time
-
-        if checksum and self.version in self.versions:
-            self.stage.check()
-
-        self.stage.cache_local()
-
     def do_stage(self, mirror_only=False):
         """Unpacks and expands the fetched tarball."""
         # Always create the stage directory at this point.  Why?  A no-code
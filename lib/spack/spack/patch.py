@@ -504,11 +504,15 @@ def patch_for_package(self, sha256: str, pkg: "spack.package_base.PackageBase")
         patch_dict["sha256"] = sha256
         return from_dict(patch_dict, repository=self.repository)
 
-    def update_package(self, pkg_fullname: str) -> None:
+    def update_package(
+        self, pkg_fullname: str, package_index: Optional[Dict[str, Any]] = None
+    ) -> None:
         """Update the patch cache.
 
         Args:
             pkg_fullname: package to update.
+            package_index: patch index of the package, as returned by ``package_index``, or
+                None to compute it
         """
         # remove this package from any patch entries that reference it.
         empty = []
@@ -529,12 +533,21 @@ def update_package(self, pkg_fullname: str) -> None:
             del self.index[sha256]
 
         # update the index with per-package patch indexes
-        pkg_cls = self.repository.get_pkg_class(pkg_fullname)
-        partial_index = self._index_patches(pkg_cls, self.repository)
-        for sha256, package_to_patch in partial_index.items():
+        if package_index is None:
+            package_index = self.package_index(pkg_fullname)
+        for sha256, package_to_patch in package_index.items():
             p2p = self.index.setdefault(sha256, {})
             p2p.update(package_to_patch)
 
+    def package_index(self, pkg_fullname: str) -> Dict[str, Any]:
+        """Patch index of a single package, by sha256 hash.
+
+        Args:
+            pkg_fullname: package to index.
+        """
+        pkg_cls = self.repository.get_pkg_class(pkg_fullname)
+        return self._index_patches(pkg_cls, self.repository)
+
     def update(self, other: "PatchCache") -> None:
         """Update this cache with the contents of another.
 
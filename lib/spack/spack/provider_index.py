@@ -111,11 +111,13 @@ def __init__(
 
             self.update(spec)
 
-    def update(self, spec):
+    def update(self, spec, provided=None):
         """Update the provider index with additional virtual specs.
 
         Args:
             spec: spec potentially providing additional virtual specs
+            provided: virtual specs provided by the package, as in the ``provided`` attribute
+                of its class. If None, the package class is loaded to get them.
         """
         if not isinstance(spec, spack.spec.Spec):
             spec = spack.spec.Spec(spec)
@@ -124,11 +126,12 @@ def update(self, spec):
             # Empty specs do not have a package
             return
 
-        msg = "cannot update an index passing the virtual spec '{}'".format(spec.name)
-        assert not self.repository.is_virtual_safe(spec.name), msg
+        if provided is None:
+            msg = "cannot update an index passing the virtual spec '{}'".format(spec.name)
+            assert not self.repository.is_virtual_safe(spec.name), msg
+            provided = self.repository.get_pkg_class(spec.name).provided
 
-        pkg_provided = self.repository.get_pkg_class(spec.name).provided
-        for provider_spec_readonly, provided_specs in pkg_provided.items():
+        for provider_spec_readonly, provided_specs in provided.items():
             for provided_spec in provided_specs:
                 # TODO: fix this comment.
                 # We want satisfaction other than flags
@@ -3,12 +3,15 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 import collections
+import concurrent.futures
+import functools
 import itertools
 import os
 import re
 import sys
+import threading
 from collections import OrderedDict
-from typing import List, Optional
+from typing import Callable, List, Optional
 
 import macholib.mach_o
 import macholib.MachO
@@ -18,6 +21,7 @@
 from llnl.util.lang import memoized
 from llnl.util.symlink import readlink, symlink
 
+import spack.config
 import spack.error
 import spack.store
 import spack.util.elf as elf
@@ -26,6 +30,12 @@
 
 from .relocate_text import BinaryFilePrefixReplacer, TextFilePrefixReplacer
 
+#: Minimum number of files relocated by each thread, when relocation is done in parallel
+FILES_PER_THREAD = 32
+
+#: Serializes the lookup of patchelf, which may bootstrap it, across relocation threads
+_PATCHELF_LOCK = threading.Lock()
+
 
 class InstallRootStringError(spack.error.SpackError):
     def __init__(self, file_path, root_path):
@@ -43,6 +53,21 @@ def __init__(self, file_path, root_path):
         )
 
 
+def _map_over_files(func: Callable[[str], bool], files: List[str]) -> List[bool]:
+    """Apply a function to a list of files, in a pool of threads if there are enough files
+    to make it worthwhile. The results are in the same order as the files.
+
+    The work is bound by I/O and by subprocesses, so threads are enough, and we don't fork
+    the installer while it may be downloading other binaries."""
+    jobs = min(
+        len(files) // FILES_PER_THREAD, spack.config.determine_number_of_jobs(parallel=True)
+    )
+    if jobs < 2:
+        return [func(f) for f in files]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(func, files))
+
+
 @memoized
 def _patchelf() -> Optional[executable.Executable]:
     """Return the full path to the patchelf binary, if available, else None."""
@@ -51,7 +76,7 @@ def _patchelf() -> Optional[executable.Executable]:
     if sys.platform == "darwin":
         return None
 
-    with spack.bootstrap.ensure_bootstrap_configuration():
+    with _PATCHELF_LOCK, spack.bootstrap.ensure_bootstrap_configuration():
         return spack.bootstrap.ensure_patchelf_in_path_or_raise()
 
 
@@ -497,14 +522,20 @@ def new_relocate_elf_binaries(binaries, prefix_to_prefix):
         (k.encode("utf-8"), v.encode("utf-8")) for (k, v) in prefix_to_prefix.items()
     )
 
-    for path in binaries:
-        try:
-            elf.substitute_rpath_and_pt_interp_in_place_or_raise(path, prefix_to_prefix)
-        except elf.ElfCStringUpdatesFailed as e:
-            # Fall back to `patchelf --set-rpath ... --set-interpreter ...`
-            rpaths = e.rpath.new_value.decode("utf-8").split(":") if e.rpath else []
-            interpreter = e.pt_interp.new_value.decode("utf-8") if e.pt_interp else None
-            _set_elf_rpaths_and_interpreter(path, rpaths=rpaths, interpreter=interpreter)
+    _map_over_files(
+        functools.partial(_relocate_elf_binary, prefix_to_prefix=prefix_to_prefix), binaries
+    )
+
+
+def _relocate_elf_binary(path: str, prefix_to_prefix) -> bool:
+    try:
+        return elf.substitute_rpath_and_pt_interp_in_place_or_raise(path, prefix_to_prefix)
+    except elf.ElfCStringUpdatesFailed as e:
+        # Fall back to `patchelf --set-rpath ... --set-interpreter ...`
+        rpaths = e.rpath.new_value.decode("utf-8").split(":") if e.rpath else []
+        interpreter = e.pt_interp.new_value.decode("utf-8") if e.pt_interp else None
+        _set_elf_rpaths_and_interpreter(path, rpaths=rpaths, interpreter=interpreter)
+        return True
 
 
 def relocate_elf_binaries(
@@ -632,7 +663,9 @@ def relocate_text(files, prefixes):
         files (list): Text files to be relocated
         prefixes (OrderedDict): String prefixes which need to be changed
     """
-    TextFilePrefixReplacer.from_strings_or_bytes(prefixes).apply(files)
+    replacer = TextFilePrefixReplacer.from_strings_or_bytes(prefixes)
+    if not replacer.is_noop:
+        _map_over_files(replacer.apply_to_filename, files)
 
 
 def relocate_text_bin(binaries, prefixes):
@@ -647,7 +680,11 @@ def relocate_text_bin(binaries, prefixes):
     Raises:
       spack.relocate_text.BinaryTextReplaceError: when the new path is longer than the old path
     """
-    return BinaryFilePrefixReplacer.from_strings_or_bytes(prefixes).apply(binaries)
+    replacer = BinaryFilePrefixReplacer.from_strings_or_bytes(prefixes)
+    if replacer.is_noop:
+        return []
+    changed = _map_over_files(replacer.apply_to_filename, binaries)
+    return [binary for binary, modified in zip(binaries, changed) if modified]
 
 
 def is_binary(filename):
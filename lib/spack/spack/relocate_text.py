@@ -6,9 +6,11 @@
 """This module contains pure-Python classes and functions for replacing
 paths inside text files and binaries."""
 
+import contextlib
+import mmap
 import re
 from collections import OrderedDict
-from typing import Dict, Union
+from typing import Dict, Iterator, Optional, Union
 
 import spack.error
 
@@ -39,6 +41,21 @@ def utf8_paths_to_single_binary_regex(prefixes):
     return _byte_strings_to_single_binary_regex(p.encode("utf-8") for p in prefixes)
 
 
+@contextlib.contextmanager
+def memory_map(f) -> Iterator[Optional[mmap.mmap]]:
+    """Map a file opened in rb+ mode into memory, or yield None if it cannot be mapped, for
+    instance because it is empty or it is not backed by a file descriptor."""
+    try:
+        mapped = mmap.mmap(f.fileno(), 0)
+    except (OSError, ValueError):
+        yield None
+        return
+    try:
+        yield mapped
+    finally:
+        mapped.close()
+
+
 def filter_identity_mappings(prefix_to_prefix):
     """Drop mappings that are not changed."""
     # NOTE: we don't guard against the following case:
@@ -121,7 +138,12 @@ def from_strings_or_bytes(
 
     def _apply_to_file(self, f):
         """Text replacement implementation simply reads the entire file
-        in memory and applies the combined regex."""
+        in memory and applies the combined regex. Files are scanned through
+        a memory map first, so that files without prefixes are never read."""
+        with memory_map(f) as mapped:
+            if mapped is not None and not self.regex.search(mapped):
+                return False
+
         replacement = lambda m: m.group(1) + self.prefix_to_prefix[m.group(2)] + m.group(3)
         data = f.read()
         new_data = re.sub(self.regex, replacement, data)
@@ -205,13 +227,16 @@ def _apply_to_file(self, f):
         """
         assert f.tell() == 0
 
-        # We *could* read binary data in chunks to avoid loading all in memory,
-        # but it's nasty to deal with matches across boundaries, so let's stick to
-        # something simple.
+        # Matches across chunk boundaries are nasty to deal with, so the file is
+        # memory mapped as a whole, and replacements are written in place. They are
+        # never longer than the match, so they don't affect the matches to come.
+        with memory_map(f) as mapped:
+            return self._apply_to_data(f, mapped)
 
-        modified = True
+    def _apply_to_data(self, f, mapped: Optional[mmap.mmap]) -> bool:
+        modified = False
 
-        for match in self.regex.finditer(f.read()):
+        for match in self.regex.finditer(f.read() if mapped is None else mapped):
             # The matching prefix (old) and its replacement (new)
             old = match.group(1)
             new = self.prefix_to_prefix[old]
@@ -251,8 +276,11 @@ def _apply_to_file(self, f):
             else:
                 raise CannotShrinkCString(old, new, match.group()[:-1])
 
-            f.seek(match.start())
-            f.write(replacement)
+            if mapped is None:
+                f.seek(match.start())
+                f.write(replacement)
+            else:
+                mapped[match.start() : match.start() + len(replacement)] = replacement
             modified = True
 
         return modified
@@ -285,9 +313,13 @@ def __init__(self, msg):
 
 class CannotGrowString(BinaryTextReplaceError):
     def __init__(self, old, new):
+        self.old, self.new = old, new
         msg = "Cannot replace {!r} with {!r} because the new prefix is longer.".format(old, new)
         super().__init__(msg)
 
+    def __reduce__(self):
+        return CannotGrowString, (self.old, self.new)
+
 
 class CannotShrinkCString(BinaryTextReplaceError):
     def __init__(self, old, new, full_old_string):
@@ -295,7 +327,11 @@ def __init__(self, old, new, full_old_string):
         # unicode, which would be really bad user experience: error in error.
         # We have no clue if we actually deal with a real C-string nor what
         # encoding it has.
+        self.old, self.new, self.full_old_string = old, new, full_old_string
         msg = "Cannot replace {!r} with {!r} in the C-string {!r}.".format(
             old, new, full_old_string
         )
         super().__init__(msg)
+
+    def __reduce__(self):
+        return CannotShrinkCString, (self.old, self.new, self.full_old_string)
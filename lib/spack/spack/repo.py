@@ -5,15 +5,19 @@
 
 import abc
 import collections.abc
+import concurrent.futures
 import contextlib
 import difflib
 import errno
 import functools
+import hashlib
 import importlib
 import importlib.machinery
 import importlib.util
 import inspect
+import io
 import itertools
+import multiprocessing
 import os
 import os.path
 import random
@@ -31,6 +35,7 @@
 import llnl.path
 import llnl.util.filesystem as fs
 import llnl.util.lang
+import llnl.util.lock
 import llnl.util.tty as tty
 from llnl.util.filesystem import working_dir
 
@@ -42,9 +47,13 @@
 import spack.repo
 import spack.spec
 import spack.tag
+import spack.util.cpus
 import spack.util.git
 import spack.util.naming as nm
+import spack.util.package_metadata
+import spack.util.parallel
 import spack.util.path
+import spack.util.spack_json as sjson
 import spack.util.spack_yaml as syaml
 
 #: Package modules are imported as spack.pkg.<repo-namespace>.<pkg-name>
@@ -374,6 +383,18 @@ def __getattr__(self, name):
         return getattr(self, name)
 
 
+#: Number of package files whose stats are obtained by the same thread
+STATS_PER_THREAD = 256
+
+#: Maximum number of threads obtaining the stats of package files. Stat calls are latency bound
+#: on network filesystems, so it can be larger than the number of cores.
+MAX_STAT_THREADS = 16
+
+
+#: Fields of stat results that are not part of their tuple
+_STAT_TIMES = ("st_atime", "st_mtime", "st_ctime", "st_atime_ns", "st_mtime_ns", "st_ctime_ns")
+
+
 class FastPackageChecker(collections.abc.Mapping):
     """Cache that maps package names to the stats obtained on the
     'package.py' files associated with them.
@@ -381,27 +402,77 @@ class FastPackageChecker(collections.abc.Mapping):
     For each repository a cache is maintained at class level, and shared among
     all instances referring to it. Update of the global cache is done lazily
     during instance initialization.
+
+    When a file cache is given, the stats are also stored there, and read back
+    in later processes as long as the mtime of the packages directory does not
+    change, i.e. as long as no package is added or removed. This saves one stat
+    call per package, but changes to existing ``package.py`` files are then not
+    detected.
     """
 
     #: Global cache, reused by every instance
     _paths_cache: Dict[str, Dict[str, os.stat_result]] = {}
 
-    def __init__(self, packages_path):
+    def __init__(self, packages_path, cache: Optional["spack.caches.FileCacheType"] = None):
         # The path of the repository managed by this instance
         self.packages_path = packages_path
+        self.cache = cache
 
         # If the cache we need is not there yet, then build it appropriately
         if packages_path not in self._paths_cache:
-            self._paths_cache[packages_path] = self._create_new_cache()
+            self._paths_cache[packages_path] = self._read_or_create_cache()
 
         #: Reference to the appropriate entry in the global cache
         self._packages_to_stats = self._paths_cache[packages_path]
 
     def invalidate(self):
         """Regenerate cache for this checker."""
-        self._paths_cache[self.packages_path] = self._create_new_cache()
+        self._paths_cache[self.packages_path] = self._read_or_create_cache(rescan=True)
         self._packages_to_stats = self._paths_cache[self.packages_path]
 
+    @property
+    def _cache_key(self) -> str:
+        digest = hashlib.sha256(self.packages_path.encode("utf-8")).hexdigest()
+        return f"package-stats/{digest[:32]}.json"
+
+    def _read_or_create_cache(self, rescan: bool = False) -> Dict[str, os.stat_result]:
+        """Read the stats from the file cache if the packages directory did not change
+        since they were written, otherwise create a new cache and write it there."""
+        if self.cache is None:
+            return self._create_new_cache()
+
+        # Take the mtime before scanning, so that concurrent changes cause a rescan next time
+        directory_mtime = os.stat(self.packages_path).st_mtime_ns
+        try:
+            if not rescan and self.cache.init_entry(self._cache_key):
+                with self.cache.read_transaction(self._cache_key) as f:
+                    data = sjson.load(f)
+                if data["directory_mtime"] == directory_mtime:
+                    return {
+                        name: os.stat_result(fields, times)
+                        for name, (fields, times) in data["stats"].items()
+                    }
+        except (spack.error.SpackError, llnl.util.lock.LockError, OSError) as e:
+            tty.debug(f"Cannot read the stats of {self.packages_path} from the cache: {e}")
+        except (KeyError, TypeError, ValueError) as e:
+            tty.debug(f"Invalid stats of {self.packages_path} in the cache: {e}")
+
+        cache = self._create_new_cache()
+        data = {
+            "directory_mtime": directory_mtime,
+            "stats": {
+                name: [list(sinfo), {field: getattr(sinfo, field) for field in _STAT_TIMES}]
+                for name, sinfo in cache.items()
+            },
+        }
+        try:
+            self.cache.init_entry(self._cache_key)
+            with self.cache.write_transaction(self._cache_key) as (_, new):
+                sjson.dump(data, new)
+        except (spack.error.SpackError, llnl.util.lock.LockError, OSError) as e:
+            tty.debug(f"Cannot write the stats of {self.packages_path} to the cache: {e}")
+        return cache
+
     def _create_new_cache(self) -> Dict[str, os.stat_result]:
         """Create a new cache for packages in a repo.
 
@@ -409,10 +480,10 @@ def _create_new_cache(self) -> Dict[str, os.stat_result]:
         calls.  At the moment, it is O(number of packages) and makes
         about one stat call per package.  This is reasonably fast, and
         avoids actually importing packages in Spack, which is slow.
+        The stat calls are made by a few threads, since they are slow
+        on network filesystems.
         """
-        # Create a dictionary that will store the mapping between a
-        # package name and its stat info
-        cache: Dict[str, os.stat_result] = {}
+        pkg_names: List[str] = []
         for pkg_name in os.listdir(self.packages_path):
             # Skip non-directories in the package root.
             pkg_dir = os.path.join(self.packages_path, pkg_name)
@@ -425,7 +496,33 @@ def _create_new_cache(self) -> Dict[str, os.stat_result]:
                         "a valid Spack module name.".format(pkg_dir, pkg_name)
                     )
                 continue
+            pkg_names.append(pkg_name)
+
+        chunks = [
+            pkg_names[i : i + STATS_PER_THREAD] for i in range(0, len(pkg_names), STATS_PER_THREAD)
+        ]
+        if len(chunks) < 2:
+            stats = [self._stat_package_files(chunk) for chunk in chunks]
+        else:
+            with concurrent.futures.ThreadPoolExecutor(
+                min(len(chunks), MAX_STAT_THREADS)
+            ) as executor:
+                stats = list(executor.map(self._stat_package_files, chunks))
+
+        # Create a dictionary that will store the mapping between a
+        # package name and its stat info
+        cache: Dict[str, os.stat_result] = {}
+        for chunk, chunk_stats in zip(chunks, stats):
+            for pkg_name, sinfo in zip(chunk, chunk_stats):
+                if sinfo is not None:
+                    cache[pkg_name] = sinfo
+        return cache
 
+    def _stat_package_files(self, pkg_names: List[str]) -> List[Optional[os.stat_result]]:
+        """Stats of the package.py files of some packages, or None for the ones without a
+        readable file."""
+        result: List[Optional[os.stat_result]] = []
+        for pkg_name in pkg_names:
             # Construct the file name from the directory
             pkg_file = os.path.join(self.packages_path, pkg_name, package_file_name)
 
@@ -435,21 +532,17 @@ def _create_new_cache(self) -> Dict[str, os.stat_result]:
             except OSError as e:
                 if e.errno == errno.ENOENT:
                     # No package.py file here.
+                    result.append(None)
                     continue
                 elif e.errno == errno.EACCES:
                     tty.warn("Can't read package file %s." % pkg_file)
+                    result.append(None)
                     continue
                 raise e
 
             # If it's not a file, skip it.
-            if stat.S_ISDIR(sinfo.st_mode):
-                continue
-
-            # If it is a file, then save the stats under the
-            # appropriate key
-            cache[pkg_name] = sinfo
-
-        return cache
+            result.append(None if stat.S_ISDIR(sinfo.st_mode) else sinfo)
+        return result
 
     def last_mtime(self):
         return max(sinfo.st_mtime for sinfo in self._packages_to_stats.values())
@@ -501,9 +594,20 @@ def needs_update(self, pkg):
     def read(self, stream):
         """Read this index from a provided file object."""
 
-    @abc.abstractmethod
     def update(self, pkg_fullname):
         """Update the index in memory with information about a package."""
+        self.merge(pkg_fullname, self.fragment(pkg_fullname))
+
+    @abc.abstractmethod
+    def fragment(self, pkg_fullname):
+        """Return the information about a package that goes into the index.
+
+        This is where the package is loaded, possibly in a worker process, so the fragment
+        must be picklable."""
+
+    @abc.abstractmethod
+    def merge(self, pkg_fullname, fragment):
+        """Replace the information about a package in the index with a fragment."""
 
     @abc.abstractmethod
     def write(self, stream):
@@ -519,8 +623,20 @@ def _create(self):
     def read(self, stream):
         self.index = spack.tag.TagIndex.from_json(stream, self.repository)
 
-    def update(self, pkg_fullname):
-        self.index.update_package(pkg_fullname.split(".")[-1])
+    def fragment(self, pkg_fullname):
+        name = pkg_fullname.split(".")[-1]
+        metadata = self.repository.package_metadata(name)
+        if metadata is None:
+            tags = getattr(self.repository.get_pkg_class(name), "tags", [])
+        else:
+            tags = metadata.tags or []
+            # Same as DetectablePackageMeta, for packages that can be detected as externals
+            if metadata.attributes & {"executables", "libraries"}:
+                tags = tags + ["detectable"]
+        return [tag.lower() for tag in tags]
+
+    def merge(self, pkg_fullname, fragment):
+        self.index.update_package(pkg_fullname.split(".")[-1], tags=fragment)
 
     def write(self, stream):
         self.index.to_json(stream)
@@ -535,15 +651,32 @@ def _create(self):
     def read(self, stream):
         self.index = spack.provider_index.ProviderIndex.from_json(stream, self.repository)
 
-    def update(self, pkg_fullname):
+    def fragment(self, pkg_fullname):
         name = pkg_fullname.split(".")[-1]
-        is_virtual = (
-            not self.repository.exists(name) or self.repository.get_pkg_class(name).virtual
-        )
-        if is_virtual:
+        if not self.repository.exists(name):
+            return None
+
+        metadata = self.repository.package_metadata(name)
+        if metadata is not None and all(d.is_static for d in metadata.provides):
+            provided = _provided_by(name, metadata)
+        elif self.repository.get_pkg_class(name).virtual:
+            return None
+        else:
+            provided = None
+
+        index = spack.provider_index.ProviderIndex(repository=self.repository)
+        index.update(pkg_fullname, provided=provided)
+        stream = io.StringIO()
+        index.to_json(stream)
+        return stream.getvalue()
+
+    def merge(self, pkg_fullname, fragment):
+        if fragment is None:
             return
         self.index.remove_provider(pkg_fullname)
-        self.index.update(pkg_fullname)
+        self.index.merge(
+            spack.provider_index.ProviderIndex.from_json(io.StringIO(fragment), self.repository)
+        )
 
     def write(self, stream):
         self.index.to_json(stream)
@@ -568,8 +701,70 @@ def read(self, stream):
     def write(self, stream):
         self.index.to_json(stream)
 
-    def update(self, pkg_fullname):
-        self.index.update_package(pkg_fullname)
+    def fragment(self, pkg_fullname):
+        metadata = self.repository.package_metadata(pkg_fullname.split(".")[-1])
+        if metadata is not None and not metadata.patches:
+            return {}
+        return self.index.package_index(pkg_fullname)
+
+    def merge(self, pkg_fullname, fragment):
+        self.index.update_package(pkg_fullname, package_index=fragment)
+
+
+def _provided_by(
+    pkg_name: str, metadata: spack.util.package_metadata.PackageMetadata
+) -> Dict["spack.spec.Spec", Set["spack.spec.Spec"]]:
+    """Same as the ``provided`` attribute of a package class, computed from its metadata"""
+    provided: Dict[spack.spec.Spec, Set[spack.spec.Spec]] = {}
+    for directive in metadata.provides:
+        when = directive.kwargs.get("when")
+        if directive.when:
+            constraints = [spack.spec.Spec(x) for x in directive.when]
+            if when:
+                constraints.append(spack.spec.Spec(when))
+            when_spec = spack.spec.merge_abstract_anonymous_specs(*constraints)
+        elif when is False:
+            continue
+        else:
+            when_spec = spack.spec.Spec(when if isinstance(when, str) else None)
+
+        when_spec.name = pkg_name
+        provided.setdefault(when_spec, set()).update(spack.spec.Spec(x) for x in directive.args)
+    return provided
+
+
+def _declares_providers_or_patches(directive: Any) -> bool:
+    """Whether a directive inherited from a base class can declare providers or patches"""
+    name = getattr(directive, "__name__", "")
+    if name in ("_execute_provides", "_execute_patch") or not name.startswith("_execute_"):
+        return True
+    closure = zip(directive.__code__.co_freevars, directive.__closure__ or ())
+    return any(var == "patches" and cell.cell_contents for var, cell in closure)
+
+
+@functools.lru_cache(maxsize=None)
+def _is_static_base_class(qualified_name: str) -> bool:
+    """Whether a base class of packages has no tags, providers, patches, or detection
+    attributes, which are missing from the static metadata of the packages deriving from it"""
+    module_name, _, class_name = qualified_name.rpartition(".")
+    try:
+        cls = getattr(importlib.import_module(module_name), class_name)
+    except (ImportError, AttributeError):
+        return False
+    if any(hasattr(cls, attr) for attr in ("tags", "executables", "libraries")):
+        return False
+    directives = getattr(cls, "_directives_to_be_executed", [])
+    return not any(_declares_providers_or_patches(d) for d in directives)
+
+
+#: Minimum number of outdated packages per worker process when updating an index in parallel
+PACKAGES_PER_INDEXING_JOB = 32
+
+
+def _index_fragment(pkg_fullname: str) -> Tuple[str, Any]:
+    indexer = spack.util.parallel.worker_state()
+    assert indexer is not None, "index fragments are computed in forked processes"
+    return pkg_fullname, indexer.fragment(pkg_fullname)
 
 
 class RepoIndex:
@@ -577,7 +772,11 @@ class RepoIndex:
 
     This class is responsible for checking packages in a repository for
     updates (using ``FastPackageChecker``) and for regenerating indexes
-    when they're needed.
+    when they're needed. Each index is read and updated independently, the
+    first time it is accessed, and only the packages modified since the
+    index was written are loaded. When there are many of them, they are
+    loaded in worker processes, which send back the fragments of the index
+    for each package.
 
     ``Indexers`` should be added to the ``RepoIndex`` using
     ``add_indexer(name, indexer)``, and they should support the interface
@@ -617,21 +816,10 @@ def __getitem__(self, name):
             raise KeyError("no such index: %s" % name)
 
         if name not in self.indexes:
-            self._build_all_indexes()
+            self.indexes[name] = self._build_index(name, indexer)
 
         return self.indexes[name]
 
-    def _build_all_indexes(self):
-        """Build all the indexes at once.
-
-        We regenerate *all* indexes whenever *any* index needs an update,
-        because the main bottleneck here is loading all the packages.  It
-        can take tens of seconds to regenerate sequentially, and we'd
-        rather only pay that cost once rather than on several
-        invocations."""
-        for name, indexer in self.indexers.items():
-            self.indexes[name] = self._build_index(name, indexer)
-
     def _build_index(self, name: str, indexer: Indexer):
         """Determine which packages need an update, and update indexes."""
 
@@ -659,13 +847,41 @@ def _build_index(self, name: str, indexer: Indexer):
                 if new_index_mtime != index_mtime:
                     needs_update = self.checker.modified_since(new_index_mtime)
 
-                for pkg_name in needs_update:
-                    indexer.update(f"{self.namespace}.{pkg_name}")
+                self._update_packages(
+                    indexer, [f"{self.namespace}.{pkg_name}" for pkg_name in needs_update]
+                )
 
                 indexer.write(new)
 
         return indexer.index
 
+    def _update_packages(self, indexer: Indexer, pkg_fullnames: List[str]) -> None:
+        """Update an index with information about the packages passed as input.
+
+        The bottleneck here is loading the packages, which can take tens of seconds for a whole
+        repository, so large updates load them in forked worker processes, and merge the index
+        fragments they return in order."""
+        jobs = min(
+            spack.util.cpus.cpus_available(), len(pkg_fullnames) // PACKAGES_PER_INDEXING_JOB
+        )
+        if jobs < 2 or multiprocessing.get_start_method() != "fork":
+            for pkg_fullname in pkg_fullnames:
+                indexer.update(pkg_fullname)
+            return
+
+        # Workers are forked with the indexer as it is here
+        fragments = dict(
+            spack.util.parallel.imap_unordered(
+                _index_fragment,
+                pkg_fullnames,
+                processes=jobs,
+                chunksize=PACKAGES_PER_INDEXING_JOB,
+                state=indexer,
+            )
+        )
+        for pkg_fullname in pkg_fullnames:
+            indexer.merge(pkg_fullname, fragments[pkg_fullname])
+
 
 class RepoPath:
     """A RepoPath is a list of repos that function as one.
@@ -678,6 +894,8 @@ class RepoPath:
         repos: list Repo objects or paths to put in this RepoPath
         cache: file cache associated with this repository
         overrides: dict mapping package name to class attribute overrides for that package
+        stat_cache: whether the repos created from paths store the stats of their package files
+            in the file cache
     """
 
     def __init__(
@@ -685,6 +903,7 @@ def __init__(
         *repos: Union[str, "Repo"],
         cache: Optional["spack.caches.FileCacheType"],
         overrides: Optional[Dict[str, Any]] = None,
+        stat_cache: bool = False,
     ) -> None:
         self.repos: List[Repo] = []
         self.by_namespace = nm.NamespaceTrie()
@@ -697,7 +916,7 @@ def __init__(
             try:
                 if isinstance(repo, str):
                     assert cache is not None, "cache must hold a value, when repo is a string"
-                    repo = Repo(repo, cache=cache, overrides=overrides)
+                    repo = Repo(repo, cache=cache, overrides=overrides, stat_cache=stat_cache)
                 repo.finder(self)
                 self.put_last(repo)
             except RepoError as e:
@@ -881,6 +1100,12 @@ def get_pkg_class(self, pkg_name: str) -> Type["spack.package_base.PackageBase"]
         """Find a class for the spec's package and return the class object."""
         return self.repo_for_pkg(pkg_name).get_pkg_class(pkg_name)
 
+    def package_metadata(
+        self, pkg_name: str
+    ) -> Optional[spack.util.package_metadata.PackageMetadata]:
+        """Metadata of a package read without importing it, or None if it must be imported."""
+        return self.repo_for_pkg(pkg_name).package_metadata(pkg_name)
+
     @autospec
     def dump_provenance(self, spec, path):
         """Dump provenance information for a spec to a particular path.
@@ -967,6 +1192,7 @@ def __init__(
         *,
         cache: "spack.caches.FileCacheType",
         overrides: Optional[Dict[str, Any]] = None,
+        stat_cache: bool = False,
     ) -> None:
         """Instantiate a package repository from a filesystem path.
 
@@ -974,6 +1200,9 @@ def __init__(
             root: the root directory of the repository
             cache: file cache associated with this repository
             overrides: dict mapping package name to class attribute overrides for that package
+            stat_cache: whether to store the stats of the package files in the file cache, and
+                trust them as long as no package is added or removed (see
+                ``FastPackageChecker``)
         """
         # Root directory, containing _repo.yaml and package dirs
         # Allow roots to by spack-relative by starting with '$spack'
@@ -1022,6 +1251,7 @@ def check(condition, msg):
 
         # Maps that goes from package name to corresponding file stat
         self._fast_package_checker: Optional[FastPackageChecker] = None
+        self._stat_cache = stat_cache
 
         # Indexes for this repository, computed lazily
         self._repo_index: Optional[RepoIndex] = None
@@ -1197,7 +1427,9 @@ def filename_for_package_name(self, pkg_name: str) -> str:
     @property
     def _pkg_checker(self) -> FastPackageChecker:
         if self._fast_package_checker is None:
-            self._fast_package_checker = FastPackageChecker(self.packages_path)
+            self._fast_package_checker = FastPackageChecker(
+                self.packages_path, cache=self._cache if self._stat_cache else None
+            )
         return self._fast_package_checker
 
     def all_package_names(self, include_virtuals: bool = False) -> List[str]:
@@ -1260,6 +1492,38 @@ def is_virtual_safe(self, pkg_name: str) -> bool:
         """
         return not self.exists(pkg_name) or self.get_pkg_class(pkg_name).virtual
 
+    def package_metadata(
+        self, pkg_name: str
+    ) -> Optional[spack.util.package_metadata.PackageMetadata]:
+        """Read the metadata of a package from its ``package.py``, without importing it.
+
+        Returns None if the package does not exist, or if it must be imported to get its
+        metadata: because it is dynamic, because it derives from a base class with tags,
+        providers or patches, or because its attributes are overridden in configuration.
+        """
+        namespace, pkg_name = self.partition_package_name(pkg_name)
+        if pkg_name in self.overrides:
+            return None
+
+        filename = self.filename_for_package_name(pkg_name)
+        try:
+            with open(filename, encoding="utf-8") as f:
+                source = f.read()
+        except OSError:
+            return None
+
+        try:
+            metadata = spack.util.package_metadata.extract_metadata(
+                source, nm.mod_to_class(pkg_name), filename
+            )
+        except spack.util.package_metadata.DynamicPackageError as e:
+            tty.debug(f"{self.namespace}.{pkg_name} is imported to read its metadata: {e}")
+            return None
+
+        if not all(_is_static_base_class(base) for base in metadata.bases):
+            return None
+        return metadata
+
     def get_pkg_class(self, pkg_name: str) -> Type["spack.package_base.PackageBase"]:
         """Get the class for the package out of its module.
 
@@ -1335,15 +1599,15 @@ def __contains__(self, pkg_name: str) -> bool:
         return self.exists(pkg_name)
 
     @staticmethod
-    def unmarshal(root, cache, overrides):
+    def unmarshal(root, cache, overrides, stat_cache):
         """Helper method to unmarshal keyword arguments"""
-        return Repo(root, cache=cache, overrides=overrides)
+        return Repo(root, cache=cache, overrides=overrides, stat_cache=stat_cache)
 
     def marshal(self):
         cache = self._cache
         if isinstance(cache, llnl.util.lang.Singleton):
             cache = cache.instance
-        return self.root, cache, self.overrides
+        return self.root, cache, self.overrides, self._stat_cache
 
     def __reduce__(self):
         return Repo.unmarshal, self.marshal()
@@ -1461,7 +1725,12 @@ def create(
             continue
         overrides[pkg_name] = value
 
-    return RepoPath(*repo_dirs, cache=spack.caches.MISC_CACHE, overrides=overrides)
+    return RepoPath(
+        *repo_dirs,
+        cache=spack.caches.MISC_CACHE,
+        overrides=overrides,
+        stat_cache=configuration.get("config:repo_stat_cache", False),
+    )
 
 
 #: Singleton repo path instance
@@ -10,7 +10,7 @@
 import os
 import time
 import traceback
-from typing import Any, Callable, Dict, List, Type
+from typing import Any, Callable, Dict, List, Tuple, Type
 
 import llnl.util.lang
 
@@ -48,6 +48,8 @@ def __init__(self, wrap_class: Type, do_fn: str, specs: List[spack.spec.Spec]):
         self.input_specs = specs
         #: This is where we record the data that will be included in our report
         self.specs: List[Dict[str, Any]] = []
+        #: Package records and start times of the builds still running in the background
+        self.running: Dict[str, Tuple[Dict[str, Any], float]] = {}
 
     def fetch_log(self, pkg: spack.package_base.PackageBase) -> str:
         """Return the stdout log associated with the function being monitored
@@ -89,31 +91,18 @@ def gather_info(wrapped_fn):
             def wrapper(instance, *args, **kwargs):
                 pkg = self.extract_package_from_signature(instance, *args, **kwargs)
 
-                package = {
-                    "name": pkg.name,
-                    "id": pkg.spec.dag_hash(),
-                    "elapsed_time": None,
-                    "result": None,
-                    "message": None,
-                    "installed_from_binary_cache": False,
-                }
-
-                # Append the package to the correct spec report. In some
-                # cases it may happen that a spec that is asked to be
-                # installed explicitly will also be installed as a
-                # dependency of another spec. In this case append to both
-                # spec reports.
-                for current_spec in llnl.util.lang.dedupe([pkg.spec.root, pkg.spec]):
-                    name = name_fmt.format(current_spec.name, current_spec.dag_hash(length=7))
-                    try:
-                        item = next((x for x in self.specs if x["name"] == name))
-                        item["packages"].append(package)
-                    except StopIteration:
-                        pass
-
-                start_time = time.time()
+                # A build that was started in the background is reported when it completes
+                if pkg.spec.dag_hash() in self.running:
+                    package, start_time = self.running.pop(pkg.spec.dag_hash())
+                else:
+                    package = self._new_package_record(pkg, name_fmt)
+                    start_time = time.time()
+
                 try:
                     value = wrapped_fn(instance, *args, **kwargs)
+                    if isinstance(value, spack.build_environment.BuildProcess):
+                        self.running[pkg.spec.dag_hash()] = (package, start_time)
+                        return value
                     package["stdout"] = self.fetch_log(pkg)
                     package["installed_from_binary_cache"] = pkg.installed_from_binary_cache
                     self.on_success(pkg, kwargs, package)
@@ -146,6 +135,34 @@ def wrapper(instance, *args, **kwargs):
 
         setattr(self.wrap_class, self.do_fn, gather_info(getattr(self.wrap_class, self.do_fn)))
 
+    def _new_package_record(
+        self, pkg: spack.package_base.PackageBase, name_fmt: str
+    ) -> Dict[str, Any]:
+        """Return a new record for the package, appended to the relevant spec reports."""
+        package = {
+            "name": pkg.name,
+            "id": pkg.spec.dag_hash(),
+            "elapsed_time": None,
+            "result": None,
+            "message": None,
+            "installed_from_binary_cache": False,
+        }
+
+        # Append the package to the correct spec report. In some
+        # cases it may happen that a spec that is asked to be
+        # installed explicitly will also be installed as a
+        # dependency of another spec. In this case append to both
+        # spec reports.
+        for current_spec in llnl.util.lang.dedupe([pkg.spec.root, pkg.spec]):
+            name = name_fmt.format(current_spec.name, current_spec.dag_hash(length=7))
+            try:
+                item = next((x for x in self.specs if x["name"] == name))
+                item["packages"].append(package)
+            except StopIteration:
+                pass
+
+        return package
+
     def on_success(self, pkg: spack.package_base.PackageBase, kwargs, package_record):
         """Add additional properties on function call success."""
         raise NotImplementedError("must be implemented by derived classes")
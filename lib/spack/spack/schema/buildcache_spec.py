@@ -22,7 +22,12 @@
     },
     "binary_cache_checksum": {
         "type": "object",
-        "properties": {"hash_algorithm": {"type": "string"}, "hash": {"type": "string"}},
+        "properties": {
+            "hash_algorithm": {"type": "string"},
+            "hash": {"type": "string"},
+            "compression": {"type": "string"},
+            "format": {"type": "string", "enum": ["tarball", "manifest"]},
+        },
     },
     "buildcache_layout_version": {"type": "number"},
 }
@@ -45,6 +45,8 @@
                 ]
             },
             "enable_node_namespace": {"type": "boolean"},
+            "fact_cache": {"type": "boolean"},
+            "result_cache": {"type": "boolean"},
             "targets": {
                 "type": "object",
                 "properties": {
@@ -73,6 +73,7 @@
             "misc_cache": {"type": "string"},
             "environments_root": {"type": "string"},
             "connect_timeout": {"type": "integer", "minimum": 0},
+            "spider_timeout": {"type": "integer", "minimum": 0},
             "verify_ssl": {"type": "boolean"},
             "ssl_certs": {"type": "string"},
             "suppress_gpg_warnings": {"type": "boolean"},
@@ -83,8 +84,16 @@
             "dirty": {"type": "boolean"},
             "build_language": {"type": "string"},
             "build_jobs": {"type": "integer", "minimum": 1},
+            "concurrent_packages": {"type": "integer", "minimum": 1},
+            "binary_prefetch": {"type": "integer", "minimum": 0},
+            "fetch_jobs": {"type": "integer", "minimum": 1},
+            "fetch_jobs_per_host": {"type": "integer", "minimum": 1},
             "ccache": {"type": "boolean"},
             "db_lock_timeout": {"type": "integer", "minimum": 1},
+            "db_binary_index": {"type": "boolean"},
+            "db_journal": {"type": "boolean"},
+            "binary_blob_store": {"type": "boolean"},
+            "repo_stat_cache": {"type": "boolean"},
             "package_lock_timeout": {
                 "anyOf": [{"type": "integer", "minimum": 1}, {"type": "null"}]
             },
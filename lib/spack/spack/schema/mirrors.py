@@ -47,6 +47,8 @@
         "fetch": fetch_and_push,
         "push": fetch_and_push,
         "autopush": {"type": "boolean"},
+        "compression": {"type": "string", "enum": ["gzip", "zstd"]},
+        "deduplicate": {"type": "boolean"},
         **connection,  # type: ignore
     },
 }
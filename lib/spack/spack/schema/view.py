@@ -31,6 +31,7 @@
                             "root": {"type": "string"},
                             "link": {"type": "string", "pattern": "(roots|all|run)"},
                             "link_type": {"type": "string"},
+                            "atomic": {"type": "boolean"},
                             "select": {"type": "array", "items": {"type": "string"}},
                             "exclude": {"type": "array", "items": {"type": "string"}},
                             "projections": projections_scheme,
@@ -2,6 +2,7 @@
 # Spack Project Developers. See the top-level COPYRIGHT file for details.
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
+import atexit
 import collections
 import collections.abc
 import copy
@@ -17,7 +18,19 @@
 import typing
 import warnings
 from contextlib import contextmanager
-from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple, Type, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
 
 import archspec.cpu
 
@@ -28,12 +41,14 @@
 import spack
 import spack.binary_distribution
 import spack.bootstrap.core
+import spack.caches
 import spack.compilers
 import spack.concretize
 import spack.config
 import spack.deptypes as dt
 import spack.environment as ev
 import spack.error
+import spack.hash_types as ht
 import spack.package_base
 import spack.package_prefs
 import spack.platforms
@@ -51,6 +66,7 @@
 from spack.config import get_mark_from_yaml_data
 from spack.error import SpecSyntaxError
 
+from . import fact_cache, result_cache
 from .core import (
     AspFunction,
     NodeArgument,
@@ -62,6 +78,7 @@
     fn,
     parse_files,
     parse_term,
+    program_builder,
 )
 from .counter import FullDuplicatesCounter, MinimalDuplicatesCounter, NoDuplicatesCounter
 from .version_order import concretization_version_order
@@ -529,6 +546,46 @@ def _compute_specs_from_answer_set(self):
             else:
                 self._unsolved_specs.append((input_spec, candidate))
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a JSON serializable representation of a satisfiable result.
+
+        The concrete specs are stored in the specfile format, and can be read back with
+        ``Result.from_dict``.
+        """
+        cost, _, answer = min(self.answers)
+        dependencies = {d.dag_hash() for spec in answer.values() for d in spec.dependencies()}
+        roots = {
+            spec.dag_hash(): spec
+            for spec in answer.values()
+            if spec.dag_hash() not in dependencies
+        }
+        return {
+            "cost": list(cost),
+            "criteria": [list(criterion) for criterion in self.criteria],
+            "nmodels": self.nmodels,
+            "possible_dependencies": sorted(self.possible_dependencies),
+            "nodes": [[node.id, node.pkg, spec.dag_hash()] for node, spec in answer.items()],
+            "specs": [spec.to_dict(hash=ht.dag_hash) for spec in roots.values()],
+        }
+
+    @staticmethod
+    def from_dict(specs: List[spack.spec.Spec], data: Dict[str, Any]) -> "Result":
+        """Construct a satisfiable result for the input specs, from the output of
+        ``Result.to_dict``."""
+        by_hash: Dict[str, spack.spec.Spec] = {}
+        for specfile in data["specs"]:
+            for node in spack.spec.Spec.from_dict(specfile).traverse():
+                by_hash.setdefault(node.dag_hash(), node)
+
+        result = Result(specs)
+        result.satisfiable = True
+        answer = {NodeArgument(id=i, pkg=pkg): by_hash[h] for i, pkg, h in data["nodes"]}
+        result.answers.append((data["cost"], 0, answer))
+        result.criteria = [tuple(criterion) for criterion in data["criteria"]]
+        result.nmodels = data["nmodels"]
+        result.possible_dependencies = set(data["possible_dependencies"])
+        return result
+
     @staticmethod
     def format_unsolved(unsolved_specs):
         """Create a message providing info on unsolved user specs and for
@@ -779,6 +836,22 @@ def __hash__(self):
         return hash(self._key())
 
 
+@llnl.util.lang.memoized
+def _parse_logic_program(path: str) -> List[typing.Any]:
+    """Parse a logic program shipped with Spack, and return its statements.
+
+    Logic programs are parsed once per process, and their statements are added to the control
+    object of each solve.
+    """
+    statements: List[typing.Any] = []
+    parse_files([path], statements.append)
+    return statements
+
+
+# Release the statements before the clingo library is unloaded at exit
+atexit.register(_parse_logic_program.cache.clear)
+
+
 class PyclingoDriver:
     def __init__(self, cores=True):
         """Driver for the Python clingo interface.
@@ -835,19 +908,22 @@ def solve(self, setup, specs, reuse=None, output=None, control=None, allow_depre
         timer.start("load")
         # Add the problem instance
         self.control.add("base", [], asp_problem)
-        # Load the file itself
+        # Add the logic programs, which are parsed only in the first solve of the process
         parent_dir = os.path.dirname(__file__)
-        self.control.load(os.path.join(parent_dir, "concretize.lp"))
-        self.control.load(os.path.join(parent_dir, "heuristic.lp"))
-        self.control.load(os.path.join(parent_dir, "display.lp"))
+        programs = ["concretize.lp", "heuristic.lp", "display.lp"]
         if not setup.concretize_everything:
-            self.control.load(os.path.join(parent_dir, "when_possible.lp"))
+            programs.append("when_possible.lp")
 
         # Binary compatibility is based on libc on Linux, and on the os tag elsewhere
         if using_libc_compatibility():
-            self.control.load(os.path.join(parent_dir, "libc_compatibility.lp"))
+            programs.append("libc_compatibility.lp")
         else:
-            self.control.load(os.path.join(parent_dir, "os_compatibility.lp"))
+            programs.append("os_compatibility.lp")
+
+        with program_builder(self.control) as builder:
+            for program in programs:
+                for statement in _parse_logic_program(os.path.join(parent_dir, program)):
+                    builder.add(statement)
 
         timer.stop("load")
 
@@ -1139,6 +1215,7 @@ def __init__(self, tests: bool = False):
         self.reusable_and_possible: ConcreteSpecsByHash = ConcreteSpecsByHash()
 
         self._id_counter: Iterator[int] = itertools.count()
+        self.fact_cache: Optional[fact_cache.FactCache] = None
         self._trigger_cache: ConditionSpecCache = collections.defaultdict(dict)
         self._effect_cache: ConditionSpecCache = collections.defaultdict(dict)
 
@@ -1313,20 +1390,8 @@ def pkg_rules(self, pkg, tests):
         self.pkg_version_rules(pkg)
         self.gen.newline()
 
-        # languages
-        self.package_languages(pkg)
-
-        # variants
-        self.variant_rules(pkg)
-
-        # conflicts
-        self.conflict_rules(pkg)
-
-        # virtuals
-        self.package_provider_rules(pkg)
-
-        # dependencies
-        self.package_dependencies_rules(pkg)
+        # languages, variants, conflicts, virtuals and dependencies
+        self.package_directive_rules(pkg)
 
         # virtual preferences
         self.virtual_preferences(
@@ -1340,6 +1405,168 @@ def pkg_rules(self, pkg, tests):
         self.trigger_rules()
         self.effect_rules()
 
+    def package_directive_rules(self, pkg: Type[spack.package_base.PackageBase]) -> None:
+        """Emit the facts derived from the directives in a package: languages, variants,
+        conflicts, virtuals and dependencies.
+
+        These facts only depend on the package class and on a few properties of the solve, so
+        they are generated as a relocatable block, which is reused across solves when
+        ``concretizer:fact_cache`` is enabled.
+        """
+        # Flush pending triggers and effects, so that the block is self-contained
+        self.trigger_rules()
+        self.effect_rules()
+
+        key = None
+        if self.fact_cache is not None:
+            test_deps = bool(self.tests) and (
+                isinstance(self.tests, bool) or pkg.name in self.tests
+            )
+            provided = sorted(set(pkg.provided_virtual_names()) & self.possible_virtuals)
+            key = self.fact_cache.key(pkg, f"tests={test_deps}", *provided)
+
+        block = self.fact_cache.load(key) if self.fact_cache and key else None
+        if block is None or not self._is_valid_block(block):
+            block = self._directive_facts_block(pkg)
+            if self.fact_cache and key and None not in block["packages"].values():
+                self.fact_cache.store(key, block)
+
+        self._emit_directive_facts_block(pkg, block)
+
+    def _is_valid_block(self, block: Dict[str, Any]) -> bool:
+        """Whether the other packages used to generate a block of facts are unchanged."""
+        assert self.fact_cache is not None
+        try:
+            return all(
+                self.fact_cache.package_checksum(self.pkg_class(name)) == checksum
+                for name, checksum in block["packages"].items()
+            )
+        except spack.repo.RepoError:
+            return False
+
+    def _directive_facts_block(self, pkg: Type[spack.package_base.PackageBase]) -> Dict[str, Any]:
+        """Generate the facts derived from the directives in a package, as a JSON serializable
+        block with ids relative to the beginning of the block."""
+        recorder = fact_cache.FactRecorder()
+        counter = itertools.count()
+        state = (
+            self.gen,
+            self._id_counter,
+            self.version_constraints,
+            self.target_constraints,
+            self.compiler_version_constraints,
+            self.variant_values_from_specs,
+            self.variant_ids_by_def_id,
+        )
+        self.gen = recorder  # type: ignore[assignment]
+        self._id_counter = map(fact_cache.LocalId, counter)
+        self.version_constraints, self.target_constraints = set(), set()
+        self.compiler_version_constraints, self.variant_values_from_specs = set(), set()
+        self.variant_ids_by_def_id = {}
+        try:
+            self.package_languages(pkg)
+            self.variant_rules(pkg)
+            self.conflict_rules(pkg)
+            self.package_provider_rules(pkg)
+            self.package_dependencies_rules(pkg)
+            self.trigger_rules()
+            self.effect_rules()
+            generated = (
+                self.version_constraints,
+                self.target_constraints,
+                self.compiler_version_constraints,
+                self.variant_values_from_specs,
+                self.variant_ids_by_def_id,
+            )
+        finally:
+            (
+                self.gen,
+                self._id_counter,
+                self.version_constraints,
+                self.target_constraints,
+                self.compiler_version_constraints,
+                self.variant_values_from_specs,
+                self.variant_ids_by_def_id,
+            ) = state
+            self._trigger_cache.clear()
+            self._effect_cache.clear()
+
+        versions, targets, compilers, variant_values, variant_ids = generated
+
+        # Variant definitions are identified by name and position, instead of by object id
+        locations: Dict[str, Dict[int, Tuple[str, int]]] = {}
+
+        def locate(pkg_name: str, variant_def_id: int) -> Tuple[str, int]:
+            if pkg_name not in locations:
+                pkg_cls = self.pkg_class(pkg_name)
+                locations[pkg_name] = {
+                    id(variant_def): (name, idx)
+                    for name in pkg_cls.variant_names()
+                    for idx, (_, variant_def) in enumerate(pkg_cls.variant_definitions(name))
+                }
+            return locations[pkg_name][variant_def_id]
+
+        other_pkgs = sorted({name for name, _, _ in variant_values if name != pkg.name})
+        return {
+            "ids": next(counter),
+            "facts": recorder.items,
+            "version_constraints": sorted((name, str(v)) for name, v in versions),
+            "target_constraints": sorted(str(t) for t in targets),
+            "compiler_version_constraints": sorted(str(c) for c in compilers),
+            "variant_ids": [
+                [*locate(pkg.name, def_id), int(vid)] for def_id, vid in variant_ids.items()
+            ],
+            "variant_values": [
+                [name, *locate(name, def_id), fact_cache.encode(value)]
+                for name, def_id, value in variant_values
+            ],
+            "packages": {
+                name: self.fact_cache.package_checksum(self.pkg_class(name))
+                for name in other_pkgs
+                if self.fact_cache is not None
+            },
+        }
+
+    def _emit_directive_facts_block(
+        self, pkg: Type[spack.package_base.PackageBase], block: Dict[str, Any]
+    ) -> None:
+        """Emit a block of facts generated by ``_directive_facts_block``, relocating its ids
+        after the ones used so far."""
+        base = next(self._id_counter)
+        fact_cache.replay(block["facts"], self.gen, base)
+        self._id_counter = itertools.count(base + block["ids"])
+
+        self.version_constraints.update(
+            (name, vn.VersionList(versions)) for name, versions in block["version_constraints"]
+        )
+        self.target_constraints.update(
+            archspec.cpu.TARGETS.get(target, archspec.cpu.generic_microarchitecture(target))
+            for target in block["target_constraints"]
+        )
+        self.compiler_version_constraints.update(
+            spack.spec.CompilerSpec(compiler) for compiler in block["compiler_version_constraints"]
+        )
+        for name, idx, vid in block["variant_ids"]:
+            _, variant_def = pkg.variant_definitions(name)[idx]
+            self.variant_ids_by_def_id[id(variant_def)] = base + vid
+        for pkg_name, name, idx, value in block["variant_values"]:
+            _, variant_def = self.pkg_class(pkg_name).variant_definitions(name)[idx]
+            self.variant_values_from_specs.add((pkg_name, id(variant_def), value))
+
+    def _make_fact_cache(self) -> Optional[fact_cache.FactCache]:
+        """Return the cache of facts derived from directives, or None if it is disabled."""
+        if not spack.config.get("concretizer:fact_cache", False):
+            return None
+
+        repo_path = spack.repo.PATH
+        context = [
+            str(spack.spack_version),
+            spack.caches.library_checksum(),
+            *(f"{repo.namespace}:{repo.root}" for repo in repo_path.repos),
+            *sorted(repo_path.provider_index.providers),
+        ]
+        return fact_cache.FactCache(spack.caches.MISC_CACHE, context)
+
     def trigger_rules(self):
         """Flushes all the trigger rules collected so far, and clears the cache."""
         if not self._trigger_cache:
@@ -2574,6 +2801,7 @@ def setup(
         node_counter = _create_counter(specs, tests=self.tests)
         self.possible_virtuals = node_counter.possible_virtuals()
         self.pkgs = node_counter.possible_dependencies()
+        self.fact_cache = self._make_fact_cache()
         self.libcs = sorted(all_libcs())  # type: ignore[type-var]
 
         # Fail if we already know an unreachable node is requested
@@ -2722,8 +2950,8 @@ def visit(node):
                                 self.assumptions.append((parse_term(str(symbol)), True))
                                 self.gen.asp_problem.append(f"{{ {symbol} }}.\n")
 
-        path = os.path.join(parent_dir, "concretize.lp")
-        parse_files([path], visit)
+        for statement in _parse_logic_program(os.path.join(parent_dir, "concretize.lp")):
+            visit(statement)
 
     def define_runtime_constraints(self):
         """Define the constraints to be imposed on the runtimes"""
@@ -4021,14 +4249,25 @@ def __init__(self, configuration: spack.config.Configuration) -> None:
                             self.configuration, include=include, exclude=exclude
                         )
                     )
+        self._candidates: Optional[List[spack.spec.Spec]] = None
+
+    def candidates(self) -> List[spack.spec.Spec]:
+        """Specs selected from all the reuse sources, before filtering out the roots.
+
+        They are computed on first access, and then shared by all the solves using this
+        selector.
+        """
+        if self._candidates is None:
+            self._candidates = []
+            for reuse_source in self.reuse_sources:
+                self._candidates.extend(reuse_source.selected_specs())
+        return self._candidates
 
     def reusable_specs(self, specs: List[spack.spec.Spec]) -> List[spack.spec.Spec]:
         if self.reuse_strategy == ReuseStrategy.NONE:
             return []
 
-        result = []
-        for reuse_source in self.reuse_sources:
-            result.extend(reuse_source.selected_specs())
+        result = list(self.candidates())
 
         # If we only want to reuse dependencies, remove the root specs
         if self.reuse_strategy == ReuseStrategy.DEPENDENCIES:
@@ -4086,13 +4325,35 @@ def solve(
         specs = [s.lookup_hash() for s in specs]
         reusable_specs = self._check_input_and_extract_concrete_specs(specs)
         reusable_specs.extend(self.selector.reusable_specs(specs))
+
+        # Results are cached only when the solve has no other output
+        cache, key = None, None
+        if not (out or timers or stats or setup_only):
+            cache = self._result_cache()
+        if cache is not None:
+            key = cache.key(specs, reusable_specs, tests, allow_deprecated)
+            cached = cache.load(key)
+            if cached is not None:
+                tty.debug(f"[RESULT CACHE] reusing the concretization in {key}")
+                return Result.from_dict(specs, cached)
+
         setup = SpackSolverSetup(tests=tests)
         output = OutputConfiguration(timers=timers, stats=stats, out=out, setup_only=setup_only)
         result, _, _ = self.driver.solve(
             setup, specs, reuse=reusable_specs, output=output, allow_deprecated=allow_deprecated
         )
+        if cache is not None and key is not None and result.satisfiable:
+            files = result_cache.files_defining(result.possible_dependencies)
+            cache.store(key, result.to_dict(), files)
         return result
 
+    @staticmethod
+    def _result_cache() -> Optional[result_cache.ResultCache]:
+        """Return the cache of concretization results, or None if it is disabled."""
+        if not spack.config.get("concretizer:result_cache", False):
+            return None
+        return result_cache.ResultCache(spack.caches.MISC_CACHE)
+
     def solve_in_rounds(
         self, specs, out=None, timers=False, stats=False, tests=False, allow_deprecated=False
     ):
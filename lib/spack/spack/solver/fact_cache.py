@@ -0,0 +1,189 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+"""Persistent cache of the facts derived from the directives in ``package.py`` files.
+
+Translating the directives of a package into facts for the solver means parsing and processing
+many specs, and it is repeated for every possible package in every concretization. The result
+only depends on the files defining the package class, on the files of Spack itself and on a few
+properties of the solve, so it is stored in the misc cache as one block of facts per package.
+
+Blocks are content-addressed: their key is a hash of everything they depend on, so a stale block
+is never read back. The ids of conditions, triggers, effects and variants in a block are relative
+to the beginning of the block, and are relocated each time the block is emitted.
+"""
+import hashlib
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+import llnl.util.lock as lk
+import llnl.util.tty as tty
+
+import spack.util.crypto
+import spack.util.file_cache
+import spack.util.spack_json as sjson
+
+from .core import AspFunction
+
+#: Version of the format of the blocks. Bump it when the facts derived from directives change.
+FORMAT_VERSION = 1
+
+#: Blocks already read or written by this process, by path
+_BLOCKS: Dict[str, Dict[str, Any]] = {}
+
+
+class LocalId(int):
+    """Id of a condition, trigger, effect or variant, relative to the block of facts using it"""
+
+
+def encode(arg: Any) -> Any:
+    """Encode an argument of a fact as JSON, in the same way ``AspFunction`` turns it into a
+    clingo symbol."""
+    if isinstance(arg, LocalId):
+        return {"id": int(arg)}
+    elif isinstance(arg, bool):
+        return str(arg)
+    elif isinstance(arg, int):
+        return int(arg)
+    elif isinstance(arg, AspFunction):
+        return [arg.name, *(encode(x) for x in arg.args)]
+    return str(arg)
+
+
+def decode(obj: Any, base: int) -> Any:
+    """Decode an argument encoded by ``encode``, relocating ids by ``base``."""
+    if isinstance(obj, (str, int)):
+        return obj
+    elif isinstance(obj, dict):
+        return base + obj["id"]
+    return AspFunction(obj[0], [decode(x, base) for x in obj[1:]])
+
+
+class FactRecorder:
+    """Records what the solver setup emits, instead of rendering it as text.
+
+    It has the same interface as ``ProblemInstanceBuilder``, and the recorded items can be
+    emitted later with ``replay``.
+    """
+
+    def __init__(self) -> None:
+        self.items: List[List[Any]] = []
+
+    def fact(self, atom: AspFunction) -> None:
+        if isinstance(atom, AspFunction):
+            self.items.append(["fact", encode(atom)])
+        else:
+            self.items.append(["append", f"{atom}.\n"])
+
+    def append(self, rule: str) -> None:
+        self.items.append(["append", rule])
+
+    def title(self, header: str, char: str) -> None:
+        self.items.append(["title", header, char])
+
+    def h1(self, header: str) -> None:
+        self.title(header, "=")
+
+    def h2(self, header: str) -> None:
+        self.title(header, "-")
+
+    def h3(self, header: str) -> None:
+        self.items.append(["h3", header])
+
+    def newline(self) -> None:
+        self.items.append(["newline"])
+
+
+def replay(items: List[List[Any]], gen: Any, base: int) -> None:
+    """Emit items recorded by a ``FactRecorder`` into a problem instance builder, relocating
+    ids by ``base``."""
+    for op, *args in items:
+        if op == "fact":
+            gen.fact(decode(args[0], base))
+        else:
+            getattr(gen, op)(*args)
+
+
+def _sha256(parts: Iterable[str]) -> str:
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class FactCache:
+    """Blocks of facts stored in a file cache.
+
+    Args:
+        cache: file cache storing the blocks
+        context: strings identifying everything, besides the package class, that the blocks
+            depend on
+    """
+
+    def __init__(self, cache: spack.util.file_cache.FileCache, context: Iterable[str]) -> None:
+        self.cache = cache
+        self.context = _sha256([str(FORMAT_VERSION), *context])
+        self._checksums: Dict[str, str] = {}
+
+    def file_checksum(self, path: str) -> str:
+        """Checksum of a file, computed once per instance."""
+        if path not in self._checksums:
+            self._checksums[path] = spack.util.crypto.checksum(hashlib.sha256, path)
+        return self._checksums[path]
+
+    def package_checksum(self, pkg_cls: Type) -> Optional[str]:
+        """Checksum of the files defining a package class and its base classes, or None if
+        some of them are not defined in a file."""
+        paths: Dict[str, None] = {}
+        for cls in pkg_cls.__mro__:
+            if cls.__module__ == "builtins":
+                continue
+            path = getattr(sys.modules.get(cls.__module__), "__file__", None)
+            if not path:
+                return None
+            paths[path] = None
+
+        try:
+            return _sha256(self.file_checksum(path) for path in paths)
+        except OSError:
+            return None
+
+    def key(self, pkg_cls: Type, *extra: str) -> Optional[str]:
+        """Key of the block of facts of a package, or None if the package cannot be cached.
+
+        Args:
+            pkg_cls: package class the facts are derived from
+            extra: strings identifying properties of the solve the facts depend on
+        """
+        checksum = self.package_checksum(pkg_cls)
+        if checksum is None:
+            return None
+        digest = _sha256([self.context, pkg_cls.fullname, checksum, *extra])
+        return f"asp_facts/{pkg_cls.name}-{digest}.json"
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the block stored under a key, or None if there is no such block."""
+        path = self.cache.cache_path(key)
+        if path in _BLOCKS:
+            return _BLOCKS[path]
+
+        try:
+            if not self.cache.init_entry(key):
+                return None
+            with self.cache.read_transaction(key) as f:
+                block = sjson.load(f)
+        except (OSError, ValueError, lk.LockError, spack.util.file_cache.CacheError) as e:
+            tty.debug(f"[FACT CACHE] cannot read {path}: {e}")
+            return None
+
+        _BLOCKS[path] = block
+        return block
+
+    def store(self, key: str, block: Dict[str, Any]) -> None:
+        """Store a block under a key."""
+        path = self.cache.cache_path(key)
+        _BLOCKS[path] = block
+        try:
+            self.cache.init_entry(key)
+            with self.cache.write_transaction(key) as (_, new):
+                sjson.dump(block, new)
+        except (OSError, lk.LockError, spack.util.file_cache.CacheError) as e:
+            tty.debug(f"[FACT CACHE] cannot write {path}: {e}")
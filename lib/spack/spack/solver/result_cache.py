@@ -0,0 +1,165 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+"""On-disk cache of concretization results.
+
+A result is stored in the misc cache under a key hashing the inputs of the solve: the abstract
+specs, the configuration sections affecting concretization, the host, the repositories and the
+specs that could be reused, and the checksum of the Spack library. Each entry also records the
+files in the package directories of the possible dependencies of the solve (``package.py`` files,
+patches, ...), and it is discarded if any of them changed. Files are only checksummed again when
+their size or modification time differ from the ones recorded.
+"""
+import hashlib
+import os
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import archspec.cpu
+
+import llnl.util.lock as lk
+import llnl.util.tty as tty
+
+import spack
+import spack.caches
+import spack.config
+import spack.platforms
+import spack.repo
+import spack.spec
+import spack.util.crypto
+import spack.util.file_cache
+import spack.util.spack_json as sjson
+
+#: Version of the format of the entries
+FORMAT_VERSION = 2
+
+#: Configuration sections that affect the result of a solve
+CONFIG_SECTIONS = ("compilers", "concretizer", "develop", "packages", "repos", "upstreams")
+
+
+def _sha256(parts: Iterable[str]) -> str:
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def _checksum(path: str) -> Optional[str]:
+    try:
+        return spack.util.crypto.checksum(hashlib.sha256, path)
+    except OSError:
+        return None
+
+
+def _stat(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def files_defining(pkg_names: Iterable[str]) -> Set[str]:
+    """Return the files in package repositories that a solve involving the packages passed as
+    input depends on.
+
+    These are the files in the directories of the packages and of their base classes. Base
+    classes defined by Spack itself are accounted for by the checksum of the library in the key.
+    """
+    files: Set[str] = set()
+
+    for name in pkg_names:
+        if not spack.repo.PATH.exists(name):
+            continue
+        pkg_cls = spack.repo.PATH.get_pkg_class(name)
+        for cls in pkg_cls.__mro__:
+            path = getattr(sys.modules.get(cls.__module__), "__file__", None)
+            if not path or not cls.__module__.startswith(spack.repo.ROOT_PYTHON_NAMESPACE):
+                continue
+            # Packages may ship patches and other resources next to their package.py
+            for root, _, filenames in os.walk(os.path.dirname(path)):
+                files.update(os.path.join(root, f) for f in filenames if not f.endswith(".pyc"))
+    return files
+
+
+class ResultCache:
+    """Concretization results stored in a file cache.
+
+    Args:
+        cache: file cache storing the results
+    """
+
+    def __init__(self, cache: spack.util.file_cache.FileCache) -> None:
+        self.cache = cache
+
+    def key(
+        self,
+        specs: List[spack.spec.Spec],
+        reusable_specs: List[spack.spec.Spec],
+        tests: Any,
+        allow_deprecated: bool,
+    ) -> str:
+        """Key of the result of a solve.
+
+        Args:
+            specs: abstract specs to be solved
+            reusable_specs: concrete specs that can be reused in the solve
+            tests: test dependencies to be considered, as passed to the solver
+            allow_deprecated: whether deprecated versions are allowed
+        """
+        host = spack.platforms.host()
+        tests = tests if isinstance(tests, bool) else sorted(tests)
+        parts = [
+            str(FORMAT_VERSION),
+            str(spack.spack_version),
+            spack.caches.library_checksum(),
+            *(spec.to_json() for spec in specs),
+            sjson.dump({"tests": tests, "allow_deprecated": allow_deprecated}),
+            *(sjson.dump({section: spack.config.get(section)}) for section in CONFIG_SECTIONS),
+            str(host),
+            str(host.operating_system("default_os")),
+            str(archspec.cpu.host()),
+            str("SPACK_CONCRETIZER_REQUIRE_CHECKSUM" in os.environ),
+            *(
+                f"{repo.namespace}:{repo.root}:{os.stat(repo.packages_path).st_mtime_ns}"
+                for repo in spack.repo.PATH.repos
+            ),
+            *sorted({spec.dag_hash() for spec in reusable_specs}),
+        ]
+        return f"concretization/{_sha256(parts)}.json"
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the result stored under a key, or None if there is no result, or if some of
+        the files it depends on changed."""
+        try:
+            if not self.cache.init_entry(key):
+                return None
+            with self.cache.read_transaction(key) as f:
+                entry = sjson.load(f)
+        except (OSError, ValueError, lk.LockError, spack.util.file_cache.CacheError) as e:
+            tty.debug(f"[RESULT CACHE] cannot read {key}: {e}")
+            return None
+
+        for path, (size, mtime, checksum) in entry["files"].items():
+            if _stat(path) != (size, mtime) and _checksum(path) != checksum:
+                tty.debug(f"[RESULT CACHE] {key} is outdated")
+                return None
+        return entry["result"]
+
+    def store(self, key: str, result: Dict[str, Any], files: Iterable[str]) -> None:
+        """Store a result under a key.
+
+        Args:
+            key: key of the result
+            result: JSON serializable result
+            files: files the result depends on
+        """
+        entry_files = {}
+        for path in sorted(files):
+            size, mtime = _stat(path) or (None, None)
+            entry_files[path] = [size, mtime, _checksum(path)]
+        entry = {"files": entry_files, "result": result}
+        try:
+            self.cache.init_entry(key)
+            with self.cache.write_transaction(key) as (_, new):
+                sjson.dump(entry, new)
+        except (OSError, lk.LockError, spack.util.file_cache.CacheError) as e:
+            tty.debug(f"[RESULT CACHE] cannot write {key}: {e}")
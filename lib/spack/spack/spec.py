@@ -58,8 +58,9 @@
 import platform
 import re
 import socket
+import sys
 import warnings
-from typing import Any, Callable, Dict, List, Match, Optional, Set, Tuple, Union
+from typing import Any, Callable, Dict, List, Match, Optional, Set, Tuple, Type, Union
 
 import archspec.cpu
 
@@ -214,6 +215,11 @@ def ensure_modern_format_string(fmt: str) -> None:
         )
 
 
+def _interned(value: Optional[str]) -> Optional[str]:
+    """Intern strings that are repeated in many concrete specs read from files"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
 def _make_microarchitecture(name: str) -> archspec.cpu.Microarchitecture:
     if isinstance(name, archspec.cpu.Microarchitecture):
         return name
@@ -544,7 +550,10 @@ def constrain(self, other: "ArchSpec") -> bool:
 
     def copy(self):
         """Copy the current instance and returns the clone."""
-        return ArchSpec(self)
+        # The fields have already been validated by the setters
+        clone = ArchSpec.__new__(ArchSpec)
+        clone._platform, clone._os, clone._target = self._platform, self._os, self._target
+        return clone
 
     @property
     def concrete(self):
@@ -582,7 +591,7 @@ def from_dict(d):
         if not isinstance(target_name, str):
             target_name = target_name["name"]
         target = _make_microarchitecture(target_name)
-        return ArchSpec((arch["platform"], arch["platform_os"], target))
+        return ArchSpec((_interned(arch["platform"]), _interned(arch["platform_os"]), target))
 
     def __str__(self):
         return "%s-%s-%s" % (self.platform, self.os, self.target)
@@ -705,7 +714,7 @@ def to_dict(self):
     @staticmethod
     def from_dict(d):
         d = d["compiler"]
-        return CompilerSpec(d["name"], vn.VersionList.from_dict(d))
+        return CompilerSpec(_interned(d["name"]), vn.VersionList.from_dict(d))
 
     @property
     def display_str(self):
@@ -1048,7 +1057,8 @@ def select(self, parent=None, child=None, depflag: dt.DepFlag = dt.ALL):
         if not depflag:
             return []
 
-        # Start from all the edges we store
+        # Start from all the edges we store. Edges are keyed on the name their child or parent
+        # had when they were added, which may have changed since, so keys cannot be trusted here.
         selected = (d for d in itertools.chain.from_iterable(self.values()))
 
         # Filter by parent name
@@ -1465,7 +1475,7 @@ def __init__(
 
         # init an empty spec that matches anything.
         self.name = None
-        self.versions = vn.VersionList(":")
+        self.versions = vn.any_version.copy()
         self.variants = VariantMap(self)
         self.architecture = None
         self.compiler = None
@@ -2584,10 +2594,7 @@ def from_dict(data):
         else:
             spec = SpecfileV4.load(data)
 
-        # Any git version should
-        for s in spec.traverse():
-            s.attach_git_version_lookup()
-
+        # Git versions have already been attached to a lookup, when each node was read
         return spec
 
     @staticmethod
@@ -2806,12 +2813,17 @@ def ensure_no_deprecated(root):
             msg += "    For each package listed, choose another spec\n"
             raise SpecDeprecatedError(msg)
 
-    def concretize(self, tests: Union[bool, List[str]] = False) -> None:
+    def concretize(
+        self,
+        tests: Union[bool, List[str]] = False,
+        solver: Optional["spack.solver.asp.Solver"] = None,
+    ) -> None:
         """Concretize the current spec.
 
         Args:
             tests: if False disregard 'test' dependencies, if a list of names activate them for
                 the packages in the list, if True activate 'test' dependencies for all packages.
+            solver: solver to be used. If not given, a new solver is created.
         """
         import spack.solver.asp
 
@@ -2827,7 +2839,7 @@ def concretize(self, tests: Union[bool, List[str]] = False) -> None:
             return
 
         allow_deprecated = spack.config.get("config:deprecated", False)
-        solver = spack.solver.asp.Solver()
+        solver = solver or spack.solver.asp.Solver()
         result = solver.solve([self], tests=tests, allow_deprecated=allow_deprecated)
 
         # take the best answer
@@ -2934,7 +2946,7 @@ def _finalize_concretization(self):
         for spec in self.traverse():
             spec._cached_hash(ht.dag_hash)
 
-    def concretized(self, tests=False):
+    def concretized(self, tests=False, solver=None):
         """This is a non-destructive version of concretize().
 
         First clones, then returns a concrete version of this package
@@ -2944,9 +2956,11 @@ def concretized(self, tests=False):
             tests (bool or list): if False disregard 'test' dependencies,
                 if a list of names activate them for the packages in the list,
                 if True activate 'test' dependencies for all packages.
+            solver (spack.solver.asp.Solver): solver to be used. If not given, a new
+                solver is created.
         """
         clone = self.copy()
-        clone.concretize(tests=tests)
+        clone.concretize(tests=tests, solver=solver)
         return clone
 
     def index(self, deptype="all"):
@@ -3189,6 +3203,10 @@ def intersects(self, other: Union[str, "Spec"], deps: bool = True) -> bool:
             other: spec to be checked for compatibility
             deps: if True check compatibility of dependency nodes too, if False only check root
         """
+        if isinstance(other, str) and self._concrete:
+            # Strings are parsed to abstract specs, which intersect concrete specs they satisfy
+            return self.satisfies(other)
+
         other = self._autospec(other)
 
         if other.concrete and self.concrete:
@@ -3305,12 +3323,18 @@ def _intersects_dependencies(self, other):
     def satisfies(self, other: Union[str, "Spec"], deps: bool = True) -> bool:
         """Return True if all concrete specs matching self also match other, otherwise False.
 
+        Results for concrete specs and constraints passed as strings are cached, see
+        ``SATISFIES_CACHE``.
+
         Args:
             other: spec to be satisfied
             deps: if True descend to dependencies, otherwise only check root node
         """
-        other = self._autospec(other)
+        if isinstance(other, str) and self._concrete and self._hash:
+            return SATISFIES_CACHE.satisfies(self, other, deps)
+        return self._satisfies(self._autospec(other), deps)
 
+    def _satisfies(self, other: "Spec", deps: bool) -> bool:
         if other.concrete:
             # The left-hand side must be the same singleton with identical hash. Notice that
             # package hashes can be different for otherwise indistinguishable concrete Spec
@@ -4448,6 +4472,8 @@ class VariantMap(lang.HashableMap):
     """Map containing variant instances. New values can be added only
     if the key is not already present."""
 
+    __slots__ = ("spec",)
+
     def __init__(self, spec: Spec):
         super().__init__()
         self.spec = spec
@@ -4679,68 +4705,7 @@ def reconstruct_virtuals_on_edges(spec):
 class SpecfileReaderBase:
     @classmethod
     def from_node_dict(cls, node):
-        spec = Spec()
-
-        name, node = cls.name_and_data(node)
-        for h in ht.hashes:
-            setattr(spec, h.attr, node.get(h.name, None))
-
-        spec.name = name
-        spec.namespace = node.get("namespace", None)
-
-        if "version" in node or "versions" in node:
-            spec.versions = vn.VersionList.from_dict(node)
-            spec.attach_git_version_lookup()
-
-        if "arch" in node:
-            spec.architecture = ArchSpec.from_dict(node)
-
-        if "compiler" in node:
-            spec.compiler = CompilerSpec.from_dict(node)
-        else:
-            spec.compiler = None
-
-        for name, values in node.get("parameters", {}).items():
-            if name in _valid_compiler_flags:
-                spec.compiler_flags[name] = []
-                for val in values:
-                    spec.compiler_flags.add_flag(name, val, False)
-            else:
-                spec.variants[name] = vt.MultiValuedVariant.from_node_dict(name, values)
-
-        spec.external_path = None
-        spec.external_modules = None
-        if "external" in node:
-            # This conditional is needed because sometimes this function is
-            # called with a node already constructed that contains a 'versions'
-            # and 'external' field. Related to virtual packages provider
-            # indexes.
-            if node["external"]:
-                spec.external_path = node["external"]["path"]
-                spec.external_modules = node["external"]["module"]
-                if spec.external_modules is False:
-                    spec.external_modules = None
-                spec.extra_attributes = node["external"].get(
-                    "extra_attributes", syaml.syaml_dict()
-                )
-
-        # specs read in are concrete unless marked abstract
-        if node.get("concrete", True):
-            spec._mark_root_concrete()
-
-        if "patches" in node:
-            patches = node["patches"]
-            if len(patches) > 0:
-                mvar = spec.variants.setdefault("patches", vt.MultiValuedVariant("patches", ()))
-                mvar.value = patches
-                # FIXME: Monkey patches mvar to store patches order
-                mvar._patches_in_order_of_appearance = patches
-
-        # Don't read dependencies here; from_dict() is used by
-        # from_yaml() and from_json() to read the root *and* each dependency
-        # spec.
-
-        return spec
+        return SpecfileDecoder(cls).spec(node)
 
     @classmethod
     def _load(cls, data):
@@ -4772,35 +4737,13 @@ def _load(cls, data):
                 "Spec dictionary contains malformed dependencies. Old format?"
             )
 
-        hash_dict = {}
-        root_spec_hash = None
-
-        # Pass 1: Create a single lookup dictionary by hash
-        for i, node in enumerate(nodes):
-            node_hash = node[hash_type]
-            node_spec = cls.from_node_dict(node)
-            hash_dict[node_hash] = node
-            hash_dict[node_hash]["node_spec"] = node_spec
-            if i == 0:
-                root_spec_hash = node_hash
-
-        if not root_spec_hash:
+        if not nodes or not nodes[0][hash_type]:
             raise spack.error.SpecError("Spec dictionary contains no nodes.")
 
-        # Pass 2: Finish construction of all DAG edges (including build specs)
-        for node_hash, node in hash_dict.items():
-            node_spec = node["node_spec"]
-            for _, dhash, dtype, _, virtuals in cls.dependencies_from_node_dict(node):
-                node_spec._add_dependency(
-                    hash_dict[dhash]["node_spec"],
-                    depflag=dt.canonicalize(dtype),
-                    virtuals=virtuals,
-                )
-            if "build_spec" in node.keys():
-                _, bhash, _ = cls.build_spec_from_node_dict(node, hash_type=hash_type)
-                node_spec._build_spec = hash_dict[bhash]["node_spec"]
-
-        return hash_dict[root_spec_hash]["node_spec"]
+        # Pass 1 and 2: Create all the specs, and connect them (including build specs)
+        nodes_by_hash = {node[hash_type]: node for node in nodes}
+        specs = SpecfileDecoder(cls).specs(nodes_by_hash, build_spec_hash_type=hash_type)
+        return specs[nodes[0][hash_type]]
 
     @classmethod
     def read_specfile_dep_specs(cls, deps, hash_type=ht.dag_hash.name):
@@ -4948,6 +4891,268 @@ def load(cls, data):
         return cls._load(data)
 
 
+class SpecfileDecoder:
+    """Decodes the node dicts of a specfile, lockfile or database in bulk.
+
+    The concrete specs read from the same file share most of their versions, variants,
+    compilers and architectures. The decoder parses each distinct value once, and gives each
+    spec its own copy of it, so that decoded specs are identical to the ones constructed node by
+    node, and don't share mutable state. Node dicts are not modified.
+
+    Args:
+        reader: reader of the format of the node dicts
+    """
+
+    def __init__(self, reader: Type[SpecfileReaderBase]) -> None:
+        self.reader = reader
+        self._versions: Dict[Any, vn.VersionList] = {}
+        self._architectures: Dict[Any, ArchSpec] = {}
+        self._compilers: Dict[Any, CompilerSpec] = {}
+        self._variants: Dict[Any, vt.AbstractVariant] = {}
+        self._depflags: Dict[Tuple[str, ...], dt.DepFlag] = {}
+        self._hash_attributes = [(h.attr, h.name) for h in ht.hashes]
+
+    def spec(self, node: dict) -> "Spec":
+        """Constructs a spec from its node dict, without its dependencies."""
+        spec = Spec()
+
+        name, node = self.reader.name_and_data(node)
+        for attr, hash_name in self._hash_attributes:
+            setattr(spec, attr, node.get(hash_name, None))
+        # Package hashes are shared by all the specs of the same package version
+        spec._package_hash = _interned(spec._package_hash)
+
+        spec.name = _interned(name)
+        spec.namespace = _interned(node.get("namespace", None))
+
+        if "version" in node or "versions" in node:
+            spec.versions = self._versions_from(node)
+            spec.attach_git_version_lookup()
+
+        if "arch" in node:
+            spec.architecture = self._architecture_from(node)
+
+        if "compiler" in node:
+            spec.compiler = self._compiler_from(node)
+        else:
+            spec.compiler = None
+
+        for name, values in node.get("parameters", {}).items():
+            if name in _valid_compiler_flags:
+                spec.compiler_flags[name] = []
+                for val in values:
+                    spec.compiler_flags.add_flag(name, val, False)
+            else:
+                spec.variants[name] = self._variant_from(name, values)
+
+        spec.external_path = None
+        spec.external_modules = None
+        if "external" in node:
+            # This conditional is needed because sometimes this function is
+            # called with a node already constructed that contains a 'versions'
+            # and 'external' field. Related to virtual packages provider
+            # indexes.
+            if node["external"]:
+                spec.external_path = node["external"]["path"]
+                spec.external_modules = node["external"]["module"]
+                if spec.external_modules is False:
+                    spec.external_modules = None
+                spec.extra_attributes = node["external"].get(
+                    "extra_attributes", syaml.syaml_dict()
+                )
+
+        # specs read in are concrete unless marked abstract
+        if node.get("concrete", True):
+            spec._mark_root_concrete()
+
+        if "patches" in node:
+            patches = node["patches"]
+            if len(patches) > 0:
+                mvar = spec.variants.setdefault("patches", vt.MultiValuedVariant("patches", ()))
+                mvar.value = patches
+                # FIXME: Monkey patches mvar to store patches order
+                mvar._patches_in_order_of_appearance = patches
+
+        # Don't read dependencies here; from_dict() is used by
+        # from_yaml() and from_json() to read the root *and* each dependency
+        # spec.
+
+        return spec
+
+    def add_dependencies(self, spec: "Spec", node: dict, specs: Dict[str, "Spec"]) -> None:
+        """Connects a spec to its dependencies, listed in its node dict.
+
+        Args:
+            spec: spec constructed from the node dict
+            node: node dict of the spec
+            specs: all the specs, by the hashes used in the node dicts to refer to dependencies
+        """
+        _, node = self.reader.name_and_data(node)
+        for _, dhash, dtypes, _, virtuals in self.reader.dependencies_from_node_dict(node):
+            dependency, depflag = specs[dhash], self._depflag(dtypes)
+            if not dependency.name or dependency.name in spec._dependencies.edges:
+                # Let the spec merge or validate multiple edges to the same package
+                spec._add_dependency(dependency, depflag=depflag, virtuals=virtuals)
+                continue
+
+            # Usual case of a first edge to a package, where there is nothing to check
+            edge = DependencySpec(spec, dependency, depflag=depflag, virtuals=virtuals)
+            spec._dependencies.add(edge)
+            dependency._dependents.add(edge)
+
+    def specs(
+        self, nodes: Dict[str, dict], *, build_spec_hash_type: Optional[str] = None
+    ) -> Dict[str, "Spec"]:
+        """Constructs the specs of many node dicts, and connects them.
+
+        Args:
+            nodes: node dicts by the hashes used to refer to dependencies
+            build_spec_hash_type: if given, also connect specs to their build specs, which are
+                referred to by this type of hash
+
+        Returns:
+            The specs, by the same keys as the node dicts
+        """
+        specs = {key: self.spec(node) for key, node in nodes.items()}
+        for key, node in nodes.items():
+            spec = specs[key]
+            self.add_dependencies(spec, node, specs)
+            if build_spec_hash_type and "build_spec" in node:
+                _, bhash, _ = self.reader.build_spec_from_node_dict(
+                    node, hash_type=build_spec_hash_type
+                )
+                spec._build_spec = specs[bhash]
+        return specs
+
+    def _versions_from(self, d: dict) -> vn.VersionList:
+        key = tuple(d["versions"]) if "versions" in d else d["version"]
+        template = self._versions.get(key)
+        if template is None:
+            template = vn.VersionList.from_dict(d)
+            # Git versions are attached to a lookup of their own package, and are not shared
+            if _has_git_version(template):
+                return template
+            self._versions[key] = template
+        return template.copy()
+
+    def _architecture_from(self, node: dict) -> ArchSpec:
+        arch = node["arch"]
+        target = arch["target"]
+        target_name = target if isinstance(target, str) else target["name"]
+        key = (arch["platform"], arch["platform_os"], target_name)
+        template = self._architectures.get(key)
+        if template is None:
+            template = self._architectures[key] = ArchSpec.from_dict(node)
+        return template.copy()
+
+    def _compiler_from(self, node: dict) -> CompilerSpec:
+        compiler = node["compiler"]
+        key = (compiler["name"], compiler.get("version"), tuple(compiler.get("versions", ())))
+        template = self._compilers.get(key)
+        if template is None:
+            template = CompilerSpec.from_dict(node)
+            if _has_git_version(template.versions):
+                return template
+            self._compilers[key] = template
+        return template.copy()
+
+    def _variant_from(self, name: str, values: Any) -> vt.AbstractVariant:
+        key = (name, tuple(values) if isinstance(values, list) else values)
+        template = self._variants.get(key)
+        if template is None:
+            template = vt.MultiValuedVariant.from_node_dict(name, values)
+            self._variants[key] = template
+        return template._clone()
+
+    def _depflag(self, deptypes: List[str]) -> dt.DepFlag:
+        key = tuple(deptypes)
+        result = self._depflags.get(key)
+        if result is None:
+            result = self._depflags[key] = dt.canonicalize(deptypes)
+        return result
+
+
+def _has_git_version(versions: vn.VersionList) -> bool:
+    return any(isinstance(v, vn.GitVersion) for v in versions)
+
+
+class SatisfiesCache:
+    """Bounded LRU cache of the results of ``Spec.satisfies`` for concrete specs.
+
+    The same concrete specs are checked many times against the same constraints, e.g. when
+    module files, views or filters are configured for installed specs. Results are keyed by the
+    DAG hash of the concrete spec, and by the *string* passed as a constraint. Strings are
+    immutable, so no result can get stale when a constraint changes. Constraints passed as
+    ``Spec`` objects are not cached: they are mutable, and computing their canonical string costs
+    more than most checks.
+
+    The strings are parsed only once, and the cache is cleared when the package repository
+    changes, since checks against virtual packages depend on it.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        #: Maximum number of results, and of parsed constraints, that are kept
+        self.maxsize = maxsize
+        #: Number of results found in the cache
+        self.hits = 0
+        #: Number of results that had to be computed
+        self.misses = 0
+        self._results: Dict[Tuple[str, str, bool], bool] = {}
+        self._constraints: Dict[str, "Spec"] = {}
+        self._repo = None
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of the results that were found in the cache"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self) -> None:
+        """Drop all the results and parsed constraints, and reset the statistics"""
+        self._results.clear()
+        self._constraints.clear()
+        self.hits = self.misses = 0
+
+    def satisfies(self, spec: "Spec", constraint: str, deps: bool) -> bool:
+        """Same as ``spec.satisfies(constraint, deps=deps)`` for a concrete spec with a hash"""
+        if self._repo is not spack.repo.PATH:
+            self.clear()
+            self._repo = spack.repo.PATH
+
+        key = (spec._hash, constraint, deps)
+        try:
+            # Pop and insert again to move the result to the end, as the most recently used
+            result = self._results.pop(key)
+            self.hits += 1
+        except KeyError:
+            result = spec._satisfies(self._parse(constraint), deps)
+            self.misses += 1
+            if len(self._results) >= self.maxsize:
+                del self._results[next(iter(self._results))]
+        self._results[key] = result
+        return result
+
+    def _parse(self, constraint: str) -> "Spec":
+        try:
+            result = self._constraints.pop(constraint)
+        except KeyError:
+            result = Spec(constraint)
+            if len(self._constraints) >= self.maxsize:
+                del self._constraints[next(iter(self._constraints))]
+        self._constraints[constraint] = result
+        return result
+
+    def __str__(self) -> str:
+        return (
+            f"{self.hits} hits, {self.misses} misses ({self.hit_rate:.1%} hit rate), "
+            f"{len(self._results)}/{self.maxsize} results"
+        )
+
+
+#: Cache of the results of ``Spec.satisfies`` for concrete specs
+SATISFIES_CACHE = SatisfiesCache(maxsize=1 << 16)
+
+
 class LazySpecCache(collections.defaultdict):
     """Cache for Specs that uses a spec_like as key, and computes lazily
     the corresponding value ``Spec(spec_like``.
@@ -157,6 +157,8 @@ class Store:
             truncated to this length
         upstreams: optional list of upstream databases
         lock_cfg: lock configuration for the database
+        binary_index: whether the database should also be written in its binary format
+        journal: whether database changes should be appended to a journal
     """
 
     def __init__(
@@ -167,6 +169,8 @@ def __init__(
         hash_length: Optional[int] = None,
         upstreams: Optional[List[spack.database.Database]] = None,
         lock_cfg: spack.database.LockConfiguration = spack.database.NO_LOCK,
+        binary_index: bool = False,
+        journal: bool = False,
     ) -> None:
         self.root = root
         self.unpadded_root = unpadded_root or root
@@ -174,11 +178,18 @@ def __init__(
         self.hash_length = hash_length
         self.upstreams = upstreams
         self.lock_cfg = lock_cfg
+        self.binary_index = binary_index
+        self.journal = journal
         self.layout = spack.directory_layout.DirectoryLayout(
             root, projections=projections, hash_length=hash_length
         )
         self.db = spack.database.Database(
-            root, upstream_dbs=upstreams, lock_cfg=lock_cfg, layout=self.layout
+            root,
+            upstream_dbs=upstreams,
+            lock_cfg=lock_cfg,
+            layout=self.layout,
+            binary_index=binary_index,
+            journal=journal,
         )
 
         timeout_format_str = (
@@ -205,6 +216,8 @@ def __reduce__(self):
             self.hash_length,
             self.upstreams,
             self.lock_cfg,
+            self.binary_index,
+            self.journal,
         )
 
 
@@ -232,6 +245,8 @@ def create(configuration: ConfigurationType) -> Store:
         hash_length=hash_length,
         upstreams=upstreams,
         lock_cfg=spack.database.lock_configuration(configuration),
+        binary_index=configuration.get("config:db_binary_index", False),
+        journal=configuration.get("config:db_journal", False),
     )
 
 
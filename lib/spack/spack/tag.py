@@ -111,13 +111,16 @@ def merge(self, other):
             spkgs, opkgs = self.tags[tag], other.tags[tag]
             self.tags[tag] = sorted(list(set(spkgs + opkgs)))
 
-    def update_package(self, pkg_name):
+    def update_package(self, pkg_name, tags=None):
         """Updates a package in the tag index.
 
         Args:
             pkg_name (str): name of the package to be removed from the index
+            tags (list or None): tags of the package, or None to read them from the package
         """
-        pkg_cls = self.repository.get_pkg_class(pkg_name)
+        if tags is None:
+            pkg_cls = self.repository.get_pkg_class(pkg_name)
+            tags = getattr(pkg_cls, "tags", [])
 
         # Remove the package from the list of packages, if present
         for pkg_list in self._tag_dict.values():
@@ -125,9 +128,9 @@ def update_package(self, pkg_name):
                 pkg_list.remove(pkg_name)
 
         # Add it again under the appropriate tags
-        for tag in getattr(pkg_cls, "tags", []):
+        for tag in tags:
             tag = tag.lower()
-            self._tag_dict[tag].append(pkg_cls.name)
+            self._tag_dict[tag].append(pkg_name)
 
 
 class TagIndexError(spack.error.SpackError):
@@ -0,0 +1,170 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+import json
+import os
+import pathlib
+
+import pytest
+
+import spack.binary_blobs
+import spack.util.archive
+import spack.util.url as url_util
+from spack.binary_blobs import BlobError, BlobStore, ManifestRecorder
+
+pytestmark = pytest.mark.not_on_windows("symlinks and hardlinks are not portable")
+
+
+def _make_prefix(root: pathlib.Path, shared: bytes, own: bytes) -> pathlib.Path:
+    (root / "lib").mkdir(parents=True)
+    (root / "lib" / "shared.so").write_bytes(shared)
+    (root / "bin").mkdir()
+    (root / "bin" / "exe").write_bytes(own)
+    (root / "bin" / "exe").chmod(0o755)
+    (root / "bin" / "link").symlink_to("exe")
+    os.link(root / "bin" / "exe", root / "bin" / "hardlink")
+    return root
+
+
+def _record(prefix: pathlib.Path, compression: str = "gzip") -> ManifestRecorder:
+    recorder = ManifestRecorder(compression)
+    spack.util.archive.reproducible_tarfile_from_prefix(
+        recorder,
+        str(prefix),
+        path_to_name=lambda path: pathlib.Path(path).relative_to(prefix).as_posix(),
+    )
+    return recorder
+
+
+def test_blobs_are_shared_by_prefixes(tmp_path):
+    """Tests that the files two prefixes have in common are uploaded only once, and that both
+    prefixes can be recreated from the blobs"""
+    cache_prefix = url_util.path_to_file_url(str(tmp_path / "build_cache"))
+    tmpdir = tmp_path / "tmp"
+    tmpdir.mkdir()
+
+    first = _record(_make_prefix(tmp_path / "first", b"shared", b"first"))
+    second = _record(_make_prefix(tmp_path / "second", b"shared", b"second"))
+    assert spack.binary_blobs.push_blobs(first.sources, cache_prefix, "gzip", str(tmpdir)) == 2
+    assert spack.binary_blobs.push_blobs(second.sources, cache_prefix, "gzip", str(tmpdir)) == 1
+    assert len(list((tmp_path / "build_cache").rglob("*.gz"))) == 3
+
+    store = BlobStore(str(tmp_path / "store"))
+    manifest_path = tmp_path / "second.manifest.json"
+    manifest_path.write_text(json.dumps(second.manifest()))
+    manifest = spack.binary_blobs.load_manifest(str(manifest_path))
+    assert len(store.missing(manifest)) == 2
+    store.fetch(store.missing(manifest), cache_prefix, "gzip")
+    assert not store.missing(manifest)
+
+    extracted = tmp_path / "extracted"
+    extracted.mkdir()
+    store.extract(manifest, str(extracted))
+    assert (extracted / "lib" / "shared.so").read_bytes() == b"shared"
+    assert (extracted / "bin" / "exe").read_bytes() == b"second"
+    assert os.access(extracted / "bin" / "exe", os.X_OK)
+    assert os.readlink(extracted / "bin" / "link") == "exe"
+    assert os.path.samefile(extracted / "bin" / "exe", extracted / "bin" / "hardlink")
+
+
+@pytest.mark.parametrize(
+    "entry",
+    [
+        {"type": "dir", "path": "../outside"},
+        {"type": "dir", "path": "/outside"},
+        {"type": "hardlink", "path": "link", "target": "../../etc/passwd"},
+        {"type": "file", "path": "file", "mode": 0o644, "size": 0, "digest": "not-a-digest"},
+    ],
+)
+def test_manifest_with_entries_outside_of_prefix_is_rejected(entry, tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps({"version": 1, "compression": "gzip", "entries": [entry]}))
+    with pytest.raises(BlobError):
+        spack.binary_blobs.load_manifest(str(path))
+
+
+def test_extract_does_not_follow_symlinks_outside_of_prefix(tmp_path):
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    prefix = tmp_path / "prefix"
+    prefix.mkdir()
+    manifest = {
+        "version": 1,
+        "compression": "gzip",
+        "entries": [
+            {"type": "symlink", "path": "lib", "target": str(outside)},
+            {"type": "dir", "path": "lib/evil"},
+        ],
+    }
+    with pytest.raises(BlobError, match="outside of the prefix"):
+        BlobStore(str(tmp_path / "store")).extract(manifest, str(prefix))
+    assert not os.listdir(outside)
+
+
+@pytest.mark.parametrize(
+    "entries",
+    [
+        [{"type": "dir", "path": "lib"}, {"type": "symlink", "path": "./lib", "target": "/"}],
+        [
+            {"type": "symlink", "path": "passwd", "target": "/etc/passwd"},
+            {"type": "hardlink", "path": "link", "target": "passwd"},
+        ],
+    ],
+)
+def test_manifest_with_ambiguous_entries_is_rejected(entries, tmp_path):
+    """Tests that a path cannot be listed twice, and that hardlinks point to earlier files"""
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps({"version": 1, "compression": "gzip", "entries": entries}))
+    with pytest.raises(BlobError):
+        spack.binary_blobs.load_manifest(str(path))
+
+
+def test_extract_does_not_write_through_symlinks(tmp_path):
+    """Tests that files replace the symlinks at their path, instead of being written through
+    them, and that their mode is masked by the umask"""
+    outside = tmp_path / "outside"
+    outside.write_bytes(b"outside")
+    outside.chmod(0o600)
+    prefix = tmp_path / "prefix"
+    prefix.mkdir()
+    (prefix / "file").symlink_to(outside)
+
+    store = BlobStore(str(tmp_path / "store"))
+    digest = "a" * 64
+    pathlib.Path(store.path(digest)).parent.mkdir(parents=True)
+    pathlib.Path(store.path(digest)).write_bytes(b"inside")
+    manifest = {
+        "version": 1,
+        "compression": "gzip",
+        "entries": [{"type": "file", "path": "file", "mode": 0o4777, "size": 6, "digest": digest}],
+    }
+    umask = os.umask(0o027)
+    try:
+        store.extract(manifest, str(prefix))
+    finally:
+        os.umask(umask)
+
+    assert outside.read_bytes() == b"outside"
+    assert (outside.stat().st_mode & 0o7777) == 0o600
+    assert not (prefix / "file").is_symlink()
+    assert (prefix / "file").read_bytes() == b"inside"
+    assert ((prefix / "file").stat().st_mode & 0o7777) == 0o750
+
+
+def test_corrupted_blob_is_not_stored(tmp_path):
+    cache_prefix = url_util.path_to_file_url(str(tmp_path / "build_cache"))
+    tmpdir = tmp_path / "tmp"
+    tmpdir.mkdir()
+    recorder = _record(_make_prefix(tmp_path / "prefix", b"shared", b"own"))
+    spack.binary_blobs.push_blobs(recorder.sources, cache_prefix, "gzip", str(tmpdir))
+
+    # Replace the contents of a blob with the contents of another one
+    blobs = sorted((tmp_path / "build_cache").rglob("*.gz"))
+    blobs[0].write_bytes(blobs[1].read_bytes())
+    digest = blobs[0].name[: -len(".gz")]
+
+    store = BlobStore(str(tmp_path / "store"))
+    with pytest.raises(BlobError, match="checksum"):
+        store.fetch([digest], cache_prefix, "gzip")
+    assert not os.path.exists(store.path(digest))
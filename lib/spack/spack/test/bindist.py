@@ -5,6 +5,7 @@
 import filecmp
 import glob
 import gzip
+import hashlib
 import io
 import json
 import os
@@ -37,6 +38,8 @@
 import spack.spec
 import spack.stage
 import spack.store
+import spack.util.crypto
+import spack.util.file_cache
 import spack.util.gpg
 import spack.util.spack_yaml as syaml
 import spack.util.url as url_util
@@ -463,6 +466,160 @@ def test_generate_index_missing(monkeypatch, tmpdir, mutable_config):
         assert "libelf" not in cache_list
 
 
+@pytest.mark.usefixtures("install_mockery", "mock_packages", "mock_fetch")
+def test_update_index_reads_only_new_specfiles(monkeypatch, tmp_path, mutable_config):
+    """Tests that updating the index reads only the specfiles of specs that are not in the
+    sharded index yet, and pushes only the shards that changed."""
+    mirror_dir = tmp_path / "mirror_dir"
+    spack.config.set("mirrors", {"test": url_util.path_to_file_url(str(mirror_dir))})
+
+    install_cmd("--no-cache", "libdwarf")
+    buildcache_cmd("push", "-u", str(mirror_dir), "libdwarf")
+    buildcache_cmd("update-index", str(mirror_dir))
+
+    shards_dir = mirror_dir / "build_cache" / bindist.INDEX_SHARDS_RELATIVE_PATH
+    manifest = json.loads((shards_dir / bindist.INDEX_MANIFEST_NAME).read_text())
+    assert manifest["shards"]
+    index_hash = (mirror_dir / "build_cache" / "index.json.hash").read_text()
+    assert manifest["index_hash"] == index_hash
+    shard_mtimes = {p.name: p.stat().st_mtime_ns for p in shards_dir.glob("*-*.json")}
+
+    read_specs = []
+    original_from_json = bindist.Spec.from_json
+
+    def _from_json(*args, **kwargs):
+        read_specs.append(args)
+        return original_from_json(*args, **kwargs)
+
+    monkeypatch.setattr(bindist.Spec, "from_json", _from_json)
+    buildcache_cmd("update-index", str(mirror_dir))
+
+    assert not read_specs
+    assert json.loads((shards_dir / bindist.INDEX_MANIFEST_NAME).read_text()) == manifest
+    assert {p.name: p.stat().st_mtime_ns for p in shards_dir.glob("*-*.json")} == shard_mtimes
+
+    # The monolithic index has the same records as the shards
+    index = json.loads((mirror_dir / "build_cache" / "index.json").read_text())
+    assert set(index["database"]["installs"]) == {
+        h
+        for p in shards_dir.glob("*-*.json")
+        for h in json.loads(p.read_text())["database"]["installs"]
+    }
+
+
+def test_sharded_index_fetches_only_changed_shards(tmp_path):
+    """Tests that the fetcher of a sharded index downloads only the shards it doesn't have"""
+    shards = {
+        "a": bindist._index_json({"a" * 32: {"spec": {"name": "a"}}}),
+        "b": bindist._index_json({"b" * 32: {"spec": {"name": "b"}}}),
+    }
+    fetched = []
+
+    def index():
+        installs = {}
+        for data in shards.values():
+            installs.update(json.loads(data)["database"]["installs"])
+        return bindist._index_json(installs)
+
+    def manifest():
+        return json.dumps(
+            {
+                "version": bindist.INDEX_MANIFEST_VERSION,
+                "index_hash": bindist.compute_hash(index()),
+                "shards": {
+                    name: {
+                        "file": f"{name}-{bindist.compute_hash(data)}.json",
+                        "hash": bindist.compute_hash(data),
+                    }
+                    for name, data in shards.items()
+                },
+            }
+        )
+
+    def urlopen(request: urllib.request.Request):
+        url = request.get_full_url()
+        if url.endswith(bindist.INDEX_MANIFEST_NAME):
+            data = manifest()
+        elif url.endswith("index.json.hash"):
+            data = bindist.compute_hash(index())
+        else:
+            fetched.append(url)
+            name = url.rsplit("/", 1)[1]
+            data = shards[name[0]]
+            assert name == f"{name[0]}-{bindist.compute_hash(data)}.json"
+        return urllib.response.addinfourl(
+            io.BytesIO(data.encode()), headers={}, url=url, code=200  # type: ignore[arg-type]
+        )
+
+    cache = spack.util.file_cache.FileCache(str(tmp_path))
+    url = "https://www.example.com"
+
+    result = bindist.ShardedIndexFetcher(
+        url, None, cache=cache, urlopen=urlopen
+    ).conditional_fetch()
+    assert not result.fresh
+    assert result.hash == bindist.compute_hash(manifest())
+    assert set(json.loads(result.data)["database"]["installs"]) == {"a" * 32, "b" * 32}
+    assert len(fetched) == 2
+
+    # Nothing changed
+    fetcher = bindist.ShardedIndexFetcher(url, result.hash, cache=cache, urlopen=urlopen)
+    assert fetcher.conditional_fetch().fresh
+    assert len(fetched) == 2
+
+    # Only one shard changed
+    shards["b"] = bindist._index_json({"b" * 32: {"spec": {"name": "b"}}, "b" + "c" * 31: {}})
+    fetcher = bindist.ShardedIndexFetcher(url, result.hash, cache=cache, urlopen=urlopen)
+    result = fetcher.conditional_fetch()
+    assert not result.fresh
+    assert len(json.loads(result.data)["database"]["installs"]) == 3
+    assert len(fetched) == 3 and fetched[-1].split("/")[-1].startswith("b-")
+
+
+def test_sharded_index_out_of_sync_falls_back_to_index_json(tmp_path):
+    """Tests that the fetcher of a sharded index reads index.json when the manifest records
+    another index hash, for instance when index.json was updated by an older client"""
+    shard = bindist._index_json({"a" * 32: {"spec": {"name": "a"}}})
+    index = bindist._index_json({"a" * 32: {"spec": {"name": "a"}}, "b" * 32: {}})
+    manifest = json.dumps(
+        {
+            "version": bindist.INDEX_MANIFEST_VERSION,
+            "index_hash": bindist.compute_hash(shard),
+            "shards": {
+                "a": {
+                    "file": f"a-{bindist.compute_hash(shard)}.json",
+                    "hash": bindist.compute_hash(shard),
+                }
+            },
+        }
+    )
+    files = {
+        bindist.INDEX_MANIFEST_NAME: manifest,
+        "index.json": index,
+        "index.json.hash": bindist.compute_hash(index),
+    }
+    fetched = []
+
+    def urlopen(request: urllib.request.Request):
+        url = request.get_full_url()
+        fetched.append(url.rsplit("/", 1)[1])
+        data = files[fetched[-1]]
+        return urllib.response.addinfourl(
+            io.BytesIO(data.encode()), headers={}, url=url, code=200  # type: ignore[arg-type]
+        )
+
+    cache = spack.util.file_cache.FileCache(str(tmp_path))
+    fetcher = bindist.ShardedIndexFetcher(
+        "https://www.example.com", None, cache=cache, urlopen=urlopen
+    )
+    result = fetcher.conditional_fetch()
+
+    assert not result.fresh
+    assert result.hash == bindist.compute_hash(index)
+    assert result.data == index
+    assert not any(name.startswith("a-") for name in fetched)
+
+
 def test_generate_key_index_failure(monkeypatch, tmp_path):
     def list_url(url, recursive=False):
         if "fails-listing" in url:
@@ -1111,6 +1268,113 @@ def test_tarfile_with_files_outside_common_prefix(tmpdir, dummy_prefix):
             bindist._ensure_common_prefix(tarfile.open("broken.tar", mode="r"))
 
 
+class _MockSpec:
+    def __init__(self, prefix):
+        self.prefix = prefix
+
+
+@pytest.mark.parametrize("mode", ["w", "w:gz"])
+def test_extract_tarball_stream(dummy_prefix, tmp_path, mode):
+    """Tests that a tarball is extracted into the prefix while it is read, and that its
+    checksum is computed on the fly."""
+    tarball = tmp_path / "example.spack"
+    with tarfile.open(tarball, mode=mode) as tar:
+        tar.add(name=dummy_prefix)
+    checksum = {
+        "hash_algorithm": "sha256",
+        "hash": spack.util.crypto.checksum(hashlib.sha256, tarball),
+    }
+
+    spec = _MockSpec(str(tmp_path / "install" / "prefix"))
+    os.makedirs(spec.prefix)
+    with open(tarball, "rb") as stream:
+        bindist._extract_tarball_stream(spec, stream, str(tarball), checksum)
+
+    assert set(os.listdir(spec.prefix)) == {"bin", "share", ".spack"}
+    assert readlink(os.path.join(spec.prefix, "bin", "relative_app_link")) == "app"
+    assert os.listdir(tmp_path / "install") == ["prefix"]
+
+
+def test_extract_tarball_stream_wrong_checksum(dummy_prefix, tmp_path):
+    """Tests that nothing is extracted into the prefix if the checksum does not match."""
+    tarball = tmp_path / "example.spack"
+    with tarfile.open(tarball, mode="w:gz") as tar:
+        tar.add(name=dummy_prefix)
+    checksum = {"hash_algorithm": "sha256", "hash": "0" * 64}
+
+    spec = _MockSpec(str(tmp_path / "install" / "prefix"))
+    os.makedirs(spec.prefix)
+    with open(tarball, "rb") as stream, pytest.raises(bindist.NoChecksumException):
+        bindist._extract_tarball_stream(spec, stream, str(tarball), checksum)
+
+    assert not os.listdir(spec.prefix)
+    assert os.listdir(tmp_path / "install") == ["prefix"]
+
+
+def test_extract_tarball_stream_rejects_files_outside_of_archive(tmp_path):
+    tarball = tmp_path / "broken.spack"
+    with tarfile.open(tarball, mode="w") as tar:
+        tar.addfile(tarfile.TarInfo(name="../config_file"), fileobj=io.BytesIO(b"hello"))
+    checksum = {
+        "hash_algorithm": "sha256",
+        "hash": spack.util.crypto.checksum(hashlib.sha256, tarball),
+    }
+
+    spec = _MockSpec(str(tmp_path / "install" / "prefix"))
+    os.makedirs(spec.prefix)
+    with open(tarball, "rb") as stream, pytest.raises(ValueError, match="outside of the archive"):
+        bindist._extract_tarball_stream(spec, stream, str(tarball), checksum)
+    assert not (tmp_path / "install" / "config_file").exists()
+
+
+def _link_member(name, linkname, type=tarfile.SYMTYPE):
+    info = tarfile.TarInfo(name=name)
+    info.type = type
+    info.linkname = linkname
+    return info
+
+
+@pytest.mark.parametrize(
+    "members,error",
+    [
+        # A file written through a symlink to a directory outside of the archive
+        ([_link_member("prefix/a", "../../../outside"), "prefix/a/config_file"], "through a link"),
+        # A file replacing a symlink to a file outside of the archive
+        ([_link_member("prefix/a", "../../../outside/config_file"), "prefix/a"], "through a link"),
+        # A hard link to a file outside of the archive
+        (
+            [_link_member("prefix/a", "../outside/config_file", type=tarfile.LNKTYPE)],
+            "not a file of the archive",
+        ),
+    ],
+)
+def test_extract_tarball_stream_rejects_writes_through_links(tmp_path, members, error):
+    """Tests that members of a tarball that is not verified yet cannot be written outside of
+    the directory it is extracted into."""
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "config_file").write_text("original")
+    tarball = tmp_path / "broken.spack"
+    with tarfile.open(tarball, mode="w") as tar:
+        for member in members:
+            if isinstance(member, str):
+                tar.addfile(tarfile.TarInfo(name=member), fileobj=io.BytesIO(b""))
+            else:
+                tar.addfile(member)
+    checksum = {
+        "hash_algorithm": "sha256",
+        "hash": spack.util.crypto.checksum(hashlib.sha256, tarball),
+    }
+
+    spec = _MockSpec(str(tmp_path / "install" / "prefix"))
+    os.makedirs(spec.prefix)
+    with open(tarball, "rb") as stream, pytest.raises(ValueError, match=error):
+        bindist._extract_tarball_stream(spec, stream, str(tarball), checksum)
+    assert os.listdir(tmp_path / "install") == ["prefix"]
+    assert os.listdir(outside) == ["config_file"]
+    assert (outside / "config_file").read_text() == "original"
+
+
 def test_tarfile_of_spec_prefix(tmpdir):
     """Tests whether hardlinks, symlinks, files and dirs are added correctly,
     and that the order of entries is correct."""
@@ -0,0 +1,72 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+import pytest
+
+import spack.build_times
+import spack.spec
+import spack.util.file_cache
+import spack.util.spack_json as sjson
+
+
+@pytest.fixture()
+def build_times(tmpdir):
+    return spack.build_times.BuildTimes(spack.util.file_cache.FileCache(str(tmpdir)))
+
+
+def _spec(name, version, variants):
+    return spack.spec.Spec(f"{name}@={version}{variants}")
+
+
+def test_estimate_falls_back_to_similar_builds(build_times):
+    build_times.record(_spec("zlib", "1.2", "+shared"), 10.0)
+    build_times.record(_spec("zlib", "1.2", "~shared"), 20.0)
+    build_times.record(_spec("zlib", "1.3", "+shared"), 60.0)
+
+    assert build_times.estimate(_spec("zlib", "1.2", "~shared")) == 20.0
+    assert build_times.estimate(_spec("zlib", "1.2", "+pic")) == 15.0
+    assert build_times.estimate(_spec("zlib", "1.4", "+shared")) == 30.0
+    assert build_times.estimate(_spec("cmake", "3.0", "")) is None
+    assert build_times.default_estimate() == 30.0
+
+
+def test_build_times_are_averaged_and_persisted(build_times, tmpdir):
+    spec = _spec("zlib", "1.2", "+shared")
+    build_times.record(spec, 10.0)
+    build_times.record(spec, 20.0)
+    assert build_times.estimate(spec) == 15.0
+
+    # A new instance reads the data back from the cache
+    other = spack.build_times.BuildTimes(build_times.cache)
+    assert other.estimate(spec) == 15.0
+
+
+def test_default_estimate_without_history(build_times):
+    assert build_times.default_estimate() == 1.0
+
+
+@pytest.mark.parametrize(
+    "timer,expected",
+    [({"total": 42.0, "cache": False}, 42.0), ({"total": 42.0, "cache": True}, None)],
+)
+def test_record_from_timer(build_times, tmpdir, timer, expected):
+    """Only builds from source are recorded"""
+    spec = _spec("zlib", "1.2", "+shared")
+    path = tmpdir.join("install_times.json")
+    path.write(sjson.dump(timer))
+    build_times.record_from_timer(spec, str(path))
+    assert build_times.estimate(spec) == expected
+
+
+def test_invalid_build_times_are_ignored(build_times):
+    spec = _spec("zlib", "1.2", "+shared")
+    build_times.cache.init_entry(spack.build_times.CACHE_KEY)
+    with open(build_times.cache.cache_path(spack.build_times.CACHE_KEY), "w") as f:
+        f.write("not json")
+
+    assert build_times.estimate(spec) is None
+    build_times.record(spec, 10.0)
+    assert build_times.estimate(spec) == 10.0
+    build_times.record_from_timer(spec, "/does/not/exist")
+    assert build_times.estimate(spec) == 10.0
@@ -40,7 +40,7 @@ def test_build_task_basics(install_mockery):
     task = inst.BuildTask(spec.package, request, False, 0, 0, inst.STATUS_ADDED, set())
     assert not task.explicit
     assert task.priority == len(task.uninstalled_deps)
-    assert task.key == (task.priority, task.sequence)
+    assert task.key == (task.priority, task.deferrals, -task.critical_path, task.sequence)
 
     # Ensure flagging installed works as expected
     assert len(task.uninstalled_deps) > 0
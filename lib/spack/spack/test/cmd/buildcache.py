@@ -11,13 +11,16 @@
 
 import pytest
 
+import spack.binary_blobs
 import spack.binary_distribution
 import spack.cmd.buildcache
+import spack.config
 import spack.environment as ev
 import spack.error
 import spack.main
 import spack.mirror
 import spack.spec
+import spack.util.archive
 import spack.util.url
 from spack.installer import PackageInstaller
 from spack.spec import Spec
@@ -448,6 +451,40 @@ def test_push_and_install_with_mirror_marked_unsigned_does_not_require_extra_fla
     PackageInstaller([spec.package], **kwargs).install()
 
 
+@pytest.mark.parametrize(
+    "compression",
+    [
+        "gzip",
+        pytest.param(
+            "zstd",
+            marks=pytest.mark.skipif(
+                not spack.util.archive.ZSTD_SUPPORTED, reason="requires zstandard"
+            ),
+        ),
+    ],
+)
+def test_push_and_install_with_mirror_compression(tmp_path, mutable_database, compression):
+    """Tests that the compression of a mirror is used when pushing, and recorded in the
+    specfile, so that tarballs can be installed from it."""
+    mirror("add", "--unsigned", "--compression", compression, "my-mirror", str(tmp_path))
+    spec = mutable_database.query_local("libelf", installed=True)[0]
+    buildcache("push", "my-mirror", f"/{spec.dag_hash()}")
+
+    specfile = (
+        tmp_path / "build_cache" / spack.binary_distribution.tarball_name(spec, ".spec.json")
+    )
+    spec_dict = json.loads(specfile.read_text())
+    assert spec_dict["binary_cache_checksum"].get("compression", "gzip") == compression
+
+    # Versions of Spack that only know gzip must skip other tarballs
+    expected_layout = 2 if compression == "gzip" else 3
+    assert spec_dict["buildcache_layout_version"] == expected_layout
+
+    spec.package.do_uninstall(force=True)
+    PackageInstaller([spec.package], explicit=True, cache_only=True).install()
+    assert spec.installed
+
+
 def test_skip_no_redistribute(mock_packages, config):
     specs = list(Spec("no-redistribute-dependent").concretized().traverse())
     filtered = spack.cmd.buildcache._skip_no_redistribute_for_public(specs)
@@ -504,3 +541,96 @@ def test_push_without_build_deps(tmp_path, temporary_store, mock_packages, mutab
         "push", "--update-index", "--without-build-dependencies", "my-mirror", f"/{s.dag_hash()}"
     )
     assert spack.binary_distribution.update_cache_and_get_specs() == [s]
+
+
+def test_push_and_install_from_deduplicated_mirror(
+    tmp_path, mutable_database, mutable_config, monkeypatch
+):
+    """Tests that specs pushed to a deduplicated mirror are stored as a manifest and blobs, and
+    that only the blobs missing in the local blob store are downloaded when installing."""
+    spack.config.set("config:binary_blob_store", True)
+    monkeypatch.setattr(
+        spack.binary_distribution,
+        "blob_store",
+        lambda: spack.binary_blobs.BlobStore(str(tmp_path / "blob_store")),
+    )
+    mirror("add", "--unsigned", "--deduplicate", "my-mirror", str(tmp_path / "mirror"))
+    spec = mutable_database.query_local("libelf", installed=True)[0]
+    buildcache("push", "my-mirror", f"/{spec.dag_hash()}")
+
+    build_cache = tmp_path / "mirror" / "build_cache"
+    specfile = build_cache / spack.binary_distribution.tarball_name(spec, ".spec.json")
+    spec_dict = json.loads(specfile.read_text())
+    assert spec_dict["binary_cache_checksum"]["format"] == "manifest"
+    # Versions of Spack that only know tarballs must skip the spec
+    assert spec_dict["buildcache_layout_version"] == 4
+    assert (
+        build_cache / spack.binary_distribution.tarball_path_name(spec, ".manifest.json")
+    ).exists()
+    assert not (build_cache / spack.binary_distribution.tarball_path_name(spec, ".spack")).exists()
+    blobs = {p.name: p.stat().st_mtime_ns for p in (build_cache / "blobs").rglob("*.gz")}
+    assert blobs
+
+    # Pushing again does not upload blobs that are already there
+    buildcache("push", "--force", "my-mirror", f"/{spec.dag_hash()}")
+    assert blobs == {p.name: p.stat().st_mtime_ns for p in (build_cache / "blobs").rglob("*.gz")}
+
+    fetched = []
+    fetch_blob = spack.binary_blobs.BlobStore._fetch_blob
+
+    def _fetch_blob(self, digest, *args):
+        fetched.append(digest)
+        return fetch_blob(self, digest, *args)
+
+    monkeypatch.setattr(spack.binary_blobs.BlobStore, "_fetch_blob", _fetch_blob)
+
+    for _ in range(2):
+        spec.package.do_uninstall(force=True)
+        PackageInstaller([spec.package], explicit=True, cache_only=True).install()
+        assert spec.installed
+        assert os.path.exists(spack.binary_distribution.buildinfo_file_name(spec.prefix))
+
+    # The second install finds all the blobs in the local store
+    assert len(fetched) == len(blobs)
+
+
+def test_buildcache_sync_copies_manifests_and_blobs(
+    tmp_path,
+    mutable_mock_env_path,
+    install_mockery,
+    mock_packages,
+    mock_fetch,
+    mock_stage,
+    monkeypatch,
+):
+    """Tests that syncing a deduplicated build cache copies the manifests of the specs, and
+    their blobs, so that the specs can be installed from the destination."""
+    monkeypatch.setattr(
+        spack.binary_distribution,
+        "blob_store",
+        lambda: spack.binary_blobs.BlobStore(str(tmp_path / "blob_store")),
+    )
+    src, dest = tmp_path / "src", tmp_path / "dest"
+    mirror("add", "--unsigned", "--deduplicate", "src", str(src))
+    env("create", "test")
+    with ev.read("test"):
+        add("trivial-install-test-package")
+        install()
+        buildcache("push", "src", "trivial-install-test-package")
+        buildcache("sync", "src", str(dest))
+        spec = ev.active_environment().concrete_roots()[0]
+
+    manifest = spack.binary_distribution.tarball_path_name(spec, ".manifest.json")
+    assert (dest / "build_cache" / manifest).exists()
+    src_blobs = [p.relative_to(src) for p in (src / "build_cache" / "blobs").rglob("*.gz")]
+    dest_blobs = [p.relative_to(dest) for p in (dest / "build_cache" / "blobs").rglob("*.gz")]
+    assert src_blobs and sorted(src_blobs) == sorted(dest_blobs)
+
+    mirror("remove", "src")
+    mirror("add", "--unsigned", "dest", str(dest))
+    spec.package.do_uninstall(force=True)
+    PackageInstaller([spec.package], explicit=True, cache_only=True).install()
+    assert spec.installed
+
+    # Blobs are not kept after the install, unless the local blob store is enabled
+    assert not (tmp_path / "blob_store").exists()
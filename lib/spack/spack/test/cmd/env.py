@@ -24,6 +24,7 @@
 import spack.environment.environment
 import spack.environment.shell
 import spack.error
+import spack.filesystem_view
 import spack.main
 import spack.modules
 import spack.modules.tcl
@@ -4336,3 +4337,67 @@ def test_env_view_ignores_different_file_conflicts(tmp_path, install_mockery, mo
         prefix_dependent = e.matching_spec("view-ignore-conflict").prefix
     # The dependent's file is linked into the view
     assert readlink(tmp_path / "view" / "bin" / "x") == prefix_dependent.bin.x
+
+
+def _view_tree(root):
+    """Map paths in a view to their link target, or to None for directories and files"""
+    tree = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in dirnames + filenames:
+            path = os.path.join(dirpath, name)
+            tree[os.path.relpath(path, root)] = readlink(path) if os.path.islink(path) else None
+    return tree
+
+
+def test_env_view_updates_in_place(tmp_path, install_mockery, mock_fetch, monkeypatch):
+    """Test that views are updated in place by walking only the prefixes of new specs, and that
+    they end up the same as views generated from scratch."""
+    walked = []
+    prefix_contents = spack.filesystem_view._prefix_contents
+
+    def _prefix_contents(prefix, ignore=None):
+        walked.append(prefix)
+        return prefix_contents(prefix, ignore)
+
+    monkeypatch.setattr(spack.filesystem_view, "_prefix_contents", _prefix_contents)
+
+    view = tmp_path / "view"
+    with ev.create("env", with_view=str(view)) as e:
+        add("libelf")
+        install("--fake")
+        only_libelf = _view_tree(view)
+        libelf = e.matching_spec("libelf")
+
+        walked.clear()
+        add("libdwarf")
+        install("--fake")
+        libdwarf = e.matching_spec("libdwarf")
+
+    # The prefix of libelf was not walked again
+    assert libelf.prefix not in walked
+    assert libdwarf.prefix in walked
+    assert len(list(view.resolve().parent.glob("*.json"))) == 1
+
+    # Compare with a view generated from scratch
+    atomic_view = tmp_path / "atomic_view"
+    spack_yaml = tmp_path / "spack.yaml"
+    spack_yaml.write_text(
+        f"""\
+spack:
+  specs: [libelf, libdwarf]
+  view:
+    default:
+      root: {atomic_view}
+      atomic: true
+"""
+    )
+    with ev.create("atomic", init_file=spack_yaml):
+        install("--fake")
+    assert not list(atomic_view.resolve().parent.glob("*.json"))
+    assert _view_tree(view) == _view_tree(atomic_view)
+
+    # Removing a spec removes its files
+    with ev.read("env"):
+        remove("libdwarf")
+        install("--fake")
+    assert _view_tree(view) == only_libelf
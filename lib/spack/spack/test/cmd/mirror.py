@@ -441,3 +441,28 @@ def test_mirror_add_set_autopush(mutable_config):
     mirror("set", "--autopush", "example")
     assert spack.config.get("mirrors:example") == {"url": "http://example.com", "autopush": True}
     mirror("remove", "example")
+
+
+def test_mirror_add_set_compression(mutable_config):
+    mirror("add", "--compression", "zstd", "example", "http://example.com")
+    entry = spack.config.get("mirrors:example")
+    assert entry == {"url": "http://example.com", "compression": "zstd"}
+    assert spack.mirror.MirrorCollection()["example"].compression == "zstd"
+
+    mirror("set", "--compression", "gzip", "example")
+    entry = spack.config.get("mirrors:example")
+    assert entry == {"url": "http://example.com", "compression": "gzip"}
+    mirror("remove", "example")
+
+    mirror("add", "example", "http://example.com")
+    assert spack.mirror.MirrorCollection()["example"].compression == "gzip"
+
+
+def test_mirror_add_set_deduplicate(mutable_config):
+    mirror("add", "--deduplicate", "example", "http://example.com")
+    entry = spack.config.get("mirrors:example")
+    assert entry == {"url": "http://example.com", "deduplicate": True}
+    assert spack.mirror.MirrorCollection()["example"].deduplicate
+
+    mirror("set", "--no-deduplicate", "example")
+    assert not spack.mirror.MirrorCollection()["example"].deduplicate
@@ -27,6 +27,7 @@
 import spack.platforms.test
 import spack.repo
 import spack.solver.asp
+import spack.solver.core
 import spack.solver.version_order
 import spack.spec
 import spack.store
@@ -3057,3 +3058,25 @@ def test_reuse_prefers_standard_over_git_versions(
         test_spec = spack.spec.Spec("git-ref-package@2").concretized()
         assert git_spec.dag_hash() != test_spec.dag_hash()
         assert standard_spec.dag_hash() == test_spec.dag_hash()
+
+
+def test_logic_programs_are_parsed_once(mutable_config, mock_packages, monkeypatch):
+    """Tests that the logic programs shipped with Spack are parsed only once per process,
+    and reused in later solves.
+    """
+    parsed = []
+
+    def _parse_files(paths, callback):
+        parsed.extend(paths)
+        return spack.solver.core.parse_files(paths, callback)
+
+    monkeypatch.setattr(spack.solver.asp, "parse_files", _parse_files)
+    spack.solver.asp._parse_logic_program.cache.clear()
+
+    first = Spec("mpileaks").concretized()
+    assert parsed and len(parsed) == len(set(parsed))
+
+    number_of_parsed_files = len(parsed)
+    second = Spec("mpileaks").concretized()
+    assert len(parsed) == number_of_parsed_files
+    assert first.dag_hash() == second.dag_hash()
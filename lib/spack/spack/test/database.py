@@ -33,6 +33,7 @@
 import spack.repo
 import spack.spec
 import spack.store
+import spack.traverse
 import spack.version as vn
 from spack.installer import PackageInstaller
 from spack.schema.database_index import schema
@@ -1181,3 +1182,266 @@ def test_reindex_with_upstreams(tmp_path, monkeypatch, mock_packages, config):
     assert not reindexed_local_store.db.query_local("callpath")
     assert reindexed_local_store.db.query("callpath") == [callpath]
     assert reindexed_local_store.db.query_local("mpileaks") == [mpileaks]
+
+
+def _check_record_index(database: spack.database.Database):
+    """Check that the secondary indexes of a database are in sync with its records."""
+    expected = spack.database.RecordIndex(database._data)
+    assert database._index.by_name == expected.by_name
+    assert database._index.explicit == expected.explicit
+    assert database._index.by_time == expected.by_time
+
+
+def test_record_index_is_kept_in_sync(mutable_database):
+    """Tests that secondary indexes are updated when records are added, removed or modified."""
+    _check_record_index(mutable_database)
+
+    concrete_spec = mutable_database.remove("mpileaks ^mpich")
+    _check_record_index(mutable_database)
+
+    mutable_database.add(concrete_spec)
+    _check_record_index(mutable_database)
+
+    mutable_database.update_explicit(concrete_spec, False)
+    _check_record_index(mutable_database)
+
+    mutable_database.mark(concrete_spec, "installation_time", 0.0)
+    _check_record_index(mutable_database)
+    assert concrete_spec not in mutable_database.query(
+        start_date=datetime.datetime.fromtimestamp(1.0)
+    )
+
+    mutable_database.reindex()
+    _check_record_index(mutable_database)
+
+
+@pytest.mark.parametrize(
+    "query_args",
+    [
+        {"query_spec": "mpileaks"},
+        {"query_spec": "mpileaks@2.3"},
+        {"query_spec": "mpileaks@:2.3"},
+        {"query_spec": "@1.0"},
+        {"query_spec": "mpi"},
+        {"query_spec": "mpi@2:"},
+        {"query_spec": "callpath ^zmpi"},
+        {"query_spec": "mpileaks", "explicit": True},
+        {"query_spec": "callpath", "explicit": False},
+        {"query_spec": "libelf", "installed": any},
+        {"start_date": datetime.datetime.fromtimestamp(0)},
+    ],
+)
+def test_indexed_query_matches_linear_scan(database, query_args):
+    """Tests that narrowing queries with secondary indexes doesn't change their results."""
+    query_args = dict(query_args)
+    query_spec = spack.spec.Spec(query_args.pop("query_spec", None))
+    explicit = query_args.pop("explicit", any)
+    installed = query_args.pop("installed", True)
+
+    with database.read_transaction():
+        expected = [
+            rec.spec
+            for rec in database._data.values()
+            if rec.install_type_matches(installed)
+            and (explicit is any or rec.explicit == explicit)
+            and rec.spec.satisfies(query_spec)
+        ]
+    result = database.query_local(query_spec, explicit=explicit, installed=installed, **query_args)
+    assert expected and result == expected
+
+
+def test_binary_index_roundtrip(mutable_database, monkeypatch):
+    """Tests that a database read lazily from its binary index is equivalent to the one read
+    from index.json, and that it only constructs the specs it needs.
+    """
+    monkeypatch.setattr(mutable_database, "binary_index", True)
+    with mutable_database.write_transaction():
+        pass
+    assert os.path.isfile(mutable_database._binary_index_path)
+    expected = mutable_database.query(installed=any)
+
+    db = spack.database.Database(mutable_database.root, layout=mutable_database.layout)
+    with db.read_transaction():
+        assert isinstance(db._data, spack.database.LazyInstallRecords)
+
+    # Querying for a package only materializes the sub-DAGs of its installations
+    (mpileaks,) = db.query("mpileaks ^zmpi")
+    needed = set(s.dag_hash() for s in spack.traverse.traverse_nodes(db.query("mpileaks")))
+    assert set(db._data._records) == needed
+    assert len(needed) < len(db._data)
+    assert db.is_occupied_install_prefix(mpileaks.prefix)
+
+    assert db.query(installed=any) == expected
+    for spec in expected:
+        assert db.get_by_hash(spec.dag_hash()) == [spec]
+    _check_record_index(db)
+    db._check_ref_counts()
+
+
+def test_binary_index_reads_summary_lazily(mutable_database, monkeypatch):
+    """Tests that the summary of the records in the binary index is only read for queries that
+    need the secondary indexes, and that the binary index is unmapped when the database is read
+    again."""
+    monkeypatch.setattr(mutable_database, "binary_index", True)
+    with mutable_database.write_transaction():
+        pass
+    mpileaks = mutable_database.query_one("mpileaks ^zmpi")
+
+    db = spack.database.Database(mutable_database.root, layout=mutable_database.layout)
+    with db.read_transaction():
+        records = db._data
+        assert isinstance(records, spack.database.LazyInstallRecords)
+        assert records._summary is None
+
+        assert db.get_by_hash(mpileaks.dag_hash()) == [mpileaks]
+        assert records._summary is None
+
+        assert db.query_local("mpileaks ^zmpi") == [mpileaks]
+        assert records._summary is not None
+        _check_record_index(db)
+
+    # Reading index.json again replaces the records, and unmaps the binary index
+    db._read_from_file(db._index_path)
+    assert records._table._buffer.closed
+
+
+def test_binary_index_writes_after_lazy_read(mutable_database, monkeypatch):
+    """Tests that modifying a database read from its binary index writes both indexes
+    consistently.
+    """
+    monkeypatch.setattr(mutable_database, "binary_index", True)
+    with mutable_database.write_transaction():
+        pass
+
+    db = spack.database.Database(
+        mutable_database.root, layout=mutable_database.layout, binary_index=True
+    )
+    removed = db.remove("mpileaks ^mpich")
+    expected = db.query(installed=any)
+    assert removed not in expected
+
+    # Both the binary index and index.json are up-to-date
+    from_binary = spack.database.Database(mutable_database.root, layout=mutable_database.layout)
+    assert from_binary.query(installed=any) == expected
+    assert isinstance(from_binary._data, spack.database.LazyInstallRecords)
+    from_binary._check_ref_counts()
+
+    from_json = spack.database.Database(mutable_database.root, layout=mutable_database.layout)
+    from_json._read_from_file(from_json._index_path)
+    assert sorted(rec.spec for rec in from_json._data.values()) == expected
+    from_json._check_ref_counts()
+
+
+def test_stale_binary_index_is_ignored(mutable_database, monkeypatch):
+    """Tests that a binary index is not read after index.json is written without it."""
+    monkeypatch.setattr(mutable_database, "binary_index", True)
+    with mutable_database.write_transaction():
+        pass
+
+    monkeypatch.setattr(mutable_database, "binary_index", False)
+    mutable_database.remove("mpileaks ^mpich")
+    expected = mutable_database.query(installed=any)
+
+    db = spack.database.Database(mutable_database.root, layout=mutable_database.layout)
+    assert db.query(installed=any) == expected
+    assert not isinstance(db._data, spack.database.LazyInstallRecords)
+
+
+@pytest.mark.skipif(not _use_uuid, reason="the journal requires uuid support")
+def test_journal_replay(mutable_database, monkeypatch):
+    """Tests that write transactions only append to the journal, and that other processes
+    replay it incrementally.
+    """
+    monkeypatch.setattr(mutable_database, "journal", True)
+    monkeypatch.setattr(spack.database, "_JOURNAL_COMPACTION_RATIO", 10)
+    # The first write rewrites index.json with the version of journaled databases
+    with mutable_database.write_transaction():
+        pass
+    with open(mutable_database._index_path) as f:
+        index_content = f.read()
+
+    reader = spack.database.Database(mutable_database.root, layout=mutable_database.layout)
+    assert reader.query(installed=any) == mutable_database.query(installed=any)
+
+    # Changes are appended to the journal, index.json is untouched
+    removed = mutable_database.remove("mpileaks ^mpich")
+    mutable_database.update_explicit(mutable_database.query_one("callpath ^zmpi"), False)
+    assert os.path.getsize(mutable_database._journal_path) > 0
+    with open(mutable_database._index_path) as f:
+        assert f.read() == index_content
+
+    # Only the new journal entries are read by the other database
+    def _fail(*args, **kwargs):
+        raise AssertionError("index.json should not be read again")
+
+    with monkeypatch.context() as m:
+        m.setattr(reader, "_read_from_file", _fail)
+        assert reader.query(installed=any) == mutable_database.query(installed=any)
+        assert removed not in reader.query(installed=any)
+        assert not reader.query("callpath ^zmpi", explicit=True)
+        assert reader.query("callpath ^zmpi", explicit=False)
+        reader._check_ref_counts()
+        _check_record_index(reader)
+
+    # A database reading from scratch replays the whole journal
+    fresh = spack.database.Database(mutable_database.root, layout=mutable_database.layout)
+    assert fresh.query(installed=any) == mutable_database.query(installed=any)
+    fresh._check_ref_counts()
+
+    # Re-adding the spec goes through the journal too
+    mutable_database.add(removed)
+    with open(mutable_database._index_path) as f:
+        assert f.read() == index_content
+    assert removed in reader.query()
+    assert removed in fresh.query()
+    assert reader.is_occupied_install_prefix(removed.prefix)
+    reader._check_ref_counts()
+
+
+@pytest.mark.skipif(not _use_uuid, reason="the journal requires uuid support")
+def test_journal_compaction(mutable_database, monkeypatch):
+    """Tests that the journal is merged into index.json when it grows too large"""
+    monkeypatch.setattr(mutable_database, "journal", True)
+    with mutable_database.write_transaction():
+        pass
+    mutable_database.remove("mpileaks ^mpich")
+    assert os.path.exists(mutable_database._journal_path)
+    expected = mutable_database.query(installed=any)
+
+    monkeypatch.setattr(spack.database, "_JOURNAL_COMPACTION_RATIO", 0)
+    mutable_database.remove("mpileaks ^zmpi")
+    assert not os.path.exists(mutable_database._journal_path)
+
+    db = spack.database.Database(mutable_database.root, layout=mutable_database.layout)
+    assert db.query(installed=any) == mutable_database.query(installed=any)
+    assert len(db.query(installed=any)) == len(expected) - 1
+    db._check_ref_counts()
+
+
+@pytest.mark.skipif(not _use_uuid, reason="the journal requires uuid support")
+def test_journal_bumps_database_version(mutable_database, monkeypatch):
+    """Tests that a journal is only written on top of an index.json that older versions of
+    Spack refuse to read, and that disabling the journal writes the old version again.
+    """
+
+    def index_version():
+        with open(mutable_database._index_path) as f:
+            return json.load(f)["database"]["version"]
+
+    assert index_version() == str(spack.database._DB_VERSION)
+
+    monkeypatch.setattr(mutable_database, "journal", True)
+    mutable_database.remove("mpileaks ^mpich")
+    assert not os.path.exists(mutable_database._journal_path)
+    assert index_version() == str(spack.database._JOURNAL_DB_VERSION)
+
+    mutable_database.remove("mpileaks ^zmpi")
+    assert os.path.exists(mutable_database._journal_path)
+    expected = mutable_database.query(installed=any)
+    db = spack.database.Database(mutable_database.root, layout=mutable_database.layout)
+    assert db.query(installed=any) == expected
+
+    monkeypatch.setattr(mutable_database, "journal", False)
+    mutable_database.remove("mpileaks ^mpich2")
+    assert not os.path.exists(mutable_database._journal_path)
+    assert index_version() == str(spack.database._DB_VERSION)
@@ -15,6 +15,7 @@
 import spack.environment as ev
 import spack.solver.asp
 import spack.spec
+import spack.util.parallel
 from spack.environment.environment import (
     EnvironmentManifestFile,
     SpackEnvironmentViewError,
@@ -892,3 +893,44 @@ def test_stack_enforcement_is_strict(tmp_path, matrix_line, config, mock_package
     with pytest.raises(Exception):
         with ev.Environment(tmp_path) as e:
             e.concretize()
+
+
+def test_reusable_specs_are_selected_once_with_unify_false(
+    tmp_path, mock_packages, mutable_config, monkeypatch
+):
+    """Tests that concretizing roots separately selects the specs to be reused only once,
+    in the parent process, and that the workers share them.
+    """
+    calls = tmp_path / "calls.txt"
+    original = spack.solver.asp.SpecFilter.selected_specs
+
+    def _selected_specs(self):
+        with open(calls, "a") as f:
+            f.write(f"{os.getpid()}\n")
+        return original(self)
+
+    monkeypatch.setattr(spack.solver.asp.SpecFilter, "selected_specs", _selected_specs)
+    spack.config.set("concretizer:reuse", True)
+
+    manifest = tmp_path / "spack.yaml"
+    manifest.write_text(
+        """
+    spack:
+      specs:
+      - mpileaks
+      - libelf
+      - pkg-c
+      concretizer:
+        unify: false
+    """
+    )
+    with ev.Environment(tmp_path) as env:
+        env.concretize()
+
+    # One call for the store, and one for the buildcaches
+    assert set(calls.read_text().split()) == {str(os.getpid())}
+    assert len(calls.read_text().split()) == 2
+    assert all(env.matching_spec(s).concrete for s in ("mpileaks", "libelf", "pkg-c"))
+
+    # The solver is not kept around after concretization
+    assert spack.util.parallel.worker_state() is None
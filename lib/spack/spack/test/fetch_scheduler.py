@@ -0,0 +1,65 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+import threading
+import time
+
+import pytest
+
+import spack.error
+import spack.fetch_strategy
+from spack.fetch_scheduler import FetchScheduler, is_transient
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_fetch_scheduler_results_in_order(jobs):
+    futures = FetchScheduler(jobs=jobs).run(lambda x: x * x, range(20))
+    assert [f.result() for f in futures] == [x * x for x in range(20)]
+
+
+def test_fetch_scheduler_limits_jobs_per_host():
+    running = {"a": 0, "b": 0}
+    most_running = {"a": 0, "b": 0}
+    lock = threading.Lock()
+
+    def fetch(item):
+        host, _ = item
+        with lock:
+            running[host] += 1
+            most_running[host] = max(most_running[host], running[host])
+        time.sleep(0.01)
+        with lock:
+            running[host] -= 1
+
+    items = [(host, i) for i in range(10) for host in ("a", "b")]
+    FetchScheduler(jobs=8, jobs_per_host=2).run(fetch, items, host=lambda item: item[0])
+    assert most_running == {"a": 2, "b": 2}
+
+
+def test_fetch_scheduler_retries_transient_errors():
+    attempts = {"flaky": 0, "broken": 0, "checksum": 0}
+
+    def fetch(name):
+        attempts[name] += 1
+        if name == "flaky" and attempts[name] < 3:
+            raise spack.error.FetchError("connection reset")
+        elif name == "broken":
+            raise spack.error.FetchError("not found")
+        elif name == "checksum":
+            raise spack.fetch_strategy.ChecksumError("bad checksum")
+        return name
+
+    futures = FetchScheduler(jobs=2, attempts=3, backoff=0).run(
+        fetch, ["flaky", "broken", "checksum"]
+    )
+    assert futures[0].result() == "flaky"
+    assert isinstance(futures[1].exception(), spack.error.FetchError)
+    assert isinstance(futures[2].exception(), spack.fetch_strategy.ChecksumError)
+    assert attempts == {"flaky": 3, "broken": 3, "checksum": 1}
+
+
+def test_is_transient():
+    assert is_transient(spack.fetch_strategy.FailedDownloadError(RuntimeError("timeout")))
+    assert not is_transient(spack.fetch_strategy.ChecksumError("bad checksum"))
+    assert not is_transient(ValueError("bug"))
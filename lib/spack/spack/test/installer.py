@@ -3,10 +3,12 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import concurrent.futures
 import glob
 import os
 import shutil
 import sys
+import threading
 from typing import List, Optional, Union
 
 import py
@@ -17,15 +19,19 @@
 import llnl.util.tty as tty
 
 import spack.binary_distribution
+import spack.build_environment
+import spack.config
 import spack.database
 import spack.deptypes as dt
 import spack.error
 import spack.hooks
 import spack.installer as inst
+import spack.mirror
 import spack.package_base
 import spack.package_prefs as prefs
 import spack.repo
 import spack.spec
+import spack.stage
 import spack.store
 import spack.util.lock as lk
 from spack.installer import PackageInstaller
@@ -181,7 +187,7 @@ def test_process_external_package_module(install_mockery, monkeypatch, capfd):
 def test_process_binary_cache_tarball_tar(install_mockery, monkeypatch, capfd):
     """Tests of _process_binary_cache_tarball with a tar file."""
 
-    def _spec(spec, unsigned=False, mirrors_for_spec=None):
+    def _spec(spec, unsigned=False, mirrors_for_spec=None, stream=False):
         return spec
 
     # Skip binary distribution functionality since assume tested elsewhere
@@ -1236,3 +1242,151 @@ def test_print_install_test_log_failures(
     spack.installer.print_install_test_log(pkg)
     out = capfd.readouterr()[0]
     assert "See test results at" in out
+
+
+def test_pop_task_follows_critical_path(install_mockery):
+    """Ready tasks heading the longest chain of dependents are popped first."""
+    installer = create_installer(["dttop"])
+    installer._init_queue()
+
+    # Without historical build times, every package counts the same
+    root_id = inst.package_id(installer.build_requests[0].pkg.spec)
+    assert installer.critical_paths[root_id] == 1.0
+
+    ready = [task for _, task in installer._ready_tasks()]
+    assert len(ready) > 1
+    task = installer._pop_task()
+    assert task.critical_path == max(t.critical_path for t in ready)
+    assert task.status == inst.STATUS_DEQUEUED
+
+
+def test_pop_task_uses_build_times(install_mockery):
+    """Packages that took long to build are scheduled first."""
+    installer = create_installer(["dttop"])
+    installer._init_queue()
+    shortest = min((task for _, task in installer._ready_tasks()), key=lambda t: t.critical_path)
+
+    for spec in installer.build_requests[0].pkg.spec.traverse():
+        installer.build_times.record(spec, 3600.0 if spec is shortest.pkg.spec else 1.0)
+
+    installer = create_installer(["dttop"])
+    installer._init_queue()
+    assert installer._pop_task().pkg_id == shortest.pkg_id
+
+
+def test_requeued_task_does_not_block_other_ready_tasks(install_mockery):
+    """A task requeued because another process is installing its package is popped after the
+    other ready tasks, even if it heads the longest chain of dependents."""
+    installer = create_installer(["dttop"])
+    installer._init_queue()
+    ready = set(task.pkg_id for _, task in installer._ready_tasks())
+    assert len(ready) > 1
+
+    locked = installer._pop_task()
+    installer._requeue_task(locked, None)
+    popped = installer._pop_task()
+    assert popped.pkg_id != locked.pkg_id
+    assert popped.pkg_id in ready
+
+    # The requeued task is still handed out once the other ready tasks are done
+    popped_ids = [popped.pkg_id]
+    while popped_ids[-1] != locked.pkg_id:
+        popped_ids.append(installer._pop_task().pkg_id)
+    assert set(popped_ids) == ready
+
+
+def test_install_concurrent_packages(install_mockery, mock_fetch, monkeypatch):
+    """Packages are built from source at the same time, sharing the available jobs."""
+    installer = create_installer(["dependent-install", "pkg-b"], {"concurrent_packages": 2})
+
+    jobs, in_flight = [], []
+    create_build_process = spack.build_environment.create_build_process
+    wait_for_build = installer._wait_for_build
+
+    def _create_build_process(*args):
+        jobs.append(spack.config.get("config:build_jobs"))
+        return create_build_process(*args)
+
+    def _wait_for_build(timeout=None):
+        in_flight.append(len(installer.running_builds))
+        return wait_for_build(timeout)
+
+    monkeypatch.setattr(spack.config, "determine_number_of_jobs", lambda **kwargs: 8)
+    monkeypatch.setattr(spack.build_environment, "create_build_process", _create_build_process)
+    monkeypatch.setattr(installer, "_wait_for_build", _wait_for_build)
+    installer.install()
+
+    for request in installer.build_requests:
+        assert request.pkg.spec.installed
+        assert inst.package_id(request.pkg.spec) in installer.installed
+    assert not installer.running_builds
+    assert jobs and all(j == 4 for j in jobs)
+    assert max(in_flight) == 2
+
+
+@pytest.mark.parametrize("signed", [True, False])
+def test_install_from_cache_prefetches_binaries(tmp_path, mutable_database, monkeypatch, signed):
+    """Tests that the binaries of the next ready specs are downloaded in the background, and
+    that the other ones are extracted while they are downloaded, if their signature is
+    verified."""
+    spec = mutable_database.query_local("mpileaks ^mpich", installed=True)[0]
+    nodes = list(spec.traverse(root=True, order="post"))
+
+    mirror = spack.mirror.Mirror.from_local_path(str(tmp_path / "mirror"))
+    with spack.binary_distribution.make_uploader(mirror=mirror) as uploader:
+        uploader.push_or_raise(nodes)
+    spack.mirror.add(mirror)
+
+    if signed:
+        # Pretend the specfiles are signed, and that their signature is verified
+        for specfile in (tmp_path / "mirror").glob("**/*.spec.json"):
+            shutil.copy(specfile, f"{specfile}.sig")
+        monkeypatch.setattr(spack.binary_distribution, "try_verify", lambda path: True)
+
+    for node in reversed(nodes):
+        node.package.do_uninstall(force=True)
+
+    downloads = []
+    download_tarball = spack.binary_distribution.download_tarball
+
+    def _download_tarball(spec, unsigned=False, mirrors_for_spec=None, stream=False):
+        result = download_tarball(spec, unsigned, mirrors_for_spec, stream=stream)
+        downloads.append((spec.name, "tarball_stream" in result))
+        return result
+
+    monkeypatch.setattr(spack.binary_distribution, "download_tarball", _download_tarball)
+    spack.config.set("config:binary_prefetch", 2)
+    stages = set(os.listdir(spack.stage.get_stage_root()))
+    PackageInstaller([spec.package], cache_only=True, unsigned=not signed).install()
+
+    assert all(mutable_database.query_local_by_spec_hash(n.dag_hash()).installed for n in nodes)
+    assert sorted(name for name, _ in downloads) == sorted(n.name for n in nodes)
+    if signed:
+        assert any(streamed for _, streamed in downloads)
+        assert not all(streamed for _, streamed in downloads)
+    else:
+        assert not any(streamed for _, streamed in downloads)
+    assert set(os.listdir(spack.stage.get_stage_root())) == stages
+
+
+def test_drain_prefetches_before_forking(install_mockery):
+    """Tests that no prefetch thread is left running before a build is forked: downloads that
+    did not start are cancelled, and the others complete and can be used later."""
+    installer = create_installer(["trivial-install-test-package"], {})
+    installer._prefetch_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    started, resume = threading.Event(), threading.Event()
+
+    def _download():
+        started.set()
+        resume.wait()
+        return "downloaded"
+
+    installer.prefetched["running"] = installer._prefetch_executor.submit(_download)
+    installer.prefetched["pending"] = installer._prefetch_executor.submit(_download)
+    started.wait()
+    threading.Timer(0.1, resume.set).start()
+    installer._drain_prefetches()
+
+    assert installer._prefetch_executor is None
+    assert list(installer.prefetched) == ["running"]
+    assert installer.prefetched["running"].result(timeout=0) == "downloaded"
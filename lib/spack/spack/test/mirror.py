@@ -276,6 +276,38 @@ def test_mirror_layout_make_alias(tmpdir):
     assert os.path.normpath(link_target) == os.path.join(cache.root, layout.path)
 
 
+class FailingFetcher:
+    """Mock fetcher whose archive fails after writing part of it"""
+
+    def __init__(self):
+        self.destinations = []
+
+    def archive(self, dst):
+        self.destinations.append(dst)
+        with open(dst, "w") as f:
+            f.write("partial")
+        raise OSError("archive failed")
+
+
+def test_mirror_cache_stores_archives_atomically(tmp_path):
+    """Tests that archives are written next to their destination, with the same name, and moved
+    into place only when complete, so that concurrent or failed stores leave no truncated file."""
+    cache = spack.caches.MirrorCache(root=str(tmp_path), skip_unstable_versions=False)
+    path = os.path.join("_source-cache", "git", "pkg", "pkg-1.0.tar.gz")
+    fetcher = FailingFetcher()
+
+    with pytest.raises(OSError, match="archive failed"):
+        cache.store(fetcher, path)
+
+    dst = tmp_path / path
+    assert fetcher.destinations[0] != str(dst)
+    assert os.path.basename(fetcher.destinations[0]) == dst.name
+    assert not dst.exists() and not os.listdir(dst.parent)
+
+    cache.store(MockFetcher(), path)
+    assert dst.exists() and os.listdir(dst.parent) == [dst.name]
+
+
 @pytest.mark.regression("31627")
 @pytest.mark.parametrize(
     "specs,expected_specs",
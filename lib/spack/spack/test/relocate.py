@@ -9,6 +9,7 @@
 
 import pytest
 
+import spack.config
 import spack.platforms
 import spack.relocate
 import spack.relocate_text as relocate_text
@@ -277,6 +278,55 @@ def test_relocate_text_bin_raise_if_new_prefix_is_longer(tmpdir):
         spack.relocate.relocate_text_bin([fpath], {short_prefix: long_prefix})
 
 
+@pytest.fixture()
+def relocate_in_parallel(monkeypatch):
+    monkeypatch.setattr(spack.relocate, "FILES_PER_THREAD", 2)
+    monkeypatch.setattr(spack.config, "determine_number_of_jobs", lambda **kwargs: 4)
+
+
+def test_relocate_text_in_parallel(tmp_path, relocate_in_parallel):
+    """Tests that relocating many files with a pool of threads relocates all of them"""
+    files = []
+    for i in range(16):
+        path = tmp_path / f"file-{i}.txt"
+        path.write_text(f"#!/old/prefix/bin/sh\n/old/prefix/lib/{i}\n" if i % 2 else "\n")
+        files.append(str(path))
+
+    spack.relocate.relocate_text(files, {"/old/prefix": "/new/prefix"})
+
+    for i, path in enumerate(files):
+        expected = f"#!/new/prefix/bin/sh\n/new/prefix/lib/{i}\n" if i % 2 else "\n"
+        assert open(path).read() == expected
+
+
+def test_relocate_text_bin_in_parallel(tmp_path, relocate_in_parallel):
+    """Tests that binaries are relocated in place, and that only the files that were modified
+    are reported"""
+    files = []
+    for i in range(8):
+        path = tmp_path / f"bin-{i}"
+        path.write_bytes(b"\x7fELF\0/old/prefix/lib/libfoo.so\0\1" if i < 4 else b"")
+        files.append(str(path))
+
+    changed = spack.relocate.relocate_text_bin(files, {b"/old/prefix": b"/new/pfx"})
+
+    assert changed == files[:4]
+    for path in files[:4]:
+        assert open(path, "rb").read() == b"\x7fELF\0////new/pfx/lib/libfoo.so\0\1"
+
+
+def test_relocate_text_bin_in_parallel_raises(tmp_path, relocate_in_parallel):
+    """Tests that errors in the worker threads are raised with their original type"""
+    files = []
+    for i in range(8):
+        path = tmp_path / f"bin-{i}"
+        path.write_bytes(b"/short")
+        files.append(str(path))
+
+    with pytest.raises(relocate_text.CannotGrowString):
+        spack.relocate.relocate_text_bin(files, {b"/short": b"/much/longer"})
+
+
 @pytest.mark.requires_executables("install_name_tool", "file", "cc")
 def test_fixup_macos_rpaths(make_dylib, make_object_file):
     compiler_cls = spack.repo.PATH.get_pkg_class("apple-clang")
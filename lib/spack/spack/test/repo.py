@@ -2,8 +2,11 @@
 # Spack Project Developers. See the top-level COPYRIGHT file for details.
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
+import io
+import json
 import os
 import pathlib
+import shutil
 
 import pytest
 
@@ -11,6 +14,7 @@
 import spack.paths
 import spack.repo
 import spack.spec
+import spack.util.cpus
 import spack.util.file_cache
 
 
@@ -287,6 +291,131 @@ def test_packages_with_tags(self, repo_cls, mock_test_cache):
         assert set(r2).issubset(r1)
 
 
+def _index_as_json(repo, name):
+    stream = io.StringIO()
+    repo.index.indexers[name].write(stream)
+    return json.loads(stream.getvalue())
+
+
+@pytest.mark.usefixtures("nullify_globals")
+@pytest.mark.parametrize("name", ["providers", "tags", "patches"])
+def test_indexes_built_in_parallel_are_the_same(name, tmp_path, monkeypatch):
+    """Tests that indexes are the same whether outdated packages are loaded in worker processes
+    or in the current process."""
+    sequential = spack.repo.Repo(
+        spack.paths.mock_packages_path,
+        cache=spack.util.file_cache.FileCache(str(tmp_path / "sequential")),
+    )
+    sequential.index[name]
+
+    monkeypatch.setattr(spack.util.cpus, "cpus_available", lambda: 4)
+    monkeypatch.setattr(spack.repo, "PACKAGES_PER_INDEXING_JOB", 1)
+    parallel = spack.repo.Repo(
+        spack.paths.mock_packages_path,
+        cache=spack.util.file_cache.FileCache(str(tmp_path / "parallel")),
+    )
+    parallel.index[name]
+
+    assert _index_as_json(parallel, name) == _index_as_json(sequential, name)
+
+
+@pytest.mark.usefixtures("nullify_globals")
+def test_indexes_are_built_independently(mock_test_cache):
+    repo = spack.repo.Repo(spack.paths.mock_packages_path, cache=mock_test_cache)
+    assert "mpich" in repo.tag_index["tag1"]
+    assert set(repo.index.indexes) == {"tags"}
+
+
+@pytest.mark.usefixtures("nullify_globals")
+def test_only_modified_packages_are_reindexed(tmp_path, monkeypatch):
+    repo_dir = tmp_path / "repo"
+    shutil.copytree(spack.paths.mock_packages_path, repo_dir)
+    cache = spack.util.file_cache.FileCache(str(tmp_path / "cache"))
+    assert "mpich" in spack.repo.Repo(str(repo_dir), cache=cache).tag_index["tag1"]
+
+    # Touch a package after the index was written
+    package_py = repo_dir / "packages" / "mpich" / "package.py"
+    mtime = os.stat(cache.cache_path("tags/builtin.mock-index.json")).st_mtime + 10
+    os.utime(package_py, (mtime, mtime))
+    spack.repo.FastPackageChecker._paths_cache.pop(str(repo_dir / "packages"), None)
+
+    updated = []
+    original = spack.repo.TagIndexer.fragment
+
+    def _fragment(self, pkg_fullname):
+        updated.append(pkg_fullname)
+        return original(self, pkg_fullname)
+
+    monkeypatch.setattr(spack.repo.TagIndexer, "fragment", _fragment)
+    assert "mpich" in spack.repo.Repo(str(repo_dir), cache=cache).tag_index["tag1"]
+    assert updated == ["builtin.mock.mpich"]
+
+
+def test_package_checker_stats_files_in_threads(monkeypatch):
+    packages_path = os.path.join(spack.paths.mock_packages_path, "packages")
+    expected = spack.repo.FastPackageChecker(packages_path)._create_new_cache()
+    monkeypatch.setattr(spack.repo, "STATS_PER_THREAD", 3)
+    assert spack.repo.FastPackageChecker(packages_path)._create_new_cache() == expected
+
+
+@pytest.mark.usefixtures("nullify_globals")
+def test_package_checker_reuses_stats_until_packages_are_added(tmp_path, monkeypatch):
+    repo_dir = tmp_path / "repo"
+    shutil.copytree(spack.paths.mock_packages_path, repo_dir)
+    packages_path = str(repo_dir / "packages")
+    cache = spack.util.file_cache.FileCache(str(tmp_path / "cache"))
+    expected = dict(spack.repo.FastPackageChecker(packages_path, cache=cache))
+
+    def _no_scan(self):
+        raise AssertionError("the packages directory should not be scanned")
+
+    # Stats are read from the cache by other processes
+    spack.repo.FastPackageChecker._paths_cache.clear()
+    with monkeypatch.context() as m:
+        m.setattr(spack.repo.FastPackageChecker, "_create_new_cache", _no_scan)
+        assert dict(spack.repo.FastPackageChecker(packages_path, cache=cache)) == expected
+
+    # Adding a package changes the mtime of the packages directory
+    (repo_dir / "packages" / "new-package").mkdir()
+    (repo_dir / "packages" / "new-package" / "package.py").touch()
+    spack.repo.FastPackageChecker._paths_cache.clear()
+    assert "new-package" in spack.repo.FastPackageChecker(packages_path, cache=cache)
+    spack.repo.FastPackageChecker._paths_cache.clear()
+
+
+@pytest.mark.usefixtures("nullify_globals")
+@pytest.mark.parametrize(
+    "indexer_cls", [spack.repo.TagIndexer, spack.repo.ProviderIndexer, spack.repo.PatchIndexer]
+)
+def test_index_fragments_from_static_metadata(indexer_cls, mock_test_cache, monkeypatch):
+    """Tests that index fragments computed from the static metadata of packages are the same
+    as the ones computed by importing the packages"""
+    repo = spack.repo.Repo(spack.paths.mock_packages_path, cache=mock_test_cache)
+    indexer = indexer_cls(repo)
+    indexer.create()
+    names = repo.all_package_names()
+    assert any(repo.package_metadata(name) is not None for name in names)
+    static = [indexer.fragment(f"builtin.mock.{name}") for name in names]
+
+    monkeypatch.setattr(repo, "package_metadata", lambda name: None)
+    assert static == [indexer.fragment(f"builtin.mock.{name}") for name in names]
+
+
+@pytest.mark.usefixtures("nullify_globals")
+def test_package_metadata(mock_test_cache):
+    repo = spack.repo.Repo(spack.paths.mock_packages_path, cache=mock_test_cache)
+    metadata = repo.package_metadata("mpich")
+    assert metadata.class_name == "Mpich"
+    assert metadata.docstring == repo.get_pkg_class("mpich").__doc__
+    assert [d.args for d in metadata.provides] == [("mpi@:3",), ("mpi@:1",)]
+
+    # Packages with overrides are imported, to account for them
+    repo = spack.repo.Repo(
+        spack.paths.mock_packages_path, cache=mock_test_cache, overrides={"mpich": {"tags": []}}
+    )
+    assert repo.package_metadata("mpich") is None
+
+
 @pytest.mark.usefixtures("nullify_globals")
 class TestRepoPath:
     def test_creation_from_string(self, mock_test_cache):
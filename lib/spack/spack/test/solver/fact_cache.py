@@ -0,0 +1,154 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+"""Unit tests for the cache of facts derived from package directives."""
+import os
+
+import pytest
+
+import spack.caches
+import spack.config
+import spack.paths
+import spack.spec
+import spack.util.file_cache
+from spack.solver import asp, fact_cache
+from spack.solver.core import AspFunction
+
+pytestmark = pytest.mark.usefixtures("mock_packages")
+
+
+def _setup(*specs):
+    return asp.SpackSolverSetup().setup([spack.spec.Spec(s) for s in specs])
+
+
+@pytest.fixture()
+def enable_fact_cache(mutable_config, tmp_path, monkeypatch):
+    cache = spack.util.file_cache.FileCache(str(tmp_path / "misc_cache"))
+    monkeypatch.setattr(spack.caches, "MISC_CACHE", cache)
+    monkeypatch.setattr(fact_cache, "_BLOCKS", {})
+    spack.config.set("concretizer:fact_cache", True)
+    return cache
+
+
+@pytest.mark.parametrize(
+    "specs",
+    [
+        ["mpileaks"],
+        ["quantum-espresso"],
+        ["conditional-constrained-dependencies", "variant-values"],
+        ["conditional-variant-pkg@2.0 +version_based"],
+    ],
+)
+def test_setup_does_not_depend_on_the_cache(specs, enable_fact_cache, monkeypatch):
+    """Tests that the problem is the same without the cache, with a cold cache, and with
+    a warm cache on disk.
+    """
+    spack.config.set("concretizer:fact_cache", False)
+    expected = _setup(*specs)
+
+    spack.config.set("concretizer:fact_cache", True)
+    assert _setup(*specs) == expected
+    assert os.listdir(enable_fact_cache.cache_path("asp_facts"))
+
+    # Read the blocks back from disk
+    monkeypatch.setattr(fact_cache, "_BLOCKS", {})
+    assert _setup(*specs) == expected
+
+
+def test_blocks_are_reused(enable_fact_cache, monkeypatch):
+    """Tests that blocks of facts are generated only once for each package."""
+    _setup("mpileaks")
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("facts should be read from the cache")
+
+    monkeypatch.setattr(fact_cache, "_BLOCKS", {})
+    monkeypatch.setattr(asp.SpackSolverSetup, "_directive_facts_block", _fail)
+    _setup("mpileaks")
+
+
+def test_blocks_depending_on_a_changed_package_are_regenerated(enable_fact_cache, monkeypatch):
+    """Tests that a block is not reused if a package whose variants it refers to changed."""
+    _setup("conditional-constrained-dependencies")
+
+    original = fact_cache.FactCache.package_checksum
+
+    def _changed_checksum(self, pkg_cls):
+        if pkg_cls.name == "dep-with-variants":
+            return "changed"
+        return original(self, pkg_cls)
+
+    generated = []
+    original_block = asp.SpackSolverSetup._directive_facts_block
+
+    def _record(self, pkg):
+        generated.append(pkg.name)
+        return original_block(self, pkg)
+
+    monkeypatch.setattr(fact_cache, "_BLOCKS", {})
+    monkeypatch.setattr(fact_cache.FactCache, "package_checksum", _changed_checksum)
+    monkeypatch.setattr(asp.SpackSolverSetup, "_directive_facts_block", _record)
+    _setup("conditional-constrained-dependencies")
+
+    assert "conditional-constrained-dependencies" in generated
+
+
+def test_blocks_are_not_reused_by_a_different_spack(enable_fact_cache, monkeypatch):
+    """Tests that a change in any file of the Spack library invalidates all blocks."""
+    _setup("mpileaks")
+
+    generated = []
+    original_block = asp.SpackSolverSetup._directive_facts_block
+
+    def _record(self, pkg):
+        generated.append(pkg.name)
+        return original_block(self, pkg)
+
+    monkeypatch.setattr(fact_cache, "_BLOCKS", {})
+    monkeypatch.setattr(spack.caches, "library_checksum", lambda: "changed")
+    monkeypatch.setattr(asp.SpackSolverSetup, "_directive_facts_block", _record)
+    _setup("mpileaks")
+
+    assert "mpileaks" in generated
+
+
+def test_library_checksum_follows_file_stats(tmp_path, monkeypatch):
+    """Tests that the checksum of the library follows the stats of its files, and that it
+    ignores the tests."""
+    lib = tmp_path / "lib"
+    (lib / "spack" / "spack" / "test").mkdir(parents=True)
+    (lib / "spack" / "external").mkdir()
+    (lib / "spack" / "llnl").mkdir()
+    module = lib / "spack" / "spack" / "module.py"
+    module.write_text("x = 1\n")
+    monkeypatch.setattr(spack.paths, "lib_path", str(lib / "spack"))
+    monkeypatch.setattr(spack.paths, "module_path", str(lib / "spack" / "spack"))
+    monkeypatch.setattr(spack.paths, "external_path", str(lib / "spack" / "external"))
+    monkeypatch.setattr(spack.paths, "test_path", str(lib / "spack" / "spack" / "test"))
+    checksum = spack.caches.library_checksum.__wrapped__
+
+    before = checksum()
+    (lib / "spack" / "spack" / "test" / "test_module.py").write_text("y = 2\n")
+    assert checksum() == before
+
+    # The content is the same, but the modification time is not
+    os.utime(module, ns=(0, 12345))
+    assert checksum() != before
+
+
+@pytest.mark.parametrize(
+    "arg,expected",
+    [
+        ("foo", '"foo"'),
+        (3, "3"),
+        (True, '"True"'),
+        (fact_cache.LocalId(2), "12"),
+        (AspFunction("node", ("x", fact_cache.LocalId(1))), 'node("x",11)'),
+    ],
+)
+def test_encode_decode_relocates_ids(arg, expected):
+    """Tests that ids in facts are relocated, and that other arguments are preserved."""
+    fact = AspFunction("f", (arg,))
+    decoded = fact_cache.decode(fact_cache.encode(fact), 10)
+    assert str(decoded.symbol()) == f"f({expected})"
@@ -0,0 +1,117 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+"""Unit tests for the cache of concretization results."""
+import pytest
+
+import spack.caches
+import spack.concretize
+import spack.config
+import spack.spec
+import spack.util.file_cache
+from spack.solver import asp, result_cache
+
+pytestmark = pytest.mark.usefixtures("mutable_config", "mock_packages")
+
+
+@pytest.fixture()
+def enable_result_cache(tmp_path, monkeypatch):
+    cache = spack.util.file_cache.FileCache(str(tmp_path / "misc_cache"))
+    monkeypatch.setattr(spack.caches, "MISC_CACHE", cache)
+    spack.config.set("concretizer:result_cache", True)
+    return cache
+
+
+@pytest.fixture()
+def solves(monkeypatch):
+    """Counts the number of solves actually run by clingo"""
+    calls = []
+    original = asp.PyclingoDriver.solve
+
+    def _solve(self, *args, **kwargs):
+        calls.append(args)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(asp.PyclingoDriver, "solve", _solve)
+    return calls
+
+
+@pytest.mark.parametrize("spec_str", ["mpileaks", "mpi", "dt-diamond ^dt-diamond-bottom@1.0"])
+def test_repeated_concretization_is_cached(spec_str, enable_result_cache, solves):
+    """Tests that concretizing the same spec twice solves only once, and gives the same
+    concrete spec.
+    """
+    first = spack.spec.Spec(spec_str).concretized()
+    second = spack.spec.Spec(spec_str).concretized()
+
+    assert len(solves) == 1
+    assert second.concrete
+    assert second.dag_hash() == first.dag_hash()
+    assert second.tree(hashes=True) == first.tree(hashes=True)
+
+
+def test_cache_is_keyed_by_all_the_input_specs(enable_result_cache, solves):
+    mpileaks, libelf = spack.spec.Spec("mpileaks"), spack.spec.Spec("libelf")
+    first = spack.concretize.concretize_specs_together(mpileaks, libelf)
+    second = spack.concretize.concretize_specs_together(mpileaks, libelf)
+    assert len(solves) == 1
+    assert [s.dag_hash() for s in first] == [s.dag_hash() for s in second]
+
+    spack.concretize.concretize_specs_together(mpileaks)
+    assert len(solves) == 2
+
+
+def test_changes_in_config_invalidate_results(enable_result_cache, solves):
+    first = spack.spec.Spec("mpileaks").concretized()
+    spack.config.set("packages", {"mpileaks": {"require": ["@2.2"]}})
+    second = spack.spec.Spec("mpileaks").concretized()
+
+    assert len(solves) == 2
+    assert first.version != second.version
+
+
+def test_changes_in_package_files_invalidate_results(enable_result_cache, solves, monkeypatch):
+    spack.spec.Spec("mpileaks").concretized()
+
+    # Files with a different modification time, but the same content, are still valid
+    checksums = []
+    original = result_cache._checksum
+
+    def _checksum(path):
+        checksums.append(path)
+        return original(path)
+
+    monkeypatch.setattr(result_cache, "_stat", lambda path: (0, 0))
+    monkeypatch.setattr(result_cache, "_checksum", _checksum)
+    spack.spec.Spec("mpileaks").concretized()
+    assert len(solves) == 1 and checksums
+
+    monkeypatch.setattr(result_cache, "_checksum", lambda path: "changed")
+    spack.spec.Spec("mpileaks").concretized()
+    assert len(solves) == 2
+
+
+def test_unchanged_files_are_not_checksummed(enable_result_cache, solves, monkeypatch):
+    spack.spec.Spec("mpileaks").concretized()
+
+    def _fail(path):
+        raise AssertionError("files with the same size and modification time are not read")
+
+    monkeypatch.setattr(result_cache, "_checksum", _fail)
+    spack.spec.Spec("mpileaks").concretized()
+    assert len(solves) == 1
+
+
+def test_changes_in_spack_invalidate_results(enable_result_cache, solves, monkeypatch):
+    spack.spec.Spec("mpileaks").concretized()
+    monkeypatch.setattr(spack.caches, "library_checksum", lambda: "changed")
+    spack.spec.Spec("mpileaks").concretized()
+    assert len(solves) == 2
+
+
+def test_disabled_cache_is_not_used(enable_result_cache, solves):
+    spack.config.set("concretizer:result_cache", False)
+    spack.spec.Spec("mpileaks").concretized()
+    spack.spec.Spec("mpileaks").concretized()
+    assert len(solves) == 2
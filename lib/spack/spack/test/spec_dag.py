@@ -929,3 +929,13 @@ def test_getitem_finds_transitive_virtual():
     x.add_dependency_edge(y, depflag=dt.LINK, virtuals=())
     y.add_dependency_edge(z, depflag=dt.LINK, virtuals=("virtual",))
     assert x["virtual"].name == "z"
+
+
+def test_edges_are_selected_by_current_name():
+    """Tests that edges are selected by the current name of their child, even if it was
+    renamed after the edge was added."""
+    x, y = Spec("x"), Spec("y")
+    x.add_dependency_edge(y, depflag=dt.BUILD, virtuals=())
+    y.name = "z"
+    assert [d.name for d in x.dependencies(name="z")] == ["z"]
+    assert not x.dependencies(name="y")
@@ -12,6 +12,7 @@
 import spack.error
 import spack.parser
 import spack.paths
+import spack.repo
 import spack.solver.asp
 import spack.spec
 import spack.store
@@ -1931,3 +1932,30 @@ def test_old_format_strings_trigger_error(default_mock_concretization):
     s = Spec("pkg-a").concretized()
     with pytest.raises(SpecFormatStringError):
         s.format("${PACKAGE}-${VERSION}-${HASH}")
+
+
+def test_satisfies_cache(default_mock_concretization, monkeypatch):
+    """Tests that results for concrete specs and string constraints are cached, and evicted in
+    LRU order"""
+    cache = spack.spec.SatisfiesCache(maxsize=2)
+    monkeypatch.setattr(spack.spec, "SATISFIES_CACHE", cache)
+    s = default_mock_concretization("mpileaks")
+
+    assert s.satisfies("^mpi") and s.satisfies("^mpi")
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Constraints as Spec objects are not cached, since they can be mutated
+    assert s.satisfies(Spec("^mpi"))
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # The least recently used result is evicted
+    assert not s.satisfies("+debug")
+    assert s.intersects("~debug")
+    assert s.satisfies("^mpi")
+    assert (cache.hits, cache.misses) == (1, 4)
+    assert cache.hit_rate == 0.2
+
+    # Results depend on the repository of packages
+    with spack.repo.use_repositories(*spack.repo.PATH.repos):
+        assert s.satisfies("^mpi")
+        assert (cache.hits, cache.misses) == (0, 1)
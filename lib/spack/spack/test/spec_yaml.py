@@ -11,6 +11,7 @@
 import ast
 import collections
 import collections.abc
+import copy
 import gzip
 import inspect
 import io
@@ -106,6 +107,49 @@ def test_roundtrip_concrete_specs(abstract_spec, default_mock_concretization):
     check_json_round_trip(concrete_spec)
 
 
+def test_specs_read_from_files_share_immutable_data(default_mock_concretization):
+    """Tests that concrete specs read from files share their versions and strings, but not
+    their mutable parts"""
+    data = default_mock_concretization("mpileaks").to_dict()
+    first, second = Spec.from_dict(data), Spec.from_dict(data)
+    for x, y in zip(first.traverse(), second.traverse()):
+        assert x.name is y.name
+        assert x.version is y.version
+        assert x.architecture.os is y.architecture.os
+        assert x.versions is not y.versions
+        for name, variant in x.variants.items():
+            assert variant.name is y.variants[name].name
+            assert variant is not y.variants[name]
+    assert first.eq_dag(second)
+
+
+def test_specfile_decoder(default_mock_concretization):
+    """Tests that decoding many nodes in bulk gives the same specs as decoding them one by one,
+    without modifying the node dicts, or sharing mutable parts between specs"""
+    roots = [default_mock_concretization("mpileaks"), default_mock_concretization("mpileaks+opt")]
+    nodes = {}
+    for root in roots:
+        for node in root.to_dict()["spec"]["nodes"]:
+            nodes[node["hash"]] = node
+    expected = copy.deepcopy(nodes)
+
+    specs = spack.spec.SpecfileDecoder(spack.spec.SpecfileV4).specs(nodes)
+
+    assert nodes == expected
+    for root in roots:
+        decoded = specs[root.dag_hash()]
+        assert decoded.eq_dag(root, deptypes=True)
+        assert decoded.dag_hash() == root.dag_hash()
+
+    first, second = (specs[root["libelf"].dag_hash()] for root in roots)
+    assert first is second
+    first, second = (specs[root.dag_hash()] for root in roots)
+    assert first.versions is not second.versions
+    assert first.architecture is not second.architecture
+    assert first.compiler is not second.compiler
+    assert first.variants["shared"] is not second.variants["shared"]
+
+
 def test_yaml_subdag(config, mock_packages):
     spec = Spec("mpileaks^mpich+debug")
     spec.concretize()
@@ -5,13 +5,22 @@
 
 import gzip
 import hashlib
+import io
 import os
 import shutil
 import tarfile
 from pathlib import Path, PurePath
 
+import pytest
+
+import spack.util.archive
 import spack.util.crypto
-from spack.util.archive import gzip_compressed_tarfile, reproducible_tarfile_from_prefix
+from spack.util.archive import (
+    ParallelGzipWriter,
+    compressed_tarfile,
+    gzip_compressed_tarfile,
+    reproducible_tarfile_from_prefix,
+)
 
 
 def test_gzip_compressed_tarball_is_reproducible(tmpdir):
@@ -155,3 +164,59 @@ def test_gzip_compressed_tarball_is_reproducible(tmpdir):
                 == spack.util.crypto.checksum_stream(hashlib.sha256, f)
                 == spack.util.crypto.checksum_stream(hashlib.sha256, g)
             )
+
+
+@pytest.mark.parametrize("size", [0, 1000, 4 * 1024 + 17, 40 * 1024])
+def test_parallel_gzip_writer_does_not_depend_on_jobs(size):
+    """Tests that the output of the parallel gzip writer is valid gzip, and that it does not
+    depend on the number of threads, or on how the data is written."""
+    data = (os.urandom(size // 4) + b"spack " * size)[:size]
+
+    outputs = []
+    for jobs, chunk in ((1, max(size, 1)), (4, 333)):
+        out = io.BytesIO()
+        writer = ParallelGzipWriter(out, jobs=jobs, block_size=1024)
+        for i in range(0, size, chunk):
+            writer.write(data[i : i + chunk])
+        writer.close()
+        outputs.append(out.getvalue())
+
+    assert outputs[0] == outputs[1]
+    assert gzip.decompress(outputs[0]) == data
+
+
+@pytest.mark.parametrize(
+    "compression",
+    [
+        "gzip",
+        pytest.param(
+            "zstd",
+            marks=pytest.mark.skipif(
+                not spack.util.archive.ZSTD_SUPPORTED, reason="requires zstandard"
+            ),
+        ),
+    ],
+)
+def test_compressed_tarfile_checksums(tmp_path, compression):
+    """Tests that the checksums of compressed tarfiles match their contents, and that the
+    output is reproducible with any number of threads."""
+    root = tmp_path / "root"
+    root.mkdir()
+    (root / "data").write_bytes(b"spack " * 100000)
+
+    checksums = set()
+    for jobs in (1, 3):
+        path = str(tmp_path / f"{jobs}.tar")
+        with compressed_tarfile(path, compression, jobs) as (tar, compressed, uncompressed):
+            reproducible_tarfile_from_prefix(tar, str(root))
+        assert compressed.hexdigest() == spack.util.crypto.checksum(hashlib.sha256, path)
+
+        with open(path, "rb") as f, spack.util.archive.decompressing_reader(
+            f, compression
+        ) as reader:
+            assert uncompressed.hexdigest() == spack.util.crypto.checksum_stream(
+                hashlib.sha256, reader
+            )
+        checksums.add(compressed.hexdigest())
+
+    assert len(checksums) == 1
@@ -0,0 +1,104 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+import pytest
+
+import spack.directives
+import spack.directives_meta
+from spack.util.package_metadata import (
+    DIRECTIVES,
+    UNKNOWN,
+    Directive,
+    DynamicPackageError,
+    extract_metadata,
+)
+
+STATIC_PACKAGE = '''
+from spack.package import *
+from spack.build_systems.cmake import CMakePackage as Base
+
+
+class Foo(Base, spack.package.Package):
+    """Foo is a package."""
+
+    homepage = "https://example.com"
+    tags = ["Tag1", "tag2"]
+    executables = ["^foo$"]
+
+    version("1.0", sha256="abcd")
+    variant("bar", default=True, values=any_combination_of("a", "b"))
+
+    with when("+bar"), default_args(type="build"):
+        depends_on("bar", when="@1:", patches=["bar.patch"])
+        provides("baz")
+
+    patch("foo.patch", when="@:1")
+
+    def install(self, spec, prefix):
+        for x in range(10):
+            pass
+'''
+
+
+def test_extract_metadata_of_static_package():
+    metadata = extract_metadata(STATIC_PACKAGE, "Foo")
+    assert metadata.bases == ["spack.build_systems.cmake.CMakePackage", "spack.package.Package"]
+    assert metadata.docstring == "Foo is a package."
+    assert metadata.tags == ["Tag1", "tag2"]
+    assert metadata.attributes == {"homepage", "tags", "executables"}
+
+    assert metadata.versions == [Directive("version", ("1.0",), {"sha256": "abcd"}, ())]
+    assert metadata.variants[0].kwargs["values"] is UNKNOWN
+    assert not metadata.variants[0].is_static
+    assert metadata.depends_on == [
+        Directive(
+            "depends_on",
+            ("bar",),
+            {"type": "build", "when": "@1:", "patches": ["bar.patch"]},
+            ("+bar",),
+        )
+    ]
+    assert metadata.provides == [Directive("provides", ("baz",), {"type": "build"}, ("+bar",))]
+    assert [d.name for d in metadata.patches] == ["patch", "depends_on"]
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        # Loops, conditionals and unknown calls in the class body
+        "    for v in ('1.0', '2.0'):\n        version(v)",
+        "    if True:\n        version('1.0')",
+        "    helper(version)",
+        # Computed tags and conditions
+        "    tags = ['a'] + ['b']",
+        "    with when(CONDITION):\n        depends_on('bar')",
+        "    with open('x'):\n        pass",
+        # The class may be virtual
+        "    virtual = True",
+    ],
+)
+def test_dynamic_packages(body):
+    with pytest.raises(DynamicPackageError):
+        extract_metadata(f"class Foo(Package):\n{body}\n", "Foo")
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "from spack.pkg.builtin.bar import Bar\nclass Foo(Bar):\n    pass\n",
+        "class Bar(Package):\n    pass\nclass Foo(Bar):\n    pass\n",
+        "class Foo(make_base()):\n    pass\n",
+        "@decorator\nclass Foo(Package):\n    pass\n",
+        "class Bar(Package):\n    pass\n",
+        "class Foo(Package:\n",
+    ],
+)
+def test_dynamic_classes(source):
+    with pytest.raises(DynamicPackageError):
+        extract_metadata(source, "Foo")
+
+
+def test_all_directives_are_known():
+    """Tests that new directives are taken into account by the static extractor"""
+    assert set(spack.directives_meta.directive_names) - {"_language"} <= set(DIRECTIVES)
@@ -0,0 +1,76 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+import pytest
+
+import spack.util.record_table as record_table
+
+
+def test_record_table_roundtrip(tmp_path):
+    path = tmp_path / "table.bin"
+    records = [(f"key{i:03d}", f"record {i}".encode()) for i in reversed(range(100))]
+    record_table.write(path, records, metadata={"foo": [1, 2]}, summary=b"summary")
+
+    with record_table.RecordTable(path) as table:
+        assert len(table) == 100
+        assert table.metadata == {"foo": [1, 2]}
+        assert table.summary() == b"summary"
+        assert list(table.keys()) == sorted(key for key, _ in records)
+        for key, record in records:
+            assert key in table
+            assert table.get(key) == record
+        assert "key100" not in table
+        assert "too-long-key" not in table
+        assert table.get("key100") is None
+
+
+def test_empty_record_table(tmp_path):
+    path = tmp_path / "table.bin"
+    record_table.write(path, [])
+    with record_table.RecordTable(path) as table:
+        assert len(table) == 0
+        assert table.metadata == {}
+        assert table.summary() == b""
+        assert "key" not in table
+
+
+def test_record_table_keys_must_have_same_length(tmp_path):
+    with pytest.raises(ValueError):
+        record_table.write(tmp_path / "table.bin", [("a", b""), ("bb", b"")])
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.parametrize(
+    "content", [b"", b"not a record table", record_table.MAGIC + b"\x01\x00\x00\x00" + 20 * b"\0"]
+)
+def test_invalid_record_tables(tmp_path, content):
+    path = tmp_path / "table.bin"
+    path.write_bytes(content)
+    with pytest.raises(record_table.RecordTableError):
+        record_table.RecordTable(path)
+
+
+def test_truncated_record_table(tmp_path):
+    path = tmp_path / "table.bin"
+    record_table.write(path, [("a", b"1"), ("b", b"2")])
+    path.write_bytes(path.read_bytes()[:-10])
+    with pytest.raises(record_table.RecordTableError, match="truncated"):
+        record_table.RecordTable(path)
+
+
+def test_record_out_of_range(tmp_path):
+    """Tests that reading a record whose offset in the table is out of the file is an error."""
+    path = tmp_path / "table.bin"
+    record_table.write(path, [("a", b"1"), ("b", b"2")])
+    data = bytearray(path.read_bytes())
+    # Move the offset of the second record past the end of the file
+    entry = record_table._entry_struct(1)
+    entry_start = record_table._HEADER.size + 2 + entry.size
+    entry.pack_into(data, entry_start, b"b", len(data), 1)
+    path.write_bytes(bytes(data))
+
+    with record_table.RecordTable(path) as table:
+        assert table.get("a") == b"1"
+        with pytest.raises(record_table.RecordTableError, match="out of range"):
+            table.get("b")
@@ -7,6 +7,10 @@
 
 import pytest
 
+from llnl.util.filesystem import mkdirp, touchp
+from llnl.util.symlink import readlink
+
+import spack.filesystem_view
 from spack.directory_layout import DirectoryLayout
 from spack.filesystem_view import SimpleFilesystemView, YamlFilesystemView
 from spack.installer import PackageInstaller
@@ -65,3 +69,35 @@ def pkg_a_add_files_to_view(view, merge_map, skip_if_exists=True):
     view.add_specs(a, b)
     assert os.path.lexists(os.path.join(view_dir, "file"))
     assert os.path.lexists(os.path.join(view_dir, "subdir", "file"))
+
+
+def test_view_links_in_threads(mock_packages, tmpdir, monkeypatch):
+    """Test that links are created in threads, and that packages that add their own files to the
+    view do so after the links of the specs before them."""
+    monkeypatch.setattr(spack.filesystem_view, "ITEMS_PER_THREAD_TASK", 2)
+    view_dir = os.path.join(str(tmpdir), "view")
+    os.mkdir(view_dir)
+    view = SimpleFilesystemView(view_dir, DirectoryLayout(view_dir))
+
+    a = Spec("pkg-a")
+    b = Spec("pkg-b")
+    for spec in (a, b):
+        spec.prefix = os.path.join(tmpdir, spec.name)
+        spec._mark_concrete()
+        mkdirp(os.path.join(spec.prefix, ".spack"))
+        for i in range(10):
+            touchp(os.path.join(spec.prefix, f"dir{i}", "subdir", spec.name))
+
+    def pkg_b_add_files_to_view(view, merge_map, skip_if_exists=True):
+        for i in range(10):
+            assert os.path.lexists(os.path.join(view_dir, f"dir{i}", "subdir", "pkg-a"))
+        for src, dst in merge_map.items():
+            view.link(src, dst)
+
+    b.package.add_files_to_view = pkg_b_add_files_to_view
+
+    view.add_specs(a, b)
+    for spec in (a, b):
+        for i in range(10):
+            path = os.path.join(f"dir{i}", "subdir", spec.name)
+            assert readlink(os.path.join(view_dir, path)) == os.path.join(spec.prefix, path)
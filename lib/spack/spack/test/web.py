@@ -4,19 +4,25 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 import collections
 import email.message
+import http.server
 import os
 import pickle
 import ssl
+import threading
+import time
+import urllib.parse
 import urllib.request
 
 import pytest
 
 import llnl.util.tty as tty
 
+import spack.caches
 import spack.config
 import spack.mirror
 import spack.paths
 import spack.url
+import spack.util.file_cache
 import spack.util.s3
 import spack.util.url as url_util
 import spack.util.web
@@ -98,11 +104,47 @@ def test_spider(depth, expected_found, expected_not_found, expected_text):
 
 def test_spider_no_response(monkeypatch):
     # Mock the absence of a response
-    monkeypatch.setattr(spack.util.web, "read_from_url", lambda x, y: (None, None, None))
-    pages, links, _, _ = spack.util.web._spider(root, collect_nested=False, _visited=set())
+    monkeypatch.setattr(spack.util.web, "read_html_page", lambda x: (None, None))
+    pages, links, _ = spack.util.web._spider(
+        urllib.parse.urlparse(root), collect_nested=False, _visited=set()
+    )
     assert not pages and not links
 
 
+def test_spider_reads_each_page_once(monkeypatch):
+    read_html_page = spack.util.web.read_html_page
+    reads = collections.Counter()
+
+    def counting_read_html_page(url):
+        reads[url] += 1
+        return read_html_page(url)
+
+    monkeypatch.setattr(spack.util.web, "read_html_page", counting_read_html_page)
+
+    # The root is given twice, and is also linked from page 3
+    pages, _ = spack.util.web.spider([root, root], depth=10)
+    assert set(pages) == {root, page_1, page_2, page_3, page_4}
+    assert set(reads.values()) == {1}
+
+
+def test_spider_time_budget(monkeypatch):
+    read_html_page = spack.util.web.read_html_page
+
+    def slow_read_html_page(url):
+        if url != root:
+            time.sleep(0.5)
+        return read_html_page(url)
+
+    monkeypatch.setattr(spack.util.web, "read_html_page", slow_read_html_page)
+
+    # The page being read when time is up is waited for, but the other ones are not read
+    start = time.monotonic()
+    pages, links = spack.util.web.spider(root, depth=3, concurrency=1, timeout=0.2)
+    assert time.monotonic() - start < 1.5
+    assert set(pages) == {root}
+    assert page_1 in links
+
+
 def test_find_versions_of_archive_0():
     versions = spack.url.find_versions_of_archive(root_tarball, root, list_depth=0)
     assert Version("0.0.0") in versions
@@ -371,6 +413,126 @@ def test_detailed_http_error_pickle(tmpdir):
     assert str(deserialized) == str(error)
 
 
+class _KeepAliveServer(http.server.ThreadingHTTPServer):
+    """Local HTTP/1.1 server that records the client port of each request"""
+
+    def __init__(self, close_after_response=False):
+        self.close_after_response = close_after_response
+        self.ports = []
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server.ports.append(self.client_address[1])
+                body = b"x" * 1024
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                # Close the connection without telling the client
+                self.close_connection = server.close_after_response
+
+            def log_message(self, *args):
+                pass
+
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server_address[1]}/"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+
+def test_keep_alive_handler_reuses_connections():
+    pool = spack.util.web.ConnectionPool()
+    opener = urllib.request.build_opener(spack.util.web.KeepAliveHTTPHandler(pool=pool))
+    with _KeepAliveServer() as server:
+        for _ in range(3):
+            with opener.open(server.url) as response:
+                assert response.read() == b"x" * 1024
+
+        # A response that was not read completely can't be followed by another request
+        with opener.open(server.url) as response:
+            response.read(10)
+        with opener.open(server.url) as response:
+            response.read()
+        pool.clear()
+
+    assert len(server.ports) == 5
+    assert len(set(server.ports[:4])) == 1
+    assert server.ports[4] != server.ports[3]
+
+
+def test_keep_alive_handler_retries_stale_connections():
+    pool = spack.util.web.ConnectionPool()
+    opener = urllib.request.build_opener(spack.util.web.KeepAliveHTTPHandler(pool=pool))
+    with _KeepAliveServer(close_after_response=True) as server:
+        for _ in range(3):
+            with opener.open(server.url) as response:
+                assert response.read() == b"x" * 1024
+        pool.clear()
+
+    assert len(set(server.ports)) == 3
+
+
+def test_read_html_page_revalidates_cached_pages(tmpdir, monkeypatch):
+    monkeypatch.setattr(spack.caches, "MISC_CACHE", spack.util.file_cache.FileCache(str(tmpdir)))
+    requests = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.headers.get("If-None-Match"))
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = b"<html><a href='foo-1.0.tar.gz'>foo</a></html>"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    try:
+        first = spack.util.web.read_html_page(url)
+        second = spack.util.web.read_html_page(url)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert first == second == (url, "<html><a href='foo-1.0.tar.gz'>foo</a></html>")
+    assert requests == [None, '"v1"']
+
+
+def test_spider_keeps_the_most_recently_used_pages(tmpdir, monkeypatch):
+    cache = spack.util.file_cache.FileCache(str(tmpdir))
+    monkeypatch.setattr(spack.caches, "MISC_CACHE", cache)
+    monkeypatch.setattr(spack.util.web, "MAX_CACHED_PAGES", 2)
+    urls = [f"https://example.com/{i}" for i in range(4)]
+    for i, url in enumerate(urls):
+        spack.util.web._write_cached_page(url, url, "etag", "<html></html>")
+        os.utime(cache.cache_path(spack.util.web._page_cache_key(url)), (i, i))
+    spack.util.web._touch_cached_page(urls[0])
+
+    spack.util.web.spider([], depth=0)
+
+    kept = [url for url in urls if spack.util.web._read_cached_page(url)]
+    assert kept == [urls[0], urls[3]]
+
+
 @pytest.fixture()
 def ssl_scrubbed_env(mutable_config, monkeypatch):
     """clear out environment variables that could give false positives for SSL Cert tests"""
@@ -2,18 +2,39 @@
 # Spack Project Developers. See the top-level COPYRIGHT file for details.
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
+import collections
+import concurrent.futures
 import errno
 import hashlib
 import io
 import os
 import pathlib
+import struct
 import tarfile
+import zlib
 from contextlib import closing, contextmanager
 from gzip import GzipFile
-from typing import Callable, Dict, Tuple
+from typing import IO, Callable, Deque, Dict, Tuple
 
 from llnl.util.symlink import readlink
 
+import spack.error
+
+try:
+    import zstandard  # novermin
+
+    ZSTD_SUPPORTED = True
+except ImportError:
+    ZSTD_SUPPORTED = False
+
+#: Size of the blocks of uncompressed data that are compressed independently by the
+#: parallel gzip writer, as in pigz
+GZIP_BLOCK_SIZE = 128 * 1024
+
+#: Maximum distance of a match in a deflate stream, which is the amount of uncompressed data
+#: each block of the parallel gzip writer is primed with
+GZIP_WINDOW_SIZE = 32 * 1024
+
 
 class ChecksumWriter(io.BufferedIOBase):
     """Checksum writer computes a checksum while writing to a file."""
@@ -95,6 +116,222 @@ def readline(self, size=-1):
         raise OSError(errno.EBADF, "readline() on write-only object")
 
 
+class ChecksumReader(io.BufferedIOBase):
+    """Checksum reader computes a checksum while reading from a file, for instance from an
+    HTTP response that is decompressed and extracted while it is being downloaded."""
+
+    def __init__(self, fileobj, algorithm=hashlib.sha256):
+        self.fileobj = fileobj
+        self.hasher = algorithm()
+        self.length = 0
+
+    def hexdigest(self):
+        return self.hasher.hexdigest()
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.hasher.update(data)
+        self.length += len(data)
+        return data
+
+    def read1(self, size=-1):
+        return self.read(size)
+
+    def drain(self, chunk_size=1 << 20):
+        """Read the remainder of the file, so that the checksum covers all of it"""
+        while self.read(chunk_size):
+            pass
+
+    @property
+    def closed(self):
+        return self.fileobj is None
+
+    def close(self):
+        fileobj = self.fileobj
+        if fileobj is None:
+            return
+        self.fileobj.close()
+        self.fileobj = None
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return False
+
+    def seekable(self):
+        return False
+
+    def tell(self):
+        return self.length
+
+
+def _deflate_block(block: bytes, zdict: bytes, compresslevel: int, last: bool) -> bytes:
+    """Compress a block of a gzip stream into raw deflate data, ending on a byte boundary"""
+    if zdict:
+        compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=zdict)
+    else:
+        compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(block) + compressor.flush(
+        zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH
+    )
+
+
+class ParallelGzipWriter(io.BufferedIOBase):
+    """Gzip writer compressing blocks of data in multiple threads, like pigz.
+
+    Each block is primed with the end of the previous one and ends on a byte boundary, so that
+    the blocks form a single deflate stream that any gzip implementation can decompress. The
+    output only depends on the data and the compression level, and not on the number of
+    threads, and the header is normalized like the one of ``gzip --no-name``.
+    """
+
+    def __init__(
+        self, fileobj, compresslevel: int = 6, jobs: int = 1, block_size: int = GZIP_BLOCK_SIZE
+    ):
+        self.fileobj = fileobj
+        self.compresslevel = compresslevel
+        self.block_size = block_size
+        self.crc = 0
+        self.size = 0
+        self._buffer = bytearray()
+        self._history = b""
+        self._pending: Deque[concurrent.futures.Future] = collections.deque()
+        self._max_pending = 2 * jobs
+        self._executor = concurrent.futures.ThreadPoolExecutor(jobs) if jobs > 1 else None
+
+        # Same header as GzipFile with an empty file name and mtime 0
+        xfl = 2 if compresslevel == 9 else 4 if compresslevel == 1 else 0
+        self.fileobj.write(b"\x1f\x8b\x08\x00" + struct.pack("<L", 0) + bytes([xfl, 255]))
+
+    def _compress(self, block: bytes, last: bool) -> None:
+        self.crc = zlib.crc32(block, self.crc)
+        self.size += len(block)
+        zdict, self._history = self._history, (self._history + block)[-GZIP_WINDOW_SIZE:]
+
+        if self._executor is None:
+            self.fileobj.write(_deflate_block(block, zdict, self.compresslevel, last))
+            return
+
+        self._pending.append(
+            self._executor.submit(_deflate_block, block, zdict, self.compresslevel, last)
+        )
+        while len(self._pending) > self._max_pending or (last and self._pending):
+            self.fileobj.write(self._pending.popleft().result())
+
+    def write(self, data):
+        if not isinstance(data, (bytes, bytearray)):
+            data = memoryview(data).cast("B")
+        self._buffer += data
+
+        while len(self._buffer) >= self.block_size:
+            block = bytes(self._buffer[: self.block_size])
+            del self._buffer[: self.block_size]
+            self._compress(block, last=False)
+
+        return len(data)
+
+    @property
+    def closed(self):
+        return self.fileobj is None
+
+    def close(self):
+        if self.fileobj is None:
+            return
+        try:
+            self._compress(bytes(self._buffer), last=True)
+            self._buffer.clear()
+            self.fileobj.write(struct.pack("<LL", self.crc, self.size & 0xFFFFFFFF))
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+            self.fileobj = None
+
+    def flush(self):
+        # Flushing would end a block early, and the output would not be reproducible
+        pass
+
+    def readable(self):
+        return False
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def tell(self):
+        return self.size + len(self._buffer)
+
+
+class CompressionNotSupportedError(spack.error.SpackError):
+    """Raised when a compression format is not available"""
+
+
+def _gzip_writer(fileobj: IO[bytes], jobs: int) -> IO[bytes]:
+    # Follow the default compression level of gzip, see gzip_compressed_tarfile
+    return ParallelGzipWriter(fileobj, compresslevel=6, jobs=jobs)
+
+
+def _zstd_writer(fileobj: IO[bytes], jobs: int) -> IO[bytes]:
+    if not ZSTD_SUPPORTED:
+        raise CompressionNotSupportedError("zstd compression requires the zstandard Python module")
+    # With one or more worker threads, the output of zstd does not depend on their number
+    compressor = zstandard.ZstdCompressor(level=3, threads=max(1, jobs))
+    return compressor.stream_writer(fileobj, closefd=False)
+
+
+def _gzip_reader(fileobj: IO[bytes]) -> IO[bytes]:
+    return GzipFile(filename="", mode="rb", fileobj=fileobj)
+
+
+def _zstd_reader(fileobj: IO[bytes]) -> IO[bytes]:
+    if not ZSTD_SUPPORTED:
+        raise CompressionNotSupportedError(
+            "zstd decompression requires the zstandard Python module"
+        )
+    return zstandard.ZstdDecompressor().stream_reader(fileobj, closefd=False)
+
+
+#: Compression formats of tarballs, mapped to a function returning a writer compressing into a
+#: file object with a given number of threads, and a function returning a reader decompressing
+#: from a file object
+COMPRESSION_FORMATS: Dict[
+    str, Tuple[Callable[[IO[bytes], int], IO[bytes]], Callable[[IO[bytes]], IO[bytes]]]
+] = {"gzip": (_gzip_writer, _gzip_reader), "zstd": (_zstd_writer, _zstd_reader)}
+
+
+def decompressing_reader(fileobj: IO[bytes], compression: str = "gzip") -> IO[bytes]:
+    """Return a file object reading the decompressed data of a file in one of the
+    ``COMPRESSION_FORMATS``."""
+    return COMPRESSION_FORMATS[compression][1](fileobj)
+
+
+@contextmanager
+def compressed_tarfile(path: str, compression: str = "gzip", jobs: int = 1):
+    """Create a reproducible, compressed tarfile, and keep track of shasums of both the
+    compressed and uncompressed tarfile, like ``gzip_compressed_tarfile``. The data is compressed
+    in multiple threads, and the output does not depend on their number.
+
+    Args:
+        path: path of the tarfile
+        compression: one of the ``COMPRESSION_FORMATS``
+        jobs: number of threads compressing the data
+
+    Yields a tuple of the following:
+        tarfile.TarFile: tarfile object
+        ChecksumWriter: checksum of the compressed tarfile
+        ChecksumWriter: checksum of the uncompressed tarfile
+    """
+    compressor = COMPRESSION_FORMATS[compression][0]
+    with open(path, "wb") as f, ChecksumWriter(f) as compressed_checksum, closing(
+        compressor(compressed_checksum, jobs)
+    ) as compressed_file, ChecksumWriter(compressed_file) as tarfile_checksum, tarfile.TarFile(
+        name="", mode="w", fileobj=tarfile_checksum
+    ) as tar:
+        yield tar, compressed_checksum, tarfile_checksum
+
+
 @contextmanager
 def gzip_compressed_tarfile(path):
     """Create a reproducible, gzip compressed tarfile, and keep track of shasums of both the
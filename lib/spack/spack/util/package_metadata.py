@@ -0,0 +1,323 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+"""Extract the directives of a package from the AST of its ``package.py``, without executing it.
+
+Most packages are declarative: their class body is a docstring, some attributes, directive
+calls with literal arguments, possibly grouped in ``with when(...)`` or ``with default_args(...)``
+blocks, and methods. For those packages, the metadata needed to index a repository can be read
+statically, which is much faster than importing the package.
+
+Arguments of directives that are not literals, e.g. ``values=any_combination_of(...)``, are
+recorded as ``UNKNOWN``. Anything else (loops, conditionals, helper functions called in the class
+body, base classes defined in other packages, ...) makes the package *dynamic*, and raises
+``DynamicPackageError``: callers are expected to import the package in that case.
+"""
+import ast
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+import spack.error
+
+#: Functions that can be called in the body of a package class to declare its metadata
+DIRECTIVES = (
+    "build_system",
+    "conflicts",
+    "depends_on",
+    "extends",
+    "license",
+    "maintainers",
+    "patch",
+    "provides",
+    "redistribute",
+    "requires",
+    "resource",
+    "variant",
+    "version",
+)
+
+#: Functions that can be called in the body of a package class, and do not declare metadata
+IGNORED_CALLS = ("filter_compiler_wrappers",)
+
+#: Modules from which base classes of packages can be imported, without making the package
+#: dynamic. Base classes defined in other packages, or in the ``package.py`` itself, are not
+#: supported since they are not analyzed.
+STATIC_BASE_MODULES = ("spack.package", "spack.build_systems")
+
+
+class DynamicPackageError(spack.error.SpackError):
+    """Raised when the metadata of a package cannot be extracted without executing it"""
+
+
+class _Unknown:
+    def __repr__(self) -> str:
+        return "UNKNOWN"
+
+
+#: Value of the arguments of directives that are computed when the package is imported
+UNKNOWN = _Unknown()
+
+
+class Directive(NamedTuple):
+    #: Name of the directive, e.g. ``depends_on``
+    name: str
+    #: Positional arguments
+    args: Tuple[Any, ...]
+    #: Keyword arguments, including the ones coming from ``with default_args(...)``
+    kwargs: Dict[str, Any]
+    #: Conditions of the enclosing ``with when(...)`` blocks, outermost first
+    when: Tuple[str, ...]
+
+    @property
+    def is_static(self) -> bool:
+        """Whether the values of all the arguments are known"""
+        return all(x is not UNKNOWN for x in self.args + tuple(self.kwargs.values()))
+
+
+class PackageMetadata:
+    """Metadata of a package class, as written in its ``package.py``.
+
+    Only the directives of the class itself are recorded, not the ones inherited from its base
+    classes, which are available in ``bases``.
+    """
+
+    def __init__(
+        self,
+        class_name: str,
+        bases: List[str],
+        docstring: Optional[str],
+        tags: Optional[List[str]],
+        attributes: Set[str],
+        directives: List[Directive],
+    ) -> None:
+        self.class_name = class_name
+        #: Fully qualified names of the base classes, e.g. ``spack.package.CMakePackage``
+        self.bases = bases
+        #: Docstring of the class, not cleaned, as in ``__doc__``
+        self.docstring = docstring
+        #: Tags of the class, or None if it does not define them
+        self.tags = tags
+        #: Names of the attributes assigned in the class body
+        self.attributes = attributes
+        #: Directives in the order they are called
+        self.directives = directives
+
+    def _directives(self, *names: str) -> List[Directive]:
+        return [d for d in self.directives if d.name in names]
+
+    @property
+    def versions(self) -> List[Directive]:
+        return self._directives("version")
+
+    @property
+    def variants(self) -> List[Directive]:
+        return self._directives("variant", "build_system")
+
+    @property
+    def depends_on(self) -> List[Directive]:
+        return self._directives("depends_on", "extends")
+
+    @property
+    def provides(self) -> List[Directive]:
+        return self._directives("provides")
+
+    @property
+    def conflicts(self) -> List[Directive]:
+        return self._directives("conflicts")
+
+    @property
+    def patches(self) -> List[Directive]:
+        """Patches of the package, and dependencies declared with patches"""
+        return self._directives("patch") + [d for d in self.depends_on if d.kwargs.get("patches")]
+
+
+def _literal(node: ast.AST, what: str) -> Any:
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError) as e:
+        raise DynamicPackageError(f"{what} is not a literal (line {node.lineno})") from e
+
+
+def _argument(node: ast.AST) -> Any:
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError):
+        return UNKNOWN
+
+
+def _is_string(node: ast.AST) -> bool:
+    if sys.version_info < (3, 8):
+        return isinstance(node, ast.Str)
+    return isinstance(node, ast.Constant) and isinstance(node.value, str)
+
+
+def _call_name(node: ast.AST) -> Optional[str]:
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+        return node.func.id
+    return None
+
+
+class _ClassBodyVisitor:
+    def __init__(self) -> None:
+        self.tags: Optional[List[str]] = None
+        self.attributes: Set[str] = set()
+        self.directives: List[Directive] = []
+        self.when: List[str] = []
+        self.default_args: List[Dict[str, Any]] = []
+
+    def visit_body(self, body: List[ast.stmt]) -> None:
+        for stmt in body:
+            self.visit(stmt)
+
+    def visit(self, stmt: ast.stmt) -> None:
+        if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Pass)):
+            return
+        elif isinstance(stmt, ast.Expr):
+            self.visit_expr(stmt)
+        elif isinstance(stmt, (ast.Assign, ast.AnnAssign)):
+            self.visit_assign(stmt)
+        elif isinstance(stmt, ast.With):
+            self.visit_with(stmt)
+        else:
+            raise DynamicPackageError(
+                f"{type(stmt).__name__} statement in the class body (line {stmt.lineno})"
+            )
+
+    def visit_expr(self, stmt: ast.Expr) -> None:
+        if _is_string(stmt.value):
+            return  # docstrings, and strings used as comments
+
+        name = _call_name(stmt.value)
+        if name in IGNORED_CALLS:
+            return
+        if name not in DIRECTIVES:
+            raise DynamicPackageError(f"unknown call in the class body (line {stmt.lineno})")
+
+        call: ast.Call = stmt.value  # type: ignore[assignment]
+        if any(isinstance(arg, ast.Starred) for arg in call.args) or any(
+            keyword.arg is None for keyword in call.keywords
+        ):
+            raise DynamicPackageError(f"unpacked arguments to {name} (line {stmt.lineno})")
+
+        kwargs: Dict[str, Any] = {}
+        for defaults in self.default_args:
+            kwargs.update(defaults)
+        for keyword in call.keywords:
+            kwargs[keyword.arg] = _argument(keyword.value)
+        args = tuple(_argument(arg) for arg in call.args)
+        self.directives.append(Directive(name, args, kwargs, tuple(self.when)))
+
+    def visit_assign(self, stmt: ast.stmt) -> None:
+        targets = stmt.targets if isinstance(stmt, ast.Assign) else [stmt.target]
+        names = [t.id for t in targets if isinstance(t, ast.Name)]
+        if len(names) != len(targets):
+            raise DynamicPackageError(f"assignment to an expression (line {stmt.lineno})")
+        self.attributes.update(names)
+        if "virtual" in names:
+            raise DynamicPackageError(f"assignment to virtual (line {stmt.lineno})")
+        if "tags" in names:
+            tags = _literal(stmt.value, "tags") if stmt.value else None
+            if not isinstance(tags, (list, tuple)) or not all(isinstance(t, str) for t in tags):
+                raise DynamicPackageError(f"tags are not a list of strings (line {stmt.lineno})")
+            self.tags = list(tags)
+
+    def visit_with(self, stmt: ast.With) -> None:
+        pushed_when, pushed_defaults = 0, 0
+        for item in stmt.items:
+            name = _call_name(item.context_expr)
+            call: ast.Call = item.context_expr  # type: ignore[assignment]
+            if item.optional_vars is not None or name not in ("when", "default_args"):
+                raise DynamicPackageError(f"unknown context manager (line {stmt.lineno})")
+            if name == "when":
+                if len(call.args) != 1 or call.keywords:
+                    raise DynamicPackageError(f"invalid when() (line {stmt.lineno})")
+                condition = _literal(call.args[0], "condition of when()")
+                if not isinstance(condition, str):
+                    raise DynamicPackageError(f"non-string condition (line {stmt.lineno})")
+                self.when.append(condition)
+                pushed_when += 1
+            else:
+                if call.args or any(keyword.arg is None for keyword in call.keywords):
+                    raise DynamicPackageError(f"invalid default_args() (line {stmt.lineno})")
+                self.default_args.append({k.arg: _argument(k.value) for k in call.keywords})
+                pushed_defaults += 1
+
+        self.visit_body(stmt.body)
+        del self.when[len(self.when) - pushed_when :]
+        del self.default_args[len(self.default_args) - pushed_defaults :]
+
+
+def _qualified_bases(module: ast.Module, bases: List[str]) -> List[str]:
+    """Return the fully qualified names of the base classes, and check that they come from
+    ``STATIC_BASE_MODULES``"""
+    origins: Dict[str, str] = {}
+    for stmt in module.body:
+        if isinstance(stmt, ast.ImportFrom):
+            for alias in stmt.names:
+                origin = "." * stmt.level + (stmt.module or "")
+                origins[alias.asname or alias.name] = f"{origin}.{alias.name}"
+        elif isinstance(stmt, ast.ClassDef):
+            origins[stmt.name] = f"<package.py>.{stmt.name}"
+
+    result = []
+    for base in bases:
+        if base.startswith("spack."):
+            qualified = base
+        else:
+            # Names that are not imported explicitly come from `from spack.package import *`
+            head, _, tail = base.partition(".")
+            qualified = origins.get(head, f"spack.package.{head}")
+            if tail:
+                qualified = f"{qualified}.{tail}"
+        origin = qualified.rsplit(".", 1)[0]
+        if not any(origin == m or origin.startswith(f"{m}.") for m in STATIC_BASE_MODULES):
+            raise DynamicPackageError(f"base class {base} comes from {origin}")
+        result.append(qualified)
+    return result
+
+
+def extract_metadata(source: str, class_name: str, filename: str = "<package>") -> PackageMetadata:
+    """Extract the metadata of a package class from the source code of its module.
+
+    Args:
+        source: contents of the ``package.py`` file
+        class_name: name of the package class
+        filename: name of the file, for error messages
+
+    Raises:
+        DynamicPackageError: if the package cannot be analyzed statically
+    """
+    try:
+        module = ast.parse(source, filename)
+    except SyntaxError as e:
+        raise DynamicPackageError(f"cannot parse {filename}: {e}") from e
+
+    node = next(
+        (n for n in module.body if isinstance(n, ast.ClassDef) and n.name == class_name), None
+    )
+    if node is None:
+        raise DynamicPackageError(f"no class {class_name} at the top level of {filename}")
+    if node.decorator_list or node.keywords:
+        raise DynamicPackageError(f"class {class_name} has decorators or keywords")
+
+    bases = _qualified_bases(module, [_dotted_name(base) for base in node.bases])
+
+    visitor = _ClassBodyVisitor()
+    visitor.visit_body(node.body)
+    return PackageMetadata(
+        class_name=class_name,
+        bases=bases,
+        docstring=ast.get_docstring(node, clean=False),
+        tags=visitor.tags,
+        attributes=visitor.attributes,
+        directives=visitor.directives,
+    )
+
+
+def _dotted_name(node: ast.AST) -> str:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return f"{_dotted_name(node.value)}.{node.attr}"
+    raise DynamicPackageError(f"base class is an expression (line {node.lineno})")
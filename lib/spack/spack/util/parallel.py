@@ -7,7 +7,7 @@
 import os
 import sys
 import traceback
-from typing import Optional
+from typing import Any, Optional
 
 import spack.config
 
@@ -57,8 +57,30 @@ def __call__(self, *args, **kwargs):
         return value
 
 
+#: State shared by the tasks of the current ``imap_unordered`` call, see ``worker_state``
+_WORKER_STATE: Any = None
+
+
+def _set_worker_state(state: Any) -> None:
+    global _WORKER_STATE
+    _WORKER_STATE = state
+
+
+def worker_state() -> Any:
+    """Return the ``state`` passed to the ``imap_unordered`` call running the current task, or
+    None outside of such a call."""
+    return _WORKER_STATE
+
+
 def imap_unordered(
-    f, list_of_args, *, processes: int, maxtaskperchild: Optional[int] = None, debug=False
+    f,
+    list_of_args,
+    *,
+    processes: int,
+    maxtaskperchild: Optional[int] = None,
+    chunksize: int = 1,
+    debug=False,
+    state: Any = None,
 ):
     """Wrapper around multiprocessing.Pool.imap_unordered.
 
@@ -70,16 +92,33 @@ def imap_unordered(
             from workers, if True an exception with complete stacktraces
         maxtaskperchild: number of tasks to be executed by a child before being
             killed and substituted
+        chunksize: number of tasks sent to a child at once
+        state: object returned by ``worker_state()`` in the tasks. It is inherited by forked
+            workers, instead of being sent with every task, and tasks see None in workers that
+            are not forked.
 
     Raises:
         RuntimeError: if any error occurred in the worker processes
     """
     if sys.platform in ("darwin", "win32") or len(list_of_args) == 1:
-        yield from map(f, list_of_args)
+        previous = worker_state()
+        _set_worker_state(state)
+        try:
+            yield from map(f, list_of_args)
+        finally:
+            _set_worker_state(previous)
         return
 
-    with multiprocessing.Pool(processes, maxtasksperchild=maxtaskperchild) as p:
-        for result in p.imap_unordered(Task(f), list_of_args):
+    if multiprocessing.get_start_method() != "fork":
+        state = None
+
+    with multiprocessing.Pool(
+        processes,
+        initializer=_set_worker_state,
+        initargs=(state,),
+        maxtasksperchild=maxtaskperchild,
+    ) as p:
+        for result in p.imap_unordered(Task(f), list_of_args, chunksize=chunksize):
             if isinstance(result, ErrorFromWorker):
                 raise RuntimeError(result.stacktrace if debug else str(result))
             yield result
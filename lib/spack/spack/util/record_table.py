@@ -0,0 +1,194 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+"""A compact, memory-mappable file format storing binary records addressed by fixed-size keys.
+
+The file is laid out as follows:
+
+  1. A header with a magic number, the format version, the number of records, the size of
+     keys, and the sizes of the metadata and summary sections.
+  2. A metadata section, containing a small JSON object.
+  3. A summary section, as opaque bytes, which is only read when asked for.
+  4. A table of ``(key, offset, length)`` entries sorted by key, used to locate records by
+     binary search.
+  5. The records themselves, as opaque bytes.
+
+Readers map the file in memory and only touch the records they are asked for, so the cost of
+opening a table does not depend on the size of its records, nor of its summary.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+from llnl.util.filesystem import rename
+
+from spack.error import SpackError
+
+#: Magic number at the beginning of every record table
+MAGIC = b"SPACKRT\0"
+
+#: Version of the format written by this module
+FORMAT_VERSION = 2
+
+#: Header: magic, format version, number of records, key size, metadata size, summary size
+_HEADER = struct.Struct("<8sIIIIQ")
+
+
+def _entry_struct(key_size: int) -> struct.Struct:
+    # Key, offset of the record from the beginning of the file, length of the record
+    return struct.Struct(f"<{key_size}sQI")
+
+
+def write(
+    path: Union[str, os.PathLike],
+    records: Iterable[Tuple[str, bytes]],
+    metadata: Optional[Dict[str, Any]] = None,
+    summary: bytes = b"",
+) -> None:
+    """Atomically write a record table to a file.
+
+    Args:
+        path: path of the file to be written
+        records: pairs of ``(key, record)``. All the keys must have the same length.
+        metadata: optional JSON serializable object stored in the header of the table, which is
+            read every time the table is opened
+        summary: optional data about all the records, which is read only when asked for
+    """
+    data = sorted((key.encode("utf-8"), record) for key, record in records)
+    key_size = len(data[0][0]) if data else 0
+    if any(len(key) != key_size for key, _ in data):
+        raise ValueError("all the keys in a record table must have the same length")
+
+    meta = json.dumps(metadata or {}, separators=(",", ":")).encode("utf-8")
+    entry = _entry_struct(key_size)
+
+    offset = _HEADER.size + len(meta) + len(summary) + entry.size * len(data)
+    table = bytearray()
+    for key, record in data:
+        table += entry.pack(key, offset, len(record))
+        offset += len(record)
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(
+                _HEADER.pack(MAGIC, FORMAT_VERSION, len(data), key_size, len(meta), len(summary))
+            )
+            f.write(meta)
+            f.write(summary)
+            f.write(table)
+            for _, record in data:
+                f.write(record)
+        rename(tmp, str(path))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class RecordTable:
+    """Read-only view of a record table stored in a file.
+
+    On platforms where memory maps prevent replacing the underlying file, the content of the
+    file is read in memory instead. Opening a table only reads its header and metadata, and
+    :meth:`close` unmaps the file.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]) -> None:
+        self.path = str(path)
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < _HEADER.size:
+                raise RecordTableError(f"{self.path} is too short to be a record table")
+            if sys.platform == "win32":
+                self._buffer: Union[bytes, mmap.mmap] = f.read()
+            else:
+                self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self._size, key_size, meta_size, summary_size = _HEADER.unpack_from(
+            self._buffer, 0
+        )
+        if magic != MAGIC:
+            raise RecordTableError(f"{self.path} is not a record table")
+        if version != FORMAT_VERSION:
+            raise RecordTableError(
+                f"{self.path} has format version {version}, expected {FORMAT_VERSION}"
+            )
+
+        self._key_size = key_size
+        self._entry = _entry_struct(key_size)
+        self._summary_start = _HEADER.size + meta_size
+        self._table_start = self._summary_start + summary_size
+        self._records_start = self._table_start + self._entry.size * self._size
+        if len(self._buffer) < self._records_start:
+            raise RecordTableError(f"{self.path} is truncated")
+
+        try:
+            meta = self._buffer[_HEADER.size : self._summary_start]
+            self.metadata: Dict[str, Any] = json.loads(bytes(meta).decode("utf-8"))
+        except ValueError as e:
+            raise RecordTableError(f"{self.path} has invalid metadata: {e}") from e
+
+    def __len__(self) -> int:
+        return self._size
+
+    def summary(self) -> bytes:
+        """Return the summary of the records stored in the table"""
+        return bytes(self._buffer[self._summary_start : self._table_start])
+
+    def _entry_at(self, idx: int) -> Tuple[bytes, int, int]:
+        return self._entry.unpack_from(self._buffer, self._table_start + idx * self._entry.size)
+
+    def _find(self, key: str) -> Optional[Tuple[int, int]]:
+        encoded = key.encode("utf-8")
+        if len(encoded) != self._key_size:
+            return None
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            current, offset, length = self._entry_at(mid)
+            if current < encoded:
+                lo = mid + 1
+            elif current > encoded:
+                hi = mid
+            else:
+                return offset, length
+        return None
+
+    def __contains__(self, key: str) -> bool:
+        return self._find(key) is not None
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the record associated with a key, or None if the key is not in the table."""
+        location = self._find(key)
+        if location is None:
+            return None
+        offset, length = location
+        if offset < self._records_start or offset + length > len(self._buffer):
+            raise RecordTableError(f"{self.path} is corrupt: record {key} is out of range")
+        return bytes(self._buffer[offset : offset + length])
+
+    def keys(self) -> Iterator[str]:
+        """Iterate over the keys in the table, in sorted order."""
+        for idx in range(self._size):
+            yield self._entry_at(idx)[0].decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        return self.keys()
+
+    def close(self) -> None:
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    def __enter__(self) -> "RecordTable":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class RecordTableError(SpackError):
+    """Raised when a file is not a valid record table"""
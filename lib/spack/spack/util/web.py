@@ -4,23 +4,28 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 import codecs
+import concurrent.futures
 import email.message
 import errno
+import http.client
 import json
 import os
 import os.path
 import re
 import shutil
+import socket
 import ssl
 import stat
 import sys
+import threading
+import time
 import traceback
 import urllib.parse
 from html.parser import HTMLParser
 from pathlib import Path, PurePosixPath
-from typing import IO, Dict, Iterable, List, Optional, Set, Tuple, Union
+from typing import IO, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
 from urllib.error import HTTPError, URLError
-from urllib.request import HTTPSHandler, Request, build_opener
+from urllib.request import HTTPHandler, HTTPSHandler, Request, build_opener
 
 import llnl.url
 from llnl.util import lang, tty
@@ -29,7 +34,7 @@
 import spack.config
 import spack.error
 import spack.util.executable
-import spack.util.parallel
+import spack.util.hash
 import spack.util.path
 import spack.util.url as url_util
 
@@ -63,6 +68,183 @@ def http_error_default(self, req, fp, code, msg, hdrs):
         raise DetailedHTTPError(req, code, msg, hdrs, fp)
 
 
+#: Maximum number of idle connections kept open per host
+MAX_IDLE_CONNECTIONS_PER_HOST = 8
+
+#: Errors on a reused connection that mean the server closed it while it was idle
+_STALE_CONNECTION_ERRORS = (ConnectionError, http.client.BadStatusLine)
+
+
+def _is_stale(error: BaseException) -> bool:
+    if isinstance(error, URLError) and not isinstance(error, HTTPError):
+        error = error.reason
+    return isinstance(error, _STALE_CONNECTION_ERRORS)
+
+
+class ConnectionPool:
+    """Thread-safe pool of idle, persistent HTTP(S) connections, by host.
+
+    A connection is taken out of the pool for the duration of a request, and put back when its
+    response has been read completely, so that the next request to the same host does not have
+    to connect, and do a TLS handshake, again. Connections are never shared with child processes.
+    """
+
+    def __init__(self, max_idle_per_host: int = MAX_IDLE_CONNECTIONS_PER_HOST):
+        self.max_idle_per_host = max_idle_per_host
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._idle: Dict[tuple, List[http.client.HTTPConnection]] = {}
+
+    def _check_pid(self):
+        # A forked child must not use the sockets of its parent. It doesn't close them either,
+        # since that would affect the parent in case of TLS.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle = {}
+
+    def get(self, key: tuple) -> Optional[http.client.HTTPConnection]:
+        """Return an idle connection for ``key``, or None if there is none."""
+        with self._lock:
+            self._check_pid()
+            connections = self._idle.get(key)
+            return connections.pop() if connections else None
+
+    def put(self, key: tuple, connection: http.client.HTTPConnection) -> None:
+        """Return a connection to the pool once its response has been read."""
+        with self._lock:
+            self._check_pid()
+            connections = self._idle.setdefault(key, [])
+            if len(connections) < self.max_idle_per_host:
+                connections.append(connection)
+                return
+        connection.close()
+
+    def clear(self) -> None:
+        """Close all idle connections."""
+        with self._lock:
+            self._check_pid()
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+#: Connections shared by all openers in Spack
+CONNECTION_POOL = ConnectionPool()
+
+
+class _PooledHTTPResponse(http.client.HTTPResponse):
+    """Response that puts its connection back in the pool when its body has been read."""
+
+    _release: Optional[Callable[[bool], None]] = None
+
+    def _close_conn(self):
+        super()._close_conn()
+        release, self._release = self._release, None
+        if release is not None:
+            release(not self.will_close)
+
+    def close(self):
+        # A connection with unread data in it cannot be used for another request.
+        if self.fp is not None and (self.chunked or self.length != 0):
+            self.will_close = True
+        super().close()
+
+
+class KeepAliveHandlerMixin:
+    """Mixin for urllib's HTTP(S) handlers that keeps connections open in a
+    :class:`ConnectionPool` instead of closing them after every request."""
+
+    def __init__(self, *args, pool: Optional[ConnectionPool] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = CONNECTION_POOL if pool is None else pool
+
+    def do_open(self, http_class, req, **http_conn_args):
+        host = req.host
+        if not host:
+            raise URLError("no host given")
+
+        headers = dict(req.unredirected_hdrs)
+        headers.update({k: v for k, v in req.headers.items() if k not in headers})
+        headers["Connection"] = "keep-alive"
+        headers = {name.title(): val for name, val in headers.items()}
+
+        tunnel_headers = {}
+        if req._tunnel_host and "Proxy-Authorization" in headers:
+            # Proxy-Authorization should not be sent to origin server.
+            tunnel_headers["Proxy-Authorization"] = headers.pop("Proxy-Authorization")
+
+        key = (http_class, host, req._tunnel_host, tuple(sorted(http_conn_args.items())))
+
+        # A request with a body that is consumed when sent can only be sent once.
+        can_resend = req.data is None or isinstance(req.data, bytes)
+
+        while True:
+            connection = self.pool.get(key)
+            reused = connection is not None
+            if connection is None:
+                connection = http_class(host, timeout=req.timeout, **http_conn_args)
+                connection.response_class = _PooledHTTPResponse
+                if req._tunnel_host:
+                    connection.set_tunnel(req._tunnel_host, headers=tunnel_headers)
+            else:
+                connection.timeout = req.timeout
+                if connection.sock is not None:
+                    connection.sock.settimeout(
+                        socket.getdefaulttimeout()
+                        if req.timeout is socket._GLOBAL_DEFAULT_TIMEOUT
+                        else req.timeout
+                    )
+            connection.set_debuglevel(self._debuglevel)
+
+            try:
+                response = self._send(connection, req, headers)
+            except BaseException as e:
+                connection.close()
+                if reused and can_resend and _is_stale(e):
+                    continue
+                raise
+            break
+
+        def release(reusable: bool) -> None:
+            if reusable:
+                self.pool.put(key, connection)
+            else:
+                connection.close()
+
+        if response.will_close:
+            # http.client already handed the socket over to the response
+            release(False)
+        else:
+            response._release = release
+
+        response.url = req.get_full_url()
+        # urllib clients expect the reason in .msg
+        response.msg = response.reason
+        return response
+
+    def _send(self, connection, req, headers):
+        try:
+            connection.request(
+                req.get_method(),
+                req.selector,
+                req.data,
+                headers,
+                encode_chunked=req.has_header("Transfer-encoding"),
+            )
+        except OSError as err:  # timeout error
+            raise URLError(err)
+        return connection.getresponse()
+
+
+class KeepAliveHTTPHandler(KeepAliveHandlerMixin, HTTPHandler):
+    """HTTP handler that reuses connections"""
+
+
+class KeepAliveHTTPSHandler(KeepAliveHandlerMixin, HTTPSHandler):
+    """HTTPS handler that reuses connections"""
+
+
 def custom_ssl_certs() -> Optional[Tuple[bool, str]]:
     """Returns a tuple (is_file, path) if custom SSL certifates are configured and valid."""
     ssl_certs = spack.config.get("config:ssl_certs")
@@ -122,12 +304,20 @@ def _urlopen():
 
     # One opener with HTTPS ssl enabled
     with_ssl = build_opener(
-        s3, gcs, HTTPSHandler(context=ssl_create_default_context()), error_handler
+        s3,
+        gcs,
+        KeepAliveHTTPHandler(),
+        KeepAliveHTTPSHandler(context=ssl_create_default_context()),
+        error_handler,
     )
 
     # One opener with HTTPS ssl disabled
     without_ssl = build_opener(
-        s3, gcs, HTTPSHandler(context=ssl._create_unverified_context()), error_handler
+        s3,
+        gcs,
+        KeepAliveHTTPHandler(),
+        KeepAliveHTTPSHandler(context=ssl._create_unverified_context()),
+        error_handler,
     )
 
     # And dynamically dispatch based on the config:verify_ssl.
@@ -230,6 +420,118 @@ def read_from_url(url, accept_content_type=None):
     return response.geturl(), response.headers, response
 
 
+#: Directory of the web pages stored in the misc cache, relative to its root
+_PAGE_CACHE_DIR = "web_pages"
+
+#: Maximum number of web pages stored in the misc cache. The least recently used ones are
+#: removed first.
+MAX_CACHED_PAGES = 1000
+
+
+def _page_cache_key(url: str) -> str:
+    return f"{_PAGE_CACHE_DIR}/{spack.util.hash.b32_hash(url)}"
+
+
+def _read_cached_page(url: str) -> Optional[dict]:
+    import spack.caches  # break cycle
+
+    key = _page_cache_key(url)
+    try:
+        if not os.path.exists(spack.caches.MISC_CACHE.cache_path(key)):
+            return None
+        with spack.caches.MISC_CACHE.read_transaction(key) as f:
+            entry = json.load(f)
+    except (OSError, ValueError, spack.error.SpackError) as e:
+        tty.debug(f"Cannot read cached page of {url}: {e}")
+        return None
+    return entry if isinstance(entry, dict) and entry.get("url") == url else None
+
+
+def _write_cached_page(url: str, response_url: str, etag: str, page: str) -> None:
+    import spack.caches  # break cycle
+
+    key = _page_cache_key(url)
+    entry = {"url": url, "response_url": response_url, "etag": etag, "page": page}
+    try:
+        with spack.caches.MISC_CACHE.write_transaction(key) as (old, new):
+            json.dump(entry, new)
+    except (OSError, spack.error.SpackError) as e:
+        tty.debug(f"Cannot cache page of {url}: {e}")
+
+
+def _touch_cached_page(url: str) -> None:
+    """Mark a page stored in the misc cache as the most recently used one"""
+    import spack.caches  # break cycle
+
+    try:
+        os.utime(spack.caches.MISC_CACHE.cache_path(_page_cache_key(url)))
+    except OSError:
+        pass
+
+
+def _prune_page_cache() -> None:
+    """Remove the least recently used web pages from the misc cache, so that at most
+    ``MAX_CACHED_PAGES`` are kept."""
+    import spack.caches  # break cycle
+
+    try:
+        with os.scandir(spack.caches.MISC_CACHE.cache_path(_PAGE_CACHE_DIR)) as it:
+            entries = [(e.stat().st_mtime, e.name) for e in it if not e.name.startswith(".")]
+    except OSError:
+        return
+
+    entries.sort(reverse=True)
+    for _, name in entries[MAX_CACHED_PAGES:]:
+        try:
+            spack.caches.MISC_CACHE.remove(f"{_PAGE_CACHE_DIR}/{name}")
+        except (OSError, spack.error.SpackError) as e:
+            tty.debug(f"Cannot remove cached page {name}: {e}")
+
+
+def read_html_page(url: str) -> Tuple[Optional[str], Optional[str]]:
+    """Read an HTML page, and return the URL of the response and the text of the page, or
+    ``(None, None)`` if the page is not HTML.
+
+    Pages with a strong ETag are stored in the misc cache, and only read again when the server
+    says they changed. At most ``MAX_CACHED_PAGES`` are kept, see ``spider``."""
+    headers = {"User-Agent": SPACK_USER_AGENT}
+    cacheable = url.startswith(("http://", "https://"))
+    cached = _read_cached_page(url) if cacheable else None
+    if cached:
+        headers["If-None-Match"] = f'"{cached["etag"]}"'
+
+    try:
+        response = urlopen(Request(url, headers=headers))
+    except HTTPError as e:
+        if cached and e.code == 304:
+            e.close()
+            tty.debug(f"Using cached page of {url}")
+            _touch_cached_page(url)
+            return cached["response_url"], cached["page"]
+        raise
+
+    with response:
+        try:
+            content_type = get_header(response.headers, "Content-type")
+        except KeyError:
+            content_type = None
+        if not content_type or not content_type.startswith("text/html"):
+            msg = f"ignoring page {url}"
+            if content_type:
+                msg += f" with content type {content_type}"
+            tty.debug(msg)
+            return None, None
+
+        response_url = response.geturl()
+        page = codecs.getreader("utf-8")(response).read()
+        etag = parse_etag(response.headers.get("ETag"))
+
+    if cacheable and etag:
+        _write_cached_page(url, response_url, etag, page)
+
+    return response_url, page
+
+
 def push_to_url(local_file_path, remote_path, keep_original=True, extra_args=None):
     remote_url = urllib.parse.urlparse(remote_path)
     if remote_url.scheme == "file":
@@ -462,7 +764,7 @@ def url_exists(url, curl=None):
         urlopen(
             Request(url, method="HEAD", headers={"User-Agent": SPACK_USER_AGENT}),
             timeout=spack.config.get("config:connect_timeout", 10),
-        )
+        ).close()
         return True
     except (TimeoutError, URLError) as e:
         tty.debug(f"Failure reading {url}: {e}")
@@ -613,18 +915,29 @@ def list_url(url, recursive=False):
         return gcs.get_all_blobs(recursive=recursive)
 
 
+#: Number of pages the spider reads at the same time, when no concurrency is given
+SPIDER_CONCURRENCY = 32
+
+
 def spider(
-    root_urls: Union[str, Iterable[str]], depth: int = 0, concurrency: Optional[int] = None
+    root_urls: Union[str, Iterable[str]],
+    depth: int = 0,
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
 ):
     """Get web pages from root URLs.
 
     If depth is specified (e.g., depth=2), then this will also follow up to <depth> levels
-    of links from each root.
+    of links from each root. Pages are read in threads as soon as they are found, and every
+    URL is read at most once. Afterwards, only the ``MAX_CACHED_PAGES`` most recently used
+    pages are kept in the misc cache.
 
     Args:
         root_urls: root urls used as a starting point for spidering
         depth: level of recursion into links
         concurrency: number of simultaneous requests that can be sent
+        timeout: time in seconds after which no more pages are read. Defaults to
+            ``config:spider_timeout``, 0 means no limit.
 
     Returns:
         A dict of pages visited (URL) mapped to their full text and the set of visited links.
@@ -632,32 +945,55 @@ def spider(
     if isinstance(root_urls, str):
         root_urls = [root_urls]
 
-    current_depth = 0
-    pages, links, spider_args = {}, set(), []
+    if timeout is None:
+        timeout = spack.config.get("config:spider_timeout", 0)
+    deadline = time.monotonic() + timeout if timeout else None
 
+    pages: Dict[str, str] = {}
+    links: Set[str] = set()
     _visited: Set[str] = set()
-    go_deeper = current_depth < depth
-    for root_str in root_urls:
-        root = urllib.parse.urlparse(root_str)
-        spider_args.append((root, go_deeper, _visited))
-
-    with spack.util.parallel.make_concurrent_executor(concurrency, require_fork=False) as tp:
-        while current_depth <= depth:
-            tty.debug(
-                f"SPIDER: [depth={current_depth}, max_depth={depth}, urls={len(spider_args)}]"
+    pending: Dict[concurrent.futures.Future, int] = {}
+
+    tp = concurrent.futures.ThreadPoolExecutor(concurrency or SPIDER_CONCURRENCY)
+
+    def submit(url: str, current_depth: int) -> None:
+        if url in _visited:
+            return
+        _visited.add(url)
+        future = tp.submit(_spider, urllib.parse.urlparse(url), current_depth < depth, _visited)
+        pending[future] = current_depth
+
+    try:
+        for root in root_urls:
+            submit(root, 0)
+
+        while pending:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            done, _ = concurrent.futures.wait(
+                pending, timeout=remaining, return_when=concurrent.futures.FIRST_COMPLETED
             )
-            results = [tp.submit(_spider, *one_search_args) for one_search_args in spider_args]
-            spider_args = []
-            go_deeper = current_depth < depth
-            for future in results:
-                sub_pages, sub_links, sub_spider_args, sub_visited = future.result()
-                _visited.update(sub_visited)
-                sub_spider_args = [(x, go_deeper, _visited) for x in sub_spider_args]
+            if not done:
+                tty.warn(
+                    f"Stopped reading web pages after {timeout} seconds, "
+                    f"{len(pending)} pages were not read"
+                )
+                break
+
+            for future in done:
+                current_depth = pending.pop(future)
+                sub_pages, sub_links, subcalls = future.result()
                 pages.update(sub_pages)
                 links.update(sub_links)
-                spider_args.extend(sub_spider_args)
+                for link in subcalls:
+                    submit(link, current_depth + 1)
 
-            current_depth += 1
+            tty.debug(f"SPIDER: [pages={len(pages)}, pending={len(pending)}]")
+    finally:
+        for future in pending:
+            future.cancel()
+        # Requests that are still running are bounded by the connection timeout
+        tp.shutdown(wait=True)
+        _prune_page_cache()
 
     return pages, links
 
@@ -672,25 +1008,23 @@ def _spider(url: urllib.parse.ParseResult, collect_nested: bool, _visited: Set[s
         url: url being fetched and searched for links
         collect_nested: whether we want to collect arguments for nested spidering on the
             links found in this url
-        _visited: links already visited
+        _visited: links already visited, which are not returned for nested spidering
 
     Returns:
         A tuple of:
         - pages: dict of pages visited (URL) mapped to their full text.
         - links: set of links encountered while visiting the pages.
-        - spider_args: argument for subsequent call to spider
-        - visited: updated set of visited urls
+        - spider_args: links to spider next
     """
     pages: Dict[str, str] = {}  # dict from page URL -> text content.
     links: Set[str] = set()  # set of all links seen on visited pages.
     subcalls: List[str] = []
 
     try:
-        response_url, _, response = read_from_url(url, "text/html")
-        if not response_url or not response:
-            return pages, links, subcalls, _visited
+        response_url, page = read_html_page(url.geturl())
+        if not response_url or page is None:
+            return pages, links, subcalls
 
-        page = codecs.getreader("utf-8")(response).read()
         pages[response_url] = page
 
         # Parse out the include-fragments in the page
@@ -706,18 +1040,17 @@ def _spider(url: urllib.parse.ParseResult, collect_nested: bool, _visited: Set[s
             raw_link = metadata_parser.fragments.pop()
             abs_link = url_util.join(response_url, raw_link.strip(), resolve_href=True)
 
-            fragment_response_url = None
+            fragment_response_url, fragment = None, None
             try:
                 # This seems to be text/html, though text/fragment+html is also used
-                fragment_response_url, _, fragment_response = read_from_url(abs_link, "text/html")
+                fragment_response_url, fragment = read_html_page(abs_link)
             except Exception as e:
                 msg = f"Error reading fragment: {(type(e), str(e))}:{traceback.format_exc()}"
                 tty.debug(msg)
 
-            if not fragment_response_url or not fragment_response:
+            if not fragment_response_url or fragment is None:
                 continue
 
-            fragment = codecs.getreader("utf-8")(fragment_response).read()
             fragments.add(fragment)
 
             pages[fragment_response_url] = fragment
@@ -744,7 +1077,6 @@ def _spider(url: urllib.parse.ParseResult, collect_nested: bool, _visited: Set[s
             # If we're not at max depth, follow links.
             if collect_nested:
                 subcalls.append(abs_link)
-                _visited.add(abs_link)
 
     except (TimeoutError, URLError) as e:
         tty.debug(f"[SPIDER] Unable to read: {url}")
@@ -768,9 +1100,9 @@ def _spider(url: urllib.parse.ParseResult, collect_nested: bool, _visited: Set[s
         tty.debug(f"Error in _spider: {type(e)}:{str(e)}", traceback.format_exc())
 
     finally:
-        tty.debug(f"SPIDER: [url={url}]")
+        tty.debug(f"SPIDER: [url={url.geturl()}]")
 
-    return pages, links, subcalls, _visited
+    return pages, links, subcalls
 
 
 def get_header(headers, header_name):
@@ -12,6 +12,7 @@
 import inspect
 import itertools
 import re
+import sys
 from typing import Any, Callable, Collection, Iterable, List, Optional, Tuple, Type, Union
 
 import llnl.util.lang as lang
@@ -294,6 +295,15 @@ class AbstractVariant:
     values.
     """
 
+    # Concrete specs have many variants, and variants of concrete specs are numerous
+    __slots__ = (
+        "name",
+        "propagate",
+        "_value",
+        "_original_value",
+        "_patches_in_order_of_appearance",
+    )
+
     name: str
     propagate: bool
     _value: ValueType
@@ -309,17 +319,19 @@ def __init__(self, name: str, value: Any, propagate: bool = False):
     @staticmethod
     def from_node_dict(name: str, value: Union[str, List[str]]) -> "AbstractVariant":
         """Reconstruct a variant from a node dict."""
+        # The same names and values are read in many specs, so store them once
+        name = sys.intern(name)
         if isinstance(value, list):
             # read multi-value variants in and be faithful to the YAML
             mvar = MultiValuedVariant(name, ())
-            mvar._value = tuple(value)
+            mvar._value = tuple(sys.intern(v) if isinstance(v, str) else v for v in value)
             mvar._original_value = mvar._value
             return mvar
 
         elif str(value).upper() == "TRUE" or str(value).upper() == "FALSE":
             return BoolValuedVariant(name, value)
 
-        return SingleValuedVariant(name, value)
+        return SingleValuedVariant(name, sys.intern(value) if isinstance(value, str) else value)
 
     def yaml_entry(self) -> Tuple[str, SerializedValueType]:
         """Returns a key, value tuple suitable to be an entry in a yaml dict.
@@ -391,6 +403,19 @@ def copy(self) -> "AbstractVariant":
         """
         return type(self)(self.name, self._original_value, self.propagate)
 
+    def _clone(self) -> "AbstractVariant":
+        """Returns an exact copy of self, without validating and normalizing its value again.
+
+        Unlike ``copy()``, this preserves the order of the values of variants read from node
+        dicts, and is used to decode many specs with the same variants.
+        """
+        clone = object.__new__(type(self))
+        clone.name = self.name
+        clone.propagate = self.propagate
+        clone._value = self._value
+        clone._original_value = self._original_value
+        return clone
+
     @implicit_variant_conversion
     def satisfies(self, other: "AbstractVariant") -> bool:
         """Returns true if ``other.name == self.name``, because any value that
@@ -468,6 +493,8 @@ def __str__(self) -> str:
 class MultiValuedVariant(AbstractVariant):
     """A variant that can hold multiple values at once."""
 
+    __slots__ = ()
+
     @implicit_variant_conversion
     def satisfies(self, other: AbstractVariant) -> bool:
         """Returns true if ``other.name == self.name`` and ``other.value`` is
@@ -516,6 +543,8 @@ def __str__(self) -> str:
 class SingleValuedVariant(AbstractVariant):
     """A variant that can hold multiple values, but one at a time."""
 
+    __slots__ = ()
+
     def _value_setter(self, value: ValueType) -> None:
         # Treat the value as a multi-valued variant
         super()._value_setter(value)
@@ -575,6 +604,8 @@ class BoolValuedVariant(SingleValuedVariant):
     BoolValuedVariant can also hold the value '*', for coerced
     comparisons between ``foo=*`` and ``+foo`` or ``~foo``."""
 
+    __slots__ = ()
+
     def _value_setter(self, value: ValueType) -> None:
         # Check the string representation of the value and turn
         # it to a boolean
@@ -6,7 +6,7 @@
 import numbers
 import re
 from bisect import bisect_left
-from typing import List, Optional, Tuple, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 from spack.util.spack_yaml import syaml_dict
 
@@ -115,7 +115,7 @@ def parse_string_components(string: str) -> Tuple[tuple, tuple]:
 
 
 class ConcreteVersion:
-    pass
+    __slots__ = ()
 
 
 def _stringify_version(versions: Tuple[tuple, tuple], separators: tuple) -> str:
@@ -650,6 +650,8 @@ def up_to(self, index) -> StandardVersion:
 
 
 class ClosedOpenRange:
+    __slots__ = ["lo", "hi"]
+
     def __init__(self, lo: StandardVersion, hi: StandardVersion):
         if hi < lo:
             raise EmptyRangeError(f"{lo}..{hi} is an empty range")
@@ -795,6 +797,8 @@ def intersection(self, other: Union["ClosedOpenRange", ConcreteVersion]):
 class VersionList:
     """Sorted, non-redundant list of Version and ClosedOpenRange elements."""
 
+    __slots__ = ["versions"]
+
     def __init__(self, vlist=None):
         self.versions: List[Union[StandardVersion, GitVersion, ClosedOpenRange]] = []
         if vlist is None:
@@ -866,7 +870,10 @@ def concrete_range_as_version(self) -> Optional[ConcreteVersion]:
         return None
 
     def copy(self):
-        return VersionList(self)
+        # The elements are immutable, and already sorted and non-redundant
+        clone = VersionList()
+        clone.versions = self.versions[:]
+        return clone
 
     def lowest(self) -> Optional[StandardVersion]:
         """Get the lowest version in the list."""
@@ -932,7 +939,7 @@ def from_dict(dictionary):
         if "versions" in dictionary:
             return VersionList(dictionary["versions"])
         elif "version" in dictionary:
-            return VersionList([Version(dictionary["version"])])
+            return VersionList([interned_version(dictionary["version"])])
         raise ValueError("Dict must have 'version' or 'versions' in it.")
 
     def update(self, other: "VersionList"):
@@ -1149,6 +1156,28 @@ def Version(string: Union[str, int]) -> Union[GitVersion, StandardVersion]:
     return StandardVersion.from_string(str(string))
 
 
+#: Maximum number of versions kept by ``interned_version``
+MAX_INTERNED_VERSIONS = 1 << 16
+
+_interned_versions: Dict[str, StandardVersion] = {}
+
+
+def interned_version(string: str) -> Union[GitVersion, StandardVersion]:
+    """Same as ``Version``, but equal standard versions share the same object.
+
+    This is used for the versions of concrete specs read from files, which can be numerous.
+    Standard versions are immutable, so they can be shared. Git versions are not shared,
+    since they are attached to a repository lookup."""
+    result = _interned_versions.get(string)
+    if result is None:
+        result = Version(string)
+        if isinstance(result, StandardVersion):
+            if len(_interned_versions) >= MAX_INTERNED_VERSIONS:
+                _interned_versions.clear()
+            _interned_versions[string] = result
+    return result
+
+
 def VersionRange(lo: Union[str, StandardVersion], hi: Union[str, StandardVersion]):
     lo = lo if isinstance(lo, StandardVersion) else StandardVersion.from_string(lo)
     hi = hi if isinstance(hi, StandardVersion) else StandardVersion.from_string(hi)
@@ -41,10 +41,10 @@ class Turbomole(Package):
     # variants so there could be up to 3 installs per version. Switching
     # between them would be accomplished with `module swap` commands.
 
-    def do_fetch(self, mirror_only=True):
+    def do_fetch(self, mirror_only=True, **kwargs):
         if "+mpi" in self.spec and "+smp" in self.spec:
             raise InstallError("Can not have both SMP and MPI enabled in the " "same build.")
-        super().do_fetch(mirror_only)
+        super().do_fetch(mirror_only, **kwargs)
 
     def get_tm_arch(self):
         if "TURBOMOLE" in os.getcwd():